@@ -1,15 +1,43 @@
 from flask import Flask
-from .config import Config
-from .extensions import db, migrate, jwt
 
-def create_app():
+
+def create_app(config_class = None):
+  # Everything below is imported here rather than at the top, so importing the
+  # package (as app.runtime does for batch jobs) doesn't load the web stack,
+  # nor read the environment into Config before app.runtime has loaded .env
+  from .config import Config
+  from flask_jwt_extended import JWTManager
+  from flask_migrate import Migrate
+  from .extensions import db, enable_sqlite_foreign_keys
+  from . import sharding, billing_scheduler, analytics, serialization, events, archive, fx, profiling, categories, statements, integrity
+
   app = Flask(__name__)
-  app.config.from_object(Config)
+  app.config.from_object(config_class or Config)
 
+  sharding.init_app(app)  # Registers shard binds, so it must run before db.init_app
   db.init_app(app)
-  migrate.init_app(app, db)
-  jwt.init_app(app)
+  with app.app_context():
+    sharding.drop_shard_metadata(db)
+    # Only the default database holds every table a foreign key points at;
+    # shards don't have users, so their cross-database keys can't be enforced
+    enable_sqlite_foreign_keys(db.engine)
+  Migrate(app, db)
+  JWTManager(app)
+  serialization.init_app(app)
 
   from app import models  # Import models to register them with SQLAlchemy
 
+  billing_scheduler.init_app(app)
+  analytics.init_app(app)
+  events.init_app(app)
+  archive.init_app(app)
+  fx.init_app(app)
+  categories.init_app(app)
+  statements.init_app(app)
+  integrity.init_app(app)
+  profiling.init_app(app)
+
+  from app.routes import register_routes
+  register_routes(app)
+
   return app
@@ -0,0 +1,189 @@
+"""
+Columnar in-memory snapshot of expense splits (hot and archived) for insight queries.
+
+Each split is one row across a handful of NumPy arrays (integer cents, user,
+payer, group, day number, whether it came from a subscription), so insights
+are vectorised group-bys over a few megabytes instead of ORM rows.
+
+The snapshot refreshes incrementally: only splits with an id above the last
+one loaded (per shard) are read. Split ids are never reused (AUTOINCREMENT),
+so new splits always land above that mark, but deleted rows leave no trace
+to append; at most every RECONCILE_SECONDS the row counts are compared with
+the database and a mismatch triggers a rebuild.
+"""
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import sqlalchemy as sa
+from flask import current_app
+
+EPOCH = date(1970, 1, 1)
+
+# Most an insight can lag behind a delete
+RECONCILE_SECONDS = 60
+
+# Rows fetched per round trip while loading
+FETCH_SIZE = 50000
+
+COLUMNS = {
+  "split_id": np.int64,
+  "group_id": np.int32,
+  "user_id": np.int32,
+  "payer_id": np.int32,
+  "cents": np.int64,
+  "day": np.int32,
+  "generated": np.bool_,
+}
+
+
+def to_day(day):
+  """Day number (days since 1970-01-01) of a date, as stored in the snapshot."""
+  return (day - EPOCH).days
+
+
+def day_to_period(days):
+  """Vectorised day number -> YYYYMM period, e.g. 20513 -> 202603."""
+  months = np.asarray(days).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+  return (1970 + months // 12) * 100 + months % 12 + 1
+
+
+class AnalyticsSnapshot:
+  """
+  Column arrays of every expense split. Read them with `columns()`, which
+  refreshes first; the returned dict is never mutated, so it can be used
+  without holding a lock.
+  """
+
+  def __init__(self, reconcile_seconds = RECONCILE_SECONDS):
+    self.reconcile_seconds = reconcile_seconds
+    self._columns = _empty_columns()
+    self._high_water = {}   # shard_id -> highest split id loaded
+    self._row_counts = {}   # shard_id -> rows loaded
+    self._reconciled_at = None
+    self._lock = threading.Lock()
+
+  @property
+  def nbytes(self):
+    return sum(array.nbytes for array in self._columns.values())
+
+  def __len__(self):
+    return len(self._columns["split_id"])
+
+  def columns(self):
+    self.refresh()
+    return self._columns
+
+  def rebuild(self):
+    with self._lock:
+      self._reset()
+      self._append_new()
+      self._reconciled_at = time.monotonic()
+
+  def refresh(self):
+    """Append splits added since the last refresh; rebuild if rows went missing."""
+    with self._lock:
+      self._append_new()
+
+      now = time.monotonic()
+      if self._reconciled_at is None or now - self._reconciled_at >= self.reconcile_seconds:
+        self._reconciled_at = now
+        if self._counts_changed():
+          self._reset()
+          self._append_new()
+
+  def _reset(self):
+    self._columns = _empty_columns()
+    self._high_water, self._row_counts = {}, {}
+
+  def _append_new(self):
+    from app.sharding import get_router
+
+    chunks = []
+    for shard_id in get_router().shard_ids:
+      chunk = self._load(shard_id, after = self._high_water.get(shard_id, 0))
+      if len(chunk["split_id"]):
+        self._high_water[shard_id] = int(chunk["split_id"][-1])
+        self._row_counts[shard_id] = self._row_counts.get(shard_id, 0) + len(chunk["split_id"])
+        chunks.append(chunk)
+
+    if chunks:
+      # Build new arrays rather than growing the old ones, so readers holding
+      # the previous dict keep a consistent view
+      self._columns = {
+        name: np.concatenate([self._columns[name]] + [chunk[name] for chunk in chunks])
+        for name in COLUMNS
+      }
+
+  def _load(self, shard_id, after):
+    """Read the splits with id > after from one shard (hot and archived) into column arrays."""
+    from app.extensions import db
+    from app.models import Expense, ExpenseSplit, GeneratedExpense, ArchivedExpense, ArchivedExpenseSplit
+
+    hot = (
+      sa.select(
+        ExpenseSplit.id.label("split_id"),
+        Expense.group_id,
+        ExpenseSplit.user_id,
+        Expense.created_by,
+        # Integer cents and day numbers come straight out of SQLite, no Decimal/datetime objects
+        sa.cast(sa.func.round(ExpenseSplit.amount_owed * 100), sa.Integer),
+        sa.cast(sa.func.julianday(Expense.date) - 2440587.5, sa.Integer),
+        GeneratedExpense.id.is_not(None),
+      )
+      .join(Expense, ExpenseSplit.expense_id == Expense.id)
+      .outerjoin(GeneratedExpense, GeneratedExpense.expense_id == Expense.id)
+      .where(ExpenseSplit.id > after)
+    )
+    # Archived splits keep their ids; subscription-generated expenses are never archived
+    archived = (
+      sa.select(
+        ArchivedExpenseSplit.id,
+        ArchivedExpense.group_id,
+        ArchivedExpenseSplit.user_id,
+        ArchivedExpense.created_by,
+        sa.cast(sa.func.round(ArchivedExpenseSplit.amount_owed * 100), sa.Integer),
+        sa.cast(sa.func.julianday(ArchivedExpense.date) - 2440587.5, sa.Integer),
+        sa.literal(False),
+      )
+      .join(ArchivedExpense, ArchivedExpenseSplit.expense_id == ArchivedExpense.id)
+      .where(ArchivedExpenseSplit.id > after)
+    )
+    query = sa.union_all(hot, archived)
+    query = query.order_by(query.selected_columns.split_id)
+
+    result = db.session.execute(query, bind_arguments = {"shard_id": shard_id})
+    chunks = [np.array(rows, dtype = np.int64) for rows in result.partitions(FETCH_SIZE)]
+    if not chunks:
+      return _empty_columns()
+
+    table = np.concatenate(chunks)
+    return {name: table[:, i].astype(dtype) for i, (name, dtype) in enumerate(COLUMNS.items())}
+
+  def _counts_changed(self):
+    from app.extensions import db
+    from app.models import ExpenseSplit, ArchivedExpenseSplit
+    from app.sharding import get_router
+
+    # Archiving moves splits without changing the total
+    hot = sa.select(sa.func.count(ExpenseSplit.id)).scalar_subquery()
+    archived = sa.select(sa.func.count(ArchivedExpenseSplit.id)).scalar_subquery()
+    for shard_id in get_router().shard_ids:
+      count = db.session.execute(sa.select(hot + archived), bind_arguments = {"shard_id": shard_id}).scalar()
+      if count != self._row_counts.get(shard_id, 0):
+        return True
+    return False
+
+
+def _empty_columns():
+  return {name: np.empty(0, dtype = dtype) for name, dtype in COLUMNS.items()}
+
+
+def get_snapshot():
+  return current_app.extensions["analytics_snapshot"]
+
+
+def init_app(app):
+  # Built lazily by the first insight query
+  app.extensions["analytics_snapshot"] = AnalyticsSnapshot()
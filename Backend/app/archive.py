@@ -0,0 +1,245 @@
+"""
+Hot/cold archival of old group history.
+
+Balances are derived from every expense, split and confirmed settlement a
+group ever had, so a long-lived group's balance reads and listings slow
+down year after year. `archive_group_history(group, before)` closes a
+group's history before a date: the rows are moved into the archive tables
+(on the same shard, keeping their ids) and what they add up to is carried
+forward into the group's opening balances, one row per (debtor, creditor)
+pair. Balance reads add the opening balances to the hot rows, so archiving
+never changes a balance, and only the hot rows are read. Listings take
+`include_archived = True` and expense details fall back to the archive, so
+the history stays reachable.
+
+Left hot whatever their date:
+  - pending settlements, which can still be confirmed or rejected,
+  - subscription-generated expenses, whose GeneratedExpense rows record
+    which periods were billed.
+
+Expenses in another currency than the group's are carried forward
+converted at their own day's rate (see app.fx), like every balance read.
+
+The hot tables never reuse an id (AUTOINCREMENT), so no new row can take
+the id of an archived one. Archived expenses drop out of expense search.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import click
+from sqlalchemy import select, insert, delete, func, case
+
+from app.extensions import db
+from app.models import (
+  Group, Expense, ExpenseSplit, GeneratedExpense, Settlement,
+  ArchivedExpense, ArchivedExpenseSplit, ArchivedSettlement, BalanceCheckpoint, OpeningBalance
+)
+from app.services.balance_service import stream_converted_expenses
+from app.sharding import group_bind_arguments
+from app.transactions import commit
+
+# Hot model -> its archive table
+ARCHIVED = {
+  Expense: ArchivedExpense,
+  ExpenseSplit: ArchivedExpenseSplit,
+  Settlement: ArchivedSettlement,
+}
+
+# Rows moved per batch; each batch is its own transaction (unless inside
+# billnest_transaction()), so other writers get the database between batches
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def archive_group_history(group, before, batch_size = ARCHIVE_BATCH_SIZE):
+  """
+  Move a group's history dated before `before` to the archive.
+
+  Expenses are archived by their date and settlements by when they were
+  requested. Each batch moves its rows and updates the opening balances and
+  the checkpoint totals together, so a run that stops part way leaves the
+  balances correct and can simply be run again.
+
+  Args:
+      group (Group): The group to archive.
+      before (datetime): Archive history dated before this.
+      batch_size (int): Rows moved per batch.
+
+  Returns:
+      dict: {"expenses": int, "settlements": int} rows archived by this run.
+  """
+  if before > datetime.utcnow():
+    raise ValueError("Cannot archive history that hasn't happened yet.")
+
+  group_id = group.id
+  bind_arguments = group_bind_arguments(group_id)
+  checkpoint = _get_checkpoint(group_id)
+
+  expenses_due = (
+    select(Expense.id)
+    .where(
+      Expense.group_id == group_id,
+      Expense.date < before,
+      Expense.id.not_in(select(GeneratedExpense.expense_id))
+    )
+    .order_by(Expense.id)
+  )
+  settlements_due = (
+    select(Settlement.id)
+    .where(Settlement.group_id == group_id, Settlement.status != "pending", Settlement.created_at < before)
+    .order_by(Settlement.id)
+  )
+
+  archived = {"expenses": 0, "settlements": 0}
+  for key, due, archive_batch in (
+    ("expenses", expenses_due, _archive_expenses),
+    ("settlements", settlements_due, _archive_settlements),
+  ):
+    while True:
+      ids = db.session.scalars(due.limit(batch_size), bind_arguments = bind_arguments).all()
+      if not ids:
+        break
+      archive_batch(group, ids, checkpoint, bind_arguments)
+      commit()
+      archived[key] += len(ids)
+
+  if checkpoint.closed_before is None or before > checkpoint.closed_before:
+    checkpoint.closed_before = before
+  commit()
+
+  # Collections loaded before the run still hold the archived rows
+  db.session.expire(group, ["expenses", "settlements"])
+  return archived
+
+
+def archive_closed_periods(before, batch_size = ARCHIVE_BATCH_SIZE):
+  """
+  Archive every group's history dated before `before`.
+
+  Returns:
+      dict: {"groups": int, "expenses": int, "settlements": int}
+  """
+  totals = {"groups": 0, "expenses": 0, "settlements": 0}
+  for group_id in db.session.scalars(select(Group.id).order_by(Group.id)).all():
+    archived = archive_group_history(db.session.get(Group, group_id), before, batch_size)
+    totals["groups"] += 1
+    totals["expenses"] += archived["expenses"]
+    totals["settlements"] += archived["settlements"]
+  return totals
+
+
+def _get_checkpoint(group_id):
+  checkpoint = db.session.scalar(select(BalanceCheckpoint).where(BalanceCheckpoint.group_id == group_id))
+  if checkpoint is None:
+    checkpoint = BalanceCheckpoint(
+      group_id = group_id, expense_count = 0, total_spent = Decimal("0.00"), settlement_count = 0
+    )
+    db.session.add(checkpoint)
+  return checkpoint
+
+
+def _archive_expenses(group, ids, checkpoint, bind_arguments):
+  in_batch = Expense.id.in_(ids)
+  splits_in_batch = ExpenseSplit.expense_id.in_(ids)
+  in_base_currency = Expense.currency == group.base_currency
+
+  # What each debtor owed each payer across the batch
+  debts = db.session.execute(
+    select(ExpenseSplit.user_id, Expense.created_by, func.sum(ExpenseSplit.amount_owed))
+    .join(Expense, ExpenseSplit.expense_id == Expense.id)
+    .where(in_batch, in_base_currency, ExpenseSplit.user_id != Expense.created_by)
+    .group_by(ExpenseSplit.user_id, Expense.created_by),
+    bind_arguments = bind_arguments
+  ).all()
+  count, total = db.session.execute(
+    select(
+      func.count(Expense.id),
+      func.coalesce(func.sum(case((in_base_currency, Expense.total_amount), else_ = 0)), 0)
+    ).where(in_batch),
+    bind_arguments = bind_arguments
+  ).one()
+  total = Decimal(total)
+
+  # Expenses in other currencies are carried forward at the rates of their day
+  for payer_id, converted_total, splits in stream_converted_expenses(group, criterion = in_batch):
+    total += converted_total
+    debts.extend((debtor_id, payer_id, amount) for debtor_id, amount in splits if debtor_id != payer_id)
+
+  _copy_to_archive(Expense, in_batch, bind_arguments)
+  _copy_to_archive(ExpenseSplit, splits_in_batch, bind_arguments)
+  db.session.execute(delete(ExpenseSplit).where(splits_in_batch), bind_arguments = bind_arguments)
+  db.session.execute(delete(Expense).where(in_batch), bind_arguments = bind_arguments)
+
+  _carry_forward(group.id, debts)
+  checkpoint.expense_count += count
+  checkpoint.total_spent += total
+
+
+def _archive_settlements(group, ids, checkpoint, bind_arguments):
+  in_batch = Settlement.id.in_(ids)
+
+  # Confirmed payments reduce what the payer owed; rejected ones moved no money
+  paid = db.session.execute(
+    select(Settlement.from_user_id, Settlement.to_user_id, func.sum(Settlement.amount))
+    .where(in_batch, Settlement.status == "confirmed")
+    .group_by(Settlement.from_user_id, Settlement.to_user_id),
+    bind_arguments = bind_arguments
+  ).all()
+
+  _copy_to_archive(Settlement, in_batch, bind_arguments)
+  db.session.execute(delete(Settlement).where(in_batch), bind_arguments = bind_arguments)
+
+  _carry_forward(group.id, [(debtor, creditor, -amount) for debtor, creditor, amount in paid])
+  checkpoint.settlement_count += len(ids)
+
+
+def _copy_to_archive(model, criterion, bind_arguments):
+  # INSERT ... SELECT inside the database; the rows never come back to Python
+  archive = ARCHIVED[model].__table__
+  names = [column.name for column in archive.columns]
+  db.session.execute(
+    insert(archive).from_select(names, select(*(model.__table__.c[name] for name in names)).where(criterion)),
+    bind_arguments = bind_arguments
+  )
+
+
+def _carry_forward(group_id, debts):
+  """Add (debtor, creditor, amount) rows to the group's opening balances."""
+  if not debts:
+    return
+
+  openings = {
+    (opening.debtor_id, opening.creditor_id): opening
+    for opening in db.session.scalars(select(OpeningBalance).where(OpeningBalance.group_id == group_id))
+  }
+  for debtor_id, creditor_id, amount in debts:
+    opening = openings.get((debtor_id, creditor_id))
+    if opening is None:
+      opening = openings[(debtor_id, creditor_id)] = OpeningBalance(
+        group_id = group_id, debtor_id = debtor_id, creditor_id = creditor_id, amount = Decimal("0.00")
+      )
+      db.session.add(opening)
+    opening.amount += amount
+
+
+@click.group("archive")
+def archive_cli():
+  """Move settled history out of the hot tables."""
+
+
+@archive_cli.command("run")
+@click.option("--before", type = click.DateTime(formats = ["%Y-%m-%d"]), help = "Archive history dated before this day.")
+@click.option("--keep-days", type = int, default = 365, show_default = True, help = "Without --before, keep this many days hot.")
+def archive_run_command(before, keep_days):
+  """Archive every group's history before a cut-off."""
+  if before is None:
+    today = datetime.utcnow().replace(hour = 0, minute = 0, second = 0, microsecond = 0)
+    before = today - timedelta(days = keep_days)
+  totals = archive_closed_periods(before)
+  click.echo(
+    f"Archived {totals['expenses']} expenses and {totals['settlements']} settlements "
+    f"from {totals['groups']} groups (before {before:%Y-%m-%d})"
+  )
+
+
+def init_app(app):
+  app.cli.add_command(archive_cli)
@@ -0,0 +1,261 @@
+"""
+In-process scheduler for subscription billing.
+
+Instead of polling `subscriptions` for `next_billing_date <= today`, the
+scheduler keeps the subscriptions due within a horizon (a few weeks) in a
+min-heap keyed on their billing date. The subscription service tells it about
+creates, changes and deactivations, and it bills exactly the subscriptions at
+the top of the heap that have come due. The only queries it runs are range
+seeks on (active, next_billing_date) over the whole horizon: one on startup,
+and one every time it looks for due subscriptions (at least daily), so
+subscriptions created or re-dated in other processes, whose notifications
+only reach their own process's scheduler, are picked up within a day.
+
+Run it in exactly one process (BILLING_SCHEDULER_ENABLED), or trigger it from
+cron with `flask billing run-due`. Billing claims each cycle with a
+conditional update, so an overlap never bills a cycle twice.
+"""
+import heapq
+import logging
+import threading
+from datetime import date, datetime, time, timedelta
+
+import click
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# How far ahead the heap holds subscriptions; later ones are loaded as it moves
+DEFAULT_HORIZON_DAYS = 35
+
+# Longest the background thread sleeps, so the horizon moves at least daily
+MAX_SLEEP_SECONDS = 24 * 60 * 60
+
+
+class SystemClock:
+  def today(self):
+    return date.today()
+
+  def now(self):
+    return datetime.now()
+
+
+class ManualClock:
+  """A clock that only moves when told to, for deterministic tests."""
+
+  def __init__(self, today):
+    self._today = today
+
+  def today(self):
+    return self._today
+
+  def now(self):
+    return datetime.combine(self._today, time.min)
+
+  def advance(self, days = 1):
+    self._today += timedelta(days = days)
+
+
+class BillingScheduler:
+  """
+  Min-heap of (next_billing_date, subscription_id) for active subscriptions
+  due within the horizon.
+
+  Changed or deactivated subscriptions are not removed from the heap; `_due`
+  holds each subscription's current date and heap entries that no longer match
+  it are skipped when popped.
+  """
+
+  def __init__(self, clock = None, horizon_days = DEFAULT_HORIZON_DAYS):
+    self.clock = clock or SystemClock()
+    self.horizon = timedelta(days = horizon_days)
+
+    self._heap = []
+    self._due = {}
+    # Every active subscription due on or before this date is in the heap
+    self._loaded_until = None
+
+    self._lock = threading.Lock()
+    self._wakeup = threading.Event()
+    self._stopped = threading.Event()
+    self._thread = None
+
+  @property
+  def loaded(self):
+    return self._loaded_until is not None
+
+  def rebuild(self):
+    """Reload the schedule from the database, e.g. on startup."""
+    self._reload(self.clock.today() + self.horizon)
+    self._wakeup.set()
+
+  def schedule(self, subscription_id, due_date):
+    """Add a subscription, or move it to a new billing date."""
+    with self._lock:
+      if self._loaded_until is None:
+        return  # the first rebuild will read it from the database
+
+      if due_date > self._loaded_until:
+        # Beyond the horizon: the range load picks it up once the horizon gets there
+        self._due.pop(subscription_id, None)
+        return
+
+      self._push(subscription_id, due_date)
+
+    self._wakeup.set()
+
+  def unschedule(self, subscription_id):
+    """Drop a subscription from the schedule, e.g. when it is deactivated."""
+    with self._lock:
+      self._due.pop(subscription_id, None)
+
+  def next_due_date(self):
+    """The earliest billing date on the schedule, or None."""
+    with self._lock:
+      self._drop_stale()
+      return self._heap[0][0] if self._heap else None
+
+  def pop_due(self, today = None):
+    """Remove and return the ids of the subscriptions due on or before today."""
+    today = today or self.clock.today()
+    due_ids = []
+
+    with self._lock:
+      while self._heap and self._heap[0][0] <= today:
+        due_date, subscription_id = heapq.heappop(self._heap)
+        if self._due.get(subscription_id) == due_date:
+          del self._due[subscription_id]
+          due_ids.append(subscription_id)
+
+    return due_ids
+
+  def run_due(self):
+    """
+    Bill every subscription that is due. Needs an app context.
+
+    Returns:
+        list of int: The ids of the subscriptions billed.
+    """
+    from app.extensions import db
+    from app.models import Subscription
+    from app.services.subscription_service import bill_subscription
+
+    # The whole horizon, not just the days it moved on: other processes'
+    # changes within it only reach the database
+    today = self.clock.today()
+    self._reload(today + self.horizon)
+
+    billed = []
+    for subscription_id in self.pop_due(today):
+      subscription = db.session.get(Subscription, subscription_id)
+      if subscription is None or not subscription.active:
+        continue
+
+      try:
+        bill_subscription(subscription, today)
+        billed.append(subscription_id)
+      except Exception:
+        logger.exception("Billing subscription %s failed; retrying tomorrow", subscription_id)
+        self.schedule(subscription_id, today + timedelta(days = 1))
+
+    return billed
+
+  def start(self, app):
+    """Bill due subscriptions from a background thread until `stop` is called."""
+    if self._thread is not None:
+      return
+
+    self._stopped.clear()
+    self._thread = threading.Thread(target = self._run, args = (app,), name = "billing-scheduler", daemon = True)
+    self._thread.start()
+
+  def stop(self):
+    self._stopped.set()
+    self._wakeup.set()
+    if self._thread is not None:
+      self._thread.join()
+      self._thread = None
+
+  def _run(self, app):
+    while not self._stopped.is_set():
+      with app.app_context():
+        try:
+          self.run_due()
+        except Exception:
+          logger.exception("Billing scheduler run failed")
+
+      self._wakeup.wait(self._seconds_until(self.next_due_date()))
+      self._wakeup.clear()
+
+  def _seconds_until(self, due_date):
+    if due_date is None:
+      return MAX_SLEEP_SECONDS
+    seconds = (datetime.combine(due_date, time.min) - self.clock.now()).total_seconds()
+    return min(max(seconds, 0), MAX_SLEEP_SECONDS)
+
+  def _reload(self, until):
+    """Replace the schedule with the active subscriptions due on or before `until`."""
+    from app.services.subscription_service import get_subscriptions_due_by
+
+    rows = get_subscriptions_due_by(until)
+
+    with self._lock:
+      self._due = {subscription_id: due_date for subscription_id, due_date in rows}
+      self._heap = [(due_date, subscription_id) for subscription_id, due_date in self._due.items()]
+      heapq.heapify(self._heap)
+      self._loaded_until = until
+
+  def _push(self, subscription_id, due_date):
+    self._due[subscription_id] = due_date
+    heapq.heappush(self._heap, (due_date, subscription_id))
+
+  def _drop_stale(self):
+    while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+      heapq.heappop(self._heap)
+
+
+def get_scheduler():
+  return current_app.extensions["billing_scheduler"]
+
+
+def notify_subscription_changed(subscription):
+  """
+  Keep the schedule in step with a created, changed or deactivated
+  subscription, once the change is committed.
+  """
+  from app.transactions import on_commit
+
+  scheduler = current_app.extensions.get("billing_scheduler")
+  if scheduler is None:
+    return
+
+  subscription_id, active, due = subscription.id, subscription.active, subscription.next_billing_date
+  if active:
+    on_commit(lambda: scheduler.schedule(subscription_id, due))
+  else:
+    on_commit(lambda: scheduler.unschedule(subscription_id))
+
+
+@click.group("billing")
+def billing_cli():
+  """Subscription billing."""
+
+
+@billing_cli.command("run-due")
+def run_due_command():
+  """Bill every subscription that is due today."""
+  billed = get_scheduler().run_due()
+  click.echo(f"Billed {len(billed)} subscriptions")
+
+
+def init_app(app):
+  """
+  Register the scheduler, and start its background thread when
+  BILLING_SCHEDULER_ENABLED is set.
+  """
+  scheduler = BillingScheduler()
+  app.extensions["billing_scheduler"] = scheduler
+  app.cli.add_command(billing_cli)
+
+  if app.config.get("BILLING_SCHEDULER_ENABLED"):
+    scheduler.start(app)
@@ -0,0 +1,190 @@
+"""
+Expense categories (rent, groceries, streaming, travel, ...) from keyword and
+pattern rules.
+
+Rules map a category to keywords (words or phrases, matched whole and
+case-insensitively) and regular expressions:
+
+    {"streaming": {"keywords": ["netflix", "disney+"], "patterns": [r"\\bprime\\s+video\\b"]}, ...}
+
+Every rule is compiled into one alternation with a named group per
+category, so a description is scanned once however many rules there are.
+The earliest match in the description wins; at the same position, the
+category listed first. Descriptions no rule matches stay uncategorised
+(None). Patterns must not define named groups of their own.
+
+New expenses are categorised as they are created; `flask categories
+backfill` categorises existing ones in chunks (see backfill_categories).
+EXPENSE_CATEGORY_RULES in the config replaces DEFAULT_RULES.
+"""
+import re
+import time
+
+import click
+from flask import current_app
+from sqlalchemy import select, update, bindparam
+
+from app.extensions import db
+from app.models import Expense, ArchivedExpense
+from app.services.change_service import record_changes
+from app.sharding import get_router
+from app.transactions import commit
+
+DEFAULT_RULES = {
+  "rent": {"keywords": ["rent", "landlord", "letting agent", "mortgage"]},
+  "utilities": {
+    "keywords": ["electric", "electricity", "gas bill", "water bill", "council tax", "broadband", "internet", "wifi",
+                 "phone bill", "octopus energy", "british gas", "thames water", "tv licence"],
+  },
+  "groceries": {
+    "keywords": ["groceries", "grocery", "supermarket", "tesco", "sainsbury's", "sainsburys", "asda", "aldi", "lidl",
+                 "waitrose", "morrisons", "co-op", "ocado", "m&s food", "milk", "bread"],
+  },
+  "streaming": {
+    "keywords": ["netflix", "spotify", "disney+", "disney plus", "now tv", "apple tv", "youtube premium", "audible"],
+    "patterns": [r"\bprime\s+video\b", r"\bamazon\s+prime\b"],
+  },
+  "eating_out": {
+    "keywords": ["restaurant", "takeaway", "deliveroo", "just eat", "uber eats", "pizza", "curry", "pub", "bar",
+                 "cafe", "coffee", "brunch", "dinner out"],
+  },
+  "travel": {
+    "keywords": ["flight", "flights", "hotel", "airbnb", "hostel", "train", "trainline", "ryanair", "easyjet",
+                 "eurostar", "holiday", "ferry", "car hire", "taxi", "uber", "petrol", "parking"],
+    "patterns": [r"\btrip\s+to\b"],
+  },
+}
+
+# Expenses read, categorised and written per transaction by the backfill
+BACKFILL_CHUNK_SIZE = 5000
+
+
+class Categorizer:
+  """All of a rule set compiled into one matcher."""
+
+  def __init__(self, rules):
+    self.categories = list(rules)
+    alternatives = []
+    for i, (category, rule) in enumerate(rules.items()):
+      # Longest keyword first, so "gas bill" is tried before "gas"
+      keywords = sorted(rule.get("keywords", ()), key = len, reverse = True)
+      parts = [_keyword_pattern(keyword) for keyword in keywords] + list(rule.get("patterns", ()))
+      if parts:
+        alternatives.append(f"(?P<c{i}>{'|'.join(parts)})")
+    self._matcher = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+  def categorize(self, description):
+    """The category of one description, or None."""
+    match = self._matcher.search(description) if self._matcher and description else None
+    if match is None:
+      return None
+    # The category's group is the outermost one, so it closes last
+    return self.categories[int(match.lastgroup[1:])]
+
+  def categorize_many(self, descriptions):
+    """Categories of many descriptions, in order; each distinct description is matched once."""
+    seen = {}
+    categories = []
+    for description in descriptions:
+      category = seen.get(description, seen)
+      if category is seen:
+        category = seen[description] = self.categorize(description)
+      categories.append(category)
+    return categories
+
+
+def _keyword_pattern(keyword):
+  # Whole words only, any run of whitespace between the words of a phrase
+  words = [re.escape(word) for word in keyword.lower().split()]
+  pattern = r"\s+".join(words)
+  return (r"\b" if keyword[0].isalnum() else "") + pattern + (r"\b" if keyword[-1].isalnum() else "")
+
+
+def backfill_categories(chunk_size = BACKFILL_CHUNK_SIZE, recategorize = False):
+  """
+  Categorise existing expenses (hot and archived), chunk_size at a time.
+
+  Each chunk is read in id order, categorised in memory and written with
+  one executemany UPDATE in its own transaction, so a run can stop and be
+  run again. Categorised hot expenses are logged as updates for syncing
+  clients.
+
+  Args:
+      chunk_size (int): Expenses per chunk.
+      recategorize (bool): Also redo expenses that already have a category.
+
+  Returns:
+      dict: {"scanned": int, "categorized": int, "seconds": float}
+  """
+  categorizer = get_categorizer()
+  totals = {"scanned": 0, "categorized": 0}
+  began = time.perf_counter()
+
+  for shard_id in get_router().shard_ids:
+    bind_arguments = {"shard_id": shard_id}
+    for model in (Expense, ArchivedExpense):
+      table = model.__table__
+      set_category = update(table).where(table.c.id == bindparam("b_id")).values(category = bindparam("b_category"))
+      if "version" in table.c:
+        # A changed expense gets a new version, like any other UPDATE of it
+        set_category = set_category.values(version = table.c.version + 1)
+      last_id = 0
+      while True:
+        due = select(model.id, model.group_id, model.description, model.category).where(model.id > last_id)
+        if not recategorize:
+          due = due.where(model.category.is_(None))
+        rows = db.session.execute(due.order_by(model.id).limit(chunk_size), bind_arguments = bind_arguments).all()
+        if not rows:
+          break
+        last_id = rows[-1].id
+
+        changed = [
+          (row, category)
+          for row, category in zip(rows, categorizer.categorize_many([row.description for row in rows]))
+          if category != row.category
+        ]
+        if changed:
+          db.session.execute(
+            set_category, [{"b_id": row.id, "b_category": category} for row, category in changed],
+            bind_arguments = bind_arguments
+          )
+          if model is Expense:
+            by_group = {}
+            for row, _ in changed:
+              by_group.setdefault(row.group_id, []).append(row.id)
+            for group_id, ids in by_group.items():
+              record_changes(group_id, "expense", ids, "update")
+        commit()
+
+        totals["scanned"] += len(rows)
+        totals["categorized"] += len(changed)
+
+  totals["seconds"] = time.perf_counter() - began
+  return totals
+
+
+@click.group("categories")
+def categories_cli():
+  """Expense categories."""
+
+
+@categories_cli.command("backfill")
+@click.option("--chunk-size", type = int, default = BACKFILL_CHUNK_SIZE, show_default = True)
+@click.option("--all", "recategorize", is_flag = True, help = "Also redo expenses that already have a category.")
+def backfill_command(chunk_size, recategorize):
+  """Categorise existing expenses."""
+  totals = backfill_categories(chunk_size, recategorize)
+  rate = totals["scanned"] / totals["seconds"] if totals["seconds"] else 0
+  click.echo(
+    f"Scanned {totals['scanned']} expenses, categorised {totals['categorized']} "
+    f"in {totals['seconds']:.1f} s ({rate:,.0f} expenses/s)"
+  )
+
+
+def get_categorizer():
+  return current_app.extensions["categorizer"]
+
+
+def init_app(app):
+  app.extensions["categorizer"] = Categorizer(app.config.get("EXPENSE_CATEGORY_RULES") or DEFAULT_RULES)
+  app.cli.add_command(categories_cli)
@@ -6,4 +6,35 @@ class Config:
 
   SQLALCHEMY_TRACK_MODIFICATIONS = False
   JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secrect")
-  JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
\ No newline at end of file
+  JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
+
+  # Horizontal sharding: with more than one shard, groups and their expenses,
+  # splits, settlements and memberships are spread over the shard databases.
+  # Users, subscriptions and the group directory stay in DATABASE_URL.
+  SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+  SHARD_DATABASE_URL = os.getenv("SHARD_DATABASE_URL", "sqlite:///billnest_shard_{shard}.db")
+
+  # Bill subscriptions from a background thread in this process. Enable it in
+  # one process only; otherwise run `flask billing run-due` from cron.
+  BILLING_SCHEDULER_ENABLED = os.getenv("BILLING_SCHEDULER_ENABLED", "0") == "1"
+
+  # Exchange rates for expenses in another currency than their group's,
+  # read from CSV files (a file or a directory of them); see app/fx.py
+  FX_RATES_PATH = os.getenv("FX_RATES_PATH", "fx_rates")
+  FX_REFERENCE_CURRENCY = os.getenv("FX_REFERENCE_CURRENCY", "EUR")
+
+  # Per-request profiling (see app/profiling.py), off unless one of these is
+  # set: every request, requests sending PROFILING_TOKEN in the
+  # X-BillNest-Profile header, or a random fraction of requests
+  PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+  PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+  PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+  PROFILING_FORMAT = os.getenv("PROFILING_FORMAT", "pstats")  # or "collapsed" for flame graphs
+  PROFILING_DIR = os.getenv("PROFILING_DIR")  # defaults to instance/profiles
+
+  # Where `flask statements generate` writes monthly statements (see app/statements.py)
+  STATEMENTS_DIR = os.getenv("STATEMENTS_DIR")  # defaults to instance/statements
+
+  # Where `flask integrity check` keeps its reports and the last run's
+  # position in the change log (see app/integrity.py)
+  INTEGRITY_DIR = os.getenv("INTEGRITY_DIR")  # defaults to instance/integrity
@@ -0,0 +1,173 @@
+"""
+In-process pub/sub for pushing group updates to clients over server-sent events.
+
+Every change log entry (see change_service.record_change) queues a group
+event on the session; once the session commits, the events are published
+to the broker, so a client is never told about a change it can't read yet,
+and never about one that was rolled back. Each connected client holds a
+Subscriber following the groups it belongs to.
+
+Events are coalesced per group: a subscriber keeps at most one pending
+event per group (the entities that changed and the newest change cursor),
+and after waking it waits COALESCE_SECONDS for the rest of a burst before
+sending. A client reacts by calling GET /groups/<id>/changes?since=<cursor>.
+
+The broker lives in one process: with several worker processes each has
+its own, and a client only hears about writes made by the process it is
+connected to. Put a shared bus (e.g. Redis pub/sub) behind `publish` before
+running more than one.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+
+# Extra wait after the first event, so a burst goes out as one event per group
+COALESCE_SECONDS = 0.25
+
+# Comment line sent when nothing happened, so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+
+_PENDING_EVENTS = "billnest_pending_group_events"
+_PENDING_FOLLOWS = "billnest_pending_follows"
+
+
+class Subscriber:
+  """One connected client: the groups it follows and its coalesced pending events."""
+
+  def __init__(self, user_id, group_ids, coalesce_seconds = COALESCE_SECONDS):
+    self.user_id = user_id
+    self.group_ids = set(group_ids)
+    self.coalesce_seconds = coalesce_seconds
+    self._pending = {}  # group_id -> {"entities": set, "cursor": int}
+    self._condition = threading.Condition()
+
+  def push(self, group_id, entities, cursor):
+    with self._condition:
+      pending = self._pending.setdefault(group_id, {"entities": set(), "cursor": cursor})
+      pending["entities"].update(entities)
+      pending["cursor"] = max(pending["cursor"], cursor)
+      self._condition.notify()
+
+  def wait(self, timeout):
+    """
+    Block until there are events or `timeout` seconds pass.
+
+    Returns:
+        list of dict: {"group_id", "entities" (sorted list), "cursor"}, one per group; empty on timeout.
+    """
+    with self._condition:
+      if not self._pending:
+        self._condition.wait(timeout)
+      if not self._pending:
+        return []
+
+    if self.coalesce_seconds:
+      time.sleep(self.coalesce_seconds)
+
+    with self._condition:
+      pending, self._pending = self._pending, {}
+    return [
+      {"group_id": group_id, "entities": sorted(event["entities"]), "cursor": event["cursor"]}
+      for group_id, event in sorted(pending.items())
+    ]
+
+
+class EventBroker:
+  """Routes group events to the subscribers following each group."""
+
+  def __init__(self, coalesce_seconds = COALESCE_SECONDS):
+    self.coalesce_seconds = coalesce_seconds
+    self._lock = threading.Lock()
+    self._by_group = defaultdict(set)  # group_id -> subscribers
+    self._by_user = defaultdict(set)   # user_id -> subscribers
+
+  def subscribe(self, user_id, group_ids):
+    subscriber = Subscriber(user_id, group_ids, self.coalesce_seconds)
+    with self._lock:
+      self._by_user[user_id].add(subscriber)
+      for group_id in subscriber.group_ids:
+        self._by_group[group_id].add(subscriber)
+    return subscriber
+
+  def unsubscribe(self, subscriber):
+    with self._lock:
+      self._discard(self._by_user, subscriber.user_id, subscriber)
+      for group_id in subscriber.group_ids:
+        self._discard(self._by_group, group_id, subscriber)
+
+  def follow(self, user_id, group_id, following = True):
+    """Start (or stop) sending a group's events to a user's open connections."""
+    with self._lock:
+      for subscriber in self._by_user.get(user_id, ()):
+        if following:
+          subscriber.group_ids.add(group_id)
+          self._by_group[group_id].add(subscriber)
+        else:
+          subscriber.group_ids.discard(group_id)
+          self._discard(self._by_group, group_id, subscriber)
+
+  def publish(self, group_id, entities, cursor):
+    with self._lock:
+      subscribers = list(self._by_group.get(group_id, ()))
+    for subscriber in subscribers:
+      subscriber.push(group_id, entities, cursor)
+    return len(subscribers)
+
+  def subscriber_count(self):
+    with self._lock:
+      return sum(len(subscribers) for subscribers in self._by_user.values())
+
+  @staticmethod
+  def _discard(index, key, subscriber):
+    subscribers = index.get(key)
+    if subscribers is not None:
+      subscribers.discard(subscriber)
+      if not subscribers:
+        del index[key]
+
+
+def get_broker():
+  return current_app.extensions["event_broker"]
+
+
+def queue_group_event(session, group_id, entity, cursor):
+  """Publish that `entity` changed in a group (up to change `cursor`) once `session` commits."""
+  pending = session.info.setdefault(_PENDING_EVENTS, {})
+  event = pending.setdefault(group_id, {"entities": set(), "cursor": cursor})
+  event["entities"].add(entity)
+  event["cursor"] = max(event["cursor"], cursor)
+
+
+def queue_follow(session, user_id, group_id, following = True):
+  """Route a group's events to (or away from) a user's connections once `session` commits."""
+  session.info.setdefault(_PENDING_FOLLOWS, []).append((user_id, group_id, following))
+
+
+def _publish_pending(session):
+  follows = session.info.pop(_PENDING_FOLLOWS, [])
+  events = session.info.pop(_PENDING_EVENTS, {})
+  if not has_app_context() or "event_broker" not in current_app.extensions:
+    return
+
+  broker = get_broker()
+  for user_id, group_id, following in follows:
+    broker.follow(user_id, group_id, following)
+  for group_id, pending in events.items():
+    broker.publish(group_id, sorted(pending["entities"]), pending["cursor"])
+
+
+def _drop_pending(session, previous_transaction = None):
+  session.info.pop(_PENDING_FOLLOWS, None)
+  session.info.pop(_PENDING_EVENTS, None)
+
+
+def init_app(app):
+  from app.sharding import GroupShardedSession
+
+  app.extensions["event_broker"] = EventBroker()
+  if not event.contains(GroupShardedSession, "after_commit", _publish_pending):
+    event.listen(GroupShardedSession, "after_commit", _publish_pending)
+    event.listen(GroupShardedSession, "after_soft_rollback", _drop_pending)
@@ -1,7 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
+from sqlalchemy import event
 
-db = SQLAlchemy()
-migrate = Migrate()
-jwt = JWTManager()
\ No newline at end of file
+from app.sharding import GroupShardedSession
+
+db = SQLAlchemy(session_options = {"class_": GroupShardedSession})
+# Flask-Migrate and JWTManager are set up in create_app: batch jobs
+# (app.runtime) need neither
+
+
+def enable_sqlite_foreign_keys(engine):
+  """
+  Turn on foreign key enforcement for every new connection of a SQLite engine.
+  SQLite ignores foreign keys (including ON DELETE CASCADE) unless asked to,
+  per connection. No-op on other databases.
+  """
+  if engine.dialect.name != "sqlite":
+    return
+
+  @event.listens_for(engine, "connect")
+  def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys = ON")
+    cursor.close()
@@ -0,0 +1,171 @@
+"""
+Foreign exchange rates for multi-currency groups, read from local files.
+
+Every group keeps its balances in a base currency; an expense may be paid in
+any currency there is a rate for. Rates come from CSV files under
+FX_RATES_PATH (one file, or a directory of *.csv), never from the network:
+
+    date,currency,rate
+    2026-03-02,USD,1.0824
+    2026-03-02,GBP,0.8571
+
+A rate is units of `currency` per one unit of the reference currency
+(FX_REFERENCE_CURRENCY, EUR by default, as in the ECB reference rates). The
+rate for a day is the latest one published on or before it, so weekends and
+holidays use the last working day's rate.
+
+Conversion is cent-exact: an expense's total is converted and rounded to the
+cent once, and its splits are then shared out of that total in proportion to
+their original amounts (largest remainder, as in split_service), so the
+converted splits always add up to the converted total.
+"""
+import csv
+import glob
+import os
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from flask import current_app
+
+from app.services.split_service import CENT, allocate_cents, to_cents, from_cents
+
+DEFAULT_CURRENCY = "GBP"
+
+
+class FxRates:
+  """
+  Rate table loaded once from files. `rate()` lookups are memoized per
+  (currency, base, day), so converting a large group costs one lookup per
+  distinct currency and day, not one per row.
+  """
+
+  def __init__(self, path = None, reference = "EUR"):
+    self.path = path
+    self.reference = reference
+    self._series = None   # currency -> (sorted days, rates)
+    self._cache = {}
+
+  def load(self, rows = None):
+    """
+    (Re)load the table from `rows` of (day, currency, rate), or from the
+    files under `path`. Clears the memoized lookups.
+    """
+    if rows is None:
+      rows = self._read_files()
+
+    by_currency = {}
+    for day, currency, rate in rows:
+      by_currency.setdefault(currency.upper(), {})[_as_date(day)] = Decimal(str(rate))
+
+    self._series = {
+      currency: (sorted(rates), [rates[day] for day in sorted(rates)])
+      for currency, rates in by_currency.items()
+    }
+    self._cache = {}
+
+  def _read_files(self):
+    if not self.path:
+      return []
+    paths = sorted(glob.glob(os.path.join(self.path, "*.csv"))) if os.path.isdir(self.path) else [self.path]
+
+    rows = []
+    for path in paths:
+      with open(path, newline = "") as handle:
+        for record in csv.DictReader(handle):
+          rows.append((record["date"], record["currency"], record["rate"]))
+    return rows
+
+  def currencies(self):
+    if self._series is None:
+      self.load()
+    return {self.reference} | set(self._series)
+
+  def rate(self, currency, base, day):
+    """
+    How many units of `base` one unit of `currency` bought on `day`.
+
+    Raises:
+        ValueError: If either currency has no rate on or before the day.
+    """
+    day = _as_date(day)
+    key = (currency, base, day)
+    rate = self._cache.get(key)
+    if rate is None:
+      if currency == base:
+        rate = Decimal(1)
+      else:
+        rate = self._per_reference(base, day) / self._per_reference(currency, day)
+      self._cache[key] = rate
+    return rate
+
+  def _per_reference(self, currency, day):
+    if currency == self.reference:
+      return Decimal(1)
+    if self._series is None:
+      self.load()
+
+    days, rates = self._series.get(currency, ((), ()))
+    i = bisect_right(days, day)
+    if i == 0:
+      raise ValueError(f"No {currency} exchange rate on or before {day.isoformat()}.")
+    return rates[i - 1]
+
+  def convert(self, amount, currency, base, day):
+    """One amount converted to `base` and rounded to the cent."""
+    return (amount * self.rate(currency, base, day)).quantize(CENT, rounding = ROUND_HALF_UP)
+
+  def convert_expenses(self, expenses, base):
+    """
+    Convert a batch of expenses and their splits to `base` at once.
+
+    Args:
+        expenses (list of tuple): (currency, day, total_amount, [(user_id, amount_owed), ...]).
+        base (str): The currency to convert to.
+
+    Returns:
+        list of tuple: (total, [(user_id, amount), ...]) in `base`, in input
+        order, each expense's amounts summing exactly to its total.
+    """
+    if not expenses:
+      return []
+
+    totals = np.array([
+      to_cents(self.convert(total, currency, base, day)) for currency, day, total, _ in expenses
+    ], dtype = np.int64)
+
+    # One weight column per split position; the original split cents are the weights
+    width = max(len(splits) for _, _, _, splits in expenses)
+    weights = np.zeros((len(expenses), width), dtype = np.int64)
+    for row, (_, _, _, splits) in enumerate(expenses):
+      weights[row, :len(splits)] = [to_cents(amount) for _, amount in splits]
+
+    cents = allocate_cents(totals, weights)
+    return [
+      (from_cents(total), [(user_id, from_cents(amount)) for (user_id, _), amount in zip(splits, row)])
+      for (_, _, _, splits), total, row in zip(expenses, totals.tolist(), cents.tolist())
+    ]
+
+
+def validate_currency(currency):
+  """Raise ValueError unless `currency` is a three-letter upper-case ISO 4217 code."""
+  if not (isinstance(currency, str) and len(currency) == 3 and currency.isalpha() and currency.isupper()):
+    raise ValueError("Currency must be a three-letter ISO 4217 code, e.g. GBP.")
+
+
+def _as_date(day):
+  if isinstance(day, datetime):
+    return day.date()
+  if isinstance(day, date):
+    return day
+  return date.fromisoformat(day)
+
+
+def get_fx_rates():
+  return current_app.extensions["fx_rates"]
+
+
+def init_app(app):
+  # Loaded lazily on the first conversion
+  app.extensions["fx_rates"] = FxRates(app.config.get("FX_RATES_PATH"), app.config.get("FX_REFERENCE_CURRENCY", "EUR"))
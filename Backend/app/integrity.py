@@ -0,0 +1,273 @@
+"""
+Ledger integrity checks across every group.
+
+`flask integrity check` looks for ledger rows that the services would never
+have written, but that a bug, a manual fix or a half-applied migration can
+leave behind:
+
+  - split_total_mismatch: an expense (hot or archived) whose splits don't
+    add up to its total_amount, or that has no splits at all,
+  - orphaned_generated_expense: a GeneratedExpense whose expense is gone,
+    whose subscription is gone, or whose subscription isn't the group
+    subscription of the expense's group,
+  - settlement_non_member: a settlement with someone who isn't a member of
+    its group. Any pending one; a confirmed or rejected one only when that
+    user has no other trace in the group's ledger, since a member who left
+    keeps the settlements they squared up with.
+
+Each check is one set-based query over a chunk of groups on the same shard
+(`group_id IN (...)`), not a walk over their rows. Chunks are handed to a
+process pool (see app.workers), and their findings are appended to a JSON
+Lines report, one finding per line, as each chunk finishes.
+
+Runs are incremental: INTEGRITY_DIR/state.json keeps, per shard, the last
+group change log entry (app.services.change_service) seen by a finished
+run, and the next run only checks groups with later changes. Change log
+ids are never reused (AUTOINCREMENT), even after a group is deleted. A
+shard the state doesn't know, or `--all`, checks every group. Archiving
+doesn't log changes, so archived rows are checked when their group is next
+changed.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from itertools import chain
+
+import click
+from flask import current_app
+from sqlalchemy import select, func, exists, union
+
+from app.extensions import db
+from app.models import (
+  Group, Membership, Expense, ExpenseSplit, GeneratedExpense, Settlement, Subscription, GroupChange,
+  ArchivedExpense, ArchivedExpenseSplit, OpeningBalance
+)
+from app.serialization import decimal_string
+from app.sharding import get_router
+from app.workers import map_chunks
+
+# Groups handed to a worker at a time
+INTEGRITY_CHUNK_SIZE = 200
+
+
+def check_groups(chunk):
+  """
+  Run every per-group check over some groups of one shard.
+
+  Args:
+      chunk (tuple): (shard_id, [group_id, ...]).
+
+  Returns:
+      list of dict: The findings, JSON-ready.
+  """
+  shard_id, group_ids = chunk
+  bind_arguments = {"shard_id": shard_id}
+  findings = []
+  for expense, split in ((Expense, ExpenseSplit), (ArchivedExpense, ArchivedExpenseSplit)):
+    findings += _split_total_mismatches(expense, split, group_ids, bind_arguments)
+  findings += _generated_expense_orphans(group_ids, bind_arguments)
+  findings += _settlement_non_members(group_ids, bind_arguments)
+  for finding in findings:
+    finding["shard"] = shard_id
+  return findings
+
+
+def _split_total_mismatches(expense, split, group_ids, bind_arguments):
+  splits_total = func.coalesce(func.sum(split.amount_owed), 0)
+  rows = db.session.execute(
+    select(expense.group_id, expense.id, expense.total_amount, splits_total)
+    .outerjoin(split, split.expense_id == expense.id)
+    .where(expense.group_id.in_(group_ids))
+    .group_by(expense.id)
+    # Compared in cents: SQLite sums the amounts as floats
+    .having(func.round(splits_total * 100) != func.round(expense.total_amount * 100))
+    .order_by(expense.id),
+    bind_arguments = bind_arguments
+  )
+  return [
+    {"check": "split_total_mismatch", "group_id": group_id, "expense_id": expense_id,
+     "archived": expense is ArchivedExpense, "total_amount": decimal_string(total), "splits_total": decimal_string(summed)}
+    for group_id, expense_id, total, summed in rows
+  ]
+
+
+def _generated_expense_orphans(group_ids, bind_arguments):
+  generated = db.session.execute(
+    select(Expense.group_id, GeneratedExpense.id, GeneratedExpense.expense_id, GeneratedExpense.subscription_id)
+    .join(Expense, GeneratedExpense.expense_id == Expense.id)
+    .where(Expense.group_id.in_(group_ids))
+    .order_by(GeneratedExpense.id),
+    bind_arguments = bind_arguments
+  ).all()
+  if not generated:
+    return []
+
+  # Subscriptions live in the default database, so they are looked up apart
+  owners = {
+    subscription_id: (owner_type, owner_id)
+    for subscription_id, owner_type, owner_id in db.session.execute(
+      select(Subscription.id, Subscription.owner_type, Subscription.owner_id)
+      .where(Subscription.id.in_({row.subscription_id for row in generated}))
+    )
+  }
+  findings = []
+  for group_id, generated_id, expense_id, subscription_id in generated:
+    owner = owners.get(subscription_id)
+    if owner is None:
+      reason = "subscription_missing"
+    elif owner != ("group", group_id):
+      reason = "subscription_of_another_owner"
+    else:
+      continue
+    findings.append({
+      "check": "orphaned_generated_expense", "group_id": group_id, "generated_expense_id": generated_id,
+      "expense_id": expense_id, "subscription_id": subscription_id, "reason": reason,
+    })
+  return findings
+
+
+def _settlement_non_members(group_ids, bind_arguments):
+  # Everyone with a place in these groups' ledgers, members or not
+  ledger_users = union(
+    select(Membership.group_id, Membership.user_id).where(Membership.group_id.in_(group_ids)),
+    select(Expense.group_id, Expense.created_by).where(Expense.group_id.in_(group_ids)),
+    select(Expense.group_id, ExpenseSplit.user_id)
+    .join(Expense, ExpenseSplit.expense_id == Expense.id).where(Expense.group_id.in_(group_ids)),
+    select(ArchivedExpense.group_id, ArchivedExpense.created_by).where(ArchivedExpense.group_id.in_(group_ids)),
+    select(ArchivedExpense.group_id, ArchivedExpenseSplit.user_id)
+    .join(ArchivedExpense, ArchivedExpenseSplit.expense_id == ArchivedExpense.id)
+    .where(ArchivedExpense.group_id.in_(group_ids)),
+    select(OpeningBalance.group_id, OpeningBalance.debtor_id).where(OpeningBalance.group_id.in_(group_ids)),
+    select(OpeningBalance.group_id, OpeningBalance.creditor_id).where(OpeningBalance.group_id.in_(group_ids)),
+  ).cte("ledger_users")
+
+  findings = []
+  for side, user_id in (("from", Settlement.from_user_id), ("to", Settlement.to_user_id)):
+    is_member = exists().where(Membership.group_id == Settlement.group_id, Membership.user_id == user_id)
+    in_ledger = exists().where(ledger_users.c.group_id == Settlement.group_id, ledger_users.c.user_id == user_id)
+    rows = db.session.execute(
+      select(Settlement.group_id, Settlement.id, user_id, Settlement.status, Settlement.amount)
+      .where(Settlement.group_id.in_(group_ids), ~is_member, (Settlement.status == "pending") | ~in_ledger)
+      .order_by(Settlement.id),
+      bind_arguments = bind_arguments
+    )
+    findings += [
+      {"check": "settlement_non_member", "group_id": group_id, "settlement_id": settlement_id, "side": side,
+       "user_id": non_member_id, "status": status, "amount": decimal_string(amount)}
+      for group_id, settlement_id, non_member_id, status, amount in rows
+    ]
+  return findings
+
+
+def check_shard(shard_id):
+  """
+  The checks that can't be narrowed to groups: GeneratedExpense rows on a
+  shard whose expense no longer exists, so have no group either.
+
+  Returns:
+      list of dict: The findings, JSON-ready.
+  """
+  rows = db.session.execute(
+    select(GeneratedExpense.id, GeneratedExpense.expense_id, GeneratedExpense.subscription_id)
+    .where(~exists().where(Expense.id == GeneratedExpense.expense_id))
+    .order_by(GeneratedExpense.id),
+    bind_arguments = {"shard_id": shard_id}
+  )
+  return [
+    {"check": "orphaned_generated_expense", "group_id": None, "generated_expense_id": generated_id,
+     "expense_id": expense_id, "subscription_id": subscription_id, "reason": "expense_missing", "shard": shard_id}
+    for generated_id, expense_id, subscription_id in rows
+  ]
+
+
+def run_integrity_check(report_path = None, full = False, workers = None, chunk_size = INTEGRITY_CHUNK_SIZE):
+  """
+  Check the groups changed since the last run (or all of them), streaming
+  the findings to a report.
+
+  Args:
+      report_path (str, optional): Defaults to INTEGRITY_DIR/report-<time>.jsonl.
+      full (bool): Check every group, whatever the last run saw.
+      workers (int, optional): Worker processes; defaults to the CPU count.
+          With 1 (or an in-memory database) groups are checked in this process.
+      chunk_size (int): Groups per task handed to a worker.
+
+  Returns:
+      dict: {"groups", "findings": int, "report": str, "seconds": float}
+  """
+  integrity_dir = get_integrity_dir(current_app)
+  os.makedirs(integrity_dir, exist_ok = True)
+  report_path = report_path or os.path.join(integrity_dir, f"report-{datetime.utcnow():%Y%m%dT%H%M%S%f}.jsonl")
+  state_path = os.path.join(integrity_dir, "state.json")
+  seen = {} if full else _load_state(state_path)
+  began = time.perf_counter()
+
+  chunks, last_changes = [], {}
+  for shard_id in get_router().shard_ids:
+    bind_arguments = {"shard_id": shard_id}
+    # Taken before reading, so a group changed during the run is checked again next time
+    last_changes[shard_id] = db.session.scalar(select(func.max(GroupChange.id)), bind_arguments = bind_arguments) or 0
+    group_ids = select(Group.id)
+    if shard_id in seen:
+      group_ids = group_ids.where(
+        exists().where(GroupChange.group_id == Group.id, GroupChange.id > seen[shard_id], GroupChange.id <= last_changes[shard_id])
+      )
+    group_ids = db.session.scalars(group_ids.order_by(Group.id), bind_arguments = bind_arguments).all()
+    chunks += [(shard_id, group_ids[i:i + chunk_size]) for i in range(0, len(group_ids), chunk_size)]
+
+  totals = {"groups": sum(len(group_ids) for _, group_ids in chunks), "findings": 0, "report": report_path}
+  with open(report_path, "w", encoding = "utf-8") as report:
+    # Lazily, so each chunk's findings are written as soon as it finishes
+    shard_findings = (check_shard(shard_id) for shard_id in last_changes)
+    for findings in chain(shard_findings, map_chunks(check_groups, chunks, workers)):
+      for finding in findings:
+        report.write(json.dumps(finding) + "\n")
+      report.flush()
+      totals["findings"] += len(findings)
+
+  # Only a finished run moves the watermark
+  with open(state_path + ".tmp", "w", encoding = "utf-8") as file:
+    json.dump({"last_change_ids": last_changes, "finished_at": datetime.utcnow().isoformat()}, file)
+  os.replace(state_path + ".tmp", state_path)
+  totals["seconds"] = time.perf_counter() - began
+  return totals
+
+
+def _load_state(state_path):
+  try:
+    with open(state_path, encoding = "utf-8") as file:
+      return json.load(file)["last_change_ids"]
+  except FileNotFoundError:
+    return {}
+
+
+def get_integrity_dir(app):
+  return app.config.get("INTEGRITY_DIR") or os.path.join(app.instance_path, "integrity")
+
+
+@click.group("integrity")
+def integrity_cli():
+  """Ledger integrity checks."""
+
+
+@integrity_cli.command("check")
+@click.option("--all", "full", is_flag = True, help = "Check every group, not only those changed since the last run.")
+@click.option("--report", "report_path", type = click.Path(dir_okay = False), help = "Defaults to INTEGRITY_DIR/report-<time>.jsonl.")
+@click.option("--workers", type = int, help = "Worker processes; defaults to the CPU count.")
+@click.option("--chunk-size", type = int, default = INTEGRITY_CHUNK_SIZE, show_default = True)
+@click.pass_context
+def check_command(ctx, full, report_path, workers, chunk_size):
+  """Check the groups' ledgers; exits with 1 if anything was found."""
+  totals = run_integrity_check(report_path, full, workers, chunk_size)
+  rate = totals["groups"] / totals["seconds"] if totals["seconds"] else 0
+  click.echo(
+    f"Checked {totals['groups']} groups in {totals['seconds']:.1f} s ({rate:,.1f} groups/s): "
+    f"{totals['findings']} findings, in {totals['report']}"
+  )
+  if totals["findings"]:
+    ctx.exit(1)
+
+
+def init_app(app):
+  app.cli.add_command(integrity_cli)
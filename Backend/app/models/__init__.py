@@ -6,6 +6,14 @@ from .expense_split import ExpenseSplit
 from .subscription import Subscription
 from .generated_expenses import GeneratedExpense
 from .settlement import Settlement 
+from .group_shard import GroupShard
+from .group_change import GroupChange
+from .archived_expense import ArchivedExpense
+from .archived_expense_split import ArchivedExpenseSplit
+from .archived_settlement import ArchivedSettlement
+from .balance_checkpoint import BalanceCheckpoint
+from .opening_balance import OpeningBalance
+from . import expense_search  # FTS5 index kept in sync by triggers
 
 __all__ = [
     'User',
@@ -14,7 +22,14 @@ __all__ = [
     'Expense',
     'ExpenseSplit',
     'Subscription',
-    'GeneratedExpense'
-    'Settlement'
+    'GeneratedExpense',
+    'Settlement',
+    'GroupShard',
+    'GroupChange',
+    'ArchivedExpense',
+    'ArchivedExpenseSplit',
+    'ArchivedSettlement',
+    'BalanceCheckpoint',
+    'OpeningBalance'
 ]
 
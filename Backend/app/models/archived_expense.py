@@ -0,0 +1,23 @@
+from app.extensions import db
+from datetime import datetime
+
+class ArchivedExpense(db.Model):
+  # Cold copy of an expense moved out of `expenses` by the archival job.
+  # Rows keep their original id, so references held by clients stay valid.
+  __tablename__ = "archived_expenses"
+  __table_args__ = (
+    db.Index("ix_archived_expenses_group_id_date", "group_id", "date"),
+  )
+
+  id = db.Column(db.Integer, primary_key = True, autoincrement = False)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False)
+  created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  description = db.Column(db.String(255), nullable = False)
+  total_amount = db.Column(db.Numeric(10,2), nullable = False)
+  currency = db.Column(db.String(3), nullable = False, default = "GBP", server_default = "GBP")  # of total_amount and the splits
+  category = db.Column(db.String(32))  # see app/categories.py; None when no rule matched
+  date = db.Column(db.DateTime, nullable = False)
+  created_at = db.Column(db.DateTime)
+
+  def __repr__(self):
+    return f"<ArchivedExpense {self.description} of {self.total_amount} in Group {self.group_id}>"
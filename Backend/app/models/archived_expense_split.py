@@ -0,0 +1,13 @@
+from app.extensions import db
+
+class ArchivedExpenseSplit(db.Model):
+  # Cold copy of a split, archived together with its expense
+  __tablename__ = "archived_expense_splits"
+
+  id = db.Column(db.Integer, primary_key = True, autoincrement = False)
+  expense_id = db.Column(db.Integer, db.ForeignKey("archived_expenses.id", ondelete = "CASCADE"), nullable = False, index = True)
+  user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  amount_owed = db.Column(db.Numeric(10,2), nullable = False)
+
+  def __repr__(self):
+    return f"<ArchivedExpenseSplit User {self.user_id} owes {self.amount_owed} for Expense {self.expense_id}>"
@@ -0,0 +1,16 @@
+from app.extensions import db
+
+class ArchivedSettlement(db.Model):
+  # Cold copy of a confirmed or rejected settlement; pending ones always stay hot
+  __tablename__ = "archived_settlements"
+
+  id = db.Column(db.Integer, primary_key = True, autoincrement = False)
+  from_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  to_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False, index = True)
+  amount = db.Column(db.Numeric(10,2), nullable = False)
+  status = db.Column(db.String(20), nullable = False)
+  created_at = db.Column(db.DateTime)
+
+  def __repr__(self):
+    return f"<ArchivedSettlement from User {self.from_user_id} to User {self.to_user_id} in Group {self.group_id}, Status: {self.status}>"
@@ -0,0 +1,17 @@
+from app.extensions import db
+from datetime import datetime
+
+class BalanceCheckpoint(db.Model):
+  # How far a group's history has been archived, and totals of what was
+  # archived so summaries don't have to read the archive
+  __tablename__ = "balance_checkpoints"
+
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), primary_key = True, autoincrement = False)
+  closed_before = db.Column(db.DateTime, nullable = True)  # history dated before this is archived; None until a run completes
+  expense_count = db.Column(db.Integer, nullable = False, default = 0)
+  total_spent = db.Column(db.Numeric(12,2), nullable = False, default = 0)
+  settlement_count = db.Column(db.Integer, nullable = False, default = 0)
+  updated_at = db.Column(db.DateTime, default = datetime.utcnow, onupdate = datetime.utcnow)
+
+  def __repr__(self):
+    return f"<BalanceCheckpoint Group {self.group_id} closed before {self.closed_before}>"
@@ -3,22 +3,34 @@ from datetime import datetime
 
 class Expense(db.Model):
   __tablename__ = "expenses"
+  __table_args__ = (
+    # Expenses a given user paid for in a group (user-scoped obligations)
+    db.Index("ix_expenses_group_id_created_by", "group_id", "created_by"),
+    # Never reuse an id: archived expenses keep theirs
+    {"sqlite_autoincrement": True},
+  )
 
   id = db.Column(db.Integer, primary_key = True)
-  group_id = db.Column(db.Integer, db.ForeignKey("groups.id"), nullable = False)
-  created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False, index = True)
+  created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False, index = True)
   description = db.Column(db.String(255), nullable = False)
   total_amount = db.Column(db.Numeric(10,2), nullable = False)
+  currency = db.Column(db.String(3), nullable = False, default = "GBP", server_default = "GBP")  # of total_amount and the splits
+  category = db.Column(db.String(32))  # see app/categories.py; None when no rule matched
   date = db.Column(db.DateTime, nullable  = False)
   created_at = db.Column(db.DateTime, default = datetime.utcnow)
+  version = db.Column(db.Integer, nullable = False, server_default = "1")  # see Settlement.version
 
   # Relationships
-  group = db.relationship("Group", backref = "expenses") # backref builds both doors of the relationship
+  group = db.relationship("Group", backref = db.backref("expenses", passive_deletes = True)) # backref builds both doors of the relationship
   creator = db.relationship("User")
 
   splits = db.relationship("ExpenseSplit", back_populates = "expense", # back_populates builds one door of the relationship (expense.splits) -> the other door is built in ExpenseSplit model (splits.expense)
-    cascade = "all, delete-orphan"
+    cascade = "all, delete-orphan",
+    passive_deletes = True # leave deleting unloaded splits to ON DELETE CASCADE instead of loading them
   )
 
+  __mapper_args__ = {"version_id_col": version}
+
   def __repr__(self):
     return f"<Expense {self.description} of {self.total_amount} in Group {self.group_id}>"
@@ -0,0 +1,98 @@
+from sqlalchemy import event, inspect, text
+
+from app.extensions import db
+
+# SQLite FTS5 index over expense descriptions plus the group and payer names.
+# The rowid is the expense id. `scope` holds a "g<group_id>" token so searches
+# can be restricted to the caller's groups inside the index itself.
+# Triggers keep it in sync with expenses, group renames and user renames.
+
+SEARCH_TABLE = "expense_search"
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+  description, group_name, payer_name, scope,
+  tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+
+# {payer_name} is a users lookup, or NULL on shards that don't hold users
+INSERT_ROW = f"""
+  INSERT INTO {SEARCH_TABLE}(rowid, description, group_name, payer_name, scope)
+  VALUES (
+    NEW.id, NEW.description,
+    (SELECT name FROM groups WHERE id = NEW.group_id),
+    {{payer_name}},
+    'g' || NEW.group_id
+  );
+"""
+
+TRIGGERS = [
+  f"""
+  CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_expense_insert AFTER INSERT ON expenses BEGIN
+    {INSERT_ROW}
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_expense_delete AFTER DELETE ON expenses BEGIN
+    DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_expense_update
+  AFTER UPDATE OF description, group_id, created_by ON expenses BEGIN
+    DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+    {INSERT_ROW}
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_group_rename AFTER UPDATE OF name ON groups BEGIN
+    UPDATE {SEARCH_TABLE} SET group_name = NEW.name WHERE {SEARCH_TABLE} MATCH 'scope:g' || NEW.id;
+  END
+  """,
+]
+
+USER_RENAME_TRIGGER = f"""
+  CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_user_rename AFTER UPDATE OF name ON users BEGIN
+    UPDATE {SEARCH_TABLE} SET payer_name = NEW.name
+    WHERE rowid IN (SELECT id FROM expenses WHERE created_by = NEW.id);
+  END
+"""
+
+
+def install_search_index(connection):
+  """
+  Create the FTS table and its triggers on a connection that holds the
+  expenses table. Idempotent; a no-op on databases other than SQLite.
+  """
+  if connection.dialect.name != "sqlite":
+    return
+
+  tables = inspect(connection)
+  if not tables.has_table("expenses"):
+    return
+
+  has_users = tables.has_table("users")
+  payer_name = "(SELECT name FROM users WHERE id = NEW.created_by)" if has_users else "NULL"
+
+  connection.execute(text(CREATE_TABLE))
+  for trigger in TRIGGERS:
+    connection.execute(text(trigger.replace("{payer_name}", payer_name)))
+  if has_users:
+    connection.execute(text(USER_RENAME_TRIGGER))
+
+
+def drop_search_index(connection):
+  if connection.dialect.name == "sqlite":
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+# Keep the index in step with db.create_all() / db.drop_all() (and shard schema creation)
+@event.listens_for(db.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+  install_search_index(connection)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _drop_search_index(target, connection, **kw):
+  drop_search_index(connection)
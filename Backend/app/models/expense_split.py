@@ -3,10 +3,16 @@ from datetime import datetime
 
 class ExpenseSplit(db.Model):
   __tablename__ = "expense_splits"
+  __table_args__ = (
+    # A user's splits, joined to their expenses without touching other rows
+    db.Index("ix_expense_splits_user_id_expense_id", "user_id", "expense_id"),
+    # Never reuse an id: archived splits keep theirs
+    {"sqlite_autoincrement": True},
+  )
 
   id = db.Column(db.Integer, primary_key = True)
-  expense_id = db.Column(db.Integer, db.ForeignKey("expenses.id"), nullable = False)
-  user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  expense_id = db.Column(db.Integer, db.ForeignKey("expenses.id", ondelete = "CASCADE"), nullable = False, index = True)
+  user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False, index = True)
   amount_owed = db.Column(db.Numeric(10,2), nullable = False)
 
   # Relationships
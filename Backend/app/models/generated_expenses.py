@@ -3,14 +3,18 @@ from datetime import datetime
 
 class GeneratedExpense(db.Model):
   __tablename__ = "generated_expenses"
+  __table_args__ = (
+    # Period ranges and the latest period of a subscription are index seeks
+    db.Index("ix_generated_expenses_subscription_id_period", "subscription_id", "period"),
+  )
 
   id = db.Column(db.Integer, primary_key = True)
 
   subscription_id = db.Column(db.Integer, db.ForeignKey("subscriptions.id"), nullable = False)
 
-  expense_id = db.Column(db.Integer, db.ForeignKey("expenses.id"), nullable = False, unique = True)
+  expense_id = db.Column(db.Integer, db.ForeignKey("expenses.id", ondelete = "CASCADE"), nullable = False, unique = True)
 
-  billing_period = db.Column(db.String(7), nullable = False) # Format: 'MM-YYYY'
+  period = db.Column(db.Integer, nullable = False) # YYYYMM, e.g. 202603 for March 2026; sorts chronologically
 
   created_at = db.Column(db.DateTime, default = datetime.utcnow)
 
@@ -19,6 +23,11 @@ class GeneratedExpense(db.Model):
 
   expense = db.relationship("Expense")
 
+  @property
+  def billing_period(self):
+    # The old 'MM-YYYY' display format
+    return f"{self.period % 100:02d}-{self.period // 100}"
+
   def __repr__(self):
     return f"<GeneratedExpense Subscription {self.subscription_id} for Expense {self.expense_id} in Period {self.billing_period}>"
 
@@ -7,6 +7,7 @@ class Group(db.Model):
   id = db.Column(db.Integer, primary_key = True)
   name = db.Column(db.String(150), nullable = False)
   description = db.Column(db.String(255), nullable = True)
+  base_currency = db.Column(db.String(3), nullable = False, default = "GBP", server_default = "GBP")  # balances and settlements are in this currency
   created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
   created_at = db.Column(db.DateTime, default = datetime.utcnow)
 
@@ -14,7 +15,8 @@ class Group(db.Model):
   memberships = db.relationship(
     "Membership",
     back_populates = "group",
-    cascade = "all, delete-orphan"
+    cascade = "all, delete-orphan",
+    passive_deletes = True
   )
 
   creator = db.relationship("User")
@@ -22,7 +24,8 @@ class Group(db.Model):
   settlements = db.relationship(
     "Settlement",
     back_populates = "group",
-    cascade = "all, delete-orphan"
+    cascade = "all, delete-orphan",
+    passive_deletes = True
   )
   
   def __repr__(self):
@@ -0,0 +1,22 @@
+from app.extensions import db
+from datetime import datetime
+
+class GroupChange(db.Model):
+  __tablename__ = "group_changes"
+  __table_args__ = (
+    # seq is the sync cursor: numbered per group, so it survives a move between shards
+    db.UniqueConstraint("group_id", "seq", name = "uq_group_changes_group_id_seq"),
+    # Never reuse an id: the integrity checker's incremental runs start after the last one seen
+    {"sqlite_autoincrement": True},
+  )
+
+  id = db.Column(db.Integer, primary_key = True)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False)
+  seq = db.Column(db.Integer, nullable = False)
+  entity = db.Column(db.String(20), nullable = False)  # expense / settlement / membership / group
+  entity_id = db.Column(db.Integer, nullable = False)
+  op = db.Column(db.String(10), nullable = False)  # insert / update / delete / resync
+  created_at = db.Column(db.DateTime, default = datetime.utcnow)
+
+  def __repr__(self):
+    return f"<GroupChange {self.seq} in Group {self.group_id}: {self.op} {self.entity} {self.entity_id}>"
@@ -0,0 +1,14 @@
+from app.extensions import db
+from datetime import datetime
+
+class GroupShard(db.Model):
+  __tablename__ = "group_shards"
+
+  # The directory lives in the global database and hands out group ids,
+  # so a group id is unique across every shard.
+  group_id = db.Column(db.Integer, primary_key = True)
+  shard_id = db.Column(db.String(50), nullable = False, index = True)
+  created_at = db.Column(db.DateTime, default = datetime.utcnow)
+
+  def __repr__(self):
+    return f"<GroupShard Group {self.group_id} on {self.shard_id}>"
@@ -5,8 +5,8 @@ class Membership(db.Model):
   __tablename__ = "memberships"
 
   id = db.Column(db.Integer, primary_key = True)
-  user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
-  group_id = db.Column(db.Integer, db.ForeignKey("groups.id"), nullable = False)
+  user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete = "CASCADE"), nullable = False, index = True)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False, index = True)
   role = db.Column(db.String, default = "member")  # e.g., member, admin
   joined_at = db.Column(db.DateTime, default = datetime.utcnow)
 
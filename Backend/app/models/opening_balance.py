@@ -0,0 +1,20 @@
+from app.extensions import db
+
+class OpeningBalance(db.Model):
+  # What a debtor owed a creditor across a group's archived history: their
+  # splits of the creditor's expenses less the settlements they confirmed
+  # paying them. May be negative (overpaid). Balance reads add these to the
+  # hot rows, so archiving never changes a balance.
+  __tablename__ = "opening_balances"
+  __table_args__ = (
+    db.UniqueConstraint("group_id", "debtor_id", "creditor_id", name = "uq_opening_balances_group_id_debtor_id_creditor_id"),
+  )
+
+  id = db.Column(db.Integer, primary_key = True)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False)
+  debtor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  creditor_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  amount = db.Column(db.Numeric(12,2), nullable = False)
+
+  def __repr__(self):
+    return f"<OpeningBalance User {self.debtor_id} owes User {self.creditor_id} {self.amount} in Group {self.group_id}>"
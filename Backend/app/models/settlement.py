@@ -3,14 +3,21 @@ from datetime import datetime
 
 class Settlement(db.Model):
   __tablename__ = "settlements"
+  __table_args__ = (
+    # Settlements a user sent / received within a group
+    db.Index("ix_settlements_group_id_from_user_id", "group_id", "from_user_id"),
+    db.Index("ix_settlements_group_id_to_user_id", "group_id", "to_user_id"),
+    # Never reuse an id: archived settlements keep theirs
+    {"sqlite_autoincrement": True},
+  )
 
   id = db.Column(db.Integer, primary_key = True)
 
-  from_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  from_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False, index = True)
 
-  to_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  to_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False, index = True)
 
-  group_id = db.Column(db.Integer, db.ForeignKey("groups.id"), nullable = False)
+  group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete = "CASCADE"), nullable = False, index = True)
 
   amount = db.Column(db.Numeric(10,2), nullable = False)
 
@@ -18,13 +25,16 @@ class Settlement(db.Model):
 
   created_at = db.Column(db.DateTime, default = datetime.utcnow)
 
+  # Bumped by every UPDATE; flushes of a stale copy fail instead of overwriting
+  version = db.Column(db.Integer, nullable = False, server_default = "1")
+
   # Relationships
   from_user = db.relationship("User", foreign_keys = [from_user_id], back_populates = "settlements_sent")
   to_user = db.relationship("User", foreign_keys = [to_user_id], back_populates = "settlements_received")
 
   group = db.relationship("Group")
 
-
+  __mapper_args__ = {"version_id_col": version}
 
   def __repr__(self):
     return f"<Settlement from User {self.from_user_id} to User {self.to_user_id} in Group {self.group_id}, Status: {self.status}>"
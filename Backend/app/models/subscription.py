@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Subscription(db.Model):
   __tablename__ = "subscriptions"
+  __table_args__ = (
+    # The billing scheduler's range query: active subscriptions due by a date
+    db.Index("ix_subscriptions_active_next_billing_date", "active", "next_billing_date"),
+  )
 
   id = db.Column(db.Integer, primary_key = True)
   name = db.Column(db.String(150), nullable = False)
@@ -19,17 +23,17 @@ class Subscription(db.Model):
     db.String(20),
     nullable = False,
     default = "user"  # e.g., user, group
-)
+  )
 
-owner_id = db.Column(db.Integer, nullable = False)
+  owner_id = db.Column(db.Integer, nullable = False)
 
-created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
+  created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable = False)
 
-active = db.Column(db.Boolean, default = True)
+  active = db.Column(db.Boolean, default = True)
 
-#relationships
+  #relationships
 
-created_by_user = db.relationship("User")
+  created_by_user = db.relationship("User")
 
-def __repr__(self):
+  def __repr__(self):
     return f"<Subscription {self.name}, Amount: {self.amount}, Cycle: {self.billing_cycle}>"
@@ -14,7 +14,8 @@ class User(db.Model):
   memberships = db.relationship(
     "Membership",
     back_populates = "user",
-    cascade = "all, delete-orphan"
+    cascade = "all, delete-orphan",
+    passive_deletes = True
   )
 
   settlements_sent = db.relationship(
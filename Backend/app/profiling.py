@@ -0,0 +1,265 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when any of these is configured and applies:
+  - PROFILING_ENABLED: every request,
+  - PROFILING_TOKEN: requests carrying it in the X-BillNest-Profile header,
+  - PROFILING_SAMPLE_RATE: that fraction of requests, picked at random.
+
+With none of them set, init_app registers nothing, so requests run exactly
+as they would without this module.
+
+A profiled request runs under cProfile (PROFILING_FORMAT = "pstats") or a
+stack sampler (PROFILING_FORMAT = "collapsed", one "frame;frame;frame count"
+line per stack, for flamegraph.pl or speedscope). Its SQL statements are
+counted and timed on every engine. The output goes to
+PROFILING_DIR/<endpoint>/, next to a JSON summary with the wall and SQL time
+and the functions that took the most time. The response carries a
+Server-Timing header with the same figures.
+
+`flask profiling summary` rolls the saved summaries up per endpoint.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import click
+from flask import current_app, g, request
+from sqlalchemy import event
+
+PROFILE_HEADER = "X-BillNest-Profile"
+
+# Seconds between stack samples in the "collapsed" format
+SAMPLE_INTERVAL = 0.001
+
+# Functions listed in each summary
+TOP_FUNCTIONS = 15
+
+# The profile of the request running on this thread, for the SQL timers
+_local = threading.local()
+
+
+class RequestProfile:
+  """One request's profiler, stack samples and SQL timings."""
+
+  def __init__(self, fmt, interval = SAMPLE_INTERVAL):
+    self.fmt = fmt
+    self.interval = interval
+    self.sql_seconds = 0.0
+    self.sql_queries = 0
+    self._samples = Counter()
+    self._profiler = None
+    self._sampler = None
+    self._stopped = threading.Event()
+
+  def start(self):
+    if self.fmt == "collapsed":
+      self._sampler = threading.Thread(target = self._sample, args = (threading.get_ident(),), daemon = True)
+      self._sampler.start()
+    else:
+      self._profiler = cProfile.Profile()
+      self._profiler.enable()
+    self.started = time.perf_counter()
+    _local.profile = self
+
+  def stop(self):
+    self.wall_seconds = time.perf_counter() - self.started
+    _local.profile = None
+    if self._profiler is not None:
+      self._profiler.disable()
+    else:
+      self._stopped.set()
+      self._sampler.join()
+
+  def _sample(self, thread_id):
+    while not self._stopped.wait(self.interval):
+      frame = sys._current_frames().get(thread_id)
+      stack = []
+      while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+      self._samples[";".join(reversed(stack))] += 1
+
+  def top_functions(self, limit = TOP_FUNCTIONS):
+    """The functions with the most time of their own, as dicts of milliseconds."""
+    if self._profiler is not None:
+      stats = pstats.Stats(self._profiler).stats
+      rows = [
+        {"function": _describe(*function), "calls": calls, "self_ms": own * 1000, "cumulative_ms": cumulative * 1000}
+        for function, (_, calls, own, cumulative, _) in stats.items()
+      ]
+    else:
+      # A sample is `interval` seconds of the leaf frame's own time, and of every frame's cumulative time
+      own, cumulative = Counter(), Counter()
+      for stack, count in self._samples.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+          cumulative[frame] += count
+      rows = [
+        {"function": frame, "samples": count, "self_ms": count * self.interval * 1000,
+         "cumulative_ms": cumulative[frame] * self.interval * 1000}
+        for frame, count in own.items()
+      ]
+    rows.sort(key = lambda row: row["self_ms"], reverse = True)
+    return rows[:limit]
+
+  def save(self, directory, summary):
+    """Write the profile and its summary under `directory`; returns the profile's path."""
+    os.makedirs(directory, exist_ok = True)
+    stem = os.path.join(directory, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}")
+    if self._profiler is not None:
+      path = stem + ".prof"
+      self._profiler.dump_stats(path)
+    else:
+      path = stem + ".collapsed"
+      with open(path, "w") as handle:
+        handle.writelines(f"{stack} {count}\n" for stack, count in sorted(self._samples.items()))
+    with open(stem + ".json", "w") as handle:
+      json.dump(summary, handle, indent = 2)
+    return path
+
+
+def _describe(filename, line, name):
+  if filename == "~":  # built-ins
+    return name
+  return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _should_profile(config):
+  if config.get("PROFILING_ENABLED"):
+    return True
+  token = config.get("PROFILING_TOKEN")
+  sent = request.headers.get(PROFILE_HEADER)
+  if token and sent and hmac.compare_digest(sent.encode(), token.encode()):
+    return True
+  return random.random() < config.get("PROFILING_SAMPLE_RATE", 0)
+
+
+def _before_request():
+  if _should_profile(current_app.config):
+    g.request_profile = RequestProfile(current_app.config.get("PROFILING_FORMAT", "pstats"))
+    g.request_profile.start()
+
+
+def _after_request(response):
+  profile = g.pop("request_profile", None)
+  if profile is None:
+    return response
+  profile.stop()
+
+  endpoint = request.endpoint or "unmatched"
+  summary = {
+    "endpoint": endpoint,
+    "method": request.method,
+    "path": request.path,
+    "status": response.status_code,
+    "profiled_at": datetime.utcnow().isoformat(),
+    "wall_ms": round(profile.wall_seconds * 1000, 3),
+    "sql_ms": round(profile.sql_seconds * 1000, 3),
+    "sql_queries": profile.sql_queries,
+    "top_functions": profile.top_functions(),
+  }
+  path = profile.save(os.path.join(get_profile_dir(current_app), endpoint), summary)
+  current_app.logger.info("Profiled %s %s in %.1f ms: %s", request.method, request.path, summary["wall_ms"], path)
+
+  response.headers.add("Server-Timing", f'app;dur={summary["wall_ms"]}, sql;dur={summary["sql_ms"]};desc="{profile.sql_queries} queries"')
+  return response
+
+
+def _teardown_request(exc = None):
+  # A request that failed before after_request still has its profiler running
+  profile = g.pop("request_profile", None)
+  if profile is not None:
+    profile.stop()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  if getattr(_local, "profile", None) is not None:
+    conn.info.setdefault("billnest_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  profile = getattr(_local, "profile", None)
+  started = conn.info.get("billnest_query_started")
+  if profile is not None and started:
+    profile.sql_seconds += time.perf_counter() - started.pop()
+    profile.sql_queries += 1
+
+
+def get_profile_dir(app):
+  return app.config.get("PROFILING_DIR") or os.path.join(app.instance_path, "profiles")
+
+
+@click.group("profiling")
+def profiling_cli():
+  """Inspect saved request profiles."""
+
+
+@profiling_cli.command("summary")
+@click.option("--endpoint", help = "Only this endpoint, e.g. groups.group_changes.")
+@click.option("--top", type = int, default = 10, show_default = True, help = "Functions listed per endpoint.")
+def profiling_summary_command(endpoint, top):
+  """Wall time, SQL share and the costliest functions per endpoint."""
+  summaries = defaultdict(list)
+  root = get_profile_dir(current_app)
+  for directory, _, files in os.walk(root):
+    for name in files:
+      if name.endswith(".json"):
+        with open(os.path.join(directory, name)) as handle:
+          summary = json.load(handle)
+        if endpoint is None or summary["endpoint"] == endpoint:
+          summaries[summary["endpoint"]].append(summary)
+
+  if not summaries:
+    click.echo(f"No profiles under {root}.")
+    return
+
+  for name, profiles in sorted(summaries.items()):
+    walls = sorted(p["wall_ms"] for p in profiles)
+    wall = sum(walls)
+    sql = sum(p["sql_ms"] for p in profiles)
+    # Requests too quick for the clock can add up to no time at all
+    sql_share = f"{sql / wall:.0%}" if wall else "n/a"
+    click.echo(
+      f"{name}: {len(profiles)} profiled, median {walls[len(walls) // 2]:.1f} ms, max {walls[-1]:.1f} ms, "
+      f"SQL {sql_share} of the time ({sum(p['sql_queries'] for p in profiles) / len(profiles):.1f} queries each)"
+    )
+    own = Counter()
+    for profile in profiles:
+      for row in profile["top_functions"]:
+        own[row["function"]] += row["self_ms"]
+    for function, ms in own.most_common(top):
+      click.echo(f"  {ms / len(profiles):9.2f} ms  {function}")
+
+
+def init_app(app):
+  app.cli.add_command(profiling_cli)
+
+  if app.config.get("PROFILING_FORMAT", "pstats") not in ("pstats", "collapsed"):
+    raise ValueError("PROFILING_FORMAT must be 'pstats' or 'collapsed'.")
+
+  # Nothing can trigger a profile, so leave the request path untouched
+  if not (
+    app.config.get("PROFILING_ENABLED") or app.config.get("PROFILING_TOKEN") or app.config.get("PROFILING_SAMPLE_RATE", 0) > 0
+  ):
+    return
+
+  app.before_request(_before_request)
+  app.after_request(_after_request)
+  app.teardown_request(_teardown_request)
+  with app.app_context():
+    from app.extensions import db
+    for engine in db.engines.values():
+      event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+      event.listen(engine, "after_cursor_execute", _after_cursor_execute)
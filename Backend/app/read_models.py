@@ -0,0 +1,88 @@
+"""
+Read models: immutable views of rows for listing and detail results.
+
+Services that only read return these instead of ORM entities. They are
+named tuples built straight from column-only selects, so a listing never
+goes through the session's identity map, never carries instrumentation or
+lazy loaders, and cannot issue a query while it is being serialized.
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+from app.extensions import db
+
+
+class SplitView(NamedTuple):
+  id: int
+  expense_id: int
+  user_id: int
+  amount_owed: Decimal
+
+
+class ExpenseView(NamedTuple):
+  id: int
+  group_id: int
+  created_by: int
+  description: str
+  total_amount: Decimal
+  currency: str
+  date: datetime
+  created_at: datetime
+  category: str
+  splits: tuple = ()  # SplitViews, when the service loaded them
+
+
+class SettlementView(NamedTuple):
+  id: int
+  group_id: int
+  from_user_id: int
+  to_user_id: int
+  amount: Decimal
+  status: str
+  created_at: datetime
+
+
+class GroupView(NamedTuple):
+  id: int
+  name: str
+  description: str
+  base_currency: str
+  created_by: int
+  created_at: datetime
+
+
+class MembershipView(NamedTuple):
+  id: int
+  group_id: int
+  user_id: int
+  role: str
+  joined_at: datetime
+
+
+def view_columns(view, model):
+  """
+  The model's table columns for a view's fields, in field order.
+
+  Fields the table doesn't have (like ExpenseView.splits) are skipped and
+  take their default.
+  """
+  table = model.__table__
+  return [table.c[name] for name in view._fields if name in table.c]
+
+
+def fetch_views(view, statement, bind_arguments = None):
+  """
+  Run a column-only select and wrap each row in `view`.
+
+  Args:
+      view (type): The NamedTuple to build; the select's columns must be in field order.
+      statement (Select): Usually built from `view_columns(view, Model)`.
+      bind_arguments (dict, optional): Routing for the sharded session,
+          e.g. `group_bind_arguments(group_id)`.
+
+  Returns:
+      list: One view per row.
+  """
+  result = db.session.execute(statement, bind_arguments = bind_arguments)
+  return [view(*row) for row in result]
@@ -0,0 +1,7 @@
+from .groups import groups_bp
+from .events import events_bp
+
+
+def register_routes(app):
+  app.register_blueprint(groups_bp)
+  app.register_blueprint(events_bp)
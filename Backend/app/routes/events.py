@@ -0,0 +1,45 @@
+from flask import Blueprint, Response, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app.events import get_broker, HEARTBEAT_SECONDS
+from app.extensions import db
+from app.models import User
+from app.services.group_service import get_user_groups
+
+events_bp = Blueprint("events", __name__)
+
+
+@events_bp.get("/events")
+@jwt_required()
+def user_events():
+  """
+  Server-sent event stream of changes in the authenticated user's groups.
+
+  Each event is `event: group` with data {"group_id", "entities", "cursor"};
+  the client follows up with GET /groups/<group_id>/changes. The connection
+  holds no database session while it is open.
+  """
+  user = db.session.get(User, int(get_jwt_identity()))
+  if user is None:
+    return {"error": "User not found."}, 404
+
+  broker = get_broker()
+  subscriber = broker.subscribe(user.id, [group.id for group in get_user_groups(user)])
+  json = current_app.json
+
+  def stream():
+    try:
+      yield "retry: 5000\n\n"
+      while True:
+        events = subscriber.wait(HEARTBEAT_SECONDS)
+        if not events:
+          yield ": keepalive\n\n"
+        for event in events:
+          yield f"event: group\ndata: {json.dumps(event)}\n\n"
+    finally:
+      broker.unsubscribe(subscriber)
+
+  return Response(stream(), mimetype = "text/event-stream", headers = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # don't let nginx buffer the stream
+  })
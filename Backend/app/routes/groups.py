@@ -0,0 +1,157 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app.extensions import db
+from app.models import Group, User
+from app.services.balance_service import calculate_group_balances, get_group_obligations
+from app.services.change_service import get_group_changes, CHANGES_PAGE_SIZE
+from app.services.expense_service import create_expense, get_group_expenses
+from app.services.group_service import is_group_member
+from app.services.settlement_service import create_settlement_request, confirm_settlement, get_group_settlement
+from app.transactions import ConcurrentUpdateError
+
+groups_bp = Blueprint("groups", __name__, url_prefix = "/groups")
+
+
+def _get_member_group(group_id):
+  """The group, if it exists and the authenticated user belongs to it."""
+  group = db.session.get(Group, group_id)
+  if group is None or not is_group_member(group, int(get_jwt_identity())):
+    return None
+  return group
+
+
+@groups_bp.get("/<int:group_id>/changes")
+@jwt_required()
+def group_changes(group_id):
+  """
+  Inserts, updates and deletes in a group since a sync cursor.
+
+  Query params:
+      since (int): The `cursor` from the previous response; 0 (default) for everything.
+      limit (int): Most change log entries to read, up to CHANGES_PAGE_SIZE.
+  """
+  group = _get_member_group(group_id)
+  if group is None:
+    return jsonify(error = "Group not found."), 404
+
+  since = request.args.get("since", "0")
+  limit = request.args.get("limit", str(CHANGES_PAGE_SIZE))
+  if not since.isdigit() or not limit.isdigit() or int(limit) < 1:
+    return jsonify(error = "since must be a cursor and limit a positive number."), 400
+
+  return jsonify(get_group_changes(group, int(since), min(int(limit), CHANGES_PAGE_SIZE)))
+
+
+@groups_bp.get("/<int:group_id>/balances")
+@jwt_required()
+def group_balances(group_id):
+  """Every member's net balance and who owes whom, in the group's base currency."""
+  group = _get_member_group(group_id)
+  if group is None:
+    return jsonify(error = "Group not found."), 404
+
+  return jsonify(balances = calculate_group_balances(group), obligations = get_group_obligations(group))
+
+
+@groups_bp.get("/<int:group_id>/expenses")
+@jwt_required()
+def group_expenses(group_id):
+  """
+  The group's expenses, oldest first.
+
+  Query params:
+      splits (0/1): Include each expense's splits.
+      archived (0/1): Include archived history.
+  """
+  group = _get_member_group(group_id)
+  if group is None:
+    return jsonify(error = "Group not found."), 404
+
+  expenses = get_group_expenses(
+    group, with_splits = request.args.get("splits") == "1", include_archived = request.args.get("archived") == "1"
+  )
+  return jsonify(expenses = expenses)
+
+
+@groups_bp.post("/<int:group_id>/expenses")
+@jwt_required()
+def add_group_expense(group_id):
+  """
+  Add an expense paid by the authenticated user.
+
+  Body:
+      description (str), total_amount (str), splits (split spec or list of {"user", "amount"}),
+      date (ISO datetime, default now), currency (optional ISO 4217 code).
+  """
+  group = _get_member_group(group_id)
+  if group is None:
+    return jsonify(error = "Group not found."), 404
+
+  body = request.get_json(silent = True) or {}
+  if not isinstance(body.get("description"), str):
+    return jsonify(error = "description must be a string."), 400
+  try:
+    splits = body.get("splits")
+    if isinstance(splits, list):
+      splits = [{"user": split["user"], "amount": Decimal(str(split["amount"]))} for split in splits]
+    expense = create_expense(
+      group, db.session.get(User, int(get_jwt_identity())), body.get("description"),
+      Decimal(str(body.get("total_amount"))), splits,
+      datetime.fromisoformat(body["date"]) if body.get("date") else datetime.utcnow(),
+      body.get("currency")
+    )
+  except (ValueError, KeyError, TypeError, InvalidOperation) as error:
+    return jsonify(error = str(error) or "Invalid expense."), 400
+
+  return jsonify(expense), 201
+
+
+@groups_bp.post("/<int:group_id>/settlements")
+@jwt_required()
+def add_group_settlement(group_id):
+  """
+  Record that the authenticated user paid another member; it stays pending until they confirm it.
+
+  Body:
+      to_user_id (int), amount (str).
+  """
+  group = _get_member_group(group_id)
+  if group is None:
+    return jsonify(error = "Group not found."), 404
+
+  body = request.get_json(silent = True) or {}
+  to_user = db.session.get(User, body.get("to_user_id")) if isinstance(body.get("to_user_id"), int) else None
+  if to_user is None:
+    return jsonify(error = "to_user_id must be a user."), 400
+  try:
+    settlement = create_settlement_request(
+      group, db.session.get(User, int(get_jwt_identity())), to_user, Decimal(str(body.get("amount")))
+    )
+  except (ValueError, InvalidOperation) as error:
+    return jsonify(error = str(error) or "Invalid amount."), 400
+
+  return jsonify(settlement), 201
+
+
+@groups_bp.post("/<int:group_id>/settlements/<int:settlement_id>/confirm")
+@jwt_required()
+def confirm_group_settlement(group_id, settlement_id):
+  """Confirm a pending settlement paid to the authenticated user."""
+  group = _get_member_group(group_id)
+  settlement = get_group_settlement(group, settlement_id) if group is not None else None
+  if settlement is None:
+    return jsonify(error = "Settlement not found."), 404
+
+  try:
+    confirm_settlement(settlement, db.session.get(User, int(get_jwt_identity())))
+  except ConcurrentUpdateError as error:
+    # Confirmed or rejected by a request that got there first; a retry sees which
+    return jsonify(error = str(error)), 409
+  except ValueError as error:
+    return jsonify(error = str(error)), 400
+
+  return jsonify(settlement)
@@ -0,0 +1,125 @@
+"""
+A lightweight app for batch and maintenance jobs.
+
+Cron-driven jobs (archiving, billing, backfills, statements, integrity
+checks) are short processes that need a database session, the models and
+what the services reach through `current_app` (shard router, FX rates,
+categorizer, event broker, analytics snapshot, billing scheduler). They
+don't need routes, JWT, Flask-Migrate/Alembic, the JSON provider, request
+profiling or run.py's dotenv, which is most of what `create_app` imports.
+
+`create_job_app()` builds only the former. `job_context()` wraps it in an
+app context for scripts:
+
+    with job_context():
+      archive_closed_periods(before)
+
+and `python -m app.runtime <group> <command>` runs the maintenance CLI
+groups with it, importing only the group asked for:
+
+    python -m app.runtime categories backfill --chunk-size 10000
+
+Configuration comes from the environment, with .flaskenv and .env loaded
+into it first as the `flask` command does, so a job reaches the same
+database however it is launched. Config reads the environment when
+app.config is first imported, which `job_context()` does only after
+loading them. A job never starts the billing scheduler's thread, whatever
+BILLING_SCHEDULER_ENABLED says; `billing run-due` bills once.
+"""
+import importlib
+from contextlib import contextmanager
+
+import click
+from flask import Flask
+from flask.cli import load_dotenv
+from flask.helpers import get_load_dotenv
+
+# Components the services use, initialised in create_app's order
+JOB_COMPONENTS = ("billing_scheduler", "analytics", "events", "fx", "categories")
+
+# CLI group -> "module:attribute", imported when the group is invoked
+JOB_COMMANDS = {
+  "archive": "app.archive:archive_cli",
+  "billing": "app.billing_scheduler:billing_cli",
+  "categories": "app.categories:categories_cli",
+  "integrity": "app.integrity:integrity_cli",
+  "shards": "app.sharding:shards_cli",
+  "statements": "app.statements:statements_cli",
+}
+
+
+def create_job_app(config_class = None):
+  """
+  An app with the database, models and service components only.
+
+  Args:
+      config_class (type, optional): As for `create_app`; defaults to Config.
+
+  Returns:
+      Flask: The app; push an app context (or use `job_context`) to use it.
+  """
+  from app import sharding
+  from app.config import Config
+  from app.extensions import db, enable_sqlite_foreign_keys
+
+  app = Flask("app")  # the package, as in create_app, for the same root and instance paths
+  app.config.from_object(config_class or Config)
+  # One-shot jobs must not leave the scheduler's thread running
+  app.config["BILLING_SCHEDULER_ENABLED"] = False
+
+  sharding.init_app(app)  # Registers shard binds, so it must run before db.init_app
+  db.init_app(app)
+  with app.app_context():
+    sharding.drop_shard_metadata(db)
+    enable_sqlite_foreign_keys(db.engine)
+
+  from app import models  # Import models to register them with SQLAlchemy
+
+  for name in JOB_COMPONENTS:
+    importlib.import_module(f"app.{name}").init_app(app)
+  return app
+
+
+@contextmanager
+def job_context(config_class = None):
+  """
+  An app context of a new `create_job_app(config_class)` app, with its
+  session removed on exit. .flaskenv and .env are loaded first, as by the
+  `flask` command (unless FLASK_SKIP_DOTENV is set); variables already in
+  the environment win.
+  """
+  from app.extensions import db
+
+  if get_load_dotenv():
+    load_dotenv()
+  app = create_job_app(config_class)
+  with app.app_context():
+    try:
+      yield app
+    finally:
+      db.session.remove()
+
+
+class JobGroup(click.Group):
+  """Lists JOB_COMMANDS, and imports a group's module only when it is invoked."""
+
+  def list_commands(self, ctx):
+    return sorted(JOB_COMMANDS)
+
+  def get_command(self, ctx, name):
+    if name not in JOB_COMMANDS:
+      return None
+    module, attribute = JOB_COMMANDS[name].split(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+@click.group(cls = JobGroup)
+@click.pass_context
+def cli(ctx):
+  """BillNest batch and maintenance jobs."""
+  if not ctx.resilient_parsing:
+    ctx.with_resource(job_context())
+
+
+if __name__ == "__main__":
+  cli(prog_name = "python -m app.runtime")
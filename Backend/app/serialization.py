@@ -0,0 +1,180 @@
+"""
+JSON serialization for the API.
+
+Money is Decimal everywhere, and read models and ORM rows are nested in
+plain dicts and lists. This module registers a Flask JSON provider that:
+
+  - encodes with orjson when it is installed (the stdlib json otherwise),
+  - writes every Decimal as an exact, plain-notation string ("1234.50"),
+    never a float,
+  - serializes read-model views and ORM models through a serializer compiled
+    once per class, so each object is one generated function call rather than
+    per-field type checks.
+
+`columnar(items)` is an optional response shape for long lists: field names
+are sent once in "columns" and each item is a row of values.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+from sqlalchemy import Date, DateTime, Numeric
+
+try:
+  import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+  orjson = None
+
+from app.read_models import ExpenseView, SplitView
+
+# Element type of read-model fields that hold a tuple of other views
+NESTED_FIELDS = {
+  (ExpenseView, "splits"): SplitView,
+}
+
+_serializers = {}
+
+
+def decimal_string(value):
+  """Exact plain-notation string of a Decimal: Decimal("1E+2") -> "100"."""
+  return format(value, "f")
+
+
+class Serializer:
+  """
+  Compiled conversion of one class to JSON-ready values.
+
+  `to_dict(obj)` gives {field: value}; `to_row(obj)` gives [value, ...] in
+  `fields` order. Decimals become strings, dates and datetimes ISO strings,
+  nested views dicts (or rows, in `to_row`).
+  """
+
+  def __init__(self, cls, fields, kinds):
+    self.cls = cls
+    self.fields = tuple(fields)
+    self.nested = {name: kind for name, kind in kinds.items() if isinstance(kind, type)}
+    self.to_dict = self._compile(cls, fields, kinds, rows = False)
+    self.to_row = self._compile(cls, fields, kinds, rows = True)
+
+  @staticmethod
+  def _compile(cls, fields, kinds, rows):
+    # Generate one function per class with every field conversion inlined
+    namespace = {"decimal_string": decimal_string, "serializer_for": serializer_for}
+    values = []
+    for i, name in enumerate(fields):
+      getter = f"obj[{i}]" if issubclass(cls, tuple) else f"obj.{name}"
+      kind = kinds.get(name)
+      if kind == "decimal":
+        value = f"(None if {getter} is None else decimal_string({getter}))"
+      elif kind == "temporal":
+        value = f"(None if {getter} is None else {getter}.isoformat())"
+      elif isinstance(kind, type):
+        namespace[f"nested_{i}"] = kind
+        method = "to_row" if rows else "to_dict"
+        value = f"[serializer_for(nested_{i}).{method}(item) for item in {getter}]"
+      else:
+        value = getter
+      values.append(value if rows else f"{name!r}: {value}")
+
+    body = f"[{', '.join(values)}]" if rows else f"{{{', '.join(values)}}}"
+    exec(f"def serialize(obj):\n  return {body}\n", namespace)
+    return namespace["serialize"]
+
+
+def serializer_for(cls):
+  """The compiled Serializer for a read-model view or ORM model class."""
+  serializer = _serializers.get(cls)
+  if serializer is None:
+    fields, kinds = _describe(cls)
+    serializer = _serializers[cls] = Serializer(cls, fields, kinds)
+  return serializer
+
+
+def _describe(cls):
+  """Field names and their kinds ("decimal", "temporal", a nested view class or None)."""
+  if hasattr(cls, "_fields"):
+    annotations = cls.__annotations__
+    kinds = {}
+    for name in cls._fields:
+      kind = NESTED_FIELDS.get((cls, name)) or annotations.get(name)
+      if kind is Decimal:
+        kinds[name] = "decimal"
+      elif kind in (date, datetime):
+        kinds[name] = "temporal"
+      elif isinstance(kind, type) and hasattr(kind, "_fields"):
+        kinds[name] = kind
+    return list(cls._fields), kinds
+
+  if hasattr(cls, "__table__"):
+    kinds = {}
+    for column in cls.__table__.columns:
+      if isinstance(column.type, Numeric):
+        kinds[column.key] = "decimal"
+      elif isinstance(column.type, (Date, DateTime)):
+        kinds[column.key] = "temporal"
+    return [column.key for column in cls.__table__.columns], kinds
+
+  raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+
+
+def columnar(items, cls = None):
+  """
+  Compact shape for a long list of views or models of one class:
+
+      {"columns": ["id", "amount", ...], "rows": [[1, "10.00", ...], ...],
+       "nested": {"splits": ["id", ...]}}
+
+  "nested" names the columns of fields that hold lists of other views
+  (each such value is itself a list of rows) and is left out when empty.
+  """
+  items = list(items)
+  if cls is None:
+    if not items:
+      return {"columns": [], "rows": []}
+    cls = type(items[0])
+
+  serializer = serializer_for(cls)
+  shape = {"columns": list(serializer.fields), "rows": [serializer.to_row(item) for item in items]}
+  if serializer.nested:
+    shape["nested"] = {name: list(serializer_for(kind).fields) for name, kind in serializer.nested.items()}
+  return shape
+
+
+def _default(obj):
+  if isinstance(obj, Decimal):
+    return decimal_string(obj)
+  if isinstance(obj, (date, datetime)):
+    return obj.isoformat()
+  if isinstance(obj, (set, frozenset)):
+    return list(obj)
+  return serializer_for(type(obj)).to_dict(obj)
+
+
+class BillNestJSONProvider(JSONProvider):
+  """orjson-backed provider with exact Decimal strings and compiled per-class serializers."""
+
+  mimetype = "application/json"
+
+  def dumps(self, obj, **kwargs):
+    if orjson is not None and not kwargs:
+      return orjson.dumps(obj, default = _default, option = orjson.OPT_NON_STR_KEYS).decode()
+    kwargs.setdefault("default", _default)
+    kwargs.setdefault("ensure_ascii", False)
+    if "indent" not in kwargs:
+      kwargs.setdefault("separators", (",", ":"))
+    return json.dumps(obj, **kwargs)
+
+  def loads(self, s, **kwargs):
+    if orjson is not None and not kwargs:
+      return orjson.loads(s)
+    return json.loads(s, **kwargs)
+
+  def response(self, *args, **kwargs):
+    obj = self._prepare_response_obj(args, kwargs)
+    body = orjson.dumps(obj, default = _default, option = orjson.OPT_NON_STR_KEYS) if orjson is not None else self.dumps(obj)
+    return self._app.response_class(body, mimetype = self.mimetype)
+
+
+def init_app(app):
+  app.json = BillNestJSONProvider(app)
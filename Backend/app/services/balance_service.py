@@ -1,10 +1,18 @@
 from collections import defaultdict
 from decimal import Decimal
+from itertools import groupby
 
+from sqlalchemy import select, func, or_, union_all
 
-from app.models import Group, Expense, ExpenseSplit, Settlement
+from app.extensions import db
+from app.fx import get_fx_rates
+from app.models import Group, Expense, ExpenseSplit, Settlement, OpeningBalance
+from app.sharding import group_bind_arguments
 
-def calculate_group_balances(group):
+# Rows fetched per round trip when streaming a group's ledger
+LEDGER_BATCH_SIZE = 10000
+
+def calculate_group_balances(group, batch_size = LEDGER_BATCH_SIZE):
   """
   Calculate net balances for each user in the group.
   
@@ -15,9 +23,16 @@ def calculate_group_balances(group):
     - expenses (who paid)
     - expense splits (who owed)
     - confirmed settlements only
+    - opening balances carried forward from archived history
+
+  The ledger is streamed as plain tuples, batch_size rows
+  at a time, so memory stays flat however large the group is. Expenses in
+  another currency are converted to the group's base currency, batch_size
+  expenses at a time (see app.fx).
 
   Args:
       group (Group): The group for which to calculate balances.
+      batch_size (int): Rows fetched per round trip.
 
   Returns:
       dict: A dictionary mapping user IDs to their net balance as Decimal.
@@ -26,26 +41,36 @@ def calculate_group_balances(group):
   # defaultdict means if a user_id key doesn't exist, it auto-creates it with 0.00
   balances = defaultdict(lambda: Decimal("0.00"))
 
-  # Process expenses in the group and their splits
-  for expense in group.expenses:
-    payer_id = expense.created_by
-    # Person who PAID gets amount added to their balance
-    balances[payer_id] += expense.total_amount
+  # Person who PAID gets the expense total added to their balance, person who
+  # OWED gets their split subtracted. One statement, so both sides are read
+  # from the same snapshot and an expense added meanwhile is read whole or
+  # not at all.
+  for user_id, amount in _stream(
+    group, batch_size,
+    union_all(
+      select(Expense.created_by, Expense.total_amount).where(Expense.group_id == group.id, _in_base_currency(group)),
+      select(ExpenseSplit.user_id, -ExpenseSplit.amount_owed)
+      .join(Expense, ExpenseSplit.expense_id == Expense.id)
+      .where(Expense.group_id == group.id, _in_base_currency(group))
+    )
+  ):
+    balances[user_id] += amount
 
-    for split in expense.splits:
-      # Person who OWED gets amount subtracted from their balance
-      balances[split.user_id] -= split.amount_owed
+  for payer_id, total, splits in stream_converted_expenses(group, batch_size):
+    balances[payer_id] += total
+    for debtor_id, amount in splits:
+      balances[debtor_id] -= amount
 
-  # Process confirmed settlements in the group (when someone pays someone back)
-  for settlement in group.settlements:
-    # Only process confirmed settlements
-    if settlement.status != "confirmed":
-      continue
+  # Archived history, carried forward pair by pair
+  for debtor_id, creditor_id, amount in _opening_balances(group):
+    balances[creditor_id] += amount
+    balances[debtor_id] -= amount
 
-    # Person who paid back (from_user) reduces their debt
-    balances[settlement.from_user_id] += settlement.amount
-    # Person who received payment (to_user) is owed less
-    balances[settlement.to_user_id] -= settlement.amount
+  # Confirmed settlements (when someone pays someone back): the person who
+  # paid back reduces their debt, the person who received it is owed less
+  for from_user_id, to_user_id, amount in _stream(group, batch_size, _confirmed_settlements(group)):
+    balances[from_user_id] += amount
+    balances[to_user_id] -= amount
 
   # Validate that balances sum to zero (ensures no money is created or lost)
   total = sum(balances.values())
@@ -56,8 +81,11 @@ def calculate_group_balances(group):
 
 
   
-def get_group_obligations(group):
+def get_group_obligations(group, batch_size = LEDGER_BATCH_SIZE):
   """
+    Streams (debtor, payer, amount) split tuples and confirmed settlements,
+    batch_size rows at a time, into who owes whom.
+
     Returns:
         {
             debtor_id: {
@@ -67,54 +95,303 @@ def get_group_obligations(group):
     """
   obligations = defaultdict(lambda: defaultdict(lambda:Decimal("0.00")))
 
-# Process expenses and splits to determine who owes whom
-for expense in group.expenses:
-  payer_id = expense.created_by
-
-  for split in expense.splits:
-    debtor_id = split.user_id
-    amount = split.amount_owed
-
-    if debtor_id == payer_id:
-      continue  # Skip if the debtor is the same as the payer
+  # Start from what the archived history carried forward; settlements and
+  # carried-forward pairs are the only ones that can end up settled
+  touched = set()
+  for debtor_id, creditor_id, amount in _opening_balances(group):
+    obligations[debtor_id][creditor_id] += amount
+    touched.add((debtor_id, creditor_id))
 
+  # Splits of other people's expenses: the debtor owes the payer
+  for debtor_id, payer_id, amount in _stream(
+    group, batch_size,
+    select(ExpenseSplit.user_id, Expense.created_by, ExpenseSplit.amount_owed)
+    .join(Expense, ExpenseSplit.expense_id == Expense.id)
+    .where(Expense.group_id == group.id, _in_base_currency(group), ExpenseSplit.user_id != Expense.created_by)
+  ):
     obligations[debtor_id][payer_id] += amount
-  
-# Process confirmed settlements
 
-for settlement in group.settlements:
-  if settlement.status != "confirmed":
-    continue
+  for payer_id, _, splits in stream_converted_expenses(group, batch_size):
+    for debtor_id, amount in splits:
+      if debtor_id != payer_id:
+        obligations[debtor_id][payer_id] += amount
 
-  debtor_id = settlement.from_user_id
-  creditor_id = settlement.to_user_id
-  amount = settlement.amount
+  # Confirmed settlements pay those debts down
+  for debtor_id, creditor_id, amount in _stream(group, batch_size, _confirmed_settlements(group)):
+    obligations[debtor_id][creditor_id] -= amount
+    touched.add((debtor_id, creditor_id))
 
-  obligations[debtor_id][creditor_id] -= amount
-  
-  # Clean up zero or negative obligations
-  if obligations[debtor_id][creditor_id] <= Decimal("0.00"):
-    del obligations[debtor_id][creditor_id]
-  
-  
-  if not obligations[debtor_id]:  # If debtor has no more obligations, remove them
-    del obligations[debtor_id]
+  # Clean up settled or overpaid pairs, and debtors left with no obligations.
+  # Expenses only ever add, so this matches removing a pair as soon as a
+  # settlement takes it to zero or below.
+  for debtor_id, creditor_id in touched:
+    owed = obligations.get(debtor_id)
+    if owed is not None and creditor_id in owed and owed[creditor_id] <= Decimal("0.00"):
+      del owed[creditor_id]
+      if not owed:
+        del obligations[debtor_id]
 
   return obligations
 
+def _confirmed_settlements(group):
+  return (
+    select(Settlement.from_user_id, Settlement.to_user_id, Settlement.amount)
+    .where(Settlement.group_id == group.id, Settlement.status == "confirmed")
+  )
+
+def _in_base_currency(group):
+  return Expense.currency == group.base_currency
+
+def stream_converted_expenses(group, batch_size = LEDGER_BATCH_SIZE, criterion = None):
+  """
+  Yield the group's expenses in other currencies than its base currency,
+  converted to it, as (payer_id, total, [(debtor_id, amount), ...]).
+
+  Rows are streamed in expense order and converted batch_size expenses at a
+  time; rate lookups are memoized, so there is no per-row rate query.
+
+  Args:
+      group (Group): The group whose expenses to convert.
+      batch_size (int): Rows fetched, and expenses converted, per batch.
+      criterion (optional): Extra filter on Expense, e.g. expenses a user is part of.
+  """
+  statement = (
+    select(
+      Expense.id, Expense.created_by, Expense.currency, Expense.date, Expense.total_amount,
+      ExpenseSplit.user_id, ExpenseSplit.amount_owed
+    )
+    .join(ExpenseSplit, ExpenseSplit.expense_id == Expense.id)
+    .where(Expense.group_id == group.id, Expense.currency != group.base_currency)
+    .order_by(Expense.id, ExpenseSplit.id)
+  )
+  if criterion is not None:
+    statement = statement.where(criterion)
+
+  fx = get_fx_rates()
+  payers, pending = [], []
+  for _, rows in groupby(_stream(group, batch_size, statement), key = lambda row: row.id):
+    rows = list(rows)
+    first = rows[0]
+    payers.append(first.created_by)
+    pending.append((first.currency, first.date, first.total_amount, [(row.user_id, row.amount_owed) for row in rows]))
+    if len(pending) >= batch_size:
+      yield from _converted(fx, group, payers, pending)
+      payers, pending = [], []
+  yield from _converted(fx, group, payers, pending)
+
+def _involves(user_id):
+  """Expenses the user paid for or has a split in; all their splits still load, to convert them exactly."""
+  return or_(
+    Expense.created_by == user_id,
+    Expense.id.in_(select(ExpenseSplit.expense_id).where(ExpenseSplit.user_id == user_id))
+  )
+
+def _converted(fx, group, payers, expenses):
+  for payer_id, (total, splits) in zip(payers, fx.convert_expenses(expenses, group.base_currency)):
+    yield payer_id, total, splits
+
+def _stream(group, batch_size, statement):
+  """Yield a ledger query's rows as plain tuples, fetched batch_size at a time from a streaming cursor."""
+  result = db.session.execute(
+    statement.execution_options(yield_per = batch_size), bind_arguments = group_bind_arguments(group.id)
+  )
+  for batch in result.partitions():
+    yield from batch
+
+def get_user_net_balance(group, user_id):
+  """
+  Return one user's net balance in a group.
+
+  Same figure and sign as calculate_group_balances(group)[user_id], but read
+  with indexed aggregates (what they paid, what they owe, confirmed
+  settlements sent and received, and the opening balances carried forward
+  from archived history) instead of walking the group's ledger.
+
+  Args:
+      group (Group): The group to look in.
+      user_id (int): The user whose balance to return.
+
+  Returns:
+      Decimal: Positive if the user is owed money, negative if they owe money.
+  """
+  paid = (
+    select(func.coalesce(func.sum(Expense.total_amount), 0))
+    .where(Expense.group_id == group.id, _in_base_currency(group), Expense.created_by == user_id)
+    .scalar_subquery()
+  )
+  owed = (
+    select(func.coalesce(func.sum(ExpenseSplit.amount_owed), 0))
+    .join(Expense, ExpenseSplit.expense_id == Expense.id)
+    .where(ExpenseSplit.user_id == user_id, Expense.group_id == group.id, _in_base_currency(group))
+    .scalar_subquery()
+  )
+  sent = (
+    select(func.coalesce(func.sum(Settlement.amount), 0))
+    .where(Settlement.group_id == group.id, Settlement.from_user_id == user_id, Settlement.status == "confirmed")
+    .scalar_subquery()
+  )
+  received = (
+    select(func.coalesce(func.sum(Settlement.amount), 0))
+    .where(Settlement.group_id == group.id, Settlement.to_user_id == user_id, Settlement.status == "confirmed")
+    .scalar_subquery()
+  )
+
+  carried_in = (
+    select(func.coalesce(func.sum(OpeningBalance.amount), 0))
+    .where(OpeningBalance.group_id == group.id, OpeningBalance.creditor_id == user_id)
+    .scalar_subquery()
+  )
+  carried_out = (
+    select(func.coalesce(func.sum(OpeningBalance.amount), 0))
+    .where(OpeningBalance.group_id == group.id, OpeningBalance.debtor_id == user_id)
+    .scalar_subquery()
+  )
+
+  # One round trip; the subqueries carry the group criterion, so pin the shard
+  paid, owed, sent, received, carried_in, carried_out = db.session.execute(
+    select(paid, owed, sent, received, carried_in, carried_out), bind_arguments = group_bind_arguments(group.id)
+  ).one()
+
+  net = paid - owed + sent - received + carried_in - carried_out
+
+  # Expenses in other currencies the user paid for or has a split in
+  for payer_id, total, splits in stream_converted_expenses(group, criterion = _involves(user_id)):
+    if payer_id == user_id:
+      net += total
+    net -= sum((amount for debtor_id, amount in splits if debtor_id == user_id), Decimal("0.00"))
+
+  return net
+
+
+def get_user_pair_balances(group, user_id):
+  """
+  Return the user's net position against each other member they share
+  expenses or settlements with.
+
+  Args:
+      group (Group): The group to look in.
+      user_id (int): The user whose balances to return.
+
+  Returns:
+      dict: {other_user_id: Decimal(amount)}, positive if the other user owes
+      this user, negative if this user owes them. Settled pairs are omitted.
+      The values sum to get_user_net_balance(group, user_id).
+  """
+  owes, owed_by = _user_debts(group, user_id)
+
+  pairs = defaultdict(lambda: Decimal("0.00"))
+  for creditor, amount in owes.items():
+    pairs[creditor] -= amount
+  for debtor, amount in owed_by.items():
+    pairs[debtor] += amount
+
+  return {other: amount for other, amount in pairs.items() if amount != Decimal("0.00")}
+
+
 def get_user_obligations(group, user_id):
+  """
+  Return who the user owes and who owes the user within a group.
 
-  all_obligations = get_group_obligations(group)
-  owes = all_obligations.get(user_id, {})
+  Equivalent to slicing get_group_obligations(group), but only reads the
+  splits where the user is the debtor or the payer and the confirmed
+  settlements the user is a party to, so the cost follows the user's own
+  activity rather than the size of the group.
 
-  owed_by = {}
+  Args:
+      group (Group): The group to look in.
+      user_id (int): The user whose obligations to return.
 
-  for debtor, creditors in all_obligations.items():
-    if user_id in creditors:
-      owed_by[debtor] = creditors[user_id]
-  
-  return{
-    "owes": owes,
-    "owed_by": owed_by
+  Returns:
+      dict: {
+          "owes": {creditor_id: Decimal(amount)},
+          "owed_by": {debtor_id: Decimal(amount)}
+      }
+  """
+  owes, owed_by = _user_debts(group, user_id)
+
+  # Same clean-up as get_group_obligations: settled or overpaid pairs drop out
+  return {
+    "owes": {creditor: amount for creditor, amount in owes.items() if amount > Decimal("0.00")},
+    "owed_by": {debtor: amount for debtor, amount in owed_by.items() if amount > Decimal("0.00")}
   }
 
+
+def _user_debts(group, user_id):
+  """Per-counterparty (owes, owed_by) for a user, net of confirmed settlements and not clamped at zero."""
+  # What the user owes each payer (splits of other people's expenses)
+  owes = dict(db.session.execute(
+    select(Expense.created_by, func.sum(ExpenseSplit.amount_owed))
+    .join(ExpenseSplit, ExpenseSplit.expense_id == Expense.id)
+    .where(
+      Expense.group_id == group.id,
+      _in_base_currency(group),
+      ExpenseSplit.user_id == user_id,
+      Expense.created_by != user_id
+    )
+    .group_by(Expense.created_by)
+  ).all())
+
+  # What each debtor owes the user (splits of the user's own expenses)
+  owed_by = dict(db.session.execute(
+    select(ExpenseSplit.user_id, func.sum(ExpenseSplit.amount_owed))
+    .join(Expense, ExpenseSplit.expense_id == Expense.id)
+    .where(
+      Expense.group_id == group.id,
+      _in_base_currency(group),
+      Expense.created_by == user_id,
+      ExpenseSplit.user_id != user_id
+    )
+    .group_by(ExpenseSplit.user_id)
+  ).all())
+
+  # Converted expenses in other currencies the user is part of
+  for payer_id, _, splits in stream_converted_expenses(group, criterion = _involves(user_id)):
+    for debtor_id, amount in splits:
+      if debtor_id == payer_id:
+        continue
+      if debtor_id == user_id:
+        owes[payer_id] = owes.get(payer_id, Decimal("0.00")) + amount
+      elif payer_id == user_id:
+        owed_by[debtor_id] = owed_by.get(debtor_id, Decimal("0.00")) + amount
+
+  # Confirmed settlements the user sent or received reduce those debts
+  settlements = db.session.execute(
+    select(Settlement.from_user_id, Settlement.to_user_id, func.sum(Settlement.amount))
+    .where(
+      Settlement.group_id == group.id,
+      Settlement.status == "confirmed",
+      or_(Settlement.from_user_id == user_id, Settlement.to_user_id == user_id)
+    )
+    .group_by(Settlement.from_user_id, Settlement.to_user_id)
+  ).all()
+
+  for from_user_id, to_user_id, amount in settlements:
+    if from_user_id == user_id:
+      owes[to_user_id] = owes.get(to_user_id, Decimal("0.00")) - amount
+    else:
+      owed_by[from_user_id] = owed_by.get(from_user_id, Decimal("0.00")) - amount
+
+  # Plus what the archived history carried forward between the user and others
+  carried = db.session.execute(
+    select(OpeningBalance.debtor_id, OpeningBalance.creditor_id, OpeningBalance.amount)
+    .where(
+      OpeningBalance.group_id == group.id,
+      or_(OpeningBalance.debtor_id == user_id, OpeningBalance.creditor_id == user_id)
+    )
+  ).all()
+
+  for debtor_id, creditor_id, amount in carried:
+    if debtor_id == user_id:
+      owes[creditor_id] = owes.get(creditor_id, Decimal("0.00")) + amount
+    else:
+      owed_by[debtor_id] = owed_by.get(debtor_id, Decimal("0.00")) + amount
+
+  return owes, owed_by
+
+
+def _opening_balances(group):
+  """(debtor_id, creditor_id, amount) carried forward from the group's archived history."""
+  return db.session.execute(
+    select(OpeningBalance.debtor_id, OpeningBalance.creditor_id, OpeningBalance.amount)
+    .where(OpeningBalance.group_id == group.id)
+  ).all()
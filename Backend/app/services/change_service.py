@@ -0,0 +1,162 @@
+from sqlalchemy import select, insert, func
+
+from app.archive import ARCHIVED
+from app.events import queue_group_event
+from app.extensions import db
+from app.models import Expense, ExpenseSplit, Settlement, Membership, GroupChange
+from app.read_models import ExpenseView, SplitView, SettlementView, MembershipView, fetch_views, view_columns
+from app.sharding import group_bind_arguments
+
+# Most changes returned by one sync call; the client asks again while has_more is set
+CHANGES_PAGE_SIZE = 500
+
+# Entity -> (response key, view, model)
+SYNCED_ENTITIES = {
+  "expense": ("expenses", ExpenseView, Expense),
+  "settlement": ("settlements", SettlementView, Settlement),
+  "membership": ("memberships", MembershipView, Membership),
+}
+
+
+def record_change(group_id, entity, entity_id, op):
+  """
+  Append an entry to a group's change log. It is written in the caller's
+  transaction, so the change and the log entry are committed together, and
+  the group's subscribers are pushed an event once that commit happens.
+
+  Args:
+      group_id (int): The group the changed row belongs to.
+      entity (str): "expense", "settlement", "membership", or "group" for a resync marker.
+      entity_id (int): Id of the changed row (must already be flushed).
+      op (str): "insert", "update", "delete" or "resync".
+
+  Returns:
+      GroupChange: The pending change log entry.
+  """
+  # Numbered per group; the unique (group_id, seq) index rejects a concurrent duplicate
+  last_seq = db.session.scalar(
+    select(func.max(GroupChange.seq)).where(GroupChange.group_id == group_id)
+  )
+  change = GroupChange(group_id = group_id, seq = (last_seq or 0) + 1, entity = entity, entity_id = entity_id, op = op)
+  db.session.add(change)
+  queue_group_event(db.session(), group_id, entity, change.seq)
+  return change
+
+
+def record_changes(group_id, entity, entity_ids, op):
+  """
+  record_change for many rows of one group at once: one sequence lookup and
+  one bulk insert, for bulk jobs that touch thousands of rows.
+
+  Returns:
+      int: The group's last change sequence number after this.
+  """
+  last_seq = db.session.scalar(
+    select(func.max(GroupChange.seq)).where(GroupChange.group_id == group_id)
+  ) or 0
+  db.session.execute(insert(GroupChange.__table__), [
+    {"group_id": group_id, "seq": last_seq + i, "entity": entity, "entity_id": entity_id, "op": op}
+    for i, entity_id in enumerate(entity_ids, start = 1)
+  ], bind_arguments = group_bind_arguments(group_id))
+  last_seq += len(entity_ids)
+  queue_group_event(db.session(), group_id, entity, last_seq)
+  return last_seq
+
+
+def get_group_changes(group, since = 0, limit = CHANGES_PAGE_SIZE):
+  """
+  What changed in a group after a sync cursor.
+
+  Several changes to one row collapse into one entry: a row inserted and
+  deleted after the cursor is left out, a row inserted and then updated is
+  an insert. Inserted and updated rows are returned as they are now; deleted
+  rows only by id.
+
+  Args:
+      group (Group): The group to sync.
+      since (int): The cursor from the client's last sync; 0 for everything.
+      limit (int): Most change log entries to read in this call.
+
+  Returns:
+      dict: {
+          "cursor": int (pass back as `since`),
+          "has_more": bool,
+          "resync": bool (the client must refetch everything, e.g. after the group moved shard),
+          "expenses" / "settlements" / "memberships": {"inserted": [...], "updated": [...], "deleted": [ids]}
+      }
+  """
+  if since < 0:
+    raise ValueError("Cursor cannot be negative.")
+
+  bind_arguments = group_bind_arguments(group.id)
+  changes = db.session.execute(
+    select(GroupChange.seq, GroupChange.entity, GroupChange.entity_id, GroupChange.op)
+    .where(GroupChange.group_id == group.id, GroupChange.seq > since)
+    .order_by(GroupChange.seq)
+    .limit(limit + 1),
+    bind_arguments = bind_arguments
+  ).all()
+  has_more = len(changes) > limit
+  changes = changes[:limit]
+
+  cursor = changes[-1].seq if changes else since
+  result = {"cursor": cursor, "has_more": has_more, "resync": False}
+  for key, _, _ in SYNCED_ENTITIES.values():
+    result[key] = {"inserted": [], "updated": [], "deleted": []}
+
+  if any(change.op == "resync" for change in changes):
+    result["resync"] = True
+    return result
+
+  # (entity, id) -> [first op, last op], in log order
+  collapsed = {}
+  for change in changes:
+    ops = collapsed.setdefault((change.entity, change.entity_id), [change.op, change.op])
+    ops[1] = change.op
+
+  for entity, (key, view, model) in SYNCED_ENTITIES.items():
+    live = {}
+    for (changed_entity, entity_id), (first, last) in collapsed.items():
+      if changed_entity != entity:
+        continue
+      if last == "delete":
+        if first != "insert":
+          result[key]["deleted"].append(entity_id)
+      else:
+        live[entity_id] = "inserted" if first == "insert" else "updated"
+
+    if live:
+      rows = _current_rows(entity, view, model, group.id, list(live), bind_arguments)
+      for entity_id, kind in live.items():
+        if entity_id in rows:
+          result[key][kind].append(rows[entity_id])
+        elif kind == "updated":
+          # Deleted by a change beyond this page
+          result[key]["deleted"].append(entity_id)
+
+  return result
+
+
+def _current_rows(entity, view, model, group_id, ids, bind_arguments):
+  """Current state of some rows of a group, as views keyed by id (expenses with their splits)."""
+  rows = {}
+  # Rows missing from the hot table may have been archived since
+  for source in (model, ARCHIVED.get(model)):
+    missing = [entity_id for entity_id in ids if entity_id not in rows]
+    if source is None or not missing:
+      continue
+    rows.update((row.id, row) for row in fetch_views(
+      view, select(*view_columns(view, source)).where(source.group_id == group_id, source.id.in_(missing)), bind_arguments
+    ))
+
+  if entity == "expense" and rows:
+    splits = {}
+    for split_model in (ExpenseSplit, ARCHIVED[ExpenseSplit]):
+      for split in fetch_views(
+        SplitView,
+        select(*view_columns(SplitView, split_model)).where(split_model.expense_id.in_(list(rows))).order_by(split_model.id),
+        bind_arguments
+      ):
+        splits.setdefault(split.expense_id, []).append(split)
+    rows = {expense_id: expense._replace(splits = tuple(splits.get(expense_id, ()))) for expense_id, expense in rows.items()}
+  return rows
@@ -1,8 +1,17 @@
 from app.models import *
+from collections import defaultdict
 from decimal import Decimal 
+from sqlalchemy import select, delete
+from app.categories import get_categorizer
 from app.extensions import db
-
-def create_expense(group, creator_user, description, total_amount, splits, date):
+from app.fx import get_fx_rates, validate_currency
+from app.read_models import ExpenseView, SplitView, fetch_views, view_columns
+from app.transactions import commit, rollback, ConcurrentUpdateError
+from app.sharding import group_bind_arguments
+from app.services.split_service import calculate_splits
+from app.services.change_service import record_change
+
+def create_expense(group, creator_user, description, total_amount, splits, date, currency = None, category = None):
   """
   Create a new expense with its splits.
 
@@ -11,8 +20,12 @@ def create_expense(group, creator_user, description, total_amount, splits, date)
       creator_user (User): The user who created the expense.
       description (str): A description of the expense.
       total_amount (Decimal): The total amount of the expense.
-      splits (list of dict): A list of splits, where each split is a dict with 'user_id' and 'amount_owed'.
+      splits (list of dict | dict): A list of splits, where each split is a dict with 'user' and 'amount',
+        or a split spec (equal / percentage / shares / exact) that split_service turns into cent-exact splits.
       date (datetime): The date of the expense.
+      currency (str, optional): ISO 4217 code of total_amount and the splits. Defaults to the
+        group's base currency; any other currency needs an exchange rate on or before `date`.
+      category (str, optional): The expense's category. Defaults to the one its description matches (see app.categories).
 
   Returns:
       Expense: The created Expense object.
@@ -24,6 +37,16 @@ def create_expense(group, creator_user, description, total_amount, splits, date)
 
   if total_amount <= Decimal("0.00"):
     raise ValueError("Total amount must be greater than zero.")
+
+  currency = currency or group.base_currency
+  validate_currency(currency)
+  # Balances convert it to the base currency, so refuse what cannot be converted
+  if currency != group.base_currency:
+    get_fx_rates().rate(currency, group.base_currency, date)
+
+  # Resolve split specs into explicit per-user amounts
+  if isinstance(splits, dict):
+    splits = calculate_splits(total_amount, splits)
   
   # Validate creator belongs to the group
   creator = next(
@@ -36,7 +59,7 @@ def create_expense(group, creator_user, description, total_amount, splits, date)
   # Ensure all split users belong to the group
   validate_split_users(group, splits)
   # Ensure no duplicate split users
-  validate_no_duplicate_split_users(group, splits)
+  validate_no_duplicate_split_users(splits)
   # Ensure split amounts sum to total_amount
   validate_split_amounts(total_amount, splits)
   # Create the expense
@@ -45,6 +68,8 @@ def create_expense(group, creator_user, description, total_amount, splits, date)
     created_by = creator_user.id,
     description = description,
     total_amount = total_amount,
+    currency = currency,
+    category = category or get_categorizer().categorize(description),
     date = date
   )
   # Create ExpenseSplit entries for each split
@@ -58,7 +83,9 @@ def create_expense(group, creator_user, description, total_amount, splits, date)
 
   # Commit to database and return the created expense
   db.session.add(new_expense)
-  db.session.commit()
+  db.session.flush()
+  record_change(group.id, "expense", new_expense.id, "insert")
+  commit()
 
   return new_expense
 
@@ -73,6 +100,9 @@ def delete_expense(group, expense, requesting_user):
 
   Returns:
       bool: True if deletion was successful, False otherwise.
+
+  Raises:
+      ConcurrentUpdateError: The expense was changed or deleted since it was loaded.
   """
 
   # Check requesting user is a member of the group
@@ -87,45 +117,101 @@ def delete_expense(group, expense, requesting_user):
   if requestor.role != "admin":
     raise ValueError("Only admins can delete expenses.")
 
-  # Check if the expense exists
-  expense_to_remove = next(
-    (e for e in group.expenses if e.id == expense.id),
-    None
-  )
-  if not expense_to_remove:
+  # Check the expense belongs to the group (without loading all of its expenses)
+  if expense.group_id != group.id:
     raise ValueError("Expense does not exist in the group.")
 
-  # If checks pass, delete the expense and its splits (cascade should handle this)
-  db.session.delete(expense_to_remove)
+  # If checks pass, delete the splits, any subscription link and the expense
+  # with set-based deletes instead of loading the splits to cascade through
+  bind_arguments = group_bind_arguments(group.id)
+  for model in (ExpenseSplit, GeneratedExpense):
+    db.session.execute(delete(model).where(model.expense_id == expense.id), bind_arguments = bind_arguments)
+  # Only the version that was read: an expense changed or deleted meanwhile is left alone
+  deleted = db.session.execute(
+    delete(Expense).where(Expense.id == expense.id, Expense.version == expense.version), bind_arguments = bind_arguments
+  )
+  if deleted.rowcount != 1:
+    rollback()
+    raise ConcurrentUpdateError("Expense was changed by another request; reload it and try again.")
+  record_change(group.id, "expense", expense.id, "delete")
   # Commit to database and return True if successful
-  db.session.commit()
+  commit()
   return True
 
-def get_group_expenses(group):
+def get_group_expenses(group, with_splits = False, include_archived = False):
   """
   Retrieve all expenses for a given group.
 
   Args:
       group (Group): The group for which to retrieve expenses.
+      with_splits (bool): Also load each expense's splits (one extra query for the group).
+      include_archived (bool): Also return expenses moved to the archive.
   Returns:
-      list of Expense: A list of Expense objects belonging to the group.
+      list of ExpenseView: The group's expenses in the order they were added.
   """
-  # Return the list of expenses for the group (group.expenses should work due to relationship)
-  return group.expenses
+  sources = [(Expense, ExpenseSplit)]
+  if include_archived:
+    sources.append((ArchivedExpense, ArchivedExpenseSplit))
+
+  # Column-only select into read models; nothing enters the identity map
+  bind_arguments = group_bind_arguments(group.id)
+  expenses = []
+  for expense_model, _ in sources:
+    expenses += fetch_views(
+      ExpenseView,
+      select(*view_columns(ExpenseView, expense_model)).where(expense_model.group_id == group.id).order_by(expense_model.id),
+      bind_arguments
+    )
+  if include_archived:
+    # Ids are never reused, so id order is still the order they were added
+    expenses.sort(key = lambda expense: expense.id)
+  if not with_splits:
+    return expenses
+
+  splits = defaultdict(list)
+  for expense_model, split_model in sources:
+    for split in fetch_views(
+      SplitView,
+      select(*view_columns(SplitView, split_model))
+      .join(expense_model, split_model.expense_id == expense_model.id)
+      .where(expense_model.group_id == group.id)
+      .order_by(split_model.id),
+      bind_arguments
+    ):
+      splits[split.expense_id].append(split)
+
+  return [expense._replace(splits = tuple(splits[expense.id])) for expense in expenses]
 
 def get_expense_details(expense):
   """
   Retrieve details of a specific expense, including its splits.
 
+  Archived expenses are found too.
+
   Args:
-      expense (Expense): The expense for which to retrieve details.
+      expense (Expense or ExpenseView): The expense for which to retrieve details.
   Returns:
-      Expense: The Expense object with its splits loaded.
+      ExpenseView: The expense with its splits loaded.
   """
   if not expense:
     raise ValueError("Expense not found.")
 
-  return expense  # Due to relationships, expense.splits will be available when accessed
+  bind_arguments = group_bind_arguments(expense.group_id)
+  for expense_model, split_model in ((Expense, ExpenseSplit), (ArchivedExpense, ArchivedExpenseSplit)):
+    details = fetch_views(
+      ExpenseView, select(*view_columns(ExpenseView, expense_model)).where(expense_model.id == expense.id), bind_arguments
+    )
+    if details:
+      break
+  else:
+    raise ValueError("Expense not found.")
+
+  splits = fetch_views(
+    SplitView,
+    select(*view_columns(SplitView, split_model)).where(split_model.expense_id == expense.id).order_by(split_model.id),
+    bind_arguments
+  )
+  return details[0]._replace(splits = tuple(splits))
 
 # Validation helpers (can be used inside the above functions)
 
@@ -181,12 +267,12 @@ def validate_split_amounts(total_amount, splits):
   Raises:
       ValueError: If the sum of split amounts does not equal the total amount.
   """
-    split_total = sum(
-      Decimal(split["amount"]) for split in splits 
-      )
+  split_total = sum(
+    Decimal(split["amount"]) for split in splits 
+    )
 
-    if split_total != total_amount:
-      raise ValueError(f"The sum of split amounts ({split_total}) does not equal the total amount ({total_amount}).")
+  if split_total != total_amount:
+    raise ValueError(f"The sum of split amounts ({split_total}) does not equal the total amount ({total_amount}).")
 
   return True
 
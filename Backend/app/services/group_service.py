@@ -1,19 +1,45 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import select, insert, delete, func, case, and_, or_
+
+from app.events import queue_follow
 from app.extensions import db
-from app.models.group import Group, Membership
+from app.models import (
+  Group, Membership, Expense, ExpenseSplit, GeneratedExpense, Settlement, GroupChange,
+  ArchivedExpense, ArchivedExpenseSplit, ArchivedSettlement, BalanceCheckpoint, OpeningBalance
+)
+from app.read_models import GroupView, MembershipView, fetch_views, view_columns
+from app.fx import DEFAULT_CURRENCY, validate_currency
+from app.services.balance_service import get_user_net_balance, get_user_pair_balances, stream_converted_expenses
+from app.services.change_service import record_change
+from app.sharding import assign_group_shard, release_group_shard, group_bind_arguments
+from app.transactions import commit
 
+# Rows removed per DELETE when deleting a group. Each chunk is its own
+# transaction (unless inside billnest_transaction()), so other writers get
+# the database between chunks.
+DELETE_CHUNK_SIZE = 5000
 
 
-def create_group(name, creator_user):
+def create_group(name, creator_user, base_currency = DEFAULT_CURRENCY):
   # check name field is not empty
   if not name:
     raise ValueError("Group name cannot be empty")
+  # balances and settlements are kept in this currency
+  validate_currency(base_currency)
   # create group and add creator as admin member
-  new_group = Group(name = name, created_by = creator_user.id)
+  new_group = Group(name = name, created_by = creator_user.id, base_currency = base_currency)
+  # Reserve a globally unique id and home shard (no-op when unsharded)
+  assign_group_shard(new_group)
   new_membership = Membership(user_id = creator_user.id, role = "admin")
   # Add the new membership to the group's memberships relationship
   new_group.memberships.append(new_membership)
   db.session.add(new_group)
-  db.session.commit()
+  db.session.flush()
+  record_change(new_group.id, "membership", new_membership.id, "insert")
+  queue_follow(db.session(), creator_user.id, new_group.id)
+  commit()
   return new_group
 
 def add_user_to_group(group, user, role = "member"):
@@ -27,60 +53,337 @@ def add_user_to_group(group, user, role = "member"):
       raise ValueError("User is already a member of the group")
 
   # add user to group with specified role
-    new_membership = Membership(user_id = user.id, role = role)
-    group.memberships.append(new_membership)
-    db.session.commit()
+  new_membership = Membership(user_id = user.id, role = role)
+  group.memberships.append(new_membership)
+  db.session.flush()
+  record_change(group.id, "membership", new_membership.id, "insert")
+  queue_follow(db.session(), user.id, group.id)
+  commit()
   return new_membership
   
 
-def remove_user_from_group(group, user):
+def remove_user_from_group(group, user, force = False):
   # find the membership for the user in the group
-  membership = next(
-    (m for m in group.memberships if m.user_id == user.id), 
-    None
-  )
-  
+  membership = _get_membership(group, user)
+
   # check if the user is a member of the group
   if not membership:
     raise ValueError("User is not a member of the group")
 
   # check if the user is an admin and if there are other admins in the group
-  if membership.role == "admin":
-    admins = [m for m in group.memberships if role =="admin"]
-    if len(admins) == 1:
-      raise ValueError("Cannot remove the last admin from the group")
+  if membership.role == "admin" and _count_admins(group) == 1:
+    raise ValueError("Cannot remove the last admin from the group")
+
+  # a member can only leave once they are square with the group; this reads
+  # just their own rows instead of computing every member's balance
+  if get_user_net_balance(group, user.id) != Decimal("0.00"):
+    if not force:
+      raise ValueError("User still has an outstanding balance in the group")
+    # force: record a confirmed transfer for each pair they are not square with
+    _settle_user_pairs(group, user)
 
-  # remove the membership
+  # remove the membership; flushed first, like every other write, so this
+  # transaction holds the write lock before record_change reads the last seq
+  membership_id = membership.id
   db.session.delete(membership)
-  db.session.commit()
+  db.session.flush()
+  record_change(group.id, "membership", membership_id, "delete")
+  queue_follow(db.session(), user.id, group.id, following = False)
+  commit()
+
+  return True
+
+def _settle_user_pairs(group, user):
+  # one confirmed settlement per counterpart, inserted in a single statement
+  # and committed together with the membership removal
+  rows = [
+    {
+      "group_id": group.id,
+      "from_user_id": other_id if amount > 0 else user.id,
+      "to_user_id": user.id if amount > 0 else other_id,
+      "amount": abs(amount),
+      "status": "confirmed",
+      "created_at": datetime.utcnow(),
+    }
+    for other_id, amount in get_user_pair_balances(group, user.id).items()
+  ]
+  if rows:
+    # Core insert: the ORM bulk path cannot route through the sharded session
+    settlement_ids = db.session.scalars(
+      insert(Settlement.__table__).returning(Settlement.__table__.c.id), rows,
+      bind_arguments = group_bind_arguments(group.id)
+    ).all()
+    for settlement_id in settlement_ids:
+      record_change(group.id, "settlement", settlement_id, "insert")
+
+def _get_membership(group, user):
+  return db.session.scalar(
+    select(Membership).where(Membership.group_id == group.id, Membership.user_id == user.id)
+  )
+
+def is_group_member(group, user_id):
+  # one indexed lookup rather than walking group.memberships
+  return db.session.scalar(
+    select(Membership.id).where(Membership.group_id == group.id, Membership.user_id == user_id)
+  ) is not None
+
+def _count_admins(group):
+  return db.session.scalar(
+    select(func.count(Membership.id)).where(Membership.group_id == group.id, Membership.role == "admin")
+  )
+
+def delete_group(group, requesting_user, chunk_size = DELETE_CHUNK_SIZE):
+  # only admins can delete a group
+  membership = db.session.scalar(
+    select(Membership).where(Membership.group_id == group.id, Membership.user_id == requesting_user.id)
+  )
+  if not membership:
+    raise ValueError("User is not a member of the group")
+  if membership.role != "admin":
+    raise ValueError("Only admins can delete a group")
+
+  group_id = group.id
+  bind_arguments = group_bind_arguments(group_id)
+
+  # Set-based deletes in bounded chunks, rather than db.session.delete(group)
+  # loading every row to cascade through. ON DELETE CASCADE covers ad-hoc
+  # deletes, but shards don't enforce foreign keys, so the children are
+  # removed explicitly here. Each chunk of expenses goes together with its
+  # splits, so a run that stops part way never leaves an expense without
+  # them; memberships go last, with the group row, so the admin can run it
+  # again to finish.
+  _delete_expenses_in_chunks(Expense, [ExpenseSplit, GeneratedExpense], group_id, bind_arguments, chunk_size)
+  _delete_expenses_in_chunks(ArchivedExpense, [ArchivedExpenseSplit], group_id, bind_arguments, chunk_size)
+  for model in (Settlement, ArchivedSettlement, OpeningBalance, GroupChange):
+    _delete_in_chunks(model, model.group_id == group_id, bind_arguments, chunk_size)
+
+  # One last transaction for whatever was written while the chunks ran, and the group itself
+  _delete_expenses(Expense, [ExpenseSplit, GeneratedExpense], select(Expense.id).where(Expense.group_id == group_id), bind_arguments)
+  for model in (Settlement, GroupChange, BalanceCheckpoint, Membership):
+    db.session.execute(delete(model).where(model.group_id == group_id), bind_arguments = bind_arguments)
+  db.session.execute(delete(Group).where(Group.id == group_id), bind_arguments = bind_arguments)
+  release_group_shard(group_id)
+  commit()
 
   return True
 
+def _delete_in_chunks(model, criterion, bind_arguments, chunk_size):
+  # Delete the rows matching criterion, chunk_size at a time, committing after
+  # each chunk so no single transaction holds the writer lock for long
+  while True:
+    ids = db.session.scalars(
+      select(model.id).where(criterion).limit(chunk_size), bind_arguments = bind_arguments
+    ).all()
+    if not ids:
+      return
+    db.session.execute(delete(model).where(model.id.in_(ids)), bind_arguments = bind_arguments)
+    commit()
+
+def _delete_expenses_in_chunks(expense_model, child_models, group_id, bind_arguments, chunk_size):
+  # A group's expenses, chunk_size at a time, each chunk in one transaction with its child rows
+  while True:
+    ids = db.session.scalars(
+      select(expense_model.id).where(expense_model.group_id == group_id).limit(chunk_size), bind_arguments = bind_arguments
+    ).all()
+    if not ids:
+      return
+    _delete_expenses(expense_model, child_models, ids, bind_arguments)
+    commit()
+
+def _delete_expenses(expense_model, child_models, ids, bind_arguments):
+  for model in child_models:
+    db.session.execute(delete(model).where(model.expense_id.in_(ids)), bind_arguments = bind_arguments)
+  db.session.execute(delete(expense_model).where(expense_model.id.in_(ids)), bind_arguments = bind_arguments)
+
 def change_member_role(group, user, new_role):
   # check if new role is valid
   if new_role not in ["member", "admin"]:
     raise ValueError("Invalid role. Must be 'member' or 'admin'")
 
-  membership = next(
-    (m for m in group.memberships if m.user_id == user.id),
-    None
-  )
+  membership = _get_membership(group, user)
   # check if user is a member of the group
-  if not in membership:
-      raise ValueError("User is not a member of the group")
+  if not membership:
+    raise ValueError("User is not a member of the group")
 
   # check if demoting an admin and if there are other admins in the group
-  if membership.role =="admin" and new_role !="admin":
-      admins = [m for m in group.memberships if m.role =="admin"]
-    if len(admins) == 1:
-      raise ValueError("Cannot demote the last admin in the group")
+  if membership.role =="admin" and new_role !="admin" and _count_admins(group) == 1:
+    raise ValueError("Cannot demote the last admin in the group")
 
   # update the role
   membership.role = new_role
-  db.session.commit()
+  record_change(group.id, "membership", membership.id, "update")
+  commit()
 
   return membership
 
 def get_user_groups(user):
-  return [membership.group for membership in user.memberships]
+  # Join through memberships in one column-only query; GroupViews skip the
+  # identity map. The query fans out to every shard, so order in Python
+  groups = fetch_views(
+    GroupView,
+    select(*view_columns(GroupView, Group)).join(Membership, Membership.group_id == Group.id).where(Membership.user_id == user.id)
+  )
+  return sorted(groups, key = lambda g: g.id)
+
+
+def get_group_members(group):
+  # Membership rows of one group, oldest member first
+  return fetch_views(
+    MembershipView,
+    select(*view_columns(MembershipView, Membership)).where(Membership.group_id == group.id).order_by(Membership.id),
+    group_bind_arguments(group.id)
+  )
+
+
+def get_user_dashboard(user):
+  # One aggregate query for every group the user is in, instead of a ledger
+  # walk per group. Each derived table is filtered to the user's own rows (or
+  # the user's groups) and grouped by group_id, then outer-joined onto the
+  # user's memberships.
+  user_group_ids = select(Membership.group_id).where(Membership.user_id == user.id)
+  # Expenses in another currency are summed apart and converted below
+  in_base_currency = Expense.currency == Group.base_currency
+
+  # Money the user fronted / owes / settled in each group
+  paid = (
+    select(Expense.group_id, func.sum(Expense.total_amount).label("amount"))
+    .join(Group, Group.id == Expense.group_id)
+    .where(Expense.created_by == user.id, in_base_currency)
+    .group_by(Expense.group_id)
+    .subquery()
+  )
+  owed = (
+    select(Expense.group_id, func.sum(ExpenseSplit.amount_owed).label("amount"))
+    .select_from(ExpenseSplit)
+    .join(Expense, ExpenseSplit.expense_id == Expense.id)
+    .join(Group, Group.id == Expense.group_id)
+    .where(ExpenseSplit.user_id == user.id, in_base_currency)
+    .group_by(Expense.group_id)
+    .subquery()
+  )
+  involves_user = or_(Settlement.from_user_id == user.id, Settlement.to_user_id == user.id)
+  settled = (
+    select(
+      Settlement.group_id,
+      func.sum(case((Settlement.from_user_id == user.id, Settlement.amount), else_ = -Settlement.amount)).label("amount")
+    )
+    .where(Settlement.status == "confirmed", involves_user)
+    .group_by(Settlement.group_id)
+    .subquery()
+  )
+  # Net position carried forward from archived history
+  carried = (
+    select(
+      OpeningBalance.group_id,
+      func.sum(case((OpeningBalance.creditor_id == user.id, OpeningBalance.amount), else_ = -OpeningBalance.amount)).label("amount")
+    )
+    .where(or_(OpeningBalance.creditor_id == user.id, OpeningBalance.debtor_id == user.id))
+    .group_by(OpeningBalance.group_id)
+    .subquery()
+  )
+  pending = (
+    select(
+      Settlement.group_id,
+      func.sum(case((Settlement.to_user_id == user.id, 1), else_ = 0)).label("to_confirm"),
+      func.sum(case((Settlement.from_user_id == user.id, 1), else_ = 0)).label("awaiting_confirmation")
+    )
+    .where(Settlement.status == "pending", involves_user)
+    .group_by(Settlement.group_id)
+    .subquery()
+  )
+
+  # Group-wide summary figures
+  expense_stats = (
+    select(
+      Expense.group_id,
+      func.count(Expense.id).label("expense_count"),
+      func.sum(case((in_base_currency, Expense.total_amount), else_ = 0)).label("total_spent"),
+      func.sum(case((in_base_currency, 0), else_ = 1)).label("foreign_expense_count"),
+      func.max(Expense.created_at).label("last_expense_at")
+    )
+    .join(Group, Group.id == Expense.group_id)
+    .where(Expense.group_id.in_(user_group_ids))
+    .group_by(Expense.group_id)
+    .subquery()
+  )
+  settlement_stats = (
+    select(Settlement.group_id, func.max(Settlement.created_at).label("last_settlement_at"))
+    .where(Settlement.group_id.in_(user_group_ids))
+    .group_by(Settlement.group_id)
+    .subquery()
+  )
+  member_stats = (
+    select(Membership.group_id, func.count(Membership.id).label("member_count"))
+    .where(Membership.group_id.in_(user_group_ids))
+    .group_by(Membership.group_id)
+    .subquery()
+  )
+
+  rows = db.session.execute(
+    select(
+      Group.id, Group.name, Group.description, Group.created_at, Membership.role,
+      member_stats.c.member_count,
+      expense_stats.c.expense_count, expense_stats.c.total_spent, expense_stats.c.foreign_expense_count,
+      expense_stats.c.last_expense_at,
+      settlement_stats.c.last_settlement_at,
+      paid.c.amount.label("paid"), owed.c.amount.label("owed"), settled.c.amount.label("settled"),
+      carried.c.amount.label("carried"),
+      BalanceCheckpoint.expense_count.label("archived_expense_count"),
+      BalanceCheckpoint.total_spent.label("archived_total_spent"),
+      pending.c.to_confirm, pending.c.awaiting_confirmation
+    )
+    .join(Membership, and_(Membership.group_id == Group.id, Membership.user_id == user.id))
+    .outerjoin(member_stats, member_stats.c.group_id == Group.id)
+    .outerjoin(expense_stats, expense_stats.c.group_id == Group.id)
+    .outerjoin(settlement_stats, settlement_stats.c.group_id == Group.id)
+    .outerjoin(paid, paid.c.group_id == Group.id)
+    .outerjoin(owed, owed.c.group_id == Group.id)
+    .outerjoin(settled, settled.c.group_id == Group.id)
+    .outerjoin(carried, carried.c.group_id == Group.id)
+    .outerjoin(BalanceCheckpoint, BalanceCheckpoint.group_id == Group.id)
+    .outerjoin(pending, pending.c.group_id == Group.id)
+  ).all()
+
+  zero = Decimal("0.00")
+  dashboard = []
+  for row in rows:
+    # Same sign convention as calculate_group_balances: positive -> user is owed money
+    net_balance = (row.paid or zero) - (row.owed or zero) + (row.settled or zero) + (row.carried or zero)
+    total_spent = (row.total_spent or zero) + (row.archived_total_spent or zero)
+    if row.foreign_expense_count:
+      converted_spent, converted_net = _converted_figures(db.session.get(Group, row.id), user.id)
+      total_spent += converted_spent
+      net_balance += converted_net
+    activity = [t for t in (row.created_at, row.last_expense_at, row.last_settlement_at) if t is not None]
+
+    dashboard.append({
+      "group_id": row.id,
+      "name": row.name,
+      "description": row.description,
+      "role": row.role,
+      "member_count": row.member_count or 0,
+      # Archived expenses count through their checkpoint totals
+      "expense_count": (row.expense_count or 0) + (row.archived_expense_count or 0),
+      "total_spent": total_spent,
+      "net_balance": net_balance,
+      "pending_settlements": {
+        "to_confirm": row.to_confirm or 0,
+        "awaiting_confirmation": row.awaiting_confirmation or 0,
+      },
+      "last_activity_at": max(activity) if activity else None,
+    })
+
+  # Most recently active groups first
+  dashboard.sort(key = lambda g: g["last_activity_at"] or datetime.min, reverse = True)
+  return dashboard
 
+def _converted_figures(group, user_id):
+  # (total spent, user's net) of the group's expenses in other currencies,
+  # converted to its base currency; only multi-currency groups pay for this
+  total_spent = net_balance = Decimal("0.00")
+  for payer_id, total, splits in stream_converted_expenses(group):
+    total_spent += total
+    if payer_id == user_id:
+      net_balance += total
+    net_balance -= sum((amount for debtor_id, amount in splits if debtor_id == user_id), Decimal("0.00"))
+  return total_spent, net_balance
@@ -0,0 +1,105 @@
+import numpy as np
+
+from app.analytics import get_snapshot, to_day, day_to_period
+from app.services.split_service import from_cents
+
+
+def spend_per_user_per_month(group_ids = None, user_ids = None, date_from = None, date_to = None):
+  """
+  Total each user owed (their share of expenses) per month.
+
+  Args:
+      group_ids (iterable of int, optional): Only these groups.
+      user_ids (iterable of int, optional): Only these users.
+      date_from (date, optional): Only expenses dated on or after this.
+      date_to (date, optional): Only expenses dated before this.
+
+  Returns:
+      list of dict: {"user_id", "period" (YYYYMM), "amount" (Decimal)}, ordered by user then period.
+  """
+  columns, mask = _select(group_ids, user_ids, date_from, date_to)
+  users = columns["user_id"][mask]
+  periods = day_to_period(columns["day"][mask])
+
+  # Pack (user, YYYYMM) into one int64 so the group-by sorts a single key
+  keys, totals = _sum_by(users.astype(np.int64) * 1000000 + periods, columns["cents"][mask])
+  return [
+    {"user_id": key // 1000000, "period": key % 1000000, "amount": from_cents(cents)}
+    for key, cents in zip(keys.tolist(), totals.tolist())
+  ]
+
+
+def top_payers(group_ids = None, limit = 5, date_from = None, date_to = None):
+  """
+  The users who paid the most, by the total of the expenses they paid for.
+
+  Args:
+      group_ids (iterable of int, optional): Only these groups.
+      limit (int): How many payers to return.
+      date_from (date, optional): Only expenses dated on or after this.
+      date_to (date, optional): Only expenses dated before this.
+
+  Returns:
+      list of dict: {"user_id", "amount" (Decimal)}, largest first; ties by user id.
+  """
+  columns, mask = _select(group_ids, None, date_from, date_to)
+
+  # Splits of an expense sum to its total, so summing splits by payer gives the amount paid
+  keys, totals = _sum_by(columns["payer_id"][mask], columns["cents"][mask])
+  order = np.lexsort((keys, -totals))[:limit]
+  return [
+    {"user_id": user_id, "amount": from_cents(cents)}
+    for user_id, cents in zip(keys[order].tolist(), totals[order].tolist())
+  ]
+
+
+def subscription_share_of_spend(group_ids = None, date_from = None, date_to = None):
+  """
+  How much of the spend came from subscription-generated expenses.
+
+  Args:
+      group_ids (iterable of int, optional): Only these groups.
+      date_from (date, optional): Only expenses dated on or after this.
+      date_to (date, optional): Only expenses dated before this.
+
+  Returns:
+      dict: {"subscription": Decimal, "total": Decimal, "share": float between 0 and 1}
+  """
+  columns, mask = _select(group_ids, None, date_from, date_to)
+  cents = columns["cents"][mask]
+
+  total = int(cents.sum())
+  subscription = int(cents[columns["generated"][mask]].sum())
+  return {
+    "subscription": from_cents(subscription),
+    "total": from_cents(total),
+    "share": subscription / total if total else 0.0,
+  }
+
+
+def _select(group_ids, user_ids, date_from, date_to):
+  """The snapshot's columns and a boolean mask of the rows matching the filters."""
+  columns = get_snapshot().columns()
+  mask = np.ones(len(columns["split_id"]), dtype = bool)
+
+  if group_ids is not None:
+    mask &= np.isin(columns["group_id"], np.fromiter(group_ids, dtype = np.int64))
+  if user_ids is not None:
+    mask &= np.isin(columns["user_id"], np.fromiter(user_ids, dtype = np.int64))
+  if date_from is not None:
+    mask &= columns["day"] >= to_day(date_from)
+  if date_to is not None:
+    mask &= columns["day"] < to_day(date_to)
+
+  return columns, mask
+
+
+def _sum_by(keys, cents):
+  """Group-by-sum: the sorted unique keys and the int64 total of cents for each."""
+  if len(keys) == 0:
+    return np.empty(0, dtype = np.int64), np.empty(0, dtype = np.int64)
+
+  order = np.argsort(keys, kind = "stable")
+  keys, cents = keys[order], cents[order]
+  starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+  return keys[starts], np.add.reduceat(cents, starts)
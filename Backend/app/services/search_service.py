@@ -0,0 +1,144 @@
+import re
+from heapq import merge
+
+from sqlalchemy import text, bindparam, Integer, Numeric, DateTime, String, Float
+
+from app.extensions import db
+from app.models.expense_search import SEARCH_TABLE
+from app.sharding import get_router
+
+# Column weights for bm25: a hit in the description counts most
+DESCRIPTION_WEIGHT = 10.0
+GROUP_NAME_WEIGHT = 2.0
+PAYER_NAME_WEIGHT = 1.0
+
+MAX_PER_PAGE = 100
+
+USER_GROUPS_SQL = text("SELECT group_id FROM memberships WHERE user_id = :user_id")
+
+# The scope tokens in the MATCH expression already restrict results to the
+# caller's groups; the memberships check keeps results safe if the index lags.
+SEARCH_SQL = text(f"""
+  SELECT e.id, e.group_id, e.description, e.total_amount, e.date, e.created_by,
+         snippet({SEARCH_TABLE}, 0, '[', ']', '...', 12) AS highlight,
+         bm25({SEARCH_TABLE}, :description_weight, :group_weight, :payer_weight, 0.0) AS rank
+  FROM {SEARCH_TABLE}
+  JOIN expenses e ON e.id = {SEARCH_TABLE}.rowid
+  WHERE {SEARCH_TABLE} MATCH :match
+    AND e.group_id IN (SELECT group_id FROM memberships WHERE user_id = :user_id)
+    AND (:date_from IS NULL OR e.date >= :date_from)
+    AND (:date_to IS NULL OR e.date < :date_to)
+  ORDER BY rank, e.id
+  LIMIT :limit
+""").bindparams(
+  # Typed so dates are compared in the same format SQLAlchemy stores them
+  bindparam("date_from", type_ = DateTime),
+  bindparam("date_to", type_ = DateTime)
+).columns(
+  id = Integer, group_id = Integer, description = String, total_amount = Numeric(10, 2),
+  date = DateTime, created_by = Integer, highlight = String, rank = Float
+)
+
+
+def build_match_query(query, group_ids = None):
+  """
+  Turn free text into an FTS5 MATCH expression.
+
+  Each word becomes a quoted prefix term and terms are OR-ed, so
+  "that Airbnb from last summer" still finds "Airbnb Malta" and bm25 ranks
+  expenses matching more (and rarer) words first. Quoting means user input
+  can never be parsed as FTS5 syntax.
+
+  Args:
+      query (str): The text the user typed.
+      group_ids (iterable of int, optional): Restrict matches to these groups via
+          their scope tokens, so the index only ranks rows the caller can see.
+
+  Returns:
+      str: The MATCH expression, or None if the query has no searchable words.
+  """
+  words = re.findall(r"\w+", query or "")
+  if not words:
+    return None
+
+  match = " OR ".join(f'"{word}"*' for word in words)
+  if group_ids is not None:
+    match = f"({match}) AND scope:({' OR '.join(f'g{int(g)}' for g in group_ids)})"
+
+  return match
+
+
+def search_expenses(user, query, page = 1, per_page = 20, date_from = None, date_to = None):
+  """
+  Ranked full-text search over the expenses in the user's groups.
+
+  Searches expense descriptions plus group and payer names. With sharding on,
+  each shard is searched for the user's groups on it and the ranked results
+  are merged.
+
+  Args:
+      user (User): The user searching; only groups they belong to are searched.
+      query (str): Free text to search for.
+      page (int): 1-based page number.
+      per_page (int): Results per page (at most MAX_PER_PAGE).
+      date_from (datetime, optional): Only expenses dated on or after this.
+      date_to (datetime, optional): Only expenses dated before this.
+
+  Returns:
+      dict: {"items": [...], "page": int, "per_page": int, "has_next": bool}, where each
+      item has the expense fields plus a highlighted snippet and its rank (lower is better).
+  """
+  if page < 1:
+    raise ValueError("Page must be 1 or greater.")
+  if per_page < 1 or per_page > MAX_PER_PAGE:
+    raise ValueError(f"per_page must be between 1 and {MAX_PER_PAGE}.")
+
+  empty = {"items": [], "page": page, "per_page": per_page, "has_next": False}
+  if build_match_query(query) is None:
+    return empty
+
+  # Every shard has to return enough rows to fill this page after merging
+  offset = (page - 1) * per_page
+  params = {
+    "user_id": user.id,
+    "date_from": date_from,
+    "date_to": date_to,
+    "limit": offset + per_page + 1,
+    "description_weight": DESCRIPTION_WEIGHT,
+    "group_weight": GROUP_NAME_WEIGHT,
+    "payer_weight": PAYER_NAME_WEIGHT,
+  }
+
+  shard_results = []
+  for shard_id in get_router().shard_ids:
+    bind_arguments = {"shard_id": shard_id}
+    group_ids = db.session.scalars(USER_GROUPS_SQL, {"user_id": user.id}, bind_arguments = bind_arguments).all()
+    if group_ids:
+      shard_params = {**params, "match": build_match_query(query, group_ids)}
+      shard_results.append(db.session.execute(SEARCH_SQL, shard_params, bind_arguments = bind_arguments).all())
+
+  if not shard_results:
+    return empty
+
+  rows = list(merge(*shard_results, key = lambda row: (row.rank, row.id)))
+
+  items = [
+    {
+      "expense_id": row.id,
+      "group_id": row.group_id,
+      "description": row.description,
+      "total_amount": row.total_amount,
+      "date": row.date,
+      "created_by": row.created_by,
+      "highlight": row.highlight,
+      "rank": row.rank,
+    }
+    for row in rows[offset:offset + per_page]
+  ]
+
+  return {
+    "items": items,
+    "page": page,
+    "per_page": per_page,
+    "has_next": len(rows) > offset + per_page,
+  }
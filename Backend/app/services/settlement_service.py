@@ -1,5 +1,11 @@
-from app.models import Group, Expense, ExpenseSplit, Settlement
+from sqlalchemy import select, update
+
+from app.models import Group, Expense, ExpenseSplit, Settlement, ArchivedSettlement
 from app.extensions import db
+from app.read_models import SettlementView, fetch_views, view_columns
+from app.sharding import group_bind_arguments
+from app.transactions import commit, rollback, ConcurrentUpdateError
+from app.services.change_service import record_change
 from decimal import Decimal
 
 def create_settlement_request(group, from_user, to_user, amount):
@@ -48,11 +54,28 @@ def create_settlement_request(group, from_user, to_user, amount):
     status = "pending"
   )
   db.session.add(new_settlement)
-  db.session.commit()
+  db.session.flush()
+  record_change(group.id, "settlement", new_settlement.id, "insert")
+  commit()
 
   return new_settlement
 
 
+def get_group_settlement(group, settlement_id):
+  """
+  Find a settlement of a group by id, on the group's shard.
+
+  Args:
+      group (Group): The group the settlement belongs to.
+      settlement_id (int): The settlement's id; only unique within a shard.
+
+  Returns:
+      Settlement: The settlement, or None if the group has no such settlement.
+  """
+  return db.session.scalar(
+    select(Settlement).where(Settlement.group_id == group.id, Settlement.id == settlement_id)
+  )
+
 def confirm_settlement(settlement, confirming_user):
   """
   Confirm a settlement request, marking it as completed.
@@ -64,6 +87,9 @@ def confirm_settlement(settlement, confirming_user):
   
   Returns:
       Settlement: The updated Settlement object with status "confirmed".
+
+  Raises:
+      ConcurrentUpdateError: Another request confirmed or rejected it first.
   """
   # Validate the settlement exists and is pending
   if not settlement:
@@ -77,8 +103,7 @@ def confirm_settlement(settlement, confirming_user):
     raise ValueError("Only the user who is owed money can confirm the settlement request.")
   
   # Update the settlement status to confirmed
-  settlement.status = "confirmed"
-  db.session.commit()
+  _resolve_pending(settlement, "confirmed")
 
   return settlement
 
@@ -93,6 +118,9 @@ def reject_settlement(settlement, rejecting_user):
   
   Returns:
       Settlement: The updated Settlement object with status "rejected".
+
+  Raises:
+      ConcurrentUpdateError: Another request confirmed or rejected it first.
   """
   # Validate the settlement exists and is pending
   if not settlement:
@@ -106,22 +134,48 @@ def reject_settlement(settlement, rejecting_user):
     raise ValueError("Only the user who is owed money can reject the settlement request.")
 
   # Update the settlement status to rejected
-  settlement.status = "rejected"
-  db.session.commit()
+  _resolve_pending(settlement, "rejected")
 
   return settlement
 
-def get_group_settlements(group):
+def _resolve_pending(settlement, status):
+  # The status check above ran in Python against what was read; the UPDATE
+  # only applies if the row is still pending at that version, so of two
+  # requests racing to confirm/reject, exactly one changes it
+  result = db.session.execute(
+    update(Settlement)
+    .where(Settlement.id == settlement.id, Settlement.status == "pending", Settlement.version == settlement.version)
+    .values(status = status, version = Settlement.version + 1),
+    bind_arguments = group_bind_arguments(settlement.group_id)
+  )
+  if result.rowcount != 1:
+    rollback()
+    raise ConcurrentUpdateError("Settlement was changed by another request; reload it and try again.")
+  record_change(settlement.group_id, "settlement", settlement.id, "update")
+  commit()
+
+def get_group_settlements(group, include_archived = False):
   """
   Retrieve all settlements for a given group.
 
   Args:
       group (Group): The group for which to retrieve settlements.
+      include_archived (bool): Also return settlements moved to the archive.
 
   Returns:
-      list of Settlement: A list of Settlement objects associated with the group.
+      list of SettlementView: The group's settlements in the order they were requested.
   """
-  return group.settlements
+  models = [Settlement, ArchivedSettlement] if include_archived else [Settlement]
+  settlements = []
+  for model in models:
+    settlements += fetch_views(
+      SettlementView,
+      select(*view_columns(SettlementView, model)).where(model.group_id == group.id).order_by(model.id),
+      group_bind_arguments(group.id)
+    )
+  if include_archived:
+    settlements.sort(key = lambda settlement: settlement.id)
+  return settlements
 
 def get_user_unconfirmed_settlements(user):
   """
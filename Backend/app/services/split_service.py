@@ -0,0 +1,193 @@
+from decimal import Decimal
+
+import numpy as np
+
+CENT = Decimal("0.01")
+
+SPLIT_TYPES = ("equal", "percentage", "shares", "exact")
+
+
+def calculate_splits(total_amount, spec):
+  """
+  Turn a split spec into cent-exact splits that always sum to total_amount.
+
+  Supported specs:
+      {"type": "equal", "users": [1, 2, 3]}
+      {"type": "percentage", "shares": {1: "50", 2: "25.5", 3: "24.5"}}   # must sum to 100
+      {"type": "shares", "shares": {1: 2, 2: 1}}                          # relative weights
+      {"type": "exact", "amounts": {1: "10.00"}, "remainder": [2, 3]}     # rest split equally
+
+  Amounts are rounded down to the cent and the leftover cents go to the users
+  with the largest rounding remainders, ties going to the lowest user id, so
+  the same spec always gives the same result.
+
+  Args:
+      total_amount (Decimal): The total amount of the expense.
+      spec (dict): The split spec.
+
+  Returns:
+      list of dict: Splits as {"user": user_id, "amount": Decimal}, ordered by user id,
+      in the format accepted by create_expense.
+  """
+  total_cents = to_cents(total_amount)
+  if total_cents <= 0:
+    raise ValueError("Total amount must be greater than zero.")
+
+  user_ids, weights, fixed = _parse_spec(spec, total_cents)
+  cents = allocate_cents(
+    np.array([total_cents], dtype = np.int64),
+    weights[np.newaxis, :],
+    fixed[np.newaxis, :]
+  )[0]
+
+  return [
+    {"user": user_id, "amount": from_cents(amount)}
+    for user_id, amount in zip(user_ids, cents.tolist())
+  ]
+
+
+def allocate_cents(totals, weights, fixed = None):
+  """
+  Vectorised largest-remainder allocation for many expenses at once.
+
+  Each row is one expense and each column one user. A row's total (minus its
+  fixed amounts) is split in proportion to its integer weights; zero-weight
+  users get nothing. Everything is integer arithmetic, so rows always sum
+  exactly to their totals.
+
+  Args:
+      totals (ndarray): Shape (E,), total of each expense in cents.
+      weights (ndarray): Shape (E, U), non-negative integer weights.
+      fixed (ndarray, optional): Shape (E, U), cents assigned up front
+          (the "exact" part of an exact-plus-remainder split).
+
+  Returns:
+      ndarray: Shape (E, U) int64 cents per expense and user.
+  """
+  totals = np.asarray(totals, dtype = np.int64)
+  weights = np.asarray(weights, dtype = np.int64)
+  fixed = np.zeros_like(weights) if fixed is None else np.asarray(fixed, dtype = np.int64)
+
+  if weights.ndim != 2 or weights.shape != fixed.shape or totals.shape != (weights.shape[0],):
+    raise ValueError("totals must be (E,) and weights/fixed (E, U).")
+  if (weights < 0).any() or (fixed < 0).any():
+    raise ValueError("Weights and fixed amounts cannot be negative.")
+
+  remaining = totals - fixed.sum(axis = 1)
+  weight_totals = weights.sum(axis = 1)
+
+  if (remaining < 0).any():
+    raise ValueError("Fixed amounts exceed the expense total.")
+  if ((weight_totals == 0) & (remaining != 0)).any():
+    raise ValueError("Nothing left to split the remaining amount between.")
+
+  # Floor of each proportional share, and how far each one was rounded down
+  divisor = np.where(weight_totals == 0, 1, weight_totals)[:, np.newaxis]
+  numerators = remaining[:, np.newaxis] * weights
+  cents = numerators // divisor
+  remainders = numerators % divisor
+
+  # Hand the leftover cents to the largest remainders; the stable sort keeps
+  # column (user id) order on ties
+  leftover = remaining - cents.sum(axis = 1)
+  order = np.argsort(-remainders, axis = 1, kind = "stable")
+  extra = (np.arange(weights.shape[1])[np.newaxis, :] < leftover[:, np.newaxis]).astype(np.int64)
+  np.put_along_axis(cents, order, np.take_along_axis(cents, order, axis = 1) + extra, axis = 1)
+
+  return cents + fixed
+
+
+def build_split_rows(expense_ids, totals, user_ids, weights, fixed = None):
+  """
+  Compute splits for a batch of expenses and return rows ready for a bulk
+  insert into expense_splits, e.g. for imports and subscription billing.
+
+  Args:
+      expense_ids (sequence of int): Shape (E,), the expenses being split.
+      totals (sequence of Decimal): Shape (E,), expense totals.
+      user_ids (sequence of int): Shape (U,), the user for each weight column.
+      weights (ndarray): Shape (E, U), integer weights (0 = not in the split).
+      fixed (ndarray, optional): Shape (E, U), exact amounts in cents.
+
+  Returns:
+      list of dict: {"expense_id", "user_id", "amount_owed"} for every user with
+      a non-zero weight or fixed amount.
+  """
+  totals = np.array([to_cents(total) for total in totals], dtype = np.int64)
+  weights = np.asarray(weights, dtype = np.int64)
+  cents = allocate_cents(totals, weights, fixed)
+
+  involved = weights > 0
+  if fixed is not None:
+    involved |= np.asarray(fixed) > 0
+
+  rows, columns = np.nonzero(involved)
+  expense_ids = np.asarray(expense_ids)
+  user_ids = np.asarray(user_ids)
+
+  return [
+    {"expense_id": expense_id, "user_id": user_id, "amount_owed": from_cents(amount)}
+    for expense_id, user_id, amount in zip(
+      expense_ids[rows].tolist(), user_ids[columns].tolist(), cents[rows, columns].tolist()
+    )
+  ]
+
+
+def to_cents(amount):
+  """Convert a Decimal-compatible amount to integer cents, rejecting fractions of a cent."""
+  amount = Decimal(str(amount))
+  if amount != amount.quantize(CENT):
+    raise ValueError(f"Amount {amount} has more than two decimal places.")
+  return int(amount * 100)
+
+
+def from_cents(cents):
+  return (Decimal(cents) / 100).quantize(CENT)
+
+
+def _parse_spec(spec, total_cents):
+  """
+  Reduce a spec to (user_ids, integer weights, fixed cents), with users in
+  ascending id order so results don't depend on how the client ordered them.
+  """
+  split_type = spec.get("type")
+  if split_type not in SPLIT_TYPES:
+    raise ValueError(f"Invalid split type. Must be one of {', '.join(SPLIT_TYPES)}")
+
+  if split_type == "equal":
+    weights = {int(user_id): 1 for user_id in spec.get("users", [])}
+    fixed = {}
+
+  elif split_type in ("percentage", "shares"):
+    values = {int(user_id): Decimal(str(value)) for user_id, value in spec.get("shares", {}).items()}
+    if any(value <= 0 for value in values.values()):
+      raise ValueError("Split shares must be greater than zero.")
+    if split_type == "percentage" and sum(values.values()) != Decimal("100"):
+      raise ValueError(f"Percentages must sum to 100, got {sum(values.values())}.")
+    weights = _integer_weights(values)
+    fixed = {}
+
+  else:
+    fixed = {int(user_id): to_cents(amount) for user_id, amount in spec.get("amounts", {}).items()}
+    weights = {int(user_id): 1 for user_id in spec.get("remainder", [])}
+    if sum(fixed.values()) > total_cents:
+      raise ValueError("Exact amounts exceed the total amount.")
+    if sum(fixed.values()) != total_cents and not weights:
+      raise ValueError("Exact amounts do not cover the total and no remainder users were given.")
+
+  user_ids = sorted(set(weights) | set(fixed))
+  if not user_ids:
+    raise ValueError("A split needs at least one user.")
+
+  return (
+    user_ids,
+    np.array([weights.get(user_id, 0) for user_id in user_ids], dtype = np.int64),
+    np.array([fixed.get(user_id, 0) for user_id in user_ids], dtype = np.int64),
+  )
+
+
+def _integer_weights(values):
+  """Scale Decimal weights (e.g. 33.33 percent) to integers without changing their ratios."""
+  places = max(-value.as_tuple().exponent for value in values.values()) if values else 0
+  scale = Decimal(10) ** max(places, 0)
+  return {user_id: int(value * scale) for user_id, value in values.items()}
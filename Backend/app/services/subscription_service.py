@@ -0,0 +1,290 @@
+from calendar import monthrange
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import select, update, func
+
+from app.extensions import db
+from app.models import Subscription, GeneratedExpense, Group, Membership, Expense, ExpenseSplit
+from app.billing_scheduler import notify_subscription_changed
+from app.categories import get_categorizer
+from app.services.split_service import calculate_splits
+from app.services.change_service import record_change
+from app.transactions import commit, rollback
+
+BILLING_CYCLES = ("monthly", "yearly")
+OWNER_TYPES = ("user", "group")
+
+
+def create_subscription(creator_user, name, amount, next_billing_date, billing_cycle = "monthly",
+                        owner_type = "user", owner_id = None):
+  """
+  Create a recurring subscription and put it on the billing schedule.
+
+  Group subscriptions generate an expense, split equally between the group's
+  members and paid by the creator, every time they are billed. User
+  subscriptions only track their next billing date.
+
+  Args:
+      creator_user (User): The user creating (and paying for) the subscription.
+      name (str): What the subscription is for; used as the expense description.
+      amount (Decimal): The amount billed each cycle.
+      next_billing_date (date): When it is first billed.
+      billing_cycle (str): "monthly" or "yearly".
+      owner_type (str): "user" or "group".
+      owner_id (int, optional): The owning group's id; defaults to the creator for user subscriptions.
+
+  Returns:
+      Subscription: The created Subscription object.
+  """
+  if not name or not name.strip():
+    raise ValueError("Subscription name cannot be empty.")
+  if amount <= Decimal("0.00"):
+    raise ValueError("Subscription amount must be greater than zero.")
+  if billing_cycle not in BILLING_CYCLES:
+    raise ValueError(f"Invalid billing cycle. Must be one of {', '.join(BILLING_CYCLES)}")
+  if owner_type not in OWNER_TYPES:
+    raise ValueError(f"Invalid owner type. Must be one of {', '.join(OWNER_TYPES)}")
+
+  if owner_type == "user":
+    owner_id = creator_user.id
+  elif not _is_member(owner_id, creator_user.id):
+    raise ValueError("Creator user must be a member of the group.")
+
+  subscription = Subscription(
+    name = name,
+    amount = amount,
+    billing_cycle = billing_cycle,
+    next_billing_date = next_billing_date,
+    owner_type = owner_type,
+    owner_id = owner_id,
+    created_by = creator_user.id,
+    active = True
+  )
+  db.session.add(subscription)
+  commit()
+
+  notify_subscription_changed(subscription)
+  return subscription
+
+
+def update_subscription(subscription, name = None, amount = None, billing_cycle = None, next_billing_date = None):
+  """
+  Change a subscription's details and reschedule it if its billing date moved.
+
+  Args:
+      subscription (Subscription): The subscription to change.
+      name (str, optional): New name.
+      amount (Decimal, optional): New amount per cycle.
+      billing_cycle (str, optional): New billing cycle.
+      next_billing_date (date, optional): New next billing date.
+
+  Returns:
+      Subscription: The updated Subscription object.
+  """
+  if name is not None:
+    if not name.strip():
+      raise ValueError("Subscription name cannot be empty.")
+    subscription.name = name
+  if amount is not None:
+    if amount <= Decimal("0.00"):
+      raise ValueError("Subscription amount must be greater than zero.")
+    subscription.amount = amount
+  if billing_cycle is not None:
+    if billing_cycle not in BILLING_CYCLES:
+      raise ValueError(f"Invalid billing cycle. Must be one of {', '.join(BILLING_CYCLES)}")
+    subscription.billing_cycle = billing_cycle
+  if next_billing_date is not None:
+    subscription.next_billing_date = next_billing_date
+
+  commit()
+
+  notify_subscription_changed(subscription)
+  return subscription
+
+
+def deactivate_subscription(subscription):
+  """
+  Stop billing a subscription and take it off the schedule.
+
+  Args:
+      subscription (Subscription): The subscription to deactivate.
+
+  Returns:
+      Subscription: The deactivated Subscription object.
+  """
+  subscription.active = False
+  commit()
+
+  notify_subscription_changed(subscription)
+  return subscription
+
+
+def get_subscriptions_due_by(until, after = None):
+  """
+  Return (id, next_billing_date) for active subscriptions due on or before
+  `until` (and after `after`, if given). A range seek on
+  (active, next_billing_date), used to (re)build the billing schedule.
+  """
+  query = select(Subscription.id, Subscription.next_billing_date).where(
+    Subscription.active == True,
+    Subscription.next_billing_date <= until
+  )
+  if after is not None:
+    query = query.where(Subscription.next_billing_date > after)
+
+  return db.session.execute(query).all()
+
+
+def bill_subscription(subscription, today = None):
+  """
+  Bill every cycle of a subscription that has come due, catching up on any
+  missed while nothing was running.
+
+  Each cycle is claimed with a conditional UPDATE of next_billing_date, so a
+  cycle that has already been billed (e.g. by another process) is skipped
+  rather than billed twice. For group subscriptions the generated expense is
+  committed in the same transaction as the claim.
+
+  Args:
+      subscription (Subscription): The subscription to bill.
+      today (date, optional): The billing date; defaults to today.
+
+  Returns:
+      int: The number of cycles billed.
+  """
+  today = today or date.today()
+  billed = 0
+
+  while subscription.active and subscription.next_billing_date <= today:
+    period_start = subscription.next_billing_date
+    claimed = db.session.execute(
+      update(Subscription)
+      .where(Subscription.id == subscription.id, Subscription.next_billing_date == period_start)
+      .values(next_billing_date = advance_billing_date(period_start, subscription.billing_cycle))
+    ).rowcount
+
+    if not claimed:
+      # Billed elsewhere since we loaded it; reload and look again
+      rollback()
+      db.session.refresh(subscription)
+      continue
+
+    try:
+      if subscription.owner_type == "group":
+        _add_generated_expense(subscription, period_start)
+      commit()
+    except Exception:
+      rollback()
+      raise
+
+    billed += 1
+
+  notify_subscription_changed(subscription)
+  return billed
+
+
+def get_generated_expenses(subscription_ids, start_period = None, end_period = None):
+  """
+  Return the generated expenses of some subscriptions within a period range,
+  e.g. Q1 2026 is start_period = 202601, end_period = 202603. Each
+  subscription is an index seek on (subscription_id, period).
+
+  Args:
+      subscription_ids (iterable of int): The subscriptions to look in.
+      start_period (int, optional): First period (YYYYMM) to include.
+      end_period (int, optional): Last period (YYYYMM) to include.
+
+  Returns:
+      list of GeneratedExpense: Ordered by subscription and then period.
+  """
+  query = select(GeneratedExpense).where(GeneratedExpense.subscription_id.in_(list(subscription_ids)))
+  if start_period is not None:
+    query = query.where(GeneratedExpense.period >= start_period)
+  if end_period is not None:
+    query = query.where(GeneratedExpense.period <= end_period)
+
+  rows = db.session.scalars(query.order_by(GeneratedExpense.subscription_id, GeneratedExpense.period)).all()
+  # Shards each return their rows in order; keep the order across shards too
+  return sorted(rows, key = lambda g: (g.subscription_id, g.period))
+
+
+def get_latest_periods(subscription_ids):
+  """
+  Return the most recent billed period of each subscription.
+
+  Args:
+      subscription_ids (iterable of int): The subscriptions to look up.
+
+  Returns:
+      dict: {subscription_id: period (YYYYMM)} for subscriptions billed at least once.
+  """
+  rows = db.session.execute(
+    select(GeneratedExpense.subscription_id, func.max(GeneratedExpense.period))
+    .where(GeneratedExpense.subscription_id.in_(list(subscription_ids)))
+    .group_by(GeneratedExpense.subscription_id)
+  ).all()
+
+  # With sharding on, each shard answers for the groups it holds
+  latest = {}
+  for subscription_id, period in rows:
+    latest[subscription_id] = max(period, latest.get(subscription_id, period))
+  return latest
+
+
+def get_latest_period(subscription):
+  """Return the most recent billed period (YYYYMM) of a subscription, or None."""
+  return get_latest_periods([subscription.id]).get(subscription.id)
+
+
+def to_period(day):
+  """The YYYYMM period a date falls in, e.g. date(2026, 3, 14) -> 202603."""
+  return day.year * 100 + day.month
+
+
+def advance_billing_date(billing_date, billing_cycle):
+  """
+  Return the billing date one cycle after billing_date. Days past the end of
+  a shorter month are clamped, e.g. 31 January -> 28 February.
+  """
+  months = 12 if billing_cycle == "yearly" else 1
+  month_index = billing_date.month - 1 + months
+  year, month = billing_date.year + month_index // 12, month_index % 12 + 1
+  return date(year, month, min(billing_date.day, monthrange(year, month)[1]))
+
+
+def _add_generated_expense(subscription, period_start):
+  group = db.session.get(Group, subscription.owner_id)
+  if group is None:
+    raise ValueError(f"Group {subscription.owner_id} for subscription {subscription.id} does not exist.")
+
+  member_ids = db.session.scalars(select(Membership.user_id).where(Membership.group_id == group.id)).all()
+  if subscription.created_by not in member_ids:
+    raise ValueError("The subscription's creator is no longer a member of the group.")
+
+  expense = Expense(
+    group_id = group.id,
+    created_by = subscription.created_by,
+    description = subscription.name,
+    total_amount = subscription.amount,
+    currency = group.base_currency,
+    category = get_categorizer().categorize(subscription.name),
+    date = datetime.combine(period_start, datetime.min.time())
+  )
+  for split in calculate_splits(subscription.amount, {"type": "equal", "users": member_ids}):
+    expense.splits.append(ExpenseSplit(user_id = split["user"], amount_owed = split["amount"]))
+
+  db.session.add(expense)
+  db.session.add(GeneratedExpense(
+    subscription_id = subscription.id,
+    expense = expense,
+    period = to_period(period_start)
+  ))
+  db.session.flush()
+  record_change(group.id, "expense", expense.id, "insert")
+
+
+def _is_member(group_id, user_id):
+  return db.session.scalar(
+    select(Membership.id).where(Membership.group_id == group_id, Membership.user_id == user_id)
+  ) is not None
@@ -0,0 +1,575 @@
+"""
+Horizontal sharding of group data.
+
+Groups never share expenses, splits or settlements, so a group and every
+row hanging off it lives on exactly one shard database. Users, subscriptions
+and the group -> shard directory stay in the global database.
+
+With SHARD_COUNT <= 1 (the default) there is a single "global" shard and all
+routing short-circuits to the default database, so nothing changes for an
+unsharded install.
+
+Ids of the rows under a group (expenses, splits, settlements, memberships,
+the change log and the archive) are assigned by each shard's database, so
+they are only unique within a shard. Such rows are looked up by group_id and
+id, which routes to the group's shard; `session.get` is for groups and the
+global tables only.
+"""
+from datetime import datetime
+
+import click
+import sqlalchemy as sa
+from flask import current_app
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BindParameter, BooleanClauseList, BinaryExpression
+from sqlalchemy.sql.util import find_tables
+
+GLOBAL_SHARD = "global"
+
+# Tables that belong to exactly one group and are stored on that group's shard.
+# Order matters: parents come before children when copying a group.
+SHARDED_TABLES = (
+  "groups",
+  "memberships",
+  "expenses",
+  "expense_splits",
+  "generated_expenses",
+  "settlements",
+  "group_changes",
+  "archived_expenses",
+  "archived_expense_splits",
+  "archived_settlements",
+  "balance_checkpoints",
+  "opening_balances",
+)
+
+
+class ShardRouter:
+  """
+  Maps group ids to shard ids.
+
+  The mapping lives in the global `group_shards` directory. Lookups are cached
+  on the session (so once per request), which keeps every new request
+  consistent with groups that were moved by `move_group`.
+  """
+
+  def __init__(self, shard_ids):
+    self.shard_ids = list(shard_ids)
+
+  @property
+  def enabled(self):
+    return self.shard_ids != [GLOBAL_SHARD]
+
+  def shard_for_group(self, group_id, session):
+    """
+    Return the shard id holding a group, or None if the group is unknown.
+
+    Args:
+        group_id (int): The group to look up.
+        session (Session): The session whose global connection is used for the
+            directory lookup and whose `info` dict caches the result.
+    """
+    if not self.enabled:
+      return GLOBAL_SHARD
+
+    cache = session.info.setdefault("group_shards", {})
+    if group_id not in cache:
+      from app.models import GroupShard
+
+      connection = session.connection(bind_arguments = {"shard_id": GLOBAL_SHARD})
+      cache[group_id] = connection.execute(
+        sa.select(GroupShard.shard_id).where(GroupShard.group_id == group_id)
+      ).scalar()
+
+    return cache[group_id]
+
+  def allocate_group(self, session):
+    """
+    Reserve a globally unique group id on the least populated shard.
+
+    Returns:
+        tuple: (group_id, shard_id)
+    """
+    from app.models import GroupShard
+
+    connection = session.connection(bind_arguments = {"shard_id": GLOBAL_SHARD})
+    counts = dict(connection.execute(
+      sa.select(GroupShard.shard_id, sa.func.count()).group_by(GroupShard.shard_id)
+    ).all())
+    shard_id = min(self.shard_ids, key = lambda s: counts.get(s, 0))
+
+    group_id = connection.execute(
+      sa.insert(GroupShard).values(shard_id = shard_id, created_at = datetime.utcnow())
+    ).inserted_primary_key[0]
+
+    session.info.setdefault("group_shards", {})[group_id] = shard_id
+    return group_id, shard_id
+
+
+class GroupShardedSession(ShardedSession):
+  """
+  The `db.session` class. Routes group-owned rows to the group's shard and
+  everything else to the global database.
+  """
+
+  def __init__(self, db, **kwargs):
+    self._db = db
+    self._model_changes = {}
+    self.router = current_app.extensions["shard_router"]
+
+    shards = {
+      shard_id: db.engines[None if shard_id == GLOBAL_SHARD else shard_id]
+      for shard_id in [GLOBAL_SHARD] + self.router.shard_ids
+    }
+
+    super().__init__(
+      shard_chooser = self._choose_shard,
+      identity_chooser = self._choose_identity_shards,
+      execute_chooser = self._choose_execute_shards,
+      shards = shards,
+      **kwargs
+    )
+
+  def get_bind(self, mapper = None, *, shard_id = None, instance = None, clause = None, **kw):
+    # Plain session.connection() / Core statements carry no mapper to route on
+    if shard_id is None and mapper is None and instance is None:
+      shard_id = self._choose_shard(None, None, clause = clause)
+
+    return super().get_bind(mapper, shard_id = shard_id, instance = instance, clause = clause, **kw)
+
+  def _choose_shard(self, mapper, instance, clause = None, **kw):
+    """Pick the shard a new object (or an un-routed statement) is written to."""
+    tables = {mapper.local_table.name} if mapper is not None else _statement_tables(clause)
+    if not self.router.enabled or not tables & set(SHARDED_TABLES):
+      return GLOBAL_SHARD
+
+    group_id = self._instance_group_id(instance) if instance is not None else None
+    shard_id = self.router.shard_for_group(group_id, self) if group_id is not None else None
+    if shard_id is None:
+      raise ValueError(f"Cannot choose a shard for {', '.join(sorted(tables))} without a known group.")
+
+    return shard_id
+
+  def _choose_identity_shards(self, mapper, primary_key, *, lazy_loaded_from, **kw):
+    """List the shards a primary key lookup should try."""
+    table = mapper.local_table.name
+    if not self.router.enabled or table not in SHARDED_TABLES:
+      return [GLOBAL_SHARD]
+
+    # Many-to-one from a sharded row: the parent lives on the same shard
+    if lazy_loaded_from is not None and lazy_loaded_from.identity_token in self.router.shard_ids:
+      return [lazy_loaded_from.identity_token]
+
+    if table == "groups":
+      shard_id = self.router.shard_for_group(primary_key[0], self)
+      return [shard_id] if shard_id else []
+
+    # Child ids are only unique within a shard: the same id can be on every one
+    raise ValueError(
+      f"Cannot look up {table} by id alone; select it by group_id and id so it is read from the group's shard."
+    )
+
+  def _choose_execute_shards(self, orm_context):
+    """List the shards a statement runs against."""
+    statement = orm_context.statement
+    tables = _statement_tables(statement)
+    if not self.router.enabled or not tables & set(SHARDED_TABLES):
+      return [GLOBAL_SHARD]
+
+    lazy_loaded_from = orm_context.lazy_loaded_from
+    if lazy_loaded_from is not None and lazy_loaded_from.identity_token in self.router.shard_ids:
+      return [lazy_loaded_from.identity_token]
+
+    group_ids = _criteria_group_ids(statement, orm_context.parameters)
+    if group_ids:
+      shard_ids = {self.router.shard_for_group(g, self) for g in group_ids} - {None}
+      # Unknown groups have no rows anywhere; any single shard returns the empty result
+      return sorted(shard_ids) or self.router.shard_ids[:1]
+
+    # Reads can fan out; writes without a group would hit colliding ids on every shard
+    if not orm_context.is_select:
+      raise ValueError(
+        "Writes to group data need a group_id criterion or "
+        "bind_arguments = group_bind_arguments(group_id)."
+      )
+
+    return self.router.shard_ids
+
+  def _instance_group_id(self, instance):
+    """Find the group id of a pending object via its columns or parents."""
+    table = instance.__table__.name
+    if table == "groups":
+      return instance.id
+
+    if getattr(instance, "group_id", None) is not None:
+      return instance.group_id
+    if getattr(instance, "group", None) is not None:
+      return instance.group.id
+
+    expense = getattr(instance, "expense", None)
+    if expense is not None:
+      return self._instance_group_id(expense)
+
+    # A split created with only expense_id: find the expense already in the session
+    expense_id = getattr(instance, "expense_id", None)
+    if expense_id is not None:
+      for key, obj in self.identity_map.items():
+        if key[0].__tablename__ == "expenses" and key[1] == (expense_id,):
+          return obj.group_id
+
+    return None
+
+
+def _statement_tables(statement):
+  """Return the names of the tables a statement touches."""
+  if statement is None:
+    return set()
+
+  if getattr(statement, "is_dml", False):
+    return {statement.table.name}
+
+  return {
+    table.name for table in find_tables(statement, include_joins = True, include_aliases = True)
+    if isinstance(table, sa.Table)
+  }
+
+
+def _criteria_group_ids(statement, parameters = None):
+  """
+  Collect group ids from top-level `group_id = x` / `group_id IN (...)`
+  criteria. Terms under an OR are ignored since they don't restrict the
+  statement to those groups. Values passed as execution parameters (as
+  primary key loads do) take precedence over values embedded in the statement.
+  """
+  parameters = parameters if isinstance(parameters, dict) else {}
+  whereclause = getattr(statement, "whereclause", None)
+  if whereclause is None:
+    return set()
+
+  terms = [whereclause]
+  group_ids = set()
+
+  while terms:
+    term = terms.pop()
+    if isinstance(term, BooleanClauseList) and term.operator is operators.and_:
+      terms.extend(term.clauses)
+      continue
+
+    if not isinstance(term, BinaryExpression) or not isinstance(term.right, BindParameter):
+      continue
+
+    column = term.left
+    table = getattr(getattr(column, "table", None), "name", None)
+    is_group_column = (
+      (table == "groups" and column.name == "id")
+      or (table in SHARDED_TABLES and getattr(column, "name", None) == "group_id")
+    )
+    if not is_group_column:
+      continue
+
+    value = parameters.get(term.right.key, term.right.effective_value)
+    if term.operator is operators.eq:
+      group_ids.add(value)
+    elif term.operator is operators.in_op:
+      group_ids.update(value)
+
+  return group_ids
+
+
+def get_router():
+  return current_app.extensions["shard_router"]
+
+
+def group_bind_arguments(group_id):
+  """
+  Bind arguments that pin a statement to a group's shard, for bulk statements
+  that carry no group_id criterion.
+
+  Usage:
+      db.session.execute(insert(ExpenseSplit.__table__), rows, bind_arguments = group_bind_arguments(group.id))
+  """
+  from app.extensions import db
+
+  return {"shard_id": get_router().shard_for_group(group_id, db.session())}
+
+
+def assign_group_shard(group):
+  """
+  Give a new group a globally unique id and a home shard. No-op when sharding
+  is disabled, where the database assigns the id as usual.
+
+  Args:
+      group (Group): A group that has not been flushed yet.
+
+  Returns:
+      Group: The same group with `id` set when sharding is enabled.
+  """
+  from app.extensions import db
+
+  router = get_router()
+  if router.enabled:
+    group.id, _ = router.allocate_group(db.session())
+
+  return group
+
+
+def release_group_shard(group_id):
+  """Remove a deleted group from the shard directory. No-op when sharding is disabled."""
+  from app.extensions import db
+  from app.models import GroupShard
+
+  router = get_router()
+  if router.enabled:
+    db.session.execute(sa.delete(GroupShard).where(GroupShard.group_id == group_id))
+    db.session.info.get("group_shards", {}).pop(group_id, None)
+
+
+def create_shard_schemas():
+  """Create the group-owned tables on every shard (`db.create_all` only covers the global database)."""
+  from app.extensions import db
+
+  router = get_router()
+  if not router.enabled:
+    return
+
+  tables = [db.metadata.tables[name] for name in SHARDED_TABLES]
+  for shard_id in router.shard_ids:
+    db.metadata.create_all(db.engines[shard_id], tables = tables)
+
+
+def move_group(group_id, target_shard, batch_size = 1000):
+  """
+  Move a group and all of its rows to another shard.
+
+  Rows are copied into the target shard, the directory is repointed, and only
+  then are the source rows deleted. Child ids (expenses, splits, settlements,
+  memberships, and their archived copies) are reassigned on the target since
+  they are only unique per shard; the group id itself never changes. The
+  change log keeps its per-group sequence numbers and gets a "resync" entry, so clients syncing
+  the group refetch it under the new ids. A copy left behind by an
+  interrupted run is cleared first, so the move can simply be retried.
+
+  Writes to the group should be paused while it moves.
+
+  Args:
+      group_id (int): The group to move.
+      target_shard (str): The shard id to move it to.
+      batch_size (int): Rows per INSERT batch for splits.
+
+  Returns:
+      str: The shard the group was moved from.
+  """
+  from app.extensions import db
+  from app.models import GroupShard
+
+  router = get_router()
+  if target_shard not in router.shard_ids or not router.enabled:
+    raise ValueError(f"Unknown shard: {target_shard}")
+
+  global_engine = db.engines[None]
+  with global_engine.connect() as connection:
+    source_shard = connection.execute(
+      sa.select(GroupShard.shard_id).where(GroupShard.group_id == group_id)
+    ).scalar()
+
+  if source_shard is None:
+    raise ValueError(f"Group {group_id} does not exist")
+  if source_shard == target_shard:
+    return source_shard
+
+  tables = db.metadata.tables
+  groups, memberships, expenses = tables["groups"], tables["memberships"], tables["expenses"]
+  splits, generated, settlements = tables["expense_splits"], tables["generated_expenses"], tables["settlements"]
+  changes = tables["group_changes"]
+  archived_expenses, archived_splits = tables["archived_expenses"], tables["archived_expense_splits"]
+  archived_settlements = tables["archived_settlements"]
+  checkpoints, openings = tables["balance_checkpoints"], tables["opening_balances"]
+
+  # Clear any partial copy, then copy parents first, remapping child ids
+  _delete_group_rows(db.engines[target_shard], group_id)
+
+  with db.engines[source_shard].connect() as source, db.engines[target_shard].begin() as target:
+    target.execute(sa.insert(groups), [dict(r._mapping) for r in source.execute(
+      sa.select(groups).where(groups.c.id == group_id))])
+
+    for table in (memberships, settlements, changes):
+      rows = [_without_id(r) for r in source.execute(sa.select(table).where(table.c.group_id == group_id))]
+      if rows:
+        target.execute(sa.insert(table), rows)
+
+    expense_ids = {}
+    for row in source.execute(sa.select(expenses).where(expenses.c.group_id == group_id)):
+      expense_ids[row.id] = target.execute(sa.insert(expenses).values(**_without_id(row))).inserted_primary_key[0]
+
+    for table in (splits, generated):
+      result = source.execute(
+        sa.select(table).join(expenses, table.c.expense_id == expenses.c.id).where(expenses.c.group_id == group_id)
+      )
+      for batch in result.partitions(batch_size):
+        target.execute(sa.insert(table), [
+          {**_without_id(r), "expense_id": expense_ids[r.expense_id]} for r in batch
+        ])
+
+    # Archived history keeps its ids unique per shard too: new ids are drawn
+    # from the hot tables' sequences, then the rows go straight to the archive
+    rows = [dict(r._mapping) for r in source.execute(sa.select(checkpoints).where(checkpoints.c.group_id == group_id))]
+    if rows:
+      target.execute(sa.insert(checkpoints), rows)
+    rows = [_without_id(r) for r in source.execute(sa.select(openings).where(openings.c.group_id == group_id))]
+    if rows:
+      target.execute(sa.insert(openings), rows)
+
+    _copy_archived(source, target, archived_settlements, settlements, archived_settlements.c.group_id == group_id, batch_size)
+    archived_expense_ids = _copy_archived(
+      source, target, archived_expenses, expenses, archived_expenses.c.group_id == group_id, batch_size
+    )
+    _copy_archived(
+      source, target, archived_splits, splits,
+      archived_splits.c.expense_id.in_(
+        sa.select(archived_expenses.c.id).where(archived_expenses.c.group_id == group_id)
+      ),
+      batch_size, expense_ids = archived_expense_ids
+    )
+
+    # Child ids changed: tell syncing clients to start over
+    last_seq = target.execute(sa.select(sa.func.max(changes.c.seq)).where(changes.c.group_id == group_id)).scalar()
+    target.execute(sa.insert(changes).values(
+      group_id = group_id, seq = (last_seq or 0) + 1, entity = "group", entity_id = group_id, op = "resync",
+      created_at = datetime.utcnow()
+    ))
+
+  with global_engine.begin() as connection:
+    connection.execute(
+      sa.update(GroupShard).where(GroupShard.group_id == group_id).values(shard_id = target_shard)
+    )
+
+  _delete_group_rows(db.engines[source_shard], group_id)
+  db.session.info.get("group_shards", {}).pop(group_id, None)
+
+  return source_shard
+
+
+def _without_id(row):
+  values = dict(row._mapping)
+  values.pop("id")
+  return values
+
+
+def _copy_archived(source, target, archive, hot, criterion, batch_size, expense_ids = None):
+  """
+  Copy a group's archived rows to another shard. Each batch is inserted into
+  the hot table first to draw fresh ids from its sequence (ids are never
+  reused there, so they can't clash with that shard's hot or archived rows),
+  then moved into the archive table.
+
+  Returns:
+      dict: {old id: new id}
+  """
+  ids = {}
+  result = source.execute(sa.select(archive).where(criterion).order_by(archive.c.id))
+  for batch in result.partitions(batch_size):
+    rows = [_without_id(r) for r in batch]
+    if expense_ids is not None:
+      rows = [{**row, "expense_id": expense_ids[row["expense_id"]]} for row in rows]
+
+    new_ids = target.execute(
+      sa.insert(hot).returning(hot.c.id, sort_by_parameter_order = True), rows
+    ).scalars().all()
+    target.execute(sa.delete(hot).where(hot.c.id.in_(new_ids)))
+    target.execute(sa.insert(archive), [{**row, "id": new_id} for row, new_id in zip(rows, new_ids)])
+    ids.update(zip((r.id for r in batch), new_ids))
+
+  return ids
+
+
+def _delete_group_rows(engine, group_id):
+  """Delete a group's rows from one shard, children first."""
+  from app.extensions import db
+
+  tables = db.metadata.tables
+  expenses = tables["expenses"]
+  group_expenses = sa.select(expenses.c.id).where(expenses.c.group_id == group_id)
+
+  archived_expenses = tables["archived_expenses"]
+  group_archived_expenses = sa.select(archived_expenses.c.id).where(archived_expenses.c.group_id == group_id)
+
+  with engine.begin() as connection:
+    for name in ("expense_splits", "generated_expenses"):
+      table = tables[name]
+      connection.execute(sa.delete(table).where(table.c.expense_id.in_(group_expenses)))
+    archived_splits = tables["archived_expense_splits"]
+    connection.execute(sa.delete(archived_splits).where(archived_splits.c.expense_id.in_(group_archived_expenses)))
+    for name in (
+      "expenses", "settlements", "memberships", "group_changes",
+      "archived_expenses", "archived_settlements", "balance_checkpoints", "opening_balances"
+    ):
+      table = tables[name]
+      connection.execute(sa.delete(table).where(table.c.group_id == group_id))
+    connection.execute(sa.delete(tables["groups"]).where(tables["groups"].c.id == group_id))
+
+
+@click.group("shards")
+def shards_cli():
+  """Inspect and rebalance group shards."""
+
+
+@shards_cli.command("init")
+def init_shards_command():
+  """Create the group tables on every shard."""
+  create_shard_schemas()
+  click.echo(f"Created schemas on {', '.join(get_router().shard_ids)}")
+
+
+@shards_cli.command("status")
+def shard_status_command():
+  """Show how many groups each shard holds."""
+  from app.extensions import db
+  from app.models import GroupShard
+
+  counts = dict(db.session.execute(
+    sa.select(GroupShard.shard_id, sa.func.count()).group_by(GroupShard.shard_id)
+  ).all())
+  for shard_id in get_router().shard_ids:
+    click.echo(f"{shard_id}: {counts.get(shard_id, 0)} groups")
+
+
+@shards_cli.command("move")
+@click.argument("group_id", type = int)
+@click.argument("target_shard")
+def move_group_command(group_id, target_shard):
+  """Move GROUP_ID to TARGET_SHARD."""
+  source_shard = move_group(group_id, target_shard)
+  click.echo(f"Moved group {group_id}: {source_shard} -> {target_shard}")
+
+
+def drop_shard_metadata(db):
+  """
+  Forget the empty MetaData Flask-SQLAlchemy registers on the shared `db`
+  object for each shard bind. Shard tables live in the default metadata and
+  are created by `create_shard_schemas`; left in place, these entries make
+  `db.create_all()` in a later unsharded app look for binds it doesn't have.
+  """
+  for shard_id in get_router().shard_ids:
+    if shard_id != GLOBAL_SHARD:
+      db.metadatas.pop(shard_id, None)
+
+
+def init_app(app):
+  """
+  Register the shard router and shard binds. Must run before `db.init_app`
+  so Flask-SQLAlchemy creates an engine for every shard.
+  """
+  shard_count = app.config.get("SHARD_COUNT", 1)
+
+  if shard_count > 1:
+    shard_ids = [f"shard_{i}" for i in range(shard_count)]
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for i, shard_id in enumerate(shard_ids):
+      binds.setdefault(shard_id, app.config["SHARD_DATABASE_URL"].format(shard = i))
+    app.config["SQLALCHEMY_BINDS"] = binds
+  else:
+    shard_ids = [GLOBAL_SHARD]
+
+  app.extensions["shard_router"] = ShardRouter(shard_ids)
+  app.cli.add_command(shards_cli)
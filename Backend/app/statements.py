@@ -0,0 +1,340 @@
+"""
+Monthly group statements.
+
+`flask statements generate --month 2026-09` writes an HTML and a CSV
+statement of the month for every group to STATEMENTS_DIR/<month>/:
+
+  - each member's opening balance, the month's change and closing balance,
+  - the month's expenses and confirmed settlements,
+  - who owes whom at the end of the month.
+
+A statement is a handful of set-based queries per group: the ledger is
+summed per (debtor, creditor) pair in the database, before and during the
+month in the same query, rather than walked per member. Groups are split
+into chunks and handed to a process pool (see app.workers). Each file is
+written under a temporary name and renamed, and groups that already have
+both files are skipped, so an interrupted run picks up where it stopped.
+
+Amounts are in the group's base currency; expenses in another currency are
+converted at their own day's rate (see app.fx). Expenses count from their
+date and settlements from when they were requested, as in app.archive. A
+month that is already archived can't be told apart from the opening
+balances it was carried into, so such groups are skipped.
+"""
+import csv
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from functools import partial
+from html import escape
+from typing import NamedTuple
+
+import click
+from flask import current_app
+from sqlalchemy import select, func, case
+
+from app.extensions import db
+from app.models import Group, Membership, User, Expense, ExpenseSplit, Settlement, OpeningBalance, BalanceCheckpoint
+from app.serialization import decimal_string
+from app.services.balance_service import stream_converted_expenses
+from app.sharding import get_router, group_bind_arguments
+from app.workers import map_chunks
+
+# Groups handed to a worker at a time
+STATEMENT_CHUNK_SIZE = 50
+
+
+class GroupStatement(NamedTuple):
+  group_id: int
+  group_name: str
+  currency: str
+  month: datetime
+  balances: list     # (name, opening, change, closing), one per member
+  expenses: list     # (date, description, category, paid_by, amount, currency)
+  settlements: list  # (date, from_name, to_name, amount)
+  owes: list         # (debtor_name, creditor_name, amount) at the end of the month
+
+
+def month_bounds(month):
+  """[start, end) of the month a datetime falls in."""
+  start = month.replace(day = 1, hour = 0, minute = 0, second = 0, microsecond = 0)
+  end = start.replace(year = start.year + 1, month = 1) if start.month == 12 else start.replace(month = start.month + 1)
+  return start, end
+
+
+def build_statement(group, month):
+  """
+  A group's statement for the month `month` falls in.
+
+  Args:
+      group (Group): The group.
+      month (datetime): Any time in the month.
+
+  Returns:
+      GroupStatement, or None if the month is already archived.
+  """
+  start, end = month_bounds(month)
+  bind_arguments = group_bind_arguments(group.id)
+  closed_before = db.session.scalar(
+    select(BalanceCheckpoint.closed_before).where(BalanceCheckpoint.group_id == group.id), bind_arguments = bind_arguments
+  )
+  if closed_before is not None and closed_before > start:
+    return None
+
+  before, during = _pair_totals(group, start, end)
+  opening, change = _balances(before), _balances(during)
+  closing = defaultdict(lambda: Decimal("0.00"), opening)
+  for user_id, amount in change.items():
+    closing[user_id] += amount
+  at_end = defaultdict(lambda: Decimal("0.00"), before)
+  for pair, amount in during.items():
+    at_end[pair] += amount
+  # As get_group_obligations: pairs settled in full (or overpaid) drop out
+  owes = sorted((pair, amount) for pair, amount in at_end.items() if amount > Decimal("0.00"))
+
+  expenses = db.session.execute(
+    select(Expense.date, Expense.description, Expense.category, Expense.created_by, Expense.total_amount, Expense.currency)
+    .where(Expense.group_id == group.id, Expense.date >= start, Expense.date < end)
+    .order_by(Expense.date, Expense.id),
+    bind_arguments = bind_arguments
+  ).all()
+  settlements = db.session.execute(
+    select(Settlement.created_at, Settlement.from_user_id, Settlement.to_user_id, Settlement.amount)
+    .where(_confirmed_between(group, start, end))
+    .order_by(Settlement.created_at, Settlement.id),
+    bind_arguments = bind_arguments
+  ).all()
+
+  member_ids = db.session.scalars(
+    select(Membership.user_id).where(Membership.group_id == group.id).order_by(Membership.id), bind_arguments = bind_arguments
+  ).all()
+  # Former members who still have a balance keep their place on the statement
+  user_ids = member_ids + sorted(set(closing) - set(member_ids))
+  names = dict(db.session.execute(select(User.id, User.name).where(User.id.in_(user_ids + [e.created_by for e in expenses]))).all())
+
+  zero = Decimal("0.00")
+  return GroupStatement(
+    group_id = group.id,
+    group_name = group.name,
+    currency = group.base_currency,
+    month = start,
+    balances = [
+      (names[user_id], opening.get(user_id, zero), change.get(user_id, zero), closing.get(user_id, zero))
+      for user_id in user_ids
+    ],
+    expenses = [
+      (e.date, e.description, e.category, names[e.created_by], e.total_amount, e.currency) for e in expenses
+    ],
+    settlements = [(s.created_at, names[s.from_user_id], names[s.to_user_id], s.amount) for s in settlements],
+    owes = [(names[debtor_id], names[creditor_id], amount) for (debtor_id, creditor_id), amount in owes],
+  )
+
+
+def _pair_totals(group, start, end):
+  """What each debtor owed each creditor ({(debtor, creditor): amount}) before `start`, and during the month."""
+  before, during = defaultdict(lambda: Decimal("0.00")), defaultdict(lambda: Decimal("0.00"))
+  bind_arguments = group_bind_arguments(group.id)
+
+  # Splits of other people's expenses in the base currency, summed per pair and period
+  in_month = case((Expense.date >= start, 1), else_ = 0)
+  for period, debtor_id, creditor_id, amount in db.session.execute(
+    select(in_month, ExpenseSplit.user_id, Expense.created_by, func.sum(ExpenseSplit.amount_owed))
+    .join(Expense, ExpenseSplit.expense_id == Expense.id)
+    .where(
+      Expense.group_id == group.id, Expense.currency == group.base_currency, Expense.date < end,
+      ExpenseSplit.user_id != Expense.created_by
+    )
+    .group_by(in_month, ExpenseSplit.user_id, Expense.created_by),
+    bind_arguments = bind_arguments
+  ):
+    (during if period else before)[(debtor_id, creditor_id)] += amount
+
+  # Other currencies are converted expense by expense, at each one's own rate
+  for totals, criterion in ((before, Expense.date < start), (during, (Expense.date >= start) & (Expense.date < end))):
+    for payer_id, _, splits in stream_converted_expenses(group, criterion = criterion):
+      for debtor_id, amount in splits:
+        if debtor_id != payer_id:
+          totals[(debtor_id, payer_id)] += amount
+
+  settled_in_month = case((Settlement.created_at >= start, 1), else_ = 0)
+  for period, debtor_id, creditor_id, amount in db.session.execute(
+    select(settled_in_month, Settlement.from_user_id, Settlement.to_user_id, func.sum(Settlement.amount))
+    .where(_confirmed_between(group, None, end))
+    .group_by(settled_in_month, Settlement.from_user_id, Settlement.to_user_id),
+    bind_arguments = bind_arguments
+  ):
+    (during if period else before)[(debtor_id, creditor_id)] -= amount
+
+  for debtor_id, creditor_id, amount in db.session.execute(
+    select(OpeningBalance.debtor_id, OpeningBalance.creditor_id, OpeningBalance.amount)
+    .where(OpeningBalance.group_id == group.id),
+    bind_arguments = bind_arguments
+  ):
+    before[(debtor_id, creditor_id)] += amount
+
+  return before, during
+
+
+def _confirmed_between(group, start, end):
+  criterion = (Settlement.group_id == group.id) & (Settlement.status == "confirmed") & (Settlement.created_at < end)
+  return criterion if start is None else criterion & (Settlement.created_at >= start)
+
+
+def _balances(pairs):
+  """Net balance per user (positive: owed money) from pair totals."""
+  balances = defaultdict(lambda: Decimal("0.00"))
+  for (debtor_id, creditor_id), amount in pairs.items():
+    balances[creditor_id] += amount
+    balances[debtor_id] -= amount
+  return balances
+
+
+def render_html(statement):
+  money = lambda amount: escape(decimal_string(amount))
+  day = lambda when: when.strftime("%Y-%m-%d")
+
+  def table(headings, rows):
+    head = "".join(f"<th>{escape(heading)}</th>" for heading in headings)
+    body = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows)
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>"
+
+  title = escape(f"{statement.group_name}: {statement.month:%B %Y}")
+  return (
+    f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title></head><body>"
+    f"<h1>{title}</h1><p>Amounts in {escape(statement.currency)}.</p>"
+    "<h2>Balances</h2>"
+    + table(["Member", "Opening", "Change", "Closing"], [
+      (escape(name), money(opening), money(change), money(closing)) for name, opening, change, closing in statement.balances
+    ])
+    + "<h2>Expenses</h2>"
+    + table(["Date", "Description", "Category", "Paid by", "Amount", "Currency"], [
+      (day(when), escape(description), escape(category or ""), escape(paid_by), money(amount), escape(currency))
+      for when, description, category, paid_by, amount, currency in statement.expenses
+    ])
+    + "<h2>Settlements</h2>"
+    + table(["Date", "From", "To", "Amount"], [
+      (day(when), escape(from_name), escape(to_name), money(amount)) for when, from_name, to_name, amount in statement.settlements
+    ])
+    + "<h2>Who owes whom</h2>"
+    + table(["Owes", "To", "Amount"], [
+      (escape(debtor), escape(creditor), money(amount)) for debtor, creditor, amount in statement.owes
+    ])
+    + "</body></html>\n"
+  )
+
+
+def write_csv(statement, file):
+  """One row per line of the statement; the first column names its section."""
+  writer = csv.writer(file)
+  writer.writerow(["section", "member", "opening", "change", "closing"])
+  for name, opening, change, closing in statement.balances:
+    writer.writerow(["balance", name, decimal_string(opening), decimal_string(change), decimal_string(closing)])
+  writer.writerow(["section", "date", "description", "category", "paid_by", "amount", "currency"])
+  for when, description, category, paid_by, amount, currency in statement.expenses:
+    writer.writerow(["expense", when.strftime("%Y-%m-%d"), description, category or "", paid_by, decimal_string(amount), currency])
+  writer.writerow(["section", "date", "from", "to", "amount"])
+  for when, from_name, to_name, amount in statement.settlements:
+    writer.writerow(["settlement", when.strftime("%Y-%m-%d"), from_name, to_name, decimal_string(amount)])
+  writer.writerow(["section", "debtor", "creditor", "amount"])
+  for debtor, creditor, amount in statement.owes:
+    writer.writerow(["owes", debtor, creditor, decimal_string(amount)])
+
+
+def statement_paths(out_dir, month, group_id):
+  """The (html, csv) files of a group's statement."""
+  base = os.path.join(out_dir, f"{month:%Y-%m}", f"group-{group_id}")
+  return base + ".html", base + ".csv"
+
+
+def generate_statements(month, out_dir = None, workers = None, chunk_size = STATEMENT_CHUNK_SIZE, force = False):
+  """
+  Write every group's statement for a month.
+
+  Args:
+      month (datetime): Any time in the month.
+      out_dir (str, optional): Defaults to STATEMENTS_DIR (instance/statements).
+      workers (int, optional): Worker processes; defaults to the CPU count.
+          With 1 (or an in-memory database) groups are done in this process.
+      chunk_size (int): Groups per task handed to a worker.
+      force (bool): Redo groups whose statements already exist.
+
+  Returns:
+      dict: {"groups", "written", "already_done", "archived": int, "seconds": float}
+  """
+  month, _ = month_bounds(month)
+  out_dir = out_dir or get_statements_dir(current_app)
+  os.makedirs(os.path.join(out_dir, f"{month:%Y-%m}"), exist_ok = True)
+  began = time.perf_counter()
+
+  group_ids = []
+  for shard_id in get_router().shard_ids:
+    group_ids += db.session.scalars(
+      select(Group.id).order_by(Group.id), bind_arguments = {"shard_id": shard_id}
+    ).all()
+  todo = [
+    group_id for group_id in group_ids
+    if force or not all(os.path.exists(path) for path in statement_paths(out_dir, month, group_id))
+  ]
+  totals = {"groups": len(group_ids), "written": 0, "already_done": len(group_ids) - len(todo), "archived": 0}
+
+  chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+  results = map_chunks(partial(_write_statements, month = month, out_dir = out_dir), chunks, workers)
+  for written, archived in results:
+    totals["written"] += written
+    totals["archived"] += archived
+  totals["seconds"] = time.perf_counter() - began
+  return totals
+
+
+def _write_statements(group_ids, month, out_dir):
+  """Write the statements of some groups; returns (written, skipped as archived)."""
+  written = archived = 0
+  for group_id in group_ids:
+    group = db.session.get(Group, group_id)
+    statement = build_statement(group, month) if group is not None else None
+    if statement is None:
+      archived += group is not None
+      continue
+    html_path, csv_path = statement_paths(out_dir, month, group_id)
+    with open(html_path + ".tmp", "w", encoding = "utf-8") as file:
+      file.write(render_html(statement))
+    os.replace(html_path + ".tmp", html_path)
+    with open(csv_path + ".tmp", "w", encoding = "utf-8", newline = "") as file:
+      write_csv(statement, file)
+    os.replace(csv_path + ".tmp", csv_path)
+    written += 1
+  return written, archived
+
+
+def get_statements_dir(app):
+  return app.config.get("STATEMENTS_DIR") or os.path.join(app.instance_path, "statements")
+
+
+@click.group("statements")
+def statements_cli():
+  """Monthly group statements."""
+
+
+@statements_cli.command("generate")
+@click.option("--month", type = click.DateTime(formats = ["%Y-%m"]), help = "Defaults to last month.")
+@click.option("--out", "out_dir", type = click.Path(file_okay = False), help = "Defaults to STATEMENTS_DIR.")
+@click.option("--workers", type = int, help = "Worker processes; defaults to the CPU count.")
+@click.option("--chunk-size", type = int, default = STATEMENT_CHUNK_SIZE, show_default = True)
+@click.option("--force", is_flag = True, help = "Redo groups whose statements already exist.")
+def generate_command(month, out_dir, workers, chunk_size, force):
+  """Write every group's statement for a month."""
+  if month is None:
+    this_month, _ = month_bounds(datetime.utcnow())
+    month, _ = month_bounds(this_month - timedelta(days = 1))
+  totals = generate_statements(month, out_dir, workers, chunk_size, force)
+  rate = totals["written"] / totals["seconds"] if totals["seconds"] else 0
+  click.echo(
+    f"{month:%Y-%m}: wrote {totals['written']} of {totals['groups']} groups in {totals['seconds']:.1f} s "
+    f"({rate:,.1f} groups/s); {totals['already_done']} already done, {totals['archived']} archived"
+  )
+
+
+def init_app(app):
+  app.cli.add_command(statements_cli)
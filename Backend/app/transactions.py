@@ -0,0 +1,115 @@
+"""
+Unit of work spanning several service calls.
+
+Service functions commit their own work, which is right for a single call
+from a request. A composite operation (create a group, add its members,
+post the first expense) would pay for a transaction and fsync per call and
+could stop half way. Wrapped in `billnest_transaction()`, the services'
+commits become flushes, so ids and constraints are still checked as each
+call runs, and everything is committed once when the block exits:
+
+    with billnest_transaction():
+      group = create_group("Flat", alice)
+      for user in housemates:
+        add_user_to_group(group, user)
+      create_expense(group, alice, "Deposit", total, splits, when)
+
+An exception leaving the block rolls all of it back. Blocks nest: inner
+blocks join the outermost one, which alone commits or rolls back.
+
+With sharding on, the commit is one transaction per database touched
+(global plus the group's shard), committed one after another.
+
+Expenses and settlements carry a version column that every UPDATE bumps
+and checks. A write that lost a race with another request raises
+ConcurrentUpdateError once its work is rolled back; the caller can reload
+and try again.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.extensions import db
+
+_DEPTH = "billnest_transaction_depth"
+_ON_COMMIT = "billnest_transaction_on_commit"
+
+
+class ConcurrentUpdateError(ValueError):
+  """A row changed (or went) between reading it and writing it; reload and retry."""
+
+
+def in_transaction():
+  """True inside a `billnest_transaction()` block."""
+  return db.session.info.get(_DEPTH, 0) > 0
+
+
+@contextmanager
+def billnest_transaction():
+  session = db.session
+  depth = session.info.get(_DEPTH, 0)
+  session.info[_DEPTH] = depth + 1
+  if depth == 0:
+    session.info[_ON_COMMIT] = []
+
+  try:
+    yield session
+  except BaseException:
+    session.info[_DEPTH] = depth
+    if depth == 0:
+      session.info.pop(_ON_COMMIT, None)
+      session.rollback()
+    raise
+
+  session.info[_DEPTH] = depth
+  if depth == 0:
+    callbacks = session.info.pop(_ON_COMMIT, [])
+    try:
+      session.commit()
+    except StaleDataError as error:
+      session.rollback()
+      raise ConcurrentUpdateError(str(error)) from error
+    except BaseException:
+      session.rollback()
+      raise
+    for callback in callbacks:
+      callback()
+
+
+def commit():
+  """
+  What services call instead of `db.session.commit()`: commits, or inside a
+  `billnest_transaction()` block only flushes and leaves the commit to the block.
+
+  Raises:
+      ConcurrentUpdateError: A versioned row was changed by someone else
+          since it was loaded; the work is rolled back.
+  """
+  try:
+    if in_transaction():
+      db.session.flush()
+    else:
+      db.session.commit()
+  except StaleDataError as error:
+    rollback()
+    raise ConcurrentUpdateError(str(error)) from error
+
+
+def rollback():
+  """
+  Roll back a service's failed work. Inside a `billnest_transaction()` block
+  this is left to the block, which rolls back when the exception reaches it.
+  """
+  if not in_transaction():
+    db.session.rollback()
+
+
+def on_commit(callback):
+  """
+  Run `callback()` once the work is committed: straight away outside a
+  block, after the outermost block commits inside one (never, if it rolls back).
+  """
+  if in_transaction():
+    db.session.info[_ON_COMMIT].append(callback)
+  else:
+    callback()
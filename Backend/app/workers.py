@@ -0,0 +1,67 @@
+"""
+Fanning batch work out to worker processes.
+
+`map_chunks(fn, chunks)` calls `fn(chunk)` for every chunk in a process
+pool forked from the current app, and yields the results as chunks
+finish, so the caller can stream them out instead of holding them all.
+Each worker reuses the parent's app and opens connections of its own;
+`fn` runs in an app context, with the session removed after each chunk.
+
+`fn` must be picklable: a module-level function, or a functools.partial
+of one. With one worker, or an in-memory database the workers couldn't
+see, the chunks are done one after another in this process instead.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from flask import current_app
+
+from app.extensions import db
+
+
+def map_chunks(fn, chunks, workers = None):
+  """
+  fn(chunk) for each chunk, across worker processes.
+
+  Args:
+      fn (callable): Called with one chunk; returns something picklable.
+      chunks (list): The work, already split up.
+      workers (int, optional): Worker processes; defaults to the CPU count.
+
+  Yields:
+      fn's results, in the order the chunks finish (chunk order in-process).
+  """
+  workers = min(workers or os.cpu_count() or 1, len(chunks))
+  if workers <= 1 or db.engine.url.database in (None, "", ":memory:"):
+    for chunk in chunks:
+      yield fn(chunk)
+    return
+
+  app = current_app._get_current_object()
+  with ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context("fork"),
+                           initializer = _init_worker, initargs = (app,)) as pool:
+    futures = [pool.submit(_run_chunk, fn, chunk) for chunk in chunks]
+    for future in as_completed(futures):
+      yield future.result()
+
+
+_worker_app = None
+
+
+def _init_worker(app):
+  # The parent's pooled connections came along with the fork; forget them
+  # without closing them, which would close them for the parent too
+  global _worker_app
+  _worker_app = app
+  with app.app_context():
+    for engine in db.engines.values():
+      engine.dispose(close = False)
+
+
+def _run_chunk(fn, chunk):
+  with _worker_app.app_context():
+    try:
+      return fn(chunk)
+    finally:
+      db.session.remove()
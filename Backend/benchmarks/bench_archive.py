@@ -0,0 +1,120 @@
+"""
+Balance and listing reads for a long-lived group, before and after archiving.
+
+Seeds one household group with --years of daily expenses (split between
+--members) plus a confirmed settlement a week, then times the reads that
+scale with history. All history older than --keep-days is then archived and
+the same reads are timed again; the figures must not change.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_archive --years 5 --members 4 --keep-days 90
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.archive import archive_group_history
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit, Settlement
+from app.services.balance_service import calculate_group_balances, get_group_obligations, get_user_net_balance
+from app.services.expense_service import get_group_expenses
+from app.services.group_service import get_user_dashboard
+
+
+def seed(years, member_count, today):
+  """One group with a daily expense and a weekly confirmed settlement going back `years`."""
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [
+    {"name": f"U{i}", "email": f"u{i}@bench.test", "password_hash": "x"} for i in range(member_count)
+  ])
+  members = db.session.scalars(select(User.id).order_by(User.id)).all()
+  group_id = connection.execute(insert(Group.__table__).values(name = "Household", created_by = members[0])).inserted_primary_key[0]
+  connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": u, "role": "member"} for u in members])
+
+  share = Decimal("10.00")
+  days = years * 365
+  expenses = [
+    {"group_id": group_id, "created_by": members[d % member_count], "description": f"Shop {d}",
+     "total_amount": share * member_count, "date": today - timedelta(days = days - d), "created_at": today - timedelta(days = days - d)}
+    for d in range(days)
+  ]
+  connection.execute(insert(Expense.__table__), expenses)
+  expense_ids = db.session.scalars(select(Expense.id).order_by(Expense.id)).all()
+  connection.execute(insert(ExpenseSplit.__table__), [
+    {"expense_id": expense_id, "user_id": u, "amount_owed": share} for expense_id in expense_ids for u in members
+  ])
+  connection.execute(insert(Settlement.__table__), [
+    {"group_id": group_id, "from_user_id": members[(w + 1) % member_count], "to_user_id": members[w % member_count],
+     "amount": Decimal("15.00"), "status": "confirmed", "created_at": today - timedelta(days = days - w * 7)}
+    for w in range(days // 7)
+  ])
+  db.session.commit()
+  return group_id, members
+
+
+def timed(fn, repeat = 5):
+  best = float("inf")
+  for _ in range(repeat):
+    db.session.expire_all()
+    began = time.perf_counter()
+    result = fn()
+    best = min(best, time.perf_counter() - began)
+  return best * 1000, result
+
+
+def measure(group_id, user_id):
+  group = db.session.get(Group, group_id)
+  user = db.session.get(User, user_id)
+  reads = {
+    "calculate_group_balances": lambda: dict(calculate_group_balances(group)),
+    "get_group_obligations": lambda: {d: dict(c) for d, c in get_group_obligations(group).items()},
+    "get_user_net_balance": lambda: get_user_net_balance(group, user_id),
+    "get_user_dashboard": lambda: [(d["net_balance"], d["expense_count"], d["total_spent"]) for d in get_user_dashboard(user)],
+    "get_group_expenses": lambda: len(get_group_expenses(group)),
+  }
+  return {name: timed(read) for name, read in reads.items()}
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--years", type = int, default = 5)
+  parser.add_argument("--members", type = int, default = 4)
+  parser.add_argument("--keep-days", type = int, default = 90, help = "history kept hot")
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    today = datetime.utcnow().replace(hour = 0, minute = 0, second = 0, microsecond = 0)
+    group_id, members = seed(args.years, args.members, today)
+    print(f"{args.years} years, {args.members} members: {args.years * 365} expenses, "
+          f"{args.years * 365 * args.members} splits, {args.years * 365 // 7} settlements")
+
+    hot = measure(group_id, members[0])
+
+    began = time.perf_counter()
+    archived = archive_group_history(db.session.get(Group, group_id), today - timedelta(days = args.keep_days))
+    print(f"archived {archived['expenses']} expenses and {archived['settlements']} settlements "
+          f"in {time.perf_counter() - began:.2f} s (keeping {args.keep_days} days hot)")
+
+    cold = measure(group_id, members[0])
+    for name in hot:
+      (before_ms, before), (after_ms, after) = hot[name], cold[name]
+      note = "" if name == "get_group_expenses" or before == after else "  RESULT CHANGED"
+      print(f"{name:26} {before_ms:9.2f} ms -> {after_ms:8.2f} ms  ({before_ms / after_ms:5.1f}x){note}")
+
+
+if __name__ == "__main__":
+  main()
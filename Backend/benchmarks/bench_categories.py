@@ -0,0 +1,125 @@
+"""
+Categorisation throughput, in expenses per second.
+
+1. Matching: --descriptions realistic descriptions (a few hundred distinct
+   ones, repeated as real histories are) categorised by the combined
+   matcher, one by one and with categorize_many, against trying one regex
+   per rule in turn. All three must agree.
+2. Backfill: --expenses uncategorised expenses in a temp-file SQLite
+   database categorised by backfill_categories, end to end.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_categories --descriptions 1000000 --expenses 200000
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.categories import Categorizer, DEFAULT_RULES, _keyword_pattern, backfill_categories
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense
+
+WORDS = ["weekly", "big", "shop", "for", "the", "flat", "March", "April", "bill", "split", "with", "Bob", "share",
+         "night", "trip", "gift", "misc", "stuff", "payment", "top up", "annual", "renewal", "party", "Alice's"]
+KEYWORDS = [keyword for rule in DEFAULT_RULES.values() for keyword in rule.get("keywords", ())]
+
+
+def descriptions(count, distinct, rng):
+  """count descriptions drawn from `distinct` made-up ones, a third of which match no rule."""
+  pool = []
+  for i in range(distinct):
+    words = rng.sample(WORDS, rng.randint(1, 4))
+    if i % 3:
+      words.insert(rng.randrange(len(words) + 1), rng.choice(KEYWORDS).title())
+    pool.append(" ".join(words))
+  return [rng.choice(pool) for _ in range(count)]
+
+
+def per_rule(rules):
+  """The naive matcher: one compiled regex per rule, tried in order, earliest match kept."""
+  compiled = []
+  for category, rule in rules.items():
+    for keyword in rule.get("keywords", ()):
+      compiled.append((category, re.compile(_keyword_pattern(keyword), re.IGNORECASE)))
+    for pattern in rule.get("patterns", ()):
+      compiled.append((category, re.compile(pattern, re.IGNORECASE)))
+
+  def categorize(description):
+    best = None
+    for i, (category, regex) in enumerate(compiled):
+      match = regex.search(description)
+      if match and (best is None or match.start() < best[0]):
+        best = (match.start(), i, category)
+    return best[2] if best else None
+  return categorize
+
+
+def timed(fn):
+  began = time.perf_counter()
+  result = fn()
+  return time.perf_counter() - began, result
+
+
+def seed(expense_count, rng):
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [{"name": "A", "email": "a@bench.test", "password_hash": "x"}])
+  user_id = db.session.scalar(select(User.id))
+  group_id = connection.execute(insert(Group.__table__).values(name = "Flat", created_by = user_id)).inserted_primary_key[0]
+  connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": user_id, "role": "admin"}])
+  texts = descriptions(expense_count, 500, rng)
+  for start in range(0, expense_count, 50000):
+    connection.execute(insert(Expense.__table__), [
+      {"group_id": group_id, "created_by": user_id, "description": text, "total_amount": Decimal("10.00"),
+       "date": datetime(2026, 1, 1)}
+      for text in texts[start:start + 50000]
+    ])
+  db.session.commit()
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--descriptions", type = int, default = 1000000)
+  parser.add_argument("--distinct", type = int, default = 500, help = "distinct descriptions among them")
+  parser.add_argument("--expenses", type = int, default = 200000, help = "expenses to backfill")
+  args = parser.parse_args()
+  rng = random.Random(0)
+
+  texts = descriptions(args.descriptions, args.distinct, rng)
+  categorizer = Categorizer(DEFAULT_RULES)
+  naive = per_rule(DEFAULT_RULES)
+  rule_count = sum(len(rule.get("keywords", ())) + len(rule.get("patterns", ())) for rule in DEFAULT_RULES.values())
+
+  naive_s, expected = timed(lambda: [naive(text) for text in texts])
+  single_s, single = timed(lambda: [categorizer.categorize(text) for text in texts])
+  bulk_s, bulk = timed(lambda: categorizer.categorize_many(texts))
+  print(f"{args.descriptions} descriptions ({args.distinct} distinct), {rule_count} rules")
+  for name, seconds, result in (("one regex per rule", naive_s, expected), ("combined matcher", single_s, single),
+                                ("combined, bulk", bulk_s, bulk)):
+    note = "" if result == expected else "  RESULTS DIFFER"
+    print(f"  {name:20} {seconds:7.2f} s  {len(texts) / seconds:>12,.0f} expenses/s{note}")
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    seed(args.expenses, rng)
+    totals = backfill_categories()
+    print(f"backfill: {totals['scanned']} expenses, {totals['categorized']} categorised in {totals['seconds']:.2f} s "
+          f"({totals['scanned'] / totals['seconds']:,.0f} expenses/s)")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,154 @@
+"""
+Stress test of racing settlement confirmations and rejections.
+
+--threads threads, each with its own app context and session on one
+temp-file SQLite database, work through the same --settlements pending
+settlements in their own random order, confirming or rejecting each. A
+thread that gets ConcurrentUpdateError reloads the settlement and tries
+again, which then fails validation (it is no longer pending) unless it won.
+
+Run optimistically (version checks only) and with every read-check-write
+behind one process-wide lock, the only safe option before versioning.
+Either way each settlement must end up resolved exactly once, at version 2,
+with one change-log entry; any other outcome exits non-zero.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_concurrency --threads 16 --settlements 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from decimal import Decimal
+
+from sqlalchemy import delete, insert, select, func
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Settlement, GroupChange
+from app.services.settlement_service import confirm_settlement, reject_settlement
+from app.transactions import ConcurrentUpdateError
+
+
+def seed(settlement_count):
+  """A group of two, Bob owing Alice; returns (alice id, settlement ids)."""
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [
+    {"name": name, "email": f"{name}@bench.test", "password_hash": "x"} for name in ("alice", "bob")
+  ])
+  alice, bob = db.session.scalars(select(User.id).order_by(User.id)).all()
+  group_id = connection.execute(insert(Group.__table__).values(name = "Flat", created_by = alice)).inserted_primary_key[0]
+  connection.execute(insert(Membership.__table__), [
+    {"group_id": group_id, "user_id": user_id, "role": "admin"} for user_id in (alice, bob)
+  ])
+  connection.execute(insert(Settlement.__table__), [
+    {"group_id": group_id, "from_user_id": bob, "to_user_id": alice, "amount": Decimal("1.00"), "status": "pending"}
+    for _ in range(settlement_count)
+  ])
+  db.session.commit()
+  return alice, db.session.scalars(select(Settlement.id).order_by(Settlement.id)).all()
+
+
+def race(app, alice_id, ids, thread_count, lock):
+  """Every thread through every settlement; returns (seconds, Counter of outcomes)."""
+  outcomes = Counter()
+  outcomes_lock = threading.Lock()
+  start = threading.Barrier(thread_count + 1)
+
+  def worker(seed):
+    rng = random.Random(seed)
+    counts = Counter()
+    with app.app_context():
+      alice = db.session.get(User, alice_id)
+      start.wait()
+      for settlement_id in rng.sample(ids, len(ids)):
+        while True:
+          with lock or nullcontext():
+            settlement = db.session.get(Settlement, settlement_id)
+            try:
+              if rng.random() < 0.5:
+                confirm_settlement(settlement, alice)
+              else:
+                reject_settlement(settlement, alice_id)
+              counts["won"] += 1
+            except ConcurrentUpdateError:
+              counts["conflict"] += 1
+              continue
+            except ValueError:
+              counts["already resolved"] += 1
+            except Exception as error:
+              counts[f"error: {type(error).__name__}: {error}"] += 1
+            break
+      db.session.remove()
+    with outcomes_lock:
+      outcomes.update(counts)
+
+  threads = [threading.Thread(target = worker, args = (seed,)) for seed in range(thread_count)]
+  for thread in threads:
+    thread.start()
+  start.wait()
+  began = time.perf_counter()
+  for thread in threads:
+    thread.join()
+  return time.perf_counter() - began, outcomes
+
+
+def check(ids):
+  """Problems with the outcome: anything but one resolution and one change-log entry per settlement."""
+  problems = []
+  rows = db.session.execute(select(Settlement.status, Settlement.version).where(Settlement.id.in_(ids))).all()
+  if {version for _, version in rows} != {2} or any(status == "pending" for status, _ in rows):
+    problems.append(f"status/version: {Counter(rows)}")
+  logged = db.session.scalar(
+    select(func.count()).select_from(GroupChange).where(GroupChange.entity == "settlement", GroupChange.op == "update")
+  )
+  if logged != len(ids):
+    problems.append(f"{logged} change-log entries for {len(ids)} settlements")
+  return problems
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--threads", type = int, default = 16)
+  parser.add_argument("--settlements", type = int, default = 2000)
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    # A session keeps its connection between calls: one per thread
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": args.threads + 1}
+
+  app = create_app(BenchConfig)
+  failed = False
+  print(f"{args.threads} threads racing over {args.settlements} settlements")
+  for name, lock in (("optimistic", None), ("one global lock", threading.Lock())):
+    with app.app_context():
+      db.drop_all()
+      db.create_all()
+      alice_id, ids = seed(args.settlements)
+    seconds, outcomes = race(app, alice_id, ids, args.threads, lock)
+    with app.app_context():
+      problems = check(ids)
+      if outcomes["won"] != len(ids):
+        problems.append(f"{outcomes['won']} wins for {len(ids)} settlements")
+      db.session.execute(delete(GroupChange))
+      db.session.commit()
+    attempts = sum(outcomes.values())
+    print(f"  {name:16} {seconds:6.2f} s  {len(ids) / seconds:8,.0f} settlements/s  "
+          f"{attempts / seconds:8,.0f} calls/s  {dict(outcomes)}")
+    for problem in problems:
+      print(f"    FAILED: {problem}")
+    failed = failed or bool(problems)
+  sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,79 @@
+"""
+Dashboard load time for a user in 1 vs many groups.
+
+Compares get_user_dashboard (one aggregate query) with the per-group approach
+of get_user_groups + calculate_group_balances for every group.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_dashboard --groups 1 10 100 --expenses 50
+"""
+import argparse
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit
+from app.services.balance_service import calculate_group_balances
+from app.services.group_service import get_user_dashboard, get_user_groups
+
+
+class BenchConfig(Config):
+  SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+
+def seed(group_count, expenses_per_group):
+  """Create a user in group_count groups, each with a partner and some expenses."""
+  user = User(name = "Bench", email = f"bench{group_count}@bench.test", password_hash = "x")
+  partner = User(name = "Partner", email = f"partner{group_count}@bench.test", password_hash = "x")
+  db.session.add_all([user, partner])
+  db.session.flush()
+
+  for g in range(group_count):
+    group = Group(name = f"Group {g}", created_by = user.id)
+    group.memberships = [Membership(user_id = user.id, role = "admin"), Membership(user_id = partner.id)]
+    db.session.add(group)
+    db.session.flush()
+
+    for e in range(expenses_per_group):
+      expense = Expense(group_id = group.id, created_by = user.id if e % 2 else partner.id,
+                        description = "Bench", total_amount = Decimal("20.00"), date = datetime(2026, 1, 1))
+      expense.splits = [ExpenseSplit(user_id = user.id, amount_owed = Decimal("10.00")),
+                        ExpenseSplit(user_id = partner.id, amount_owed = Decimal("10.00"))]
+      db.session.add(expense)
+
+  db.session.commit()
+  return user.id
+
+
+def timed(fn, repeat = 5):
+  best = float("inf")
+  for _ in range(repeat):
+    db.session.expire_all()
+    began = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - began)
+  return best * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--groups", type = int, nargs = "+", default = [1, 10, 100])
+  parser.add_argument("--expenses", type = int, default = 50, help = "expenses per group")
+  args = parser.parse_args()
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+
+    for group_count in args.groups:
+      user = db.session.get(User, seed(group_count, args.expenses))
+      dashboard_ms = timed(lambda: get_user_dashboard(user))
+      per_group_ms = timed(lambda: [calculate_group_balances(db.session.get(Group, g.id)) for g in get_user_groups(user)])
+      print(f"groups={group_count:<4} dashboard {dashboard_ms:8.2f} ms   per-group balances {per_group_ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+  main()
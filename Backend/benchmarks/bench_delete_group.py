@@ -0,0 +1,132 @@
+"""
+Deleting a large group: ORM cascade vs chunked set-based deletes.
+
+The ORM path loads every expense and split into the session and deletes them
+one by one in a single transaction, as `db.session.delete(group)` used to
+with `cascade="all, delete-orphan"`. `delete_group` issues bounded DELETEs
+and commits between chunks. Reported per run: total time, peak Python memory
+and the longest single write transaction (how long other writers would wait).
+
+Usage (from Backend/):
+    python -m benchmarks.bench_delete_group --expenses 100000 --splits 5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import selectinload
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit
+from app.services.group_service import delete_group
+
+
+def seed(expense_count, splits_per_expense):
+  users = [User(name = f"U{i}", email = f"u{i}@bench.test", password_hash = "x") for i in range(splits_per_expense)]
+  db.session.add_all(users)
+  db.session.flush()
+
+  group = Group(name = "Big", created_by = users[0].id)
+  group.memberships = [Membership(user_id = u.id, role = "admin") for u in users]
+  db.session.add(group)
+  db.session.flush()
+
+  connection = db.session.connection()
+  batch = 5000
+  for start in range(0, expense_count, batch):
+    rows = [
+      {"group_id": group.id, "created_by": users[0].id, "description": f"Expense {i}",
+       "total_amount": Decimal("50.00"), "date": datetime(2026, 1, 1)}
+      for i in range(start, min(start + batch, expense_count))
+    ]
+    ids = connection.execute(insert(Expense.__table__).returning(Expense.__table__.c.id), rows).scalars().all()
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": expense_id, "user_id": u.id, "amount_owed": Decimal("10.00")} for expense_id in ids for u in users
+    ])
+
+  db.session.commit()
+  return group.id, users[0].id
+
+
+def orm_cascade_delete(group_id, user_id):
+  group = db.session.get(Group, group_id)
+  expenses = db.session.scalars(
+    select(Expense).where(Expense.group_id == group_id).options(selectinload(Expense.splits))
+  ).all()
+  for expense in expenses:
+    db.session.delete(expense)
+  db.session.delete(group)
+  db.session.commit()
+
+
+def chunked_delete(chunk_size):
+  def run(group_id, user_id):
+    delete_group(db.session.get(Group, group_id), db.session.get(User, user_id), chunk_size = chunk_size)
+  return run
+
+
+def measure(config, fn, expense_count, splits_per_expense):
+  app = create_app(config)
+  with app.app_context():
+    db.create_all()
+    group_id, user_id = seed(expense_count, splits_per_expense)
+    db.session.remove()
+
+    transactions = []
+    session = db.session()
+
+    @event.listens_for(session, "after_begin")
+    def _began(session, transaction, connection):
+      transactions.append([time.perf_counter(), None])
+
+    @event.listens_for(session, "after_commit")
+    def _committed(session):
+      transactions[-1][1] = time.perf_counter()
+
+    tracemalloc.start()
+    began = time.perf_counter()
+    fn(group_id, user_id)
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    longest = max(end - start for start, end in transactions if end is not None)
+    db.session.remove()
+    db.drop_all()
+
+  return elapsed, peak, longest
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--expenses", type = int, default = 100000)
+  parser.add_argument("--splits", type = int, default = 5, help = "splits per expense")
+  parser.add_argument("--chunks", type = int, nargs = "+", default = [1000, 5000])
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+  try:
+    class BenchConfig(Config):
+      SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+    runs = [("orm cascade", orm_cascade_delete)]
+    runs += [(f"chunked {chunk}", chunked_delete(chunk)) for chunk in args.chunks]
+
+    print(f"{args.expenses} expenses, {args.expenses * args.splits} splits")
+    for label, fn in runs:
+      elapsed, peak, longest = measure(BenchConfig, fn, args.expenses, args.splits)
+      print(f"{label:<14} total {elapsed:7.2f}s  peak memory {peak / 2**20:8.1f} MiB  longest transaction {longest * 1000:8.1f} ms")
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,134 @@
+"""
+Group balances for a large multi-currency group.
+
+Seeds one GBP group whose expenses are spread over --currencies currencies
+and a year of days, then times calculate_group_balances (expenses streamed
+in expense order, rates memoized per currency and day, each batch
+converted and allocated to the cent at once) against converting row by row
+with a fresh rate lookup per split, rounding each split on its own. The
+row-by-row balances drift off zero by the rounding they accumulate.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_fx --expenses 10000 100000 --currencies 4
+"""
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import insert, select, delete
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.fx import get_fx_rates
+from app.models import User, Group, Membership, Expense, ExpenseSplit
+from app.services.balance_service import calculate_group_balances
+from app.services.split_service import CENT
+
+MEMBERS = 12
+SPLITS_PER_EXPENSE = 3
+CURRENCIES = ["EUR", "USD", "CHF", "SEK", "NOK", "JPY", "PLN", "CZK"]
+FIRST_DAY = date(2025, 1, 1)
+
+
+def rate_rows(currencies):
+  """A business day's rate for each currency over a year, per euro."""
+  rows = []
+  for d in range(366):
+    day = FIRST_DAY + timedelta(days = d)
+    if day.weekday() >= 5:
+      continue
+    rows.append((day, "GBP", Decimal("0.85") + Decimal(d % 7) / 1000))
+    for i, currency in enumerate(currencies):
+      if currency != "EUR":
+        rows.append((day, currency, Decimal(i + 1) + Decimal(d % 11) / 100))
+  return rows
+
+
+def seed(expense_count, currencies):
+  connection = db.session.connection()
+  for model in (ExpenseSplit, Expense, Membership, Group):
+    connection.execute(delete(model.__table__))
+  if not db.session.scalar(select(User.id).limit(1)):
+    connection.execute(insert(User.__table__), [
+      {"name": f"U{i}", "email": f"u{i}@bench.test", "password_hash": "x"} for i in range(MEMBERS)
+    ])
+  members = db.session.scalars(select(User.id).order_by(User.id)).all()
+  group_id = connection.execute(insert(Group.__table__).values(name = "Trips", created_by = members[0])).inserted_primary_key[0]
+  connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": u, "role": "member"} for u in members])
+
+  for start in range(0, expense_count, 50000):
+    batch = range(start, min(start + 50000, expense_count))
+    rows = [
+      {"group_id": group_id, "created_by": members[e % MEMBERS], "description": "Bench",
+       "total_amount": Decimal("10.00"), "currency": (["GBP"] + currencies)[e % (len(currencies) + 1)],
+       "date": datetime.combine(FIRST_DAY + timedelta(days = e % 365), datetime.min.time())}
+      for e in batch
+    ]
+    first_id = connection.execute(insert(Expense.__table__).values(**rows[0])).inserted_primary_key[0]
+    connection.execute(insert(Expense.__table__), rows[1:])
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": first_id + i, "user_id": members[(e + s) % MEMBERS], "amount_owed": amount}
+      for i, e in enumerate(batch)
+      for s, amount in enumerate((Decimal("3.34"), Decimal("3.33"), Decimal("3.33")))
+    ])
+  db.session.commit()
+  return group_id
+
+
+def row_by_row(group):
+  """Convert every split on its own, with an uncached rate lookup each time."""
+  fx = get_fx_rates()
+  balances = defaultdict(lambda: Decimal("0.00"))
+  for expense in group.expenses:
+    rate = lambda: Decimal(1) if expense.currency == group.base_currency else (
+      fx._per_reference(group.base_currency, expense.date.date()) / fx._per_reference(expense.currency, expense.date.date())
+    )
+    balances[expense.created_by] += (expense.total_amount * rate()).quantize(CENT, rounding = ROUND_HALF_UP)
+    for split in expense.splits:
+      balances[split.user_id] -= (split.amount_owed * rate()).quantize(CENT, rounding = ROUND_HALF_UP)
+  return dict(balances)
+
+
+def timed(fn, group_id, rates):
+  """One run from a cold session and a freshly loaded rate table."""
+  db.session.expunge_all()
+  get_fx_rates().load(rates)
+  group = db.session.get(Group, group_id)
+  began = time.perf_counter()
+  result = fn(group)
+  return (time.perf_counter() - began) * 1000, result
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--expenses", type = int, nargs = "+", default = [10000, 100000])
+  parser.add_argument("--currencies", type = int, default = 4, help = "foreign currencies besides GBP")
+  args = parser.parse_args()
+  currencies = CURRENCIES[:args.currencies]
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    fx = get_fx_rates()
+    rates = rate_rows(currencies)
+    for expense_count in args.expenses:
+      group_id = seed(expense_count, currencies)
+      batched_ms, batched = timed(lambda group: dict(calculate_group_balances(group)), group_id, rates)
+      lookups = len(fx._cache)
+      rows_ms, rows = timed(row_by_row, group_id, rates)
+      print(f"expenses={expense_count:<8} batched {batched_ms:9.1f} ms ({lookups} rate lookups, sum {sum(batched.values())})"
+            f"   row by row {rows_ms:9.1f} ms (sum {sum(rows.values())})")
+
+
+if __name__ == "__main__":
+  main()
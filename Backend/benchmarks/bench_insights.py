@@ -0,0 +1,126 @@
+"""
+Insight queries: aggregating ORM rows vs the columnar split snapshot.
+
+Reports, for spend per user per month over every split:
+  - ORM: load splits joined to expenses and aggregate in Python (time, peak memory)
+  - snapshot: full build (time, array bytes), each insight query, and an
+    incremental refresh after new expenses arrive
+
+Usage (from Backend/):
+    python -m benchmarks.bench_insights --splits 200000
+"""
+import argparse
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.analytics import get_snapshot
+from app.models import User, Group, Expense, ExpenseSplit
+from app.services.insight_service import spend_per_user_per_month, top_payers, subscription_share_of_spend
+
+
+class BenchConfig(Config):
+  SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+
+def seed(split_count, users_per_group = 4, groups = 100, members = 50):
+  users = [User(name = f"U{i}", email = f"u{i}@bench.test", password_hash = "x") for i in range(members)]
+  db.session.add_all(users)
+  db.session.flush()
+  group_rows = [Group(name = f"G{i}", created_by = users[0].id) for i in range(groups)]
+  db.session.add_all(group_rows)
+  db.session.flush()
+
+  add_expenses(split_count // users_per_group, [g.id for g in group_rows], [u.id for u in users], users_per_group)
+
+
+def add_expenses(expense_count, group_ids, user_ids, users_per_group, seed = 0):
+  rng = np.random.default_rng(seed)
+  connection = db.session.connection()
+  start = datetime(2024, 1, 1)
+
+  for batch_start in range(0, expense_count, 10000):
+    batch = min(10000, expense_count - batch_start)
+    payers = rng.choice(user_ids, size = batch)
+    rows = [
+      {"group_id": int(rng.choice(group_ids)), "created_by": int(payer), "description": "x",
+       "total_amount": Decimal(users_per_group * 10), "date": start + timedelta(days = int(rng.integers(0, 730)))}
+      for payer in payers
+    ]
+    ids = connection.execute(insert(Expense.__table__).returning(Expense.__table__.c.id), rows).scalars().all()
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": expense_id, "user_id": int(user_id), "amount_owed": Decimal("10.00")}
+      for expense_id in ids for user_id in rng.choice(user_ids, size = users_per_group, replace = False)
+    ])
+  db.session.commit()
+
+
+def orm_spend_per_user_per_month():
+  totals = defaultdict(lambda: Decimal("0.00"))
+  for split, expense in db.session.execute(
+    select(ExpenseSplit, Expense).join(Expense, ExpenseSplit.expense_id == Expense.id)
+  ):
+    totals[(split.user_id, expense.date.year * 100 + expense.date.month)] += split.amount_owed
+  return totals
+
+
+def timed(fn, repeat = 5):
+  best = float("inf")
+  for _ in range(repeat):
+    began = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - began)
+  return best * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--splits", type = int, default = 200_000)
+  args = parser.parse_args()
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    seed(args.splits)
+    print(f"{args.splits} splits")
+
+    tracemalloc.start()
+    began = time.perf_counter()
+    orm_spend_per_user_per_month()
+    orm_ms = (time.perf_counter() - began) * 1000
+    orm_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.session.expunge_all()
+    print(f"ORM spend/user/month     {orm_ms:9.1f} ms   peak memory {orm_peak / 2**20:7.1f} MiB")
+
+    snapshot = get_snapshot()
+    began = time.perf_counter()
+    snapshot.rebuild()
+    build_ms = (time.perf_counter() - began) * 1000
+    print(f"snapshot build           {build_ms:9.1f} ms   arrays      {snapshot.nbytes / 2**20:7.1f} MiB")
+
+    group_ids = list(range(1, 11))
+    for label, fn in [
+      ("spend/user/month", spend_per_user_per_month),
+      ("spend/user/month 10 grp", lambda: spend_per_user_per_month(group_ids = group_ids)),
+      ("top payers", top_payers),
+      ("subscription share", subscription_share_of_spend),
+    ]:
+      print(f"snapshot {label:<23} {timed(fn):7.1f} ms")
+
+    add_expenses(250, group_ids, list(range(1, 51)), 4, seed = 1)
+    began = time.perf_counter()
+    snapshot.refresh()
+    print(f"incremental refresh (1000 new splits) {(time.perf_counter() - began) * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+  main()
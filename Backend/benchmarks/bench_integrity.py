@@ -0,0 +1,132 @@
+"""
+Ledger integrity check throughput, in groups per second.
+
+Seeds --groups groups of --members members with --expenses expenses each
+(and a confirmed settlement a month) in a temp-file SQLite database, and
+corrupts one split in every hundredth group. Then checks every group:
+
+  - per group and per row in Python, the way a check had to be written
+    against the services (each expense's splits loaded and summed, each
+    settlement's users looked up in the group's memberships),
+  - run_integrity_check in this process (--workers 1),
+  - run_integrity_check across --workers processes,
+
+and finally an incremental run after a tenth of the groups changed.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_integrity --groups 2000 --members 5 --expenses 200 --workers 8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select, update
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.integrity import run_integrity_check
+from app.models import User, Group, Membership, Expense, ExpenseSplit, Settlement
+from app.services.change_service import record_changes
+from app.services.expense_service import get_group_expenses
+
+
+def seed(group_count, member_count, expense_count):
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [
+    {"name": f"U{i}", "email": f"u{i}@bench.test", "password_hash": "x"} for i in range(group_count * member_count)
+  ])
+  users = db.session.scalars(select(User.id).order_by(User.id)).all()
+  step = timedelta(days = 365) / expense_count
+  share = Decimal("5.00")
+  for g in range(group_count):
+    members = users[g * member_count:(g + 1) * member_count]
+    group_id = connection.execute(insert(Group.__table__).values(name = f"Group {g}", created_by = members[0])).inserted_primary_key[0]
+    connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": u, "role": "member"} for u in members])
+    connection.execute(insert(Expense.__table__), [
+      {"group_id": group_id, "created_by": members[e % member_count], "description": f"Seed {e}",
+       "total_amount": share * member_count, "date": datetime(2026, 1, 1) + step * e}
+      for e in range(expense_count)
+    ])
+    expense_ids = db.session.scalars(
+      select(Expense.id).where(Expense.group_id == group_id).order_by(Expense.id)
+    ).all()
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": expense_id, "user_id": u, "amount_owed": share} for expense_id in expense_ids for u in members
+    ])
+    connection.execute(insert(Settlement.__table__), [
+      {"group_id": group_id, "from_user_id": members[1], "to_user_id": members[0], "amount": Decimal("20.00"),
+       "status": "confirmed", "created_at": datetime(2026, month, 10)}
+      for month in range(1, 13)
+    ])
+    if g % 100 == 0:
+      connection.execute(
+        update(ExpenseSplit).where(ExpenseSplit.expense_id == expense_ids[0], ExpenseSplit.user_id == members[0])
+        .values(amount_owed = Decimal("4.00"))
+      )
+  db.session.commit()
+
+
+def per_group_python():
+  findings = 0
+  for group_id in db.session.scalars(select(Group.id).order_by(Group.id)).all():
+    group = db.session.get(Group, group_id)
+    for expense in get_group_expenses(group, with_splits = True):
+      findings += sum(split.amount_owed for split in expense.splits) != expense.total_amount
+    member_ids = set(db.session.scalars(select(Membership.user_id).where(Membership.group_id == group_id)))
+    for settlement in db.session.scalars(select(Settlement).where(Settlement.group_id == group_id)):
+      findings += settlement.from_user_id not in member_ids or settlement.to_user_id not in member_ids
+    db.session.expunge_all()
+  return findings
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--groups", type = int, default = 2000)
+  parser.add_argument("--members", type = int, default = 5)
+  parser.add_argument("--expenses", type = int, default = 200, help = "expenses per group")
+  parser.add_argument("--workers", type = int, default = os.cpu_count())
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    INTEGRITY_DIR = os.path.join(tmpdir, "integrity")
+
+  try:
+    app = create_app(BenchConfig)
+    with app.app_context():
+      db.create_all()
+      seed(args.groups, args.members, args.expenses)
+      expected = (args.groups + 99) // 100
+      print(f"{args.groups} groups x {args.members} members x {args.expenses} expenses, {expected} corrupted")
+
+      began = time.perf_counter()
+      findings = per_group_python()
+      seconds = time.perf_counter() - began
+      assert findings == expected, findings
+      print(f"  per-group Python     {seconds:7.2f} s  {args.groups / seconds:8.1f} groups/s")
+
+      for workers in (1, args.workers):
+        totals = run_integrity_check(full = True, workers = workers)
+        assert (totals["groups"], totals["findings"]) == (args.groups, expected), totals
+        label = f"integrity x{workers}"
+        print(f"  {label:20} {totals['seconds']:7.2f} s  {args.groups / totals['seconds']:8.1f} groups/s")
+
+      # A tenth of the groups changed since the last run
+      for group_id in db.session.scalars(select(Group.id).order_by(Group.id)).all()[::10]:
+        record_changes(group_id, "group", [group_id], "resync")
+      db.session.commit()
+      totals = run_integrity_check(workers = args.workers)
+      print(f"  incremental          {totals['seconds']:7.2f} s  checked {totals['groups']} changed groups")
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+  main()
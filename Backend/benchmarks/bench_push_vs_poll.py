@@ -0,0 +1,136 @@
+"""
+Server load of thousands of mostly idle clients: polling vs SSE push.
+
+Every client is a member of one group (4 members per group). Over the run,
+a few expenses are written to random groups.
+
+  - polling: each client asks GET /groups/<id>/changes every --poll seconds.
+    One round over every client is timed (process CPU) and scaled per minute.
+  - push: each client is a Subscriber with a thread blocked in wait(), as a
+    /events connection is. Process CPU over --window seconds of writes is
+    measured (the writes themselves excluded, they happen either way), plus
+    one GET /changes per delivered event, priced from the polling round.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_push_vs_poll --clients 2000 --window 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.config import Config
+from app.events import get_broker
+from app.extensions import db
+from app.models import User, Group, Membership
+from app.services.expense_service import create_expense
+
+MEMBERS_PER_GROUP = 4
+
+
+def seed(client_count):
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [
+    {"name": f"U{i}", "email": f"u{i}@bench.test", "password_hash": "x"} for i in range(client_count)
+  ])
+  user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+  groups = []
+  for start in range(0, len(user_ids), MEMBERS_PER_GROUP):
+    members = user_ids[start:start + MEMBERS_PER_GROUP]
+    group_id = connection.execute(insert(Group.__table__).values(name = f"G{start}", created_by = members[0])).inserted_primary_key[0]
+    connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": u, "role": "member"} for u in members])
+    groups.append((group_id, members))
+  db.session.commit()
+  return groups
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--clients", type = int, default = 2000)
+  parser.add_argument("--poll", type = float, default = 5.0, help = "polling interval, seconds")
+  parser.add_argument("--window", type = float, default = 20.0, help = "seconds of push traffic to measure")
+  parser.add_argument("--writes", type = int, default = 30, help = "expenses written per minute")
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    groups = seed(args.clients)
+    client = app.test_client()
+    with app.test_request_context():
+      tokens = {u: create_access_token(identity = str(u)) for _, members in groups for u in members}
+
+    # Polling: one round over every client
+    began = time.process_time()
+    for group_id, members in groups:
+      for user_id in members:
+        response = client.get(f"/groups/{group_id}/changes?since=0", headers = {"Authorization": f"Bearer {tokens[user_id]}"})
+        assert response.status_code == 200
+    poll_cpu = (time.process_time() - began) / args.clients
+    polls_per_minute = args.clients * 60 / args.poll
+    print(f"{args.clients} clients, {args.writes} writes/min")
+    print(f"polling every {args.poll:g}s: {polls_per_minute:8.0f} requests/min  "
+          f"{poll_cpu * 1000:6.2f} ms CPU each  -> {poll_cpu * polls_per_minute:7.1f} CPU s/min")
+
+    # Push: a blocked thread per client
+    broker = get_broker()
+    stop = threading.Event()
+    delivered = [0]
+    lock = threading.Lock()
+
+    def listen(subscriber):
+      while not stop.is_set():
+        events = subscriber.wait(15)
+        with lock:
+          delivered[0] += len(events)
+
+    subscribers = [broker.subscribe(u, [group_id]) for group_id, members in groups for u in members]
+    threads = [threading.Thread(target = listen, args = (s,), daemon = True) for s in subscribers]
+    for thread in threads:
+      thread.start()
+    time.sleep(1)
+
+    users = {u: db.session.get(User, u) for _, members in groups for u in members}
+    interval = 60 / args.writes
+    write_cpu = 0.0
+    began, began_wall = time.process_time(), time.monotonic()
+    while time.monotonic() - began_wall < args.window:
+      group_id, members = random.choice(groups)
+      write_began = time.process_time()
+      create_expense(db.session.get(Group, group_id), users[members[0]], "Bench", Decimal("40.00"),
+                     {"type": "equal", "users": members}, datetime(2026, 3, 1))
+      write_cpu += time.process_time() - write_began
+      time.sleep(interval)
+    push_cpu = time.process_time() - began - write_cpu
+    elapsed = time.monotonic() - began_wall
+    time.sleep(1)  # let the last events land
+    with lock:
+      delivered_count = delivered[0]
+
+    stop.set()
+    for subscriber in subscribers:
+      subscriber.push(0, [], 0)
+    for thread in threads:
+      thread.join()
+
+    events_per_minute = delivered_count * 60 / elapsed
+    push_per_minute = push_cpu * 60 / elapsed + events_per_minute * poll_cpu
+    print(f"push ({len(threads)} open streams):  {events_per_minute:8.0f} events/min  "
+          f"idle+publish {push_cpu * 60 / elapsed:6.2f} CPU s/min  -> {push_per_minute:7.1f} CPU s/min with follow-up syncs")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,104 @@
+"""
+Listing a group's expenses and splits: ORM entities vs read-model views.
+
+Reports, for one group:
+  - ORM: group.expenses with each expense's splits (selectin-loaded)
+  - views: get_group_expenses(group, with_splits = True)
+with the best time of a few runs, and the peak traced memory per loaded row.
+Each ORM run starts from an empty identity map, as a new request would.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_read_models --expenses 1000 10000
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Expense, ExpenseSplit
+from app.services.expense_service import get_group_expenses
+
+SPLITS_PER_EXPENSE = 4
+
+
+class BenchConfig(Config):
+  SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+
+def seed(expense_count):
+  users = [User(name = f"U{i}", email = f"u{i}.{expense_count}@bench.test", password_hash = "x") for i in range(SPLITS_PER_EXPENSE)]
+  db.session.add_all(users)
+  db.session.flush()
+  group = Group(name = f"G{expense_count}", created_by = users[0].id)
+  db.session.add(group)
+  db.session.flush()
+
+  connection = db.session.connection()
+  start = datetime(2026, 1, 1)
+  ids = connection.execute(insert(Expense.__table__).returning(Expense.__table__.c.id), [
+    {"group_id": group.id, "created_by": users[i % len(users)].id, "description": f"Expense {i}",
+     "total_amount": Decimal("40.00"), "date": start + timedelta(minutes = i)}
+    for i in range(expense_count)
+  ]).scalars().all()
+  connection.execute(insert(ExpenseSplit.__table__), [
+    {"expense_id": expense_id, "user_id": user.id, "amount_owed": Decimal("10.00")}
+    for expense_id in ids for user in users
+  ])
+  db.session.commit()
+  return group.id
+
+
+def orm_listing(group_id):
+  db.session.expunge_all()
+  expenses = db.session.scalars(
+    select(Expense).where(Expense.group_id == group_id).options(selectinload(Expense.splits))
+  ).all()
+  return [(expense, list(expense.splits)) for expense in expenses]
+
+
+def view_listing(group_id):
+  return get_group_expenses(db.session.get(Group, group_id), with_splits = True)
+
+
+def measure(fn, repeat = 3):
+  best = float("inf")
+  for _ in range(repeat):
+    began = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - began)
+
+  tracemalloc.start()
+  result = fn()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  del result
+  return best * 1000, peak
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--expenses", type = int, nargs = "+", default = [1000, 10000])
+  args = parser.parse_args()
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+
+    for expense_count in args.expenses:
+      group_id = seed(expense_count)
+      rows = expense_count * (1 + SPLITS_PER_EXPENSE)
+      for label, fn in (("ORM  ", orm_listing), ("views", view_listing)):
+        ms, peak = measure(lambda: fn(group_id))
+        print(f"expenses={expense_count:<6} {label} {ms:8.1f} ms  {rows / ms:8.0f} rows/ms  "
+              f"peak {peak / 2**20:6.1f} MiB  {peak / rows:6.0f} B/row")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,110 @@
+"""
+Expense search latency: FTS5 index vs a LIKE '%...%' scan.
+
+Seeds a corpus of synthetic expenses (through the triggers, as the app would)
+and times ranked searches against the user's groups.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_search --expenses 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense
+from app.services.search_service import search_expenses
+
+WORDS = (
+  "airbnb hotel hostel ferry taxi uber train flight groceries dinner lunch breakfast coffee "
+  "rent electricity water internet netflix spotify gym cinema museum tickets petrol parking "
+  "pharmacy drinks pizza sushi market bakery laundry cleaning gift deposit insurance"
+).split()
+PLACES = "malta valletta paris rome london berlin lisbon madrid gozo dublin".split()
+# A long tail of merchant-like names, as real descriptions have
+MERCHANTS = [f"{a}{b}" for a in ("al", "be", "co", "du", "ex", "fi", "go", "ha", "in", "jo") for b in range(500)]
+
+QUERIES = ["airbnb", "that airbnb from last summer", "ferry gozo", "netflix", "dinner rome", "zzz"]
+
+
+def seed(expense_count, group_count = 1000, batch = 50_000):
+  users = [User(name = f"User {i}", email = f"user{i}@bench.test", password_hash = "x") for i in range(50)]
+  db.session.add_all(users)
+  db.session.flush()
+
+  groups = [Group(name = f"{random.choice(PLACES).title()} group {i}", created_by = users[i % 50].id)
+            for i in range(group_count)]
+  db.session.add_all(groups)
+  db.session.flush()
+  db.session.add_all([Membership(user_id = users[g % 50].id, group_id = group.id) for g, group in enumerate(groups)])
+  db.session.commit()
+
+  start = datetime(2023, 1, 1)
+  for offset in range(0, expense_count, batch):
+    rows = [{
+      "group_id": groups[i % group_count].id,
+      "created_by": users[i % 50].id,
+      "description": f"{random.choice(WORDS).title()} {random.choice(MERCHANTS)} {random.choice(PLACES)}",
+      "total_amount": 10,
+      "date": start + timedelta(minutes = i),
+    } for i in range(offset, min(offset + batch, expense_count))]
+    db.session.connection().execute(insert(Expense.__table__), rows)
+    db.session.commit()
+
+  return users[0]
+
+
+def time_ms(fn, repeat):
+  samples = []
+  for _ in range(repeat):
+    began = time.perf_counter()
+    fn()
+    samples.append((time.perf_counter() - began) * 1000)
+  return statistics.median(samples)
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--expenses", type = int, default = 1_000_000)
+  parser.add_argument("--repeat", type = int, default = 5)
+  args = parser.parse_args()
+  random.seed(0)
+
+  path = os.path.join(tempfile.mkdtemp(), "search.db")
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + path
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    began = time.perf_counter()
+    user = seed(args.expenses)
+    print(f"seeded {args.expenses} expenses in {time.perf_counter() - began:.1f}s")
+
+    like_sql = text("""
+      SELECT e.id FROM expenses e
+      WHERE e.description LIKE :pattern
+        AND e.group_id IN (SELECT group_id FROM memberships WHERE user_id = :user_id)
+      ORDER BY e.date DESC LIMIT 20
+    """)
+
+    for query in QUERIES:
+      fts_ms = time_ms(lambda: search_expenses(user, query), args.repeat)
+      pattern = f"%{query.split()[0]}%"
+      like_ms = time_ms(lambda: db.session.execute(like_sql, {"pattern": pattern, "user_id": user.id}).all(), args.repeat)
+      print(f"{query!r:32} fts {fts_ms:8.2f} ms   like {like_ms:8.2f} ms")
+
+  os.remove(path)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,102 @@
+"""
+Serializing a 10k-expense payload (each with its splits) to JSON.
+
+Compares:
+  - baseline: ORM expenses turned into dicts column by column, encoded by
+    Flask's default provider (stdlib json, Decimal via its default hook)
+  - provider: read-model views encoded by BillNestJSONProvider
+  - columnar: the same views in the columnar shape
+reporting the best encode time and the payload size.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_serialization --expenses 10000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert, select
+from sqlalchemy.orm import selectinload
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Expense, ExpenseSplit
+from app.serialization import columnar
+from app.services.expense_service import get_group_expenses
+
+SPLITS_PER_EXPENSE = 4
+
+
+class BenchConfig(Config):
+  SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+
+def seed(expense_count):
+  users = [User(name = f"U{i}", email = f"u{i}@bench.test", password_hash = "x") for i in range(SPLITS_PER_EXPENSE)]
+  db.session.add_all(users)
+  db.session.flush()
+  group = Group(name = "G", created_by = users[0].id)
+  db.session.add(group)
+  db.session.flush()
+
+  connection = db.session.connection()
+  start = datetime(2026, 1, 1)
+  ids = connection.execute(insert(Expense.__table__).returning(Expense.__table__.c.id), [
+    {"group_id": group.id, "created_by": users[i % len(users)].id, "description": f"Expense {i}",
+     "total_amount": Decimal("40.04"), "date": start + timedelta(minutes = i), "created_at": start}
+    for i in range(expense_count)
+  ]).scalars().all()
+  connection.execute(insert(ExpenseSplit.__table__), [
+    {"expense_id": expense_id, "user_id": user.id, "amount_owed": Decimal("10.01")}
+    for expense_id in ids for user in users
+  ])
+  db.session.commit()
+  return group
+
+
+def to_dict(obj):
+  return {column.key: getattr(obj, column.key) for column in obj.__table__.columns}
+
+
+def timed(fn, repeat = 5):
+  best = float("inf")
+  for _ in range(repeat):
+    began = time.perf_counter()
+    result = fn()
+    best = min(best, time.perf_counter() - began)
+  return best * 1000, result
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--expenses", type = int, default = 10000)
+  args = parser.parse_args()
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    group = seed(args.expenses)
+
+    expenses = db.session.scalars(
+      select(Expense).where(Expense.group_id == group.id).options(selectinload(Expense.splits))
+    ).all()
+    views = get_group_expenses(group, with_splits = True)
+    default_json = DefaultJSONProvider(app)
+
+    baseline = lambda: default_json.dumps([
+      dict(to_dict(expense), splits = [to_dict(split) for split in expense.splits]) for expense in expenses
+    ])
+    for label, fn in (
+      ("baseline (default provider, ORM dicts)", baseline),
+      ("provider (compiled view serializers)", lambda: app.json.dumps(views)),
+      ("provider, columnar shape", lambda: app.json.dumps(columnar(views))),
+    ):
+      ms, body = timed(fn)
+      print(f"{label:<40} {ms:8.1f} ms  {len(body) / 2**20:6.2f} MiB")
+
+
+if __name__ == "__main__":
+  main()
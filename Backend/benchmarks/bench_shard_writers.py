@@ -0,0 +1,123 @@
+"""
+Multi-writer throughput: one database vs groups sharded over N databases.
+
+Each writer process owns one group and posts expenses into it, committing
+after every expense as the API does. With a single SQLite file every commit
+queues on the same writer lock; with shards, writers for groups on different
+shards commit in parallel.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_shard_writers --writers 8 --expenses 200 --shards 1 4
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+
+def make_config(tmpdir, shard_count):
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "global.db")
+    SHARD_COUNT = shard_count
+    SHARD_DATABASE_URL = "sqlite:///" + os.path.join(tmpdir, "shard_{shard}.db")
+    # Writers queue on the SQLite lock instead of failing fast
+    SQLALCHEMY_ENGINE_OPTIONS = {"connect_args": {"timeout": 60}}
+
+  return BenchConfig
+
+
+def setup(config, writers):
+  """Create one user and one group per writer; return the (user_id, group_id) pairs."""
+  from app.models import User
+  from app.services.group_service import create_group
+  from app.sharding import create_shard_schemas
+
+  app = create_app(config)
+  with app.app_context():
+    db.create_all()
+    create_shard_schemas()
+
+    pairs = []
+    for i in range(writers):
+      user = User(name = f"Writer {i}", email = f"writer{i}@bench.test", password_hash = "x")
+      db.session.add(user)
+      db.session.commit()
+      pairs.append((user.id, create_group(f"Group {i}", user).id))
+
+    for engine in db.engines.values():
+      engine.dispose()
+
+  return pairs
+
+
+def writer(config, user_id, group_id, expenses, start):
+  from app.models import User, Group
+  from app.services.expense_service import create_expense
+
+  app = create_app(config)
+  with app.app_context():
+    user = db.session.get(User, user_id)
+    group = db.session.get(Group, group_id)
+    start.wait()
+
+    for i in range(expenses):
+      create_expense(
+        group, user, f"Expense {i}", Decimal("10.00"),
+        [{"user": user_id, "amount": Decimal("10.00")}],
+        datetime(2026, 1, 1)
+      )
+
+
+def run(shard_count, writers, expenses):
+  tmpdir = tempfile.mkdtemp()
+  try:
+    config = make_config(tmpdir, shard_count)
+    pairs = setup(config, writers)
+
+    start = multiprocessing.Barrier(writers + 1)
+    processes = [
+      multiprocessing.Process(target = writer, args = (config, user_id, group_id, expenses, start))
+      for user_id, group_id in pairs
+    ]
+    for process in processes:
+      process.start()
+
+    start.wait()
+    began = time.perf_counter()
+    for process in processes:
+      process.join()
+    elapsed = time.perf_counter() - began
+
+    if any(process.exitcode for process in processes):
+      raise RuntimeError("A writer process failed")
+
+    return writers * expenses / elapsed
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--writers", type = int, default = 8)
+  parser.add_argument("--expenses", type = int, default = 200, help = "expenses per writer")
+  parser.add_argument("--shards", type = int, nargs = "+", default = [1, 4])
+  args = parser.parse_args()
+
+  multiprocessing.set_start_method("fork")
+  baseline = None
+  for shard_count in args.shards:
+    throughput = run(shard_count, args.writers, args.expenses)
+    baseline = baseline or throughput
+    print(f"shards={shard_count:<3} writers={args.writers:<3} {throughput:8.1f} expenses/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,40 @@
+"""
+Split calculation throughput: one expense at a time vs the array mode.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_split_batch --expenses 10000 --users 8
+"""
+import argparse
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from app.services.split_service import allocate_cents, calculate_splits
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--expenses", type = int, default = 10_000)
+  parser.add_argument("--users", type = int, default = 8)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(0)
+  totals = rng.integers(100, 1_000_000, size = args.expenses)
+  weights = rng.integers(1, 5, size = (args.expenses, args.users))
+
+  began = time.perf_counter()
+  for total, row in zip(totals.tolist(), weights.tolist()):
+    calculate_splits(Decimal(total) / 100, {"type": "shares", "shares": dict(enumerate(row))})
+  single = time.perf_counter() - began
+
+  began = time.perf_counter()
+  allocate_cents(totals, weights)
+  batch = time.perf_counter() - began
+
+  print(f"one at a time: {args.expenses / single:12.0f} expenses/s")
+  print(f"array mode:    {args.expenses / batch:12.0f} expenses/s  ({single / batch:.0f}x)")
+
+
+if __name__ == "__main__":
+  main()
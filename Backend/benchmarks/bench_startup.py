@@ -0,0 +1,66 @@
+"""
+Process start-up cost of a short job: the full app factory vs the job app.
+
+Each variant runs --runs times as a fresh `python -c` process that builds
+its app, runs one query in an app context and exits, as a cron job would:
+
+  - run.py: dotenv and create_app (web stack, JWT, Flask-Migrate, routes),
+  - create_job_app: app.runtime's database-and-services app,
+  - python -m app.runtime: the job CLI running `shards status`.
+
+Reports the median and fastest wall time per process.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_startup --runs 20
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUERY = "from sqlalchemy import text; from app.extensions import db; db.session.execute(text('SELECT 1'))"
+CREATE_SCHEMA = "from app.runtime import job_context\nfrom app.extensions import db\nwith job_context(): db.create_all()"
+VARIANTS = {
+  "run.py (create_app)": ["-c", f"from run import app\nwith app.app_context(): {QUERY}"],
+  "create_job_app": ["-c", f"from app.runtime import job_context\nwith job_context(): {QUERY}"],
+  "python -m app.runtime": ["-m", "app.runtime", "shards", "status"],
+}
+
+
+def timed_run(args, env):
+  began = time.perf_counter()
+  subprocess.run([sys.executable, *args], cwd = BACKEND_DIR, env = env, check = True, stdout = subprocess.DEVNULL)
+  return time.perf_counter() - began
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--runs", type = int, default = 20)
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+  try:
+    env = dict(os.environ, DATABASE_URL = "sqlite:///" + os.path.join(tmpdir, "bench.db"))
+    subprocess.run([sys.executable, "-c", CREATE_SCHEMA], cwd = BACKEND_DIR, env = env, check = True)
+    # Warm the bytecode cache so every variant starts from the same place
+    for variant in VARIANTS.values():
+      timed_run(variant, env)
+
+    baseline = None
+    for name, variant in VARIANTS.items():
+      times = [timed_run(variant, env) for _ in range(args.runs)]
+      median = statistics.median(times)
+      baseline = baseline or median
+      print(f"{name:24} median {median * 1000:6.0f} ms  fastest {min(times) * 1000:6.0f} ms  ({median / baseline:.2f}x)")
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,124 @@
+"""
+Monthly statement throughput, in groups per second.
+
+Seeds --groups groups of --members members, each with --expenses expenses
+spread over a year and a confirmed settlement a month, in a temp-file
+SQLite database. Then builds June's statements three ways:
+
+  - per group through the balance and listing services, the way a statement
+    had to be put together before (calculate_group_balances,
+    get_group_obligations, get_group_expenses with splits, filtered to the
+    month in Python; no opening balance at all),
+  - generate_statements in this process (--workers 1),
+  - generate_statements across --workers processes.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_statements --groups 2000 --members 5 --expenses 500 --workers 8
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit, Settlement
+from app.services.balance_service import calculate_group_balances, get_group_obligations
+from app.services.expense_service import get_group_expenses
+from app.statements import generate_statements, month_bounds
+
+MONTH = datetime(2026, 6, 1)
+
+
+def seed(group_count, member_count, expense_count):
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [
+    {"name": f"U{i}", "email": f"u{i}@bench.test", "password_hash": "x"} for i in range(group_count * member_count)
+  ])
+  users = db.session.scalars(select(User.id).order_by(User.id)).all()
+  step = timedelta(days = 365) / expense_count
+  share = Decimal("5.00")
+  for g in range(group_count):
+    members = users[g * member_count:(g + 1) * member_count]
+    group_id = connection.execute(insert(Group.__table__).values(name = f"Group {g}", created_by = members[0])).inserted_primary_key[0]
+    connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": u, "role": "member"} for u in members])
+    connection.execute(insert(Expense.__table__), [
+      {"group_id": group_id, "created_by": members[e % member_count], "description": f"Seed {e}",
+       "total_amount": share * member_count, "date": datetime(2026, 1, 1) + step * e}
+      for e in range(expense_count)
+    ])
+    expense_ids = db.session.scalars(
+      select(Expense.id).where(Expense.group_id == group_id).order_by(Expense.id)
+    ).all()
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": expense_id, "user_id": u, "amount_owed": share} for expense_id in expense_ids for u in members
+    ])
+    connection.execute(insert(Settlement.__table__), [
+      {"group_id": group_id, "from_user_id": members[1], "to_user_id": members[0], "amount": Decimal("20.00"),
+       "status": "confirmed", "created_at": datetime(2026, month, 10)}
+      for month in range(1, 13)
+    ])
+  db.session.commit()
+
+
+def per_group_services(month):
+  start, end = month_bounds(month)
+  for group_id in db.session.scalars(select(Group.id).order_by(Group.id)).all():
+    group = db.session.get(Group, group_id)
+    calculate_group_balances(group)
+    get_group_obligations(group)
+    [expense for expense in get_group_expenses(group, with_splits = True) if start <= expense.date < end]
+    db.session.expunge_all()
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--groups", type = int, default = 2000)
+  parser.add_argument("--members", type = int, default = 5)
+  parser.add_argument("--expenses", type = int, default = 500, help = "expenses per group, over a year")
+  parser.add_argument("--workers", type = int, default = os.cpu_count())
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+  try:
+    app = create_app(BenchConfig)
+    with app.app_context():
+      db.create_all()
+      seed(args.groups, args.members, args.expenses)
+      print(f"{args.groups} groups x {args.members} members x {args.expenses} expenses, statements for {MONTH:%Y-%m}")
+
+      began = time.perf_counter()
+      per_group_services(MONTH)
+      seconds = time.perf_counter() - began
+      print(f"  per-group services   {seconds:7.2f} s  {args.groups / seconds:8.1f} groups/s")
+
+      for workers in (1, args.workers):
+        out_dir = os.path.join(tmpdir, f"statements-{workers}")
+        totals = generate_statements(MONTH, out_dir, workers = workers)
+        assert totals["written"] == args.groups, totals
+        label = f"statements x{workers}"
+        print(f"  {label:20} {totals['seconds']:7.2f} s  {args.groups / totals['seconds']:8.1f} groups/s")
+
+      # As if interrupted: half the groups lost a file, and the rerun redoes only those
+      out_dir = os.path.join(tmpdir, f"statements-{args.workers}")
+      for name in sorted(os.listdir(os.path.join(out_dir, f"{MONTH:%Y-%m}")))[::4]:
+        os.remove(os.path.join(out_dir, f"{MONTH:%Y-%m}", name))
+      totals = generate_statements(MONTH, out_dir, workers = args.workers)
+      print(f"  resumed              {totals['seconds']:7.2f} s  redid {totals['written']}, "
+            f"{totals['already_done']} already done")
+  finally:
+    shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,140 @@
+"""
+Peak Python memory and time of group balances as the group grows.
+
+Compares calculate_group_balances / get_group_obligations (streaming tuples
+in fixed-size batches) with walking the group's ORM rows, which is what they
+did before: every expense, split and settlement becomes an object first.
+Peak memory is measured with tracemalloc, on a separate run from the
+timing. Results must be identical.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_streaming_balances --splits 1000 100000 1000000 --orm-limit 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert, select, delete
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit, Settlement
+from app.services.balance_service import calculate_group_balances, get_group_obligations
+
+MEMBERS = 20
+SPLITS_PER_EXPENSE = 4
+
+
+def seed(split_count):
+  """Fresh group with split_count splits, 4 per expense, and a confirmed settlement per 50 expenses."""
+  connection = db.session.connection()
+  for model in (ExpenseSplit, Expense, Settlement, Membership, Group):
+    connection.execute(delete(model.__table__))
+  if not db.session.scalar(select(User.id).limit(1)):
+    connection.execute(insert(User.__table__), [
+      {"name": f"U{i}", "email": f"u{i}@bench.test", "password_hash": "x"} for i in range(MEMBERS)
+    ])
+  members = db.session.scalars(select(User.id).order_by(User.id)).all()
+  group_id = connection.execute(insert(Group.__table__).values(name = "Big", created_by = members[0])).inserted_primary_key[0]
+  connection.execute(insert(Membership.__table__), [{"group_id": group_id, "user_id": u, "role": "member"} for u in members])
+
+  expense_count = split_count // SPLITS_PER_EXPENSE
+  for start in range(0, expense_count, 50000):
+    batch = range(start, min(start + 50000, expense_count))
+    first_id = connection.execute(insert(Expense.__table__).values(
+      group_id = group_id, created_by = members[start % MEMBERS], description = "Bench",
+      total_amount = Decimal("10.00"), date = datetime(2026, 1, 1)
+    )).inserted_primary_key[0]
+    connection.execute(insert(Expense.__table__), [
+      {"group_id": group_id, "created_by": members[e % MEMBERS], "description": "Bench",
+       "total_amount": Decimal("10.00"), "date": datetime(2026, 1, 1)} for e in batch[1:]
+    ])
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": first_id + i, "user_id": members[(e + s) % MEMBERS], "amount_owed": Decimal("2.50")}
+      for i, e in enumerate(batch) for s in range(SPLITS_PER_EXPENSE)
+    ])
+  connection.execute(insert(Settlement.__table__), [
+    {"group_id": group_id, "from_user_id": members[(s + 1) % MEMBERS], "to_user_id": members[s % MEMBERS],
+     "amount": Decimal("5.00"), "status": "confirmed"} for s in range(max(expense_count // 50, 1))
+  ])
+  db.session.commit()
+  return group_id
+
+
+def orm_walk(group):
+  """The balances and obligations from ORM rows, as the services computed them before streaming."""
+  balances = defaultdict(lambda: Decimal("0.00"))
+  obligations = defaultdict(lambda: defaultdict(lambda: Decimal("0.00")))
+  for expense in group.expenses:
+    balances[expense.created_by] += expense.total_amount
+    for split in expense.splits:
+      balances[split.user_id] -= split.amount_owed
+      if split.user_id != expense.created_by:
+        obligations[split.user_id][expense.created_by] += split.amount_owed
+  for settlement in group.settlements:
+    if settlement.status != "confirmed":
+      continue
+    balances[settlement.from_user_id] += settlement.amount
+    balances[settlement.to_user_id] -= settlement.amount
+    obligations[settlement.from_user_id][settlement.to_user_id] -= settlement.amount
+    if obligations[settlement.from_user_id][settlement.to_user_id] <= Decimal("0.00"):
+      del obligations[settlement.from_user_id][settlement.to_user_id]
+    if not obligations[settlement.from_user_id]:
+      del obligations[settlement.from_user_id]
+  return dict(balances), {d: dict(c) for d, c in obligations.items()}
+
+
+def streamed(group):
+  return dict(calculate_group_balances(group)), {d: dict(c) for d, c in get_group_obligations(group).items()}
+
+
+def profile(fn, group_id):
+  """Time one untraced run, then measure peak memory on a second, traced run."""
+  db.session.expunge_all()
+  began = time.perf_counter()
+  result = fn(db.session.get(Group, group_id))
+  elapsed = time.perf_counter() - began
+
+  db.session.expunge_all()
+  group = db.session.get(Group, group_id)
+  tracemalloc.start()
+  fn(group)
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return elapsed, peak / 2**20, result
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--splits", type = int, nargs = "+", default = [1000, 100000, 1000000])
+  parser.add_argument("--orm-limit", type = int, default = 200000, help = "skip the ORM walk above this many splits")
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+
+  class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    for split_count in args.splits:
+      group_id = seed(split_count)
+      stream_s, stream_mib, stream_result = profile(streamed, group_id)
+      line = f"splits={split_count:<9} streaming {stream_s * 1000:9.1f} ms {stream_mib:7.2f} MiB peak"
+      if split_count <= args.orm_limit:
+        orm_s, orm_mib, orm_result = profile(orm_walk, group_id)
+        line += f"   ORM walk {orm_s * 1000:9.1f} ms {orm_mib:8.2f} MiB peak"
+        if orm_result != stream_result:
+          line += "  RESULTS DIFFER"
+      print(line)
+
+
+if __name__ == "__main__":
+  main()
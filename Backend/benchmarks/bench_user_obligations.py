@@ -0,0 +1,97 @@
+"""
+User obligations and net balance in a large group: full ledger walk vs
+user-scoped queries.
+
+The user under test has a fixed handful of expenses while the group grows,
+so the user-scoped path should stay flat.
+
+Usage (from Backend/):
+    python -m benchmarks.bench_user_obligations --members 50 --expenses 100 1000 10000
+"""
+import argparse
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit
+from app.services.balance_service import (
+  calculate_group_balances, get_group_obligations, get_user_obligations, get_user_net_balance
+)
+
+
+class BenchConfig(Config):
+  SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+
+def seed(members, expense_count):
+  users = [User(name = f"U{i}", email = f"{expense_count}-{i}@bench.test", password_hash = "x") for i in range(members)]
+  db.session.add_all(users)
+  db.session.flush()
+
+  group = Group(name = f"Big {expense_count}", created_by = users[0].id)
+  group.memberships = [Membership(user_id = u.id) for u in users]
+  db.session.add(group)
+  db.session.flush()
+
+  # Users other than users[0] carry the group's activity; users[0] joins 10 expenses
+  connection = db.session.connection()
+  for i in range(expense_count):
+    payer = users[1 + i % (members - 1)]
+    debtors = [users[1 + (i + k) % (members - 1)] for k in range(3)]
+    if i < 10:
+      debtors[0] = users[0]
+    expense_id = connection.execute(insert(Expense.__table__).values(
+      group_id = group.id, created_by = payer.id, description = "x",
+      total_amount = Decimal("30.00"), date = datetime(2026, 1, 1)
+    )).inserted_primary_key[0]
+    connection.execute(insert(ExpenseSplit.__table__), [
+      {"expense_id": expense_id, "user_id": d.id, "amount_owed": Decimal("10.00")} for d in debtors
+    ])
+
+  db.session.commit()
+  return group.id, users[0].id
+
+
+def timed(fn, repeat = 3):
+  best = float("inf")
+  for _ in range(repeat):
+    db.session.expire_all()
+    began = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - began)
+  return best * 1000
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--members", type = int, default = 50)
+  parser.add_argument("--expenses", type = int, nargs = "+", default = [100, 1000, 10000])
+  args = parser.parse_args()
+
+  app = create_app(BenchConfig)
+  with app.app_context():
+    db.create_all()
+    for expense_count in args.expenses:
+      group_id, user_id = seed(args.members, expense_count)
+      group = db.session.get(Group, group_id)
+
+      def from_matrix():
+        matrix = get_group_obligations(group)
+        return matrix.get(user_id, {}), {d: c[user_id] for d, c in matrix.items() if user_id in c}
+
+      matrix_ms = timed(from_matrix)
+      scoped_ms = timed(lambda: get_user_obligations(group, user_id))
+      print(f"group expenses={expense_count:<7} full matrix {matrix_ms:9.2f} ms   user-scoped {scoped_ms:7.2f} ms")
+
+      balances_ms = timed(lambda: calculate_group_balances(group)[user_id])
+      net_ms = timed(lambda: get_user_net_balance(group, user_id))
+      print(f"{'':<22} all balances {balances_ms:8.2f} ms   user net    {net_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+  main()
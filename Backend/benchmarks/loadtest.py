@@ -0,0 +1,337 @@
+"""
+End-to-end load test of the HTTP API.
+
+Seeds a fresh SQLite database (--groups groups of --members members, each
+with --expenses expenses of history), boots the app from run.py in its own
+process with a threaded server, then runs --clients concurrent clients for
+--duration seconds. Each client acts as a random member of a random group
+and picks its next call from --mix:
+
+    create_expense      POST /groups/<id>/expenses
+    balances            GET  /groups/<id>/balances
+    list_expenses       GET  /groups/<id>/expenses?splits=1
+    confirm_settlement  POST /groups/<id>/settlements, then the payee's
+                        POST /groups/<id>/settlements/<id>/confirm
+
+Reports throughput and p50/p95/p99 latency per endpoint and writes them,
+with the commit and settings, to --output as JSON. Pass an earlier result
+as --compare to print the change in each figure.
+
+Usage (from Backend/):
+    python -m benchmarks.loadtest --clients 16 --duration 30 --mix create_expense=2,balances=4,list_expenses=3,confirm_settlement=1
+    python -m benchmarks.loadtest --output after.json --compare before.json
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert, select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Group, Membership, Expense, ExpenseSplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "create_expense=2,balances=4,list_expenses=3,confirm_settlement=1"
+JWT_SECRET_KEY = "loadtest-jwt-secret-key-of-32-bytes!"
+
+
+def seed(group_count, member_count, expense_count):
+  """Groups with expense history; returns {group_id: [member ids]}."""
+  connection = db.session.connection()
+  connection.execute(insert(User.__table__), [
+    {"name": f"U{i}", "email": f"u{i}@load.test", "password_hash": "x"} for i in range(group_count * member_count)
+  ])
+  users = db.session.scalars(select(User.id).order_by(User.id)).all()
+
+  groups = {}
+  started = datetime(2026, 1, 1)
+  for g in range(group_count):
+    members = users[g * member_count:(g + 1) * member_count]
+    group_id = connection.execute(insert(Group.__table__).values(name = f"Group {g}", created_by = members[0])).inserted_primary_key[0]
+    connection.execute(insert(Membership.__table__), [
+      {"group_id": group_id, "user_id": u, "role": "admin" if u == members[0] else "member"} for u in members
+    ])
+    share = Decimal("5.00")
+    for e in range(expense_count):
+      expense_id = connection.execute(insert(Expense.__table__).values(
+        group_id = group_id, created_by = members[e % member_count], description = f"Seed {e}",
+        total_amount = share * member_count, date = started + timedelta(hours = e)
+      )).inserted_primary_key[0]
+      connection.execute(insert(ExpenseSplit.__table__), [
+        {"expense_id": expense_id, "user_id": u, "amount_owed": share} for u in members
+      ])
+    groups[group_id] = members
+  db.session.commit()
+  return groups
+
+
+def free_port():
+  with socket.socket() as probe:
+    probe.bind(("127.0.0.1", 0))
+    return probe.getsockname()[1]
+
+
+def boot_server(env, port, log_path):
+  """`flask --app run run` in its own process, logging to log_path; returns once it accepts connections."""
+  with open(log_path, "w") as log:
+    server = subprocess.Popen(
+      [sys.executable, "-m", "flask", "--app", "run", "run", "--port", str(port), "--with-threads", "--no-reload", "--no-debugger"],
+      cwd = BACKEND_DIR, env = env, stdout = log, stderr = subprocess.STDOUT
+    )
+  deadline = time.monotonic() + 30
+  while time.monotonic() < deadline:
+    if server.poll() is not None:
+      with open(log_path) as log:
+        raise RuntimeError("The server exited:\n" + log.read())
+    try:
+      socket.create_connection(("127.0.0.1", port), timeout = 0.2).close()
+      return server
+    except OSError:
+      time.sleep(0.1)
+  server.kill()
+  raise RuntimeError("The server did not start within 30 s.")
+
+
+def parse_mix(text):
+  mix = {}
+  for part in text.split(","):
+    name, _, weight = part.partition("=")
+    if name not in ACTIONS:
+      raise argparse.ArgumentTypeError(f"Unknown action {name!r}; choose from {', '.join(ACTIONS)}.")
+    mix[name] = float(weight or 1)
+  return mix
+
+
+class Client:
+  """One simulated user session over a keep-alive connection, recording (endpoint, seconds, status)."""
+
+  def __init__(self, port, groups, tokens, record, rng):
+    self.port = port
+    self.rng = rng
+    self.groups = groups
+    self.tokens = tokens
+    self.record = record
+    self.connection = None
+
+  def call(self, endpoint, method, path, user_id, body = None):
+    headers = {"Authorization": f"Bearer {self.tokens[user_id]}"}
+    if body is not None:
+      body = json.dumps(body)
+      headers["Content-Type"] = "application/json"
+
+    began = time.perf_counter()
+    try:
+      if self.connection is None:
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout = 60)
+      self.connection.request(method, path, body = body, headers = headers)
+      response = self.connection.getresponse()
+      payload = response.read()
+      status = response.status
+    except (OSError, http.client.HTTPException):
+      if self.connection is not None:
+        self.connection.close()
+      self.connection = None
+      payload, status = b"", "connection"
+    self.record(endpoint, time.perf_counter() - began, status)
+    return json.loads(payload) if status == 200 or status == 201 else None
+
+  def create_expense(self, group_id, user_id):
+    members = self.groups[group_id]
+    self.call("create_expense", "POST", f"/groups/{group_id}/expenses", user_id, {
+      "description": "Load test", "total_amount": f"{self.rng.randint(100, 20000) / 100:.2f}",
+      "splits": {"type": "equal", "users": self.rng.sample(members, k = self.rng.randint(2, len(members)))}
+    })
+
+  def balances(self, group_id, user_id):
+    self.call("balances", "GET", f"/groups/{group_id}/balances", user_id)
+
+  def list_expenses(self, group_id, user_id):
+    self.call("list_expenses", "GET", f"/groups/{group_id}/expenses?splits=1", user_id)
+
+  def confirm_settlement(self, group_id, user_id):
+    payee = self.rng.choice([m for m in self.groups[group_id] if m != user_id])
+    settlement = self.call("create_settlement", "POST", f"/groups/{group_id}/settlements", user_id, {
+      "to_user_id": payee, "amount": "1.00"
+    })
+    if settlement is not None:
+      self.call("confirm_settlement", "POST", f"/groups/{group_id}/settlements/{settlement['id']}/confirm", payee)
+
+
+ACTIONS = {
+  "create_expense": Client.create_expense,
+  "balances": Client.balances,
+  "list_expenses": Client.list_expenses,
+  "confirm_settlement": Client.confirm_settlement,
+}
+
+
+def run_clients(port, groups, tokens, mix, client_count, duration, warmup, seed = 0):
+  """Run the clients; returns {endpoint: {"latencies": [...], "errors": Counter}} and the measured seconds."""
+  results = defaultdict(lambda: {"latencies": [], "errors": Counter()})
+  lock = threading.Lock()
+  measuring_from = time.perf_counter() + warmup
+  stop_at = measuring_from + duration
+
+  def record(endpoint, seconds, status):
+    if time.perf_counter() < measuring_from:
+      return
+    with lock:
+      if status in (200, 201):
+        results[endpoint]["latencies"].append(seconds)
+      else:
+        results[endpoint]["errors"][str(status)] += 1
+
+  def work(seed):
+    rng = random.Random(seed)
+    client = Client(port, groups, tokens, record, rng)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < stop_at:
+      group_id = rng.choice(list(groups))
+      ACTIONS[rng.choices(names, weights)[0]](client, group_id, rng.choice(groups[group_id]))
+
+  threads = [threading.Thread(target = work, args = (seed + i,)) for i in range(client_count)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return results, duration
+
+
+def percentile(ordered, p):
+  """Nearest-rank percentile of a sorted list."""
+  return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(results, seconds):
+  endpoints = {}
+  for endpoint, result in sorted(results.items()):
+    latencies = sorted(result["latencies"])
+    figures = {
+      "requests": len(latencies), "errors": sum(result["errors"].values()), "errors_by_status": dict(result["errors"]),
+      "throughput_rps": round(len(latencies) / seconds, 2)
+    }
+    if latencies:
+      figures.update({
+        f"p{p}_ms": round(percentile(latencies, p) * 1000, 2) for p in (50, 95, 99)
+      })
+      figures["max_ms"] = round(latencies[-1] * 1000, 2)
+    endpoints[endpoint] = figures
+  total = sum(figures["requests"] for figures in endpoints.values())
+  return {"throughput_rps": round(total / seconds, 2), "endpoints": endpoints}
+
+
+def git_commit():
+  try:
+    return subprocess.run(
+      ["git", "rev-parse", "--short", "HEAD"], cwd = BACKEND_DIR, capture_output = True, text = True, check = True
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def print_report(report, baseline = None):
+  def change(now, before):
+    return f" ({(now - before) / before:+.0%})" if before else ""
+
+  base = (baseline or {}).get("endpoints", {})
+  print(f"{'endpoint':20} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+  for endpoint, figures in report["endpoints"].items():
+    before = base.get(endpoint, {})
+    line = f"{endpoint:20} {figures['requests']:9} {figures['errors']:7} {figures['throughput_rps']:9.1f}"
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+      line += f" {figures.get(key, float('nan')):9.1f}"
+    if before:
+      line += "   vs baseline: p50" + change(figures.get("p50_ms", 0), before.get("p50_ms"))
+      line += " p99" + change(figures.get("p99_ms", 0), before.get("p99_ms"))
+      line += " req/s" + change(figures["throughput_rps"], before.get("throughput_rps"))
+    print(line)
+  total = f"total {report['throughput_rps']:.1f} req/s"
+  if baseline:
+    total += f" vs {baseline['throughput_rps']:.1f} at {baseline.get('commit') or 'baseline'}" + change(
+      report["throughput_rps"], baseline["throughput_rps"]
+    )
+  print(total)
+
+
+def main():
+  parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--clients", type = int, default = 16)
+  parser.add_argument("--duration", type = float, default = 30, help = "seconds measured")
+  parser.add_argument("--warmup", type = float, default = 3, help = "seconds run before measuring")
+  parser.add_argument("--mix", type = parse_mix, default = parse_mix(DEFAULT_MIX), help = f"action=weight,... (default {DEFAULT_MIX})")
+  parser.add_argument("--groups", type = int, default = 20)
+  parser.add_argument("--members", type = int, default = 5)
+  parser.add_argument("--expenses", type = int, default = 200, help = "history per group")
+  parser.add_argument("--seed", type = int, default = 0)
+  parser.add_argument("--output", default = "loadtest.json")
+  parser.add_argument("--compare", help = "earlier --output to compare against")
+  args = parser.parse_args()
+
+  tmpdir = tempfile.mkdtemp()
+  database_url = "sqlite:///" + os.path.join(tmpdir, "loadtest.db")
+
+  class LoadConfig(Config):
+    SQLALCHEMY_DATABASE_URI = database_url
+    JWT_SECRET_KEY = JWT_SECRET_KEY
+
+  app = create_app(LoadConfig)
+  with app.app_context():
+    db.create_all()
+    groups = seed(args.groups, args.members, args.expenses)
+    with app.test_request_context():
+      tokens = {
+        user_id: create_access_token(identity = str(user_id), expires_delta = timedelta(days = 1))
+        for members in groups.values() for user_id in members
+      }
+
+  port = free_port()
+  env = {**os.environ, "DATABASE_URL": database_url, "JWT_SECRET_KEY": JWT_SECRET_KEY, "FLASK_DEBUG": "0"}
+  log_path = os.path.join(tmpdir, "server.log")
+  server = boot_server(env, port, log_path)
+  try:
+    results, seconds = run_clients(port, groups, tokens, args.mix, args.clients, args.duration, args.warmup, args.seed)
+  finally:
+    server.terminate()
+    server.wait()
+
+  report = {
+    "commit": git_commit(),
+    "recorded_at": datetime.utcnow().isoformat(),
+    "python": platform.python_version(),
+    "settings": {
+      "clients": args.clients, "duration": args.duration, "warmup": args.warmup, "mix": args.mix,
+      "groups": args.groups, "members": args.members, "expenses": args.expenses, "seed": args.seed,
+    },
+    **summarize(results, seconds),
+  }
+  with open(args.output, "w") as handle:
+    json.dump(report, handle, indent = 2)
+
+  baseline = None
+  if args.compare:
+    with open(args.compare) as handle:
+      baseline = json.load(handle)
+  print_report(report, baseline)
+  print(f"written to {args.output}")
+  if any(figures["errors"] for figures in report["endpoints"].values()):
+    print(f"server log: {log_path}")
+
+
+if __name__ == "__main__":
+  main()
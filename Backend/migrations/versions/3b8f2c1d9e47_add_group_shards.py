@@ -0,0 +1,34 @@
+"""Add group shards directory
+
+Revision ID: 3b8f2c1d9e47
+Revises: 952aae998600
+Create Date: 2026-10-19 09:12:41.220417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f2c1d9e47'
+down_revision = '952aae998600'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('group_shards',
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('shard_id', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('group_id')
+    )
+    with op.batch_alter_table('group_shards', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_group_shards_shard_id'), ['shard_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('group_shards', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_group_shards_shard_id'))
+
+    op.drop_table('group_shards')
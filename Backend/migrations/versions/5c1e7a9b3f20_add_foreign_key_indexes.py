@@ -0,0 +1,38 @@
+"""Add foreign key indexes
+
+Revision ID: 5c1e7a9b3f20
+Revises: 3b8f2c1d9e47
+Create Date: 2026-10-19 10:03:17.514902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9b3f20'
+down_revision = '3b8f2c1d9e47'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('expenses', 'group_id'),
+    ('expenses', 'created_by'),
+    ('expense_splits', 'expense_id'),
+    ('expense_splits', 'user_id'),
+    ('memberships', 'user_id'),
+    ('memberships', 'group_id'),
+    ('settlements', 'from_user_id'),
+    ('settlements', 'to_user_id'),
+    ('settlements', 'group_id'),
+]
+
+
+def upgrade():
+    for table, column in INDEXES:
+        op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False)
+
+
+def downgrade():
+    for table, column in reversed(INDEXES):
+        op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table)
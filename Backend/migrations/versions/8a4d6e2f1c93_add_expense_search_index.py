@@ -0,0 +1,85 @@
+"""Add expense full-text search index
+
+Revision ID: 8a4d6e2f1c93
+Revises: 5c1e7a9b3f20
+Create Date: 2026-10-19 11:26:05.381754
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d6e2f1c93'
+down_revision = '5c1e7a9b3f20'
+branch_labels = None
+depends_on = None
+
+INSERT_ROW = """
+    INSERT INTO expense_search(rowid, description, group_name, payer_name, scope)
+    VALUES (
+      NEW.id, NEW.description,
+      (SELECT name FROM groups WHERE id = NEW.group_id),
+      (SELECT name FROM users WHERE id = NEW.created_by),
+      'g' || NEW.group_id
+    );
+"""
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other databases fall back to no index
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS expense_search USING fts5(
+      description, group_name, payer_name, scope,
+      tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """)
+    op.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS expense_search_expense_insert AFTER INSERT ON expenses BEGIN
+      {INSERT_ROW}
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS expense_search_expense_delete AFTER DELETE ON expenses BEGIN
+      DELETE FROM expense_search WHERE rowid = OLD.id;
+    END
+    """)
+    op.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS expense_search_expense_update
+    AFTER UPDATE OF description, group_id, created_by ON expenses BEGIN
+      DELETE FROM expense_search WHERE rowid = OLD.id;
+      {INSERT_ROW}
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS expense_search_group_rename AFTER UPDATE OF name ON groups BEGIN
+      UPDATE expense_search SET group_name = NEW.name WHERE expense_search MATCH 'scope:g' || NEW.id;
+    END
+    """)
+    op.execute("""
+    CREATE TRIGGER IF NOT EXISTS expense_search_user_rename AFTER UPDATE OF name ON users BEGIN
+      UPDATE expense_search SET payer_name = NEW.name
+      WHERE rowid IN (SELECT id FROM expenses WHERE created_by = NEW.id);
+    END
+    """)
+
+    # Backfill existing expenses
+    op.execute("""
+    INSERT INTO expense_search(rowid, description, group_name, payer_name, scope)
+    SELECT e.id, e.description, g.name, u.name, 'g' || e.group_id
+    FROM expenses e
+    LEFT JOIN groups g ON g.id = e.group_id
+    LEFT JOIN users u ON u.id = e.created_by
+    """)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for trigger in ('expense_insert', 'expense_delete', 'expense_update', 'group_rename', 'user_rename'):
+        op.execute(f'DROP TRIGGER IF EXISTS expense_search_{trigger}')
+    op.execute('DROP TABLE IF EXISTS expense_search')
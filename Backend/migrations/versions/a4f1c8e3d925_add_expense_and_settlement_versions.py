@@ -0,0 +1,45 @@
+"""Add expense and settlement versions
+
+Revision ID: a4f1c8e3d925
+Revises: d8a3f5c1e7b2
+Create Date: 2026-10-19 23:48:02.315874
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f1c8e3d925'
+down_revision = 'd8a3f5c1e7b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows start at version 1, as new ones do
+    op.add_column('expenses', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('settlements', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    bind = op.get_bind()
+    triggers = []
+    if bind.dialect.name == 'sqlite':
+        # Dropping a column rebuilds the table, which fails while the search
+        # index's triggers refer to it; set them aside
+        triggers = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+        ).all()
+        for name, _ in triggers:
+            op.execute(f'DROP TRIGGER {name}')
+
+    # Rebuilt tables lose AUTOINCREMENT unless asked for it again
+    with op.batch_alter_table('settlements', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('expenses', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('version')
+
+    for _, sql in triggers:
+        op.execute(sql)
@@ -0,0 +1,35 @@
+"""Add the per-group change log used for delta sync
+
+Revision ID: a9d2e6c4b718
+Revises: f7c3a1d6e290
+Create Date: 2026-10-19 17:12:05.481263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d2e6c4b718'
+down_revision = 'f7c3a1d6e290'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('group_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], name='fk_group_changes_group_id_groups', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('group_id', 'seq', name='uq_group_changes_group_id_seq')
+    )
+
+
+def downgrade():
+    op.drop_table('group_changes')
@@ -0,0 +1,33 @@
+"""Add user-scoped composite indexes
+
+Revision ID: b27c4e8d5a16
+Revises: 8a4d6e2f1c93
+Create Date: 2026-10-19 12:41:52.907316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27c4e8d5a16'
+down_revision = '8a4d6e2f1c93'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_expenses_group_id_created_by', 'expenses', ['group_id', 'created_by']),
+    ('ix_expense_splits_user_id_expense_id', 'expense_splits', ['user_id', 'expense_id']),
+    ('ix_settlements_group_id_from_user_id', 'settlements', ['group_id', 'from_user_id']),
+    ('ix_settlements_group_id_to_user_id', 'settlements', ['group_id', 'to_user_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
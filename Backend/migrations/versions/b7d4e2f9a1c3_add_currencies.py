@@ -0,0 +1,48 @@
+"""Add group base currencies and expense currencies
+
+Revision ID: b7d4e2f9a1c3
+Revises: c3e8f1a2b6d9
+Create Date: 2026-10-19 21:12:47.530918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d4e2f9a1c3'
+down_revision = 'c3e8f1a2b6d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('groups', sa.Column('base_currency', sa.String(length=3), server_default='GBP', nullable=False))
+    op.add_column('expenses', sa.Column('currency', sa.String(length=3), server_default='GBP', nullable=False))
+    op.add_column('archived_expenses', sa.Column('currency', sa.String(length=3), server_default='GBP', nullable=False))
+
+
+def downgrade():
+    bind = op.get_bind()
+    triggers = []
+    if bind.dialect.name == 'sqlite':
+        # Dropping a column rebuilds the table, which fails while the search
+        # index's triggers refer to it; set them aside
+        triggers = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+        ).all()
+        for name, _ in triggers:
+            op.execute(f'DROP TRIGGER {name}')
+
+    with op.batch_alter_table('archived_expenses', schema=None) as batch_op:
+        batch_op.drop_column('currency')
+
+    # Rebuilt tables lose AUTOINCREMENT unless asked for it again
+    with op.batch_alter_table('expenses', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('currency')
+
+    with op.batch_alter_table('groups', schema=None) as batch_op:
+        batch_op.drop_column('base_currency')
+
+    for _, sql in triggers:
+        op.execute(sql)
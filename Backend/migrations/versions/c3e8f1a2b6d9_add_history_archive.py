@@ -0,0 +1,117 @@
+"""Add archive tables, balance checkpoints and opening balances
+
+Revision ID: c3e8f1a2b6d9
+Revises: a9d2e6c4b718
+Create Date: 2026-10-19 18:40:11.207354
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8f1a2b6d9'
+down_revision = 'a9d2e6c4b718'
+branch_labels = None
+depends_on = None
+
+# Archived rows keep their ids, so these tables must never hand an id out twice
+NEVER_REUSE_IDS = ['expenses', 'expense_splits', 'settlements']
+
+
+def _set_autoincrement(enabled):
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    # SQLite rebuilds each table and renames the copy into place, which fails
+    # while other triggers (the search index's) refer to it; set them aside
+    triggers = bind.execute(
+        sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    ).all()
+    for name, _ in triggers:
+        op.execute(f'DROP TRIGGER {name}')
+
+    for table in NEVER_REUSE_IDS:
+        with op.batch_alter_table(table, recreate='always', table_kwargs={'sqlite_autoincrement': enabled}):
+            pass
+
+    for _, sql in triggers:
+        op.execute(sql)
+
+
+def upgrade():
+    op.create_table('archived_expenses',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('description', sa.String(length=255), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], name='fk_archived_expenses_created_by_users'),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], name='fk_archived_expenses_group_id_groups', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_archived_expenses_group_id_date', 'archived_expenses', ['group_id', 'date'], unique=False)
+    op.create_table('archived_expense_splits',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('expense_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('amount_owed', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['expense_id'], ['archived_expenses.id'], name='fk_archived_expense_splits_expense_id_archived_expenses', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='fk_archived_expense_splits_user_id_users'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_expense_splits_expense_id'), 'archived_expense_splits', ['expense_id'], unique=False)
+    op.create_table('archived_settlements',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('from_user_id', sa.Integer(), nullable=False),
+    sa.Column('to_user_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['from_user_id'], ['users.id'], name='fk_archived_settlements_from_user_id_users'),
+    sa.ForeignKeyConstraint(['to_user_id'], ['users.id'], name='fk_archived_settlements_to_user_id_users'),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], name='fk_archived_settlements_group_id_groups', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_archived_settlements_group_id'), 'archived_settlements', ['group_id'], unique=False)
+    op.create_table('balance_checkpoints',
+    sa.Column('group_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('closed_before', sa.DateTime(), nullable=True),
+    sa.Column('expense_count', sa.Integer(), nullable=False),
+    sa.Column('total_spent', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('settlement_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], name='fk_balance_checkpoints_group_id_groups', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('group_id')
+    )
+    op.create_table('opening_balances',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('debtor_id', sa.Integer(), nullable=False),
+    sa.Column('creditor_id', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['group_id'], ['groups.id'], name='fk_opening_balances_group_id_groups', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['debtor_id'], ['users.id'], name='fk_opening_balances_debtor_id_users'),
+    sa.ForeignKeyConstraint(['creditor_id'], ['users.id'], name='fk_opening_balances_creditor_id_users'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('group_id', 'debtor_id', 'creditor_id', name='uq_opening_balances_group_id_debtor_id_creditor_id')
+    )
+
+    _set_autoincrement(True)
+
+
+def downgrade():
+    _set_autoincrement(False)
+
+    op.drop_table('opening_balances')
+    op.drop_table('balance_checkpoints')
+    op.drop_index(op.f('ix_archived_settlements_group_id'), table_name='archived_settlements')
+    op.drop_table('archived_settlements')
+    op.drop_index(op.f('ix_archived_expense_splits_expense_id'), table_name='archived_expense_splits')
+    op.drop_table('archived_expense_splits')
+    op.drop_index('ix_archived_expenses_group_id_date', table_name='archived_expenses')
+    op.drop_table('archived_expenses')
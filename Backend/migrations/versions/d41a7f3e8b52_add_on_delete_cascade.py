@@ -0,0 +1,65 @@
+"""Add ON DELETE CASCADE to group and expense foreign keys
+
+Revision ID: d41a7f3e8b52
+Revises: b27c4e8d5a16
+Create Date: 2026-10-19 13:08:27.514093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a7f3e8b52'
+down_revision = 'b27c4e8d5a16'
+branch_labels = None
+depends_on = None
+
+# The original foreign keys are unnamed; this names them on reflection so
+# batch mode can drop and recreate them
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+# (table, column, referred table)
+CASCADES = [
+    ('memberships', 'user_id', 'users'),
+    ('memberships', 'group_id', 'groups'),
+    ('expenses', 'group_id', 'groups'),
+    ('expense_splits', 'expense_id', 'expenses'),
+    ('generated_expenses', 'expense_id', 'expenses'),
+    ('settlements', 'group_id', 'groups'),
+]
+
+
+def _set_ondelete(ondelete):
+    bind = op.get_bind()
+
+    # SQLite rebuilds each table and renames the copy into place, which fails
+    # while other triggers (the search index's) refer to it; set them aside
+    triggers = []
+    if bind.dialect.name == 'sqlite':
+        triggers = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+        ).all()
+        for name, _ in triggers:
+            op.execute(f'DROP TRIGGER {name}')
+
+    tables = list(dict.fromkeys(table for table, _, _ in CASCADES))
+    for table in tables:
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for _, column, referred in (c for c in CASCADES if c[0] == table):
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+    for _, sql in triggers:
+        op.execute(sql)
+
+
+def upgrade():
+    _set_ondelete('CASCADE')
+
+
+def downgrade():
+    _set_ondelete(None)
@@ -0,0 +1,45 @@
+"""Add expense categories
+
+Revision ID: d8a3f5c1e7b2
+Revises: b7d4e2f9a1c3
+Create Date: 2026-10-19 23:05:18.641207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3f5c1e7b2'
+down_revision = 'b7d4e2f9a1c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing expenses stay uncategorised until `flask categories backfill`
+    op.add_column('expenses', sa.Column('category', sa.String(length=32), nullable=True))
+    op.add_column('archived_expenses', sa.Column('category', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    bind = op.get_bind()
+    triggers = []
+    if bind.dialect.name == 'sqlite':
+        # Dropping a column rebuilds the table, which fails while the search
+        # index's triggers refer to it; set them aside
+        triggers = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+        ).all()
+        for name, _ in triggers:
+            op.execute(f'DROP TRIGGER {name}')
+
+    with op.batch_alter_table('archived_expenses', schema=None) as batch_op:
+        batch_op.drop_column('category')
+
+    # Rebuilt tables lose AUTOINCREMENT unless asked for it again
+    with op.batch_alter_table('expenses', schema=None, table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        batch_op.drop_column('category')
+
+    for _, sql in triggers:
+        op.execute(sql)
@@ -0,0 +1,46 @@
+"""Never reuse group change log ids
+
+Revision ID: e3a7b1d5c924
+Revises: a4f1c8e3d925
+Create Date: 2026-10-20 10:12:37.480215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7b1d5c924'
+down_revision = 'a4f1c8e3d925'
+branch_labels = None
+depends_on = None
+
+
+def _set_autoincrement(enabled):
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    # SQLite rebuilds the table and renames the copy into place, which fails
+    # while other triggers (the search index's) refer to it; set them aside
+    triggers = bind.execute(
+        sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    ).all()
+    for name, _ in triggers:
+        op.execute(f'DROP TRIGGER {name}')
+
+    # Incremental integrity checks resume after the highest id they have
+    # seen; a deleted group's ids must not come back
+    with op.batch_alter_table('group_changes', recreate='always', table_kwargs={'sqlite_autoincrement': enabled}):
+        pass
+
+    for _, sql in triggers:
+        op.execute(sql)
+
+
+def upgrade():
+    _set_autoincrement(True)
+
+
+def downgrade():
+    _set_autoincrement(False)
@@ -0,0 +1,36 @@
+"""Add subscription owner, creator and active columns
+
+Revision ID: e5b9c2a7d814
+Revises: d41a7f3e8b52
+Create Date: 2026-10-19 14:02:11.637482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c2a7d814'
+down_revision = 'd41a7f3e8b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # These columns were declared on the model but never reached the table,
+    # so no subscription rows could have been written through the model yet
+    with op.batch_alter_table('subscriptions') as batch_op:
+        batch_op.add_column(sa.Column('owner_id', sa.Integer(), nullable=False))
+        batch_op.add_column(sa.Column('created_by', sa.Integer(), nullable=False))
+        batch_op.add_column(sa.Column('active', sa.Boolean(), nullable=True))
+        batch_op.create_foreign_key('fk_subscriptions_created_by_users', 'users', ['created_by'], ['id'])
+        batch_op.create_index('ix_subscriptions_active_next_billing_date', ['active', 'next_billing_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('subscriptions') as batch_op:
+        batch_op.drop_index('ix_subscriptions_active_next_billing_date')
+        batch_op.drop_constraint('fk_subscriptions_created_by_users', type_='foreignkey')
+        batch_op.drop_column('active')
+        batch_op.drop_column('created_by')
+        batch_op.drop_column('owner_id')
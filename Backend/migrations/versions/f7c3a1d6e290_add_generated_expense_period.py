@@ -0,0 +1,57 @@
+"""Replace generated expense billing_period with a sortable YYYYMM period
+
+Revision ID: f7c3a1d6e290
+Revises: e5b9c2a7d814
+Create Date: 2026-10-19 14:47:36.208915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c3a1d6e290'
+down_revision = 'e5b9c2a7d814'
+branch_labels = None
+depends_on = None
+
+# Rows per backfill UPDATE, so a large table isn't rewritten in one statement
+BATCH_SIZE = 10000
+
+# 'MM-YYYY' -> YYYYMM and back
+TO_PERIOD = "CAST(substr(billing_period, 4, 4) AS INTEGER) * 100 + CAST(substr(billing_period, 1, 2) AS INTEGER)"
+FROM_PERIOD = "substr('0' || (period % 100), -2) || '-' || (period / 100)"
+
+
+def _backfill(column, expression):
+    bind = op.get_bind()
+    max_id = bind.execute(sa.text('SELECT max(id) FROM generated_expenses')).scalar() or 0
+    for start in range(0, max_id, BATCH_SIZE):
+        bind.execute(
+            sa.text(f'UPDATE generated_expenses SET {column} = {expression} WHERE id > :start AND id <= :end'),
+            {'start': start, 'end': start + BATCH_SIZE}
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('generated_expenses') as batch_op:
+        batch_op.add_column(sa.Column('period', sa.Integer(), nullable=True))
+
+    _backfill('period', TO_PERIOD)
+
+    with op.batch_alter_table('generated_expenses') as batch_op:
+        batch_op.alter_column('period', existing_type=sa.Integer(), nullable=False)
+        batch_op.drop_column('billing_period')
+        batch_op.create_index('ix_generated_expenses_subscription_id_period', ['subscription_id', 'period'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('generated_expenses') as batch_op:
+        batch_op.add_column(sa.Column('billing_period', sa.String(length=7), nullable=True))
+
+    _backfill('billing_period', FROM_PERIOD)
+
+    with op.batch_alter_table('generated_expenses') as batch_op:
+        batch_op.drop_index('ix_generated_expenses_subscription_id_period')
+        batch_op.alter_column('billing_period', existing_type=sa.String(length=7), nullable=False)
+        batch_op.drop_column('period')
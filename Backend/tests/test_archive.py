@@ -0,0 +1,175 @@
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from sqlalchemy import select, func
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.analytics import AnalyticsSnapshot
+from app.archive import archive_group_history
+from app.models import User, Expense, ExpenseSplit, Settlement, ArchivedExpense, BalanceCheckpoint
+from app.services.balance_service import (
+    calculate_group_balances, get_group_obligations, get_user_net_balance,
+    get_user_obligations, get_user_pair_balances
+)
+from app.services.change_service import get_group_changes
+from app.services.expense_service import create_expense, get_group_expenses, get_expense_details
+from app.services.group_service import create_group, add_user_to_group, get_user_dashboard
+from app.services.insight_service import spend_per_user_per_month
+from app.services.settlement_service import (
+    create_settlement_request, confirm_settlement, reject_settlement, get_group_settlements
+)
+
+CUT_OFF = datetime(2026, 1, 1)
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestArchive(unittest.TestCase):
+    """Test suite for moving settled history out of the hot tables"""
+
+    def setUp(self):
+        """Alice, Bob and Carol share a flat with a year of history before the cut-off and some after"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.group = create_group("Flat", self.alice)
+        add_user_to_group(self.group, self.bob)
+        add_user_to_group(self.group, self.carol)
+        everyone = [self.alice.id, self.bob.id, self.carol.id]
+
+        for month in range(1, 13):
+            payer = [self.alice, self.bob, self.carol][month % 3]
+            self.spend(payer, f"Rent {month}", "900.00", everyone, datetime(2025, month, 1))
+        self.spend(self.bob, "Takeaway", "45.00", [self.bob.id, self.carol.id], datetime(2025, 6, 20))
+
+        # Bob paid Alice back twice in 2025 (one of them too much), Carol's claim was rejected
+        self.settle(self.bob, self.alice, "200.00", datetime(2025, 7, 1), "confirm")
+        self.settle(self.bob, self.alice, "500.00", datetime(2025, 9, 1), "confirm")
+        self.settle(self.carol, self.bob, "50.00", datetime(2025, 10, 1), "reject")
+        # Still awaiting Alice, so it stays hot
+        self.settle(self.carol, self.alice, "100.00", datetime(2025, 11, 1), None)
+
+        self.spend(self.carol, "Broadband", "60.00", everyone, datetime(2026, 2, 1))
+        self.settle(self.alice, self.carol, "20.00", datetime(2026, 2, 5), "confirm")
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def spend(self, payer, description, amount, users, date):
+        return create_expense(self.group, payer, description, Decimal(amount), {"type": "equal", "users": users}, date)
+
+    def settle(self, payer, payee, amount, requested_at, outcome):
+        settlement = create_settlement_request(self.group, payer, payee, Decimal(amount))
+        settlement.created_at = requested_at
+        db.session.commit()
+        if outcome == "confirm":
+            confirm_settlement(settlement, payee)
+        elif outcome == "reject":
+            reject_settlement(settlement, payee.id)
+        return settlement
+
+    def balances(self):
+        """Every balance read the services offer, for comparing before and after archiving"""
+        users = [self.alice, self.bob, self.carol]
+        dashboards = [get_user_dashboard(user)[0] for user in users]
+        return {
+            "group": dict(calculate_group_balances(self.group)),
+            "obligations": {d: dict(c) for d, c in get_group_obligations(self.group).items()},
+            "net": [get_user_net_balance(self.group, user.id) for user in users],
+            "pairs": [get_user_pair_balances(self.group, user.id) for user in users],
+            "user_obligations": [get_user_obligations(self.group, user.id) for user in users],
+            "dashboard": [(d["net_balance"], d["expense_count"], d["total_spent"]) for d in dashboards],
+        }
+
+    def count(self, model):
+        return db.session.scalar(select(func.count()).select_from(model))
+
+    def test_balances_are_unchanged_by_archiving(self):
+        """Test every balance read gives the same figures from opening balances plus the hot set"""
+        before = self.balances()
+        archived = archive_group_history(self.group, CUT_OFF)
+
+        self.assertEqual(archived, {"expenses": 13, "settlements": 3})
+        self.assertEqual(self.count(Expense), 1)
+        self.assertEqual(self.count(ExpenseSplit), 3)
+        # The pending request and the 2026 settlement stay hot
+        self.assertEqual(self.count(Settlement), 2)
+        self.assertEqual(self.balances(), before)
+
+    def test_history_stays_reachable(self):
+        """Test listings can include the archive and archived expenses keep their ids"""
+        expenses = get_group_expenses(self.group, with_splits=True)
+        settlements = get_group_settlements(self.group)
+        takeaway = next(e for e in expenses if e.description == "Takeaway")
+
+        archive_group_history(self.group, CUT_OFF)
+
+        self.assertEqual([e.description for e in get_group_expenses(self.group)], ["Broadband"])
+        self.assertEqual(get_group_expenses(self.group, with_splits=True, include_archived=True), expenses)
+        self.assertEqual(get_group_settlements(self.group, include_archived=True), settlements)
+        self.assertEqual(get_expense_details(takeaway), takeaway)
+
+        # A new device syncing from scratch still receives the archived rows
+        changes = get_group_changes(self.group, since=0, limit=1000)
+        self.assertEqual(len(changes["expenses"]["inserted"]), 14)
+
+    def test_archived_ids_are_never_reused(self):
+        """Test new rows never take an archived id, even once the newest hot row is gone"""
+        archive_group_history(self.group, CUT_OFF)
+        archived_ids = set(db.session.scalars(select(ArchivedExpense.id)))
+        db.session.execute(db.delete(ExpenseSplit))
+        db.session.execute(db.delete(Expense))
+        db.session.commit()
+
+        expense = self.spend(self.alice, "Milk", "3.00", [self.alice.id, self.bob.id, self.carol.id], datetime(2026, 3, 1))
+        self.assertNotIn(expense.id, archived_ids)
+        self.assertGreater(expense.id, max(archived_ids))
+
+    def test_runs_in_batches_and_can_be_repeated(self):
+        """Test small batches and a second run over the same cut-off change nothing"""
+        before = self.balances()
+        archive_group_history(self.group, datetime(2025, 7, 1), batch_size=2)
+        archive_group_history(self.group, CUT_OFF, batch_size=2)
+        self.assertEqual(archive_group_history(self.group, CUT_OFF), {"expenses": 0, "settlements": 0})
+
+        checkpoint = db.session.get(BalanceCheckpoint, self.group.id)
+        self.assertEqual(checkpoint.closed_before, CUT_OFF)
+        self.assertEqual((checkpoint.expense_count, checkpoint.total_spent, checkpoint.settlement_count),
+                         (13, Decimal("10845.00"), 3))
+        self.assertEqual(self.balances(), before)
+
+    def test_insights_still_cover_archived_spend(self):
+        """Test the analytics snapshot reads archived splits, before and after a rebuild"""
+        self.app.extensions["analytics_snapshot"] = AnalyticsSnapshot(reconcile_seconds=0)
+        before = spend_per_user_per_month()
+
+        archive_group_history(self.group, CUT_OFF)
+        self.assertEqual(spend_per_user_per_month(), before)
+
+        self.app.extensions["analytics_snapshot"] = AnalyticsSnapshot()
+        self.assertEqual(spend_per_user_per_month(), before)
+
+    def test_cannot_archive_the_future(self):
+        """Test a cut-off in the future is refused"""
+        with self.assertRaises(ValueError):
+            archive_group_history(self.group, datetime(2999, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
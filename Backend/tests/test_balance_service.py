@@ -6,7 +6,10 @@ from datetime import datetime
 from app import create_app
 from app.extensions import db
 from app.models import User, Group, Expense, ExpenseSplit, Settlement
-from app.services.balance_service import calculate_group_balances
+from app.services.balance_service import (
+    calculate_group_balances, get_group_obligations, get_user_obligations,
+    get_user_net_balance, get_user_pair_balances
+)
 
 
 class TestBalanceService(unittest.TestCase):
@@ -287,6 +290,110 @@ class TestBalanceService(unittest.TestCase):
             self.assertEqual(balances[self.carol_id], Decimal("-20.00"))
 
 
+    def test_splits_short_of_the_total_are_refused(self):
+        """Test the payer is credited the expense total, so splits that don't cover it fail the zero-sum check"""
+        with self.app.app_context():
+            expense = Expense(group_id=self.group_id, created_by=self.alice_id, description="Dinner",
+                              total_amount=Decimal("60.00"), date=datetime(2026, 2, 5))
+            db.session.add(expense)
+            db.session.commit()
+            db.session.add(ExpenseSplit(expense_id=expense.id, user_id=self.bob_id, amount_owed=Decimal("10.00")))
+            db.session.commit()
+
+            group = db.session.get(Group, self.group_id)
+            with self.assertRaisesRegex(ValueError, "do not sum to zero"):
+                calculate_group_balances(group)
+            self.assertEqual(get_user_net_balance(group, self.alice_id), Decimal("60.00"))
+
+    def _add_dinner_and_taxi(self):
+        """Alice pays £60 split three ways, Bob pays £30 split with Alice"""
+        dinner = Expense(group_id=self.group_id, created_by=self.alice_id, description="Dinner",
+                         total_amount=Decimal("60.00"), date=datetime(2026, 2, 5))
+        taxi = Expense(group_id=self.group_id, created_by=self.bob_id, description="Taxi",
+                       total_amount=Decimal("30.00"), date=datetime(2026, 2, 5))
+        db.session.add_all([dinner, taxi])
+        db.session.commit()
+
+        db.session.add_all([
+            ExpenseSplit(expense_id=dinner.id, user_id=self.alice_id, amount_owed=Decimal("20.00")),
+            ExpenseSplit(expense_id=dinner.id, user_id=self.bob_id, amount_owed=Decimal("20.00")),
+            ExpenseSplit(expense_id=dinner.id, user_id=self.carol_id, amount_owed=Decimal("20.00")),
+            ExpenseSplit(expense_id=taxi.id, user_id=self.alice_id, amount_owed=Decimal("15.00")),
+            ExpenseSplit(expense_id=taxi.id, user_id=self.bob_id, amount_owed=Decimal("15.00")),
+            # Carol pays Alice back in full (confirmed); Bob's claim is still pending
+            Settlement(group_id=self.group_id, from_user_id=self.carol_id, to_user_id=self.alice_id,
+                       amount=Decimal("20.00"), status="confirmed"),
+            Settlement(group_id=self.group_id, from_user_id=self.bob_id, to_user_id=self.alice_id,
+                       amount=Decimal("5.00"), status="pending"),
+        ])
+        db.session.commit()
+
+    def test_user_obligations_match_group_obligations(self):
+        """Test the user-scoped query agrees with slicing the full obligation matrix"""
+        with self.app.app_context():
+            self._add_dinner_and_taxi()
+
+            group = db.session.get(Group, self.group_id)
+            matrix = get_group_obligations(group)
+
+            for user_id in (self.alice_id, self.bob_id, self.carol_id):
+                expected_owed_by = {d: c[user_id] for d, c in matrix.items() if user_id in c}
+                obligations = get_user_obligations(group, user_id)
+                self.assertEqual(obligations["owes"], dict(matrix.get(user_id, {})))
+                self.assertEqual(obligations["owed_by"], expected_owed_by)
+
+            alice = get_user_obligations(group, self.alice_id)
+            self.assertEqual(alice, {"owes": {self.bob_id: Decimal("15.00")}, "owed_by": {self.bob_id: Decimal("20.00")}})
+
+    def test_user_net_balance_matches_group_balances(self):
+        """Test the single-user net and per-pair balances agree with calculate_group_balances"""
+        with self.app.app_context():
+            self._add_dinner_and_taxi()
+
+            group = db.session.get(Group, self.group_id)
+            balances = calculate_group_balances(group)
+
+            for user_id in (self.alice_id, self.bob_id, self.carol_id):
+                self.assertEqual(get_user_net_balance(group, user_id), balances[user_id])
+                pairs = get_user_pair_balances(group, user_id)
+                self.assertEqual(sum(pairs.values(), Decimal("0.00")), balances[user_id])
+
+            # Carol has settled up; Alice and Bob net out at £5 in Alice's favour
+            self.assertEqual(get_user_pair_balances(group, self.carol_id), {})
+            self.assertEqual(get_user_pair_balances(group, self.alice_id), {self.bob_id: Decimal("5.00")})
+
+    def test_streamed_batches_match_a_ledger_walk(self):
+        """Test small streaming batches give the same maps as walking the ORM rows"""
+        with self.app.app_context():
+            self._add_dinner_and_taxi()
+            # Bob overpays Alice, so that pair drops out of the obligations
+            db.session.add(Settlement(group_id=self.group_id, from_user_id=self.bob_id, to_user_id=self.alice_id,
+                                      amount=Decimal("25.00"), status="confirmed"))
+            db.session.commit()
+            group = db.session.get(Group, self.group_id)
+
+            expected_balances = defaultdict(lambda: Decimal("0.00"))
+            expected_obligations = defaultdict(lambda: defaultdict(lambda: Decimal("0.00")))
+            for expense in group.expenses:
+                expected_balances[expense.created_by] += expense.total_amount
+                for split in expense.splits:
+                    expected_balances[split.user_id] -= split.amount_owed
+                    if split.user_id != expense.created_by:
+                        expected_obligations[split.user_id][expense.created_by] += split.amount_owed
+            for settlement in group.settlements:
+                if settlement.status == "confirmed":
+                    expected_balances[settlement.from_user_id] += settlement.amount
+                    expected_balances[settlement.to_user_id] -= settlement.amount
+                    expected_obligations[settlement.from_user_id][settlement.to_user_id] -= settlement.amount
+
+            self.assertEqual(dict(calculate_group_balances(group, batch_size=1)), dict(expected_balances))
+            obligations = get_group_obligations(group, batch_size=1)
+            self.assertEqual({d: dict(c) for d, c in obligations.items()},
+                             {self.alice_id: {self.bob_id: Decimal("15.00")}})
+            self.assertEqual(expected_obligations[self.bob_id][self.alice_id], Decimal("-5.00"))
+            self.assertEqual(get_group_obligations(group), obligations)
+
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -0,0 +1,131 @@
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from app import create_app
+from app.archive import archive_group_history
+from app.categories import Categorizer, DEFAULT_RULES, backfill_categories
+from app.config import Config
+from app.extensions import db
+from app.models import User, Expense, ArchivedExpense, GroupChange
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestCategorizer(unittest.TestCase):
+    """Test suite for the combined rule matcher"""
+
+    def setUp(self):
+        self.categorizer = Categorizer(DEFAULT_RULES)
+
+    def test_keywords_match_whole_words_in_any_case(self):
+        """Test keywords and phrases match whole words only"""
+        cases = {
+            "March RENT": "rent",
+            "Tesco big shop": "groceries",
+            "Netflix": "streaming",
+            "Amazon   Prime renewal": "streaming",
+            "Council tax Q1": "utilities",
+            "Trip to Lisbon": "travel",
+            "Disney+ annual": "streaming",
+            "Parental leave gift": None,
+            "Barbecue supplies": None,
+            "": None,
+        }
+        self.assertEqual({d: self.categorizer.categorize(d) for d in cases}, cases)
+
+    def test_earliest_match_then_first_listed_category_wins(self):
+        """Test a description matching several rules takes the first match, then the first category"""
+        self.assertEqual(self.categorizer.categorize("Pizza on the train"), "eating_out")
+        self.assertEqual(self.categorizer.categorize("Train, then pizza"), "travel")
+        # "uber eats" (eating_out) and "uber" (travel) both start at the same place
+        self.assertEqual(self.categorizer.categorize("Uber Eats"), "eating_out")
+        self.assertEqual(self.categorizer.categorize("Uber home"), "travel")
+
+    def test_bulk_matches_one_by_one(self):
+        """Test categorize_many agrees with categorize and keeps order"""
+        descriptions = ["Rent", "Spotify", "Misc", "Rent", "Hotel", "Misc"]
+        self.assertEqual(self.categorizer.categorize_many(descriptions),
+                         [self.categorizer.categorize(d) for d in descriptions])
+
+    def test_custom_rules_with_patterns(self):
+        """Test a rule set with a pattern and no keywords"""
+        categorizer = Categorizer({"pets": {"patterns": [r"\bvet(erinary)?\b"]}, "other": {}})
+        self.assertEqual(categorizer.categorize_many(["Veterinary bill", "vet", "Vetting fee"]), ["pets", "pets", None])
+
+
+class TestCategoryBackfill(unittest.TestCase):
+    """Test suite for categorising expenses as they are added and in bulk"""
+
+    def setUp(self):
+        """Alice and Bob share a flat"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def spend(self, description, date=datetime(2026, 3, 1), category=None):
+        return create_expense(self.flat, self.alice, description, Decimal("20.00"),
+                              {"type": "equal", "users": [self.alice.id, self.bob.id]}, date, category=category)
+
+    def test_new_expenses_are_categorised(self):
+        """Test create_expense categorises from the description unless given a category"""
+        self.assertEqual(self.spend("Sainsbury's").category, "groceries")
+        self.assertEqual(self.spend("Sainsbury's", category="party").category, "party")
+        self.assertIsNone(self.spend("Misc").category)
+
+    def test_backfill_in_chunks(self):
+        """Test the backfill categorises hot and archived expenses and logs the hot ones for sync"""
+        descriptions = ["Rent", "Netflix", "Misc", "Hotel", "Lidl", "Gift", "Broadband"]
+        for i, description in enumerate(descriptions):
+            self.spend(description, datetime(2025 + i % 2, 3, 1))
+        archive_group_history(self.flat, datetime(2026, 1, 1))
+        for model in (Expense, ArchivedExpense):
+            db.session.execute(update(model).values(category=None))
+        db.session.commit()
+        changes_before = db.session.scalar(select(db.func.count()).select_from(GroupChange))
+
+        totals = backfill_categories(chunk_size=2)
+        self.assertEqual((totals["scanned"], totals["categorized"]), (7, 5))
+
+        categories = dict(db.session.execute(select(Expense.description, Expense.category)).all())
+        categories.update(db.session.execute(select(ArchivedExpense.description, ArchivedExpense.category)).all())
+        self.assertEqual(categories, {
+            "Rent": "rent", "Netflix": "streaming", "Misc": None, "Hotel": "travel",
+            "Lidl": "groceries", "Gift": None, "Broadband": "utilities",
+        })
+        # Only the hot rows that got a category are logged
+        hot_categorised = db.session.scalar(
+            select(db.func.count()).select_from(Expense).where(Expense.category.is_not(None))
+        )
+        changes = db.session.scalar(select(db.func.count()).select_from(GroupChange))
+        self.assertEqual(changes - changes_before, hot_categorised)
+
+        # Nothing left to do, short of --all
+        self.assertEqual(backfill_categories()["categorized"], 0)
+        result = self.app.test_cli_runner().invoke(args=["categories", "backfill", "--all"])
+        self.assertIn("categorised 0", result.output)
+        self.assertIn("expenses/s", result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
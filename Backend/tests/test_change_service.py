@@ -0,0 +1,119 @@
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User
+from app.services.change_service import get_group_changes
+from app.services.expense_service import create_expense, delete_expense
+from app.services.group_service import create_group, add_user_to_group, change_member_role
+from app.services.settlement_service import create_settlement_request, confirm_settlement
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestGroupChanges(unittest.TestCase):
+    """Test suite for delta sync from the per-group change log"""
+
+    def setUp(self):
+        """Alice and Bob share a flat; Carol is not a member"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add(self, description, total):
+        return create_expense(self.flat, self.alice, description, Decimal(total),
+                              {"type": "equal", "users": [self.alice.id, self.bob.id]}, datetime(2026, 3, 1))
+
+    def test_changes_since_cursor(self):
+        """Test a sync returns only what changed after the client's cursor"""
+        first = get_group_changes(self.flat)
+        self.assertEqual([m.user_id for m in first["memberships"]["inserted"]], [self.alice.id, self.bob.id])
+
+        groceries = self.add("Groceries", "30.00")
+        settlement = create_settlement_request(self.flat, self.bob, self.alice, Decimal("15.00"))
+        changes = get_group_changes(self.flat, since=first["cursor"])
+        self.assertEqual([e.id for e in changes["expenses"]["inserted"]], [groceries.id])
+        self.assertEqual(len(changes["expenses"]["inserted"][0].splits), 2)
+        self.assertEqual([s.status for s in changes["settlements"]["inserted"]], ["pending"])
+        self.assertEqual(changes["memberships"], {"inserted": [], "updated": [], "deleted": []})
+
+        confirm_settlement(settlement, self.alice)
+        delete_expense(self.flat, groceries, self.alice)
+        change_member_role(self.flat, self.bob, "admin")
+        later = get_group_changes(self.flat, since=changes["cursor"])
+        self.assertEqual([s.status for s in later["settlements"]["updated"]], ["confirmed"])
+        self.assertEqual(later["expenses"]["deleted"], [groceries.id])
+        self.assertEqual([m.role for m in later["memberships"]["updated"]], ["admin"])
+
+        idle = get_group_changes(self.flat, since=later["cursor"])
+        self.assertEqual((idle["cursor"], idle["has_more"]), (later["cursor"], False))
+
+    def test_rows_inserted_and_deleted_within_the_window_are_omitted(self):
+        """Test a client never hears about a row that came and went between syncs"""
+        cursor = get_group_changes(self.flat)["cursor"]
+        short_lived = self.add("Oops", "10.00")
+        kept = self.add("Rent", "900.00")
+        delete_expense(self.flat, short_lived, self.alice)
+
+        changes = get_group_changes(self.flat, since=cursor)
+        self.assertEqual([e.id for e in changes["expenses"]["inserted"]], [kept.id])
+        self.assertEqual(changes["expenses"]["deleted"], [])
+
+    def test_paging(self):
+        """Test large backlogs are read a page at a time"""
+        for i in range(5):
+            self.add(f"Expense {i}", "10.00")
+
+        page = get_group_changes(self.flat, since=2, limit=3)
+        self.assertTrue(page["has_more"])
+        self.assertEqual(len(page["expenses"]["inserted"]), 3)
+        rest = get_group_changes(self.flat, since=page["cursor"], limit=3)
+        self.assertFalse(rest["has_more"])
+        self.assertEqual(len(rest["expenses"]["inserted"]), 2)
+
+    def test_changes_endpoint(self):
+        """Test GET /groups/<id>/changes for members, non-members and bad cursors"""
+        client = self.app.test_client()
+        self.add("Groceries", "30.00")
+
+        def get(user, query=""):
+            with self.app.test_request_context():
+                token = create_access_token(identity=str(user.id))
+            return client.get(f"/groups/{self.flat.id}/changes{query}", headers={"Authorization": f"Bearer {token}"})
+
+        response = get(self.bob, "?since=2")
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["cursor"], 3)
+        self.assertEqual(body["expenses"]["inserted"][0]["total_amount"], "30.00")
+
+        self.assertEqual(get(self.carol).status_code, 404)
+        self.assertEqual(get(self.bob, "?since=abc").status_code, 400)
+        self.assertEqual(client.get(f"/groups/{self.flat.id}/changes").status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from sqlalchemy import select, func
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Expense, Settlement, GroupChange
+from app.services.expense_service import create_expense, delete_expense
+from app.services.group_service import create_group, add_user_to_group
+from app.services.settlement_service import create_settlement_request, confirm_settlement, reject_settlement
+from app.transactions import commit, ConcurrentUpdateError
+
+
+class TestOptimisticConcurrency(unittest.TestCase):
+    """Test suite for writes racing other requests on the same rows"""
+
+    def setUp(self):
+        """Alice and Bob share a flat, in a database file the threads share"""
+        self.tmpdir = tempfile.mkdtemp()
+
+        class TestConfig(Config):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(self.tmpdir, "test.db")
+            TESTING = True
+
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def elsewhere(self, fn):
+        """Run fn in another request's session and commit it"""
+        with self.app.app_context():
+            fn()
+            db.session.remove()
+
+    def test_stale_settlement_is_not_overwritten(self):
+        """Test rejecting a settlement someone confirmed meanwhile conflicts, and a retry sees why"""
+        settlement = create_settlement_request(self.flat, self.bob, self.alice, Decimal("10.00"))
+        self.assertEqual((settlement.status, settlement.version), ("pending", 1))
+
+        self.elsewhere(lambda: confirm_settlement(db.session.get(Settlement, settlement.id), db.session.get(User, self.alice.id)))
+
+        with self.assertRaises(ConcurrentUpdateError):
+            reject_settlement(settlement, self.alice.id)
+        settlement = db.session.get(Settlement, settlement.id)
+        self.assertEqual((settlement.status, settlement.version), ("confirmed", 2))
+        with self.assertRaisesRegex(ValueError, "Only pending"):
+            reject_settlement(settlement, self.alice.id)
+
+    def test_stale_expense_is_neither_flushed_nor_deleted(self):
+        """Test ORM edits and deletes of an expense changed meanwhile conflict"""
+        expense = create_expense(self.flat, self.alice, "Rent", Decimal("20.00"),
+                                 {"type": "equal", "users": [self.alice.id, self.bob.id]}, datetime(2026, 3, 1))
+
+        def rename(description):
+            db.session.get(Expense, expense.id).description = description
+            db.session.commit()
+
+        self.elsewhere(lambda: rename("March rent"))
+        expense.description = "Rent (March)"
+        with self.assertRaises(ConcurrentUpdateError):
+            commit()
+        self.assertEqual((expense.description, expense.version), ("March rent", 2))
+        self.elsewhere(lambda: rename("Rent"))
+        with self.assertRaises(ConcurrentUpdateError):
+            delete_expense(self.flat, expense, self.alice)
+        self.assertEqual(db.session.get(Expense, expense.id).version, 3)
+
+    def test_racing_confirms_and_rejects_resolve_each_settlement_once(self):
+        """Test threads confirming and rejecting the same settlements: one winner each, no lost updates"""
+        ids = [create_settlement_request(self.flat, self.bob, self.alice, Decimal("1.00")).id for _ in range(20)]
+        wins, conflicts, errors = [], [], []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            with self.app.app_context():
+                alice = db.session.get(User, self.alice.id)
+                for settlement_id in rng.sample(ids, len(ids)):
+                    while True:
+                        settlement = db.session.get(Settlement, settlement_id)
+                        try:
+                            if rng.random() < 0.5:
+                                confirm_settlement(settlement, alice)
+                            else:
+                                reject_settlement(settlement, alice.id)
+                            wins.append(settlement_id)
+                        except ConcurrentUpdateError:
+                            conflicts.append(settlement_id)
+                            continue
+                        except ValueError:
+                            pass  # someone else got there first
+                        except Exception as error:
+                            errors.append(error)
+                        break
+                db.session.remove()
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(wins), sorted(ids))
+        rows = db.session.execute(select(Settlement.status, Settlement.version).where(Settlement.id.in_(ids))).all()
+        self.assertEqual({version for _, version in rows}, {2})
+        self.assertNotIn("pending", {status for status, _ in rows})
+        # One change-log entry per settlement resolved, none for the losers
+        updates = db.session.scalar(
+            select(func.count()).select_from(GroupChange).where(GroupChange.entity == "settlement", GroupChange.op == "update")
+        )
+        self.assertEqual(updates, len(ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
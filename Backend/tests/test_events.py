@@ -0,0 +1,108 @@
+import json
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.events import EventBroker
+from app.extensions import db
+from app.models import User
+from app.services.expense_service import create_expense, delete_expense
+from app.services.group_service import create_group, add_user_to_group, remove_user_from_group
+from app.services.settlement_service import create_settlement_request, confirm_settlement
+from app.transactions import billnest_transaction
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestGroupEvents(unittest.TestCase):
+    """Test suite for pushing coalesced group events to subscribers"""
+
+    def setUp(self):
+        """Alice and Bob share a flat; Carol is not a member yet"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        # No coalescing delay, so waits return as soon as events are pending
+        self.broker = self.app.extensions["event_broker"] = EventBroker(coalesce_seconds=0)
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add(self, description="Groceries"):
+        return create_expense(self.flat, self.alice, description, Decimal("30.00"),
+                              {"type": "equal", "users": [self.alice.id, self.bob.id]}, datetime(2026, 3, 1))
+
+    def test_bursts_are_coalesced_per_group(self):
+        """Test many writes to a group reach a subscriber as one event"""
+        bob = self.broker.subscribe(self.bob.id, [self.flat.id])
+        expenses = [self.add(f"Expense {i}") for i in range(3)]
+        settlement = create_settlement_request(self.flat, self.bob, self.alice, Decimal("15.00"))
+        confirm_settlement(settlement, self.alice)
+        delete_expense(self.flat, expenses[0], self.alice)
+
+        self.assertEqual(bob.wait(timeout=0), [{"group_id": self.flat.id, "entities": ["expense", "settlement"], "cursor": 8}])
+        self.assertEqual(bob.wait(timeout=0), [])
+
+    def test_rolled_back_writes_publish_nothing(self):
+        """Test events wait for the commit and are dropped on rollback"""
+        bob = self.broker.subscribe(self.bob.id, [self.flat.id])
+        with self.assertRaises(RuntimeError):
+            with billnest_transaction():
+                self.add()
+                self.assertEqual(bob.wait(timeout=0), [])
+                raise RuntimeError("abandon")
+
+        self.assertEqual(bob.wait(timeout=0), [])
+
+    def test_membership_changes_follow_and_unfollow_groups(self):
+        """Test a user's open stream picks up a group they join and drops one they leave"""
+        carol = self.broker.subscribe(self.carol.id, [])
+        add_user_to_group(self.flat, self.carol)
+        self.assertEqual(carol.wait(timeout=0)[0]["entities"], ["membership"])
+
+        remove_user_from_group(self.flat, self.carol)
+        carol.wait(timeout=0)
+        self.add()
+        self.assertEqual(carol.wait(timeout=0), [])
+
+    def test_event_stream_endpoint(self):
+        """Test GET /events streams group events and unsubscribes on disconnect"""
+        with self.app.test_request_context():
+            token = create_access_token(identity=str(self.bob.id))
+        response = self.app.test_client().get("/events", headers={"Authorization": f"Bearer {token}"}, buffered=False)
+        self.assertEqual(response.mimetype, "text/event-stream")
+
+        chunks = iter(response.response)
+        self.assertEqual(next(chunks), b"retry: 5000\n\n")
+        self.assertEqual(self.broker.subscriber_count(), 1)
+
+        self.add()
+        event, data = next(chunks).decode().strip().split("\n")
+        self.assertEqual(event, "event: group")
+        self.assertEqual(json.loads(data.removeprefix("data: ")), {"group_id": self.flat.id, "entities": ["expense"], "cursor": 3})
+
+        response.close()
+        self.assertEqual(self.broker.subscriber_count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
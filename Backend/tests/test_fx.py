@@ -0,0 +1,141 @@
+import unittest
+from decimal import Decimal
+from datetime import date, datetime
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.fx import FxRates, get_fx_rates
+from app.models import User
+from app.archive import archive_group_history
+from app.services.balance_service import (
+    calculate_group_balances, get_group_obligations, get_user_net_balance, get_user_obligations
+)
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group, get_user_dashboard
+
+# Per euro, on a Friday; nothing is published over the weekend
+RATES = [
+    ("2026-03-06", "GBP", "0.8000"),
+    ("2026-03-06", "USD", "1.2500"),
+    ("2026-03-09", "GBP", "0.8500"),
+]
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    FX_RATES_PATH = None
+    TESTING = True
+
+
+class TestFx(unittest.TestCase):
+    """Test suite for expenses in other currencies than their group's"""
+
+    def setUp(self):
+        """Alice, Bob and Carol share a GBP trip kitty with rates for early March 2026"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        get_fx_rates().load(RATES)
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.group = create_group("Trip", self.alice)
+        add_user_to_group(self.group, self.bob)
+        add_user_to_group(self.group, self.carol)
+        self.everyone = [self.alice.id, self.bob.id, self.carol.id]
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def spend(self, payer, amount, users, day, currency=None):
+        return create_expense(
+            self.group, payer, "Spend", Decimal(amount), {"type": "equal", "users": users}, day, currency
+        )
+
+    def test_rates_cross_through_the_reference_and_fall_back_to_the_last_working_day(self):
+        """Test a Sunday uses Friday's rates, and lookups are memoized"""
+        fx = FxRates()
+        fx.load(RATES)
+        self.assertEqual(fx.rate("USD", "GBP", date(2026, 3, 8)), Decimal("0.64"))
+        self.assertEqual(fx.convert(Decimal("100.00"), "EUR", "GBP", datetime(2026, 3, 9, 18)), Decimal("85.00"))
+        self.assertEqual(len(fx._cache), 2)
+
+        fx.rate("USD", "GBP", date(2026, 3, 8))
+        self.assertEqual(len(fx._cache), 2)
+
+        with self.assertRaises(ValueError):
+            fx.rate("USD", "GBP", date(2026, 3, 5))
+
+    def test_converted_splits_add_up_to_the_converted_total(self):
+        """Test each expense is rounded once and its splits shared out of that to the cent"""
+        fx = FxRates()
+        fx.load(RATES)
+        converted = fx.convert_expenses([
+            ("USD", date(2026, 3, 6), Decimal("10.00"), [(1, Decimal("3.34")), (2, Decimal("3.33")), (3, Decimal("3.33"))]),
+            ("EUR", date(2026, 3, 9), Decimal("0.05"), [(1, Decimal("0.03")), (2, Decimal("0.02"))]),
+        ], "GBP")
+
+        self.assertEqual(converted[0][0], Decimal("6.40"))
+        self.assertEqual(sum(amount for _, amount in converted[0][1]), Decimal("6.40"))
+        self.assertEqual([user for user, _ in converted[0][1]], [1, 2, 3])
+        self.assertEqual(converted[1], (Decimal("0.04"), [(1, Decimal("0.02")), (2, Decimal("0.02"))]))
+
+    def test_balances_are_in_the_base_currency(self):
+        """Test every balance read converts foreign expenses at their own day's rate"""
+        self.spend(self.alice, "30.00", self.everyone, datetime(2026, 3, 6))
+        # 150 USD on a Saturday -> 96.00 GBP at Friday's rate, 32.00 each
+        self.spend(self.bob, "150.00", self.everyone, datetime(2026, 3, 7), "USD")
+        # 20 EUR on Monday -> 17.00 GBP, Carol owes Alice 8.50
+        self.spend(self.alice, "20.00", [self.alice.id, self.carol.id], datetime(2026, 3, 9), "EUR")
+
+        balances = calculate_group_balances(self.group)
+        self.assertEqual(balances[self.alice.id], Decimal("-3.50"))
+        self.assertEqual(balances[self.bob.id], Decimal("54.00"))
+        self.assertEqual(balances[self.carol.id], Decimal("-50.50"))
+
+        self.assertEqual(get_group_obligations(self.group)[self.carol.id],
+                         {self.alice.id: Decimal("18.50"), self.bob.id: Decimal("32.00")})
+        self.assertEqual(get_user_obligations(self.group, self.carol.id)["owes"],
+                         {self.alice.id: Decimal("18.50"), self.bob.id: Decimal("32.00")})
+        for user in (self.alice, self.bob, self.carol):
+            self.assertEqual(get_user_net_balance(self.group, user.id), balances[user.id])
+
+        dashboard = get_user_dashboard(self.carol)[0]
+        self.assertEqual((dashboard["net_balance"], dashboard["total_spent"]), (Decimal("-50.50"), Decimal("143.00")))
+
+    def test_archiving_carries_foreign_expenses_forward_converted(self):
+        """Test archived foreign expenses leave the same balances behind"""
+        self.spend(self.bob, "150.00", self.everyone, datetime(2026, 3, 7), "USD")
+        self.spend(self.alice, "20.00", [self.alice.id, self.carol.id], datetime(2026, 3, 9), "EUR")
+        before = dict(calculate_group_balances(self.group))
+
+        archive_group_history(self.group, datetime(2026, 3, 10))
+        self.assertEqual(dict(calculate_group_balances(self.group)), before)
+        self.assertEqual(get_user_dashboard(self.alice)[0]["total_spent"], Decimal("113.00"))
+
+    def test_expense_needs_a_known_currency_and_rate(self):
+        """Test malformed currencies and days before the first rate are refused"""
+        with self.assertRaises(ValueError):
+            self.spend(self.alice, "10.00", self.everyone, datetime(2026, 3, 6), "usd")
+        with self.assertRaises(ValueError):
+            self.spend(self.alice, "10.00", self.everyone, datetime(2026, 3, 6), "JPY")
+        with self.assertRaises(ValueError):
+            self.spend(self.alice, "10.00", self.everyone, datetime(2026, 3, 1), "USD")
+        with self.assertRaises(ValueError):
+            create_group("Tokyo", self.alice, base_currency="yen")
+
+        # The base currency needs no rate at all
+        expense = self.spend(self.alice, "10.00", self.everyone, datetime(2020, 1, 1))
+        self.assertEqual(expense.currency, "GBP")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User
+from app.services.group_service import create_group, add_user_to_group
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestGroupRoutes(unittest.TestCase):
+    """Test suite for the group expense, balance and settlement endpoints"""
+
+    def setUp(self):
+        """Alice and Bob share a flat; Carol is not a member"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def call(self, method, path, user, body=None):
+        with self.app.test_request_context():
+            token = create_access_token(identity=str(user.id))
+        return self.client.open(f"/groups/{self.flat.id}{path}", method=method, json=body,
+                                headers={"Authorization": f"Bearer {token}"})
+
+    def test_expense_then_settlement_round_trip(self):
+        """Test adding an expense, reading it back, and settling up through the API"""
+        response = self.call("POST", "/expenses", self.alice, {
+            "description": "Groceries", "total_amount": "30.00",
+            "splits": {"type": "equal", "users": [self.alice.id, self.bob.id]}, "date": "2026-03-01T12:00:00"
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["total_amount"], "30.00")
+
+        expenses = self.call("GET", "/expenses?splits=1", self.bob).get_json()["expenses"]
+        self.assertEqual([len(e["splits"]) for e in expenses], [2])
+
+        settlement = self.call("POST", "/settlements", self.bob, {"to_user_id": self.alice.id, "amount": "15.00"})
+        self.assertEqual(settlement.status_code, 201)
+        path = f"/settlements/{settlement.get_json()['id']}/confirm"
+        self.assertEqual(self.call("POST", path, self.bob).status_code, 400)
+        self.assertEqual(self.call("POST", path, self.alice).get_json()["status"], "confirmed")
+
+        body = self.call("GET", "/balances", self.bob).get_json()
+        self.assertEqual(body["balances"], {str(self.alice.id): "0.00", str(self.bob.id): "0.00"})
+        self.assertEqual(body["obligations"], {})
+
+    def test_bad_input_and_outsiders_are_refused(self):
+        """Test malformed bodies get a 400 and non-members a 404"""
+        self.assertEqual(self.call("POST", "/expenses", self.alice, {"description": "Nothing"}).status_code, 400)
+        self.assertEqual(self.call("POST", "/expenses", self.alice, {
+            "description": "Cake", "total_amount": "ten", "splits": {"type": "equal", "users": [self.alice.id]}
+        }).status_code, 400)
+        self.assertEqual(self.call("POST", "/expenses", self.alice, {
+            "description": 5, "total_amount": "10.00", "splits": {"type": "equal", "users": [self.alice.id]}
+        }).status_code, 400)
+        self.assertEqual(self.call("POST", "/settlements", self.bob, {"to_user_id": "1", "amount": "5"}).status_code, 400)
+        self.assertEqual(self.call("GET", "/balances", self.carol).status_code, 404)
+        self.assertEqual(self.call("POST", "/settlements/999/confirm", self.alice).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,277 @@
+import unittest
+from unittest import mock
+from decimal import Decimal
+from datetime import datetime
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from sqlalchemy import select, func
+
+from app.models import User, Group, Membership, Expense, ExpenseSplit, Settlement
+from app.services.balance_service import calculate_group_balances
+from app.services.expense_service import create_expense, delete_expense
+from app.services import group_service
+from app.services.group_service import (
+    create_group, add_user_to_group, get_user_dashboard, delete_group,
+    remove_user_from_group, change_member_role
+)
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestUserDashboard(unittest.TestCase):
+    """Test suite for the cross-group user dashboard"""
+
+    def setUp(self):
+        """Create three users sharing two groups"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        add_user_to_group(self.flat, self.carol)
+        self.trip = create_group("Trip", self.bob)
+        add_user_to_group(self.trip, self.alice)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def split_evenly(self, group, payer, users, total):
+        share = total / len(users)
+        return create_expense(
+            group, payer, "Shared", total,
+            [{"user": u.id, "amount": share} for u in users],
+            datetime(2026, 2, 5)
+        )
+
+    def test_dashboard_matches_full_balance_calculation(self):
+        """Test the per-group net balance equals calculate_group_balances"""
+        self.split_evenly(self.flat, self.alice, [self.alice, self.bob, self.carol], Decimal("90.00"))
+        self.split_evenly(self.flat, self.carol, [self.alice, self.carol], Decimal("20.00"))
+        self.split_evenly(self.trip, self.bob, [self.alice, self.bob], Decimal("50.00"))
+        db.session.add(Settlement(group_id=self.flat.id, from_user_id=self.bob.id, to_user_id=self.alice.id,
+                                  amount=Decimal("30.00"), status="confirmed"))
+        db.session.add(Settlement(group_id=self.flat.id, from_user_id=self.carol.id, to_user_id=self.alice.id,
+                                  amount=Decimal("5.00"), status="pending"))
+        db.session.commit()
+
+        dashboard = {g["group_id"]: g for g in get_user_dashboard(self.alice)}
+
+        self.assertEqual(set(dashboard), {self.flat.id, self.trip.id})
+        for group_id, summary in dashboard.items():
+            balances = calculate_group_balances(db.session.get(Group, group_id))
+            self.assertEqual(summary["net_balance"], balances[self.alice.id])
+
+        flat = dashboard[self.flat.id]
+        self.assertEqual(flat["member_count"], 3)
+        self.assertEqual(flat["expense_count"], 2)
+        self.assertEqual(flat["total_spent"], Decimal("110.00"))
+        self.assertEqual(flat["role"], "admin")
+        self.assertEqual(flat["pending_settlements"], {"to_confirm": 1, "awaiting_confirmation": 0})
+
+    def test_dashboard_for_group_without_activity(self):
+        """Test a group with no expenses reports zeros"""
+        dashboard = get_user_dashboard(self.carol)
+
+        self.assertEqual(len(dashboard), 1)
+        self.assertEqual(dashboard[0]["net_balance"], Decimal("0.00"))
+        self.assertEqual(dashboard[0]["expense_count"], 0)
+        self.assertIsNotNone(dashboard[0]["last_activity_at"])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestDeleteGroup(unittest.TestCase):
+    """Test suite for set-based group and expense deletion"""
+
+    def setUp(self):
+        """Create two groups with expenses and a settlement"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        self.trip = create_group("Trip", self.alice)
+        add_user_to_group(self.trip, self.bob)
+
+        for group in (self.flat, self.trip):
+            for i in range(7):
+                create_expense(
+                    group, self.alice, f"Expense {i}", Decimal("10.00"),
+                    [{"user": self.alice.id, "amount": Decimal("5.00")}, {"user": self.bob.id, "amount": Decimal("5.00")}],
+                    datetime(2026, 2, 5)
+                )
+            db.session.add(Settlement(group_id=group.id, from_user_id=self.bob.id, to_user_id=self.alice.id,
+                                      amount=Decimal("5.00"), status="pending"))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def count(self, model, *criteria):
+        return db.session.scalar(select(func.count()).select_from(model).where(*criteria))
+
+    def test_delete_group_removes_only_that_groups_rows(self):
+        """Test deleting in small chunks removes every child row of the group"""
+        flat_id = self.flat.id
+        delete_group(self.flat, self.alice, chunk_size=3)
+
+        self.assertIsNone(db.session.get(Group, flat_id))
+        self.assertEqual(self.count(Expense, Expense.group_id == flat_id), 0)
+        self.assertEqual(self.count(Membership, Membership.group_id == flat_id), 0)
+        self.assertEqual(self.count(Settlement, Settlement.group_id == flat_id), 0)
+        self.assertEqual(self.count(ExpenseSplit), 14)
+        self.assertEqual(self.count(Expense, Expense.group_id == self.trip.id), 7)
+
+    def test_interrupted_delete_leaves_whole_expenses_and_can_be_retried(self):
+        """Test a delete stopped after two chunks leaves no expense without its splits, and the admin can finish it"""
+        flat_id = self.flat.id
+        real_commit = group_service.commit
+        calls = []
+
+        def commit_twice():
+            calls.append(1)
+            if len(calls) > 2:
+                raise RuntimeError("worker killed")
+            real_commit()
+
+        with mock.patch.object(group_service, "commit", commit_twice):
+            with self.assertRaises(RuntimeError):
+                delete_group(self.flat, self.alice, chunk_size=3)
+        db.session.rollback()
+
+        self.assertEqual(self.count(Expense, Expense.group_id == flat_id), 1)
+        remaining = db.session.scalar(select(Expense.id).where(Expense.group_id == flat_id))
+        self.assertEqual(self.count(ExpenseSplit, ExpenseSplit.expense_id == remaining), 2)
+        self.assertEqual(self.count(Membership, Membership.group_id == flat_id), 2)
+
+        delete_group(db.session.get(Group, flat_id), self.alice, chunk_size=3)
+        self.assertIsNone(db.session.get(Group, flat_id))
+        self.assertEqual(self.count(Membership, Membership.group_id == flat_id), 0)
+        self.assertEqual(self.count(ExpenseSplit), 14)
+
+    def test_only_admins_can_delete_a_group(self):
+        """Test a plain member cannot delete the group"""
+        with self.assertRaises(ValueError):
+            delete_group(self.flat, self.bob)
+        self.assertEqual(self.count(Expense, Expense.group_id == self.flat.id), 7)
+
+    def test_database_cascades_expense_deletes(self):
+        """Test ON DELETE CASCADE removes splits that were never loaded"""
+        expense = db.session.scalars(select(Expense).where(Expense.group_id == self.flat.id)).first()
+        expense_id = expense.id
+        db.session.expunge_all()
+
+        db.session.delete(db.session.get(Expense, expense_id))
+        db.session.commit()
+
+        self.assertEqual(self.count(ExpenseSplit, ExpenseSplit.expense_id == expense_id), 0)
+
+    def test_delete_expense_removes_its_splits(self):
+        """Test delete_expense removes the expense and its splits"""
+        expense = db.session.scalars(select(Expense).where(Expense.group_id == self.trip.id)).first()
+        expense_id = expense.id
+        delete_expense(self.trip, expense, self.alice)
+
+        self.assertIsNone(db.session.get(Expense, expense_id))
+        self.assertEqual(self.count(ExpenseSplit, ExpenseSplit.expense_id == expense_id), 0)
+        with self.assertRaises(ValueError):
+            delete_expense(self.flat, db.session.scalars(select(Expense).where(Expense.group_id == self.trip.id)).first(), self.alice)
+
+
+class TestRemoveMember(unittest.TestCase):
+    """Test suite for balance-aware member removal"""
+
+    def setUp(self):
+        """Alice pays a £90 dinner split three ways"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.group = create_group("Flat", self.alice)
+        add_user_to_group(self.group, self.bob)
+        add_user_to_group(self.group, self.carol)
+        create_expense(
+            self.group, self.alice, "Dinner", Decimal("90.00"),
+            {"type": "equal", "users": [self.alice.id, self.bob.id, self.carol.id]},
+            datetime(2026, 2, 5)
+        )
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def member_ids(self):
+        return set(db.session.scalars(select(Membership.user_id).where(Membership.group_id == self.group.id)))
+
+    def test_member_with_balance_cannot_leave(self):
+        """Test removal is refused while the member owes money"""
+        with self.assertRaises(ValueError):
+            remove_user_from_group(self.group, self.bob)
+        self.assertIn(self.bob.id, self.member_ids())
+
+    def test_settled_member_can_leave(self):
+        """Test a member who has paid back in full is removed"""
+        db.session.add(Settlement(group_id=self.group.id, from_user_id=self.bob.id, to_user_id=self.alice.id,
+                                  amount=Decimal("30.00"), status="confirmed"))
+        db.session.commit()
+
+        remove_user_from_group(self.group, self.bob)
+        self.assertNotIn(self.bob.id, self.member_ids())
+
+    def test_force_creates_settling_transfers(self):
+        """Test force mode records the transfers that square the departing member"""
+        change_member_role(self.group, self.bob, "admin")
+
+        remove_user_from_group(self.group, self.alice, force=True)
+
+        self.assertNotIn(self.alice.id, self.member_ids())
+        balances = calculate_group_balances(db.session.get(Group, self.group.id))
+        self.assertEqual(balances[self.alice.id], Decimal("0.00"))
+        self.assertEqual(balances[self.bob.id], Decimal("0.00"))
+        transfers = db.session.scalars(select(Settlement).where(Settlement.group_id == self.group.id)).all()
+        self.assertEqual(
+            sorted((t.from_user_id, t.to_user_id, t.amount, t.status) for t in transfers),
+            sorted([(self.bob.id, self.alice.id, Decimal("30.00"), "confirmed"),
+                    (self.carol.id, self.alice.id, Decimal("30.00"), "confirmed")])
+        )
+
+    def test_last_admin_cannot_leave_or_be_demoted(self):
+        """Test the admin-count checks still apply"""
+        with self.assertRaises(ValueError):
+            remove_user_from_group(self.group, self.alice, force=True)
+        with self.assertRaises(ValueError):
+            change_member_role(self.group, self.alice, "member")
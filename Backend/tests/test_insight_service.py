@@ -0,0 +1,112 @@
+import unittest
+from collections import defaultdict
+from decimal import Decimal
+from datetime import date, datetime
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.analytics import AnalyticsSnapshot
+from app.models import User, ExpenseSplit
+from app.services.expense_service import create_expense, delete_expense
+from app.services.group_service import create_group, add_user_to_group
+from app.services.insight_service import spend_per_user_per_month, top_payers, subscription_share_of_spend
+from app.services.subscription_service import create_subscription, bill_subscription
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestInsightService(unittest.TestCase):
+    """Test suite for insights served from the columnar split snapshot"""
+
+    def setUp(self):
+        """Alice, Bob and Carol share a flat; Alice and Bob also went on a trip"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        # Reconcile on every read so deletes show up straight away
+        self.app.extensions["analytics_snapshot"] = AnalyticsSnapshot(reconcile_seconds=0)
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        add_user_to_group(self.flat, self.carol)
+        self.trip = create_group("Trip", self.bob)
+        add_user_to_group(self.trip, self.alice)
+
+        self.add(self.flat, self.alice, "90.00", [self.alice, self.bob, self.carol], datetime(2026, 1, 10))
+        self.add(self.flat, self.carol, "10.01", [self.alice, self.carol], datetime(2026, 1, 31, 23, 30))
+        self.add(self.flat, self.bob, "45.00", [self.bob, self.carol], datetime(2026, 2, 1))
+        self.add(self.trip, self.bob, "200.00", [self.alice, self.bob], datetime(2026, 2, 14))
+
+        rent = create_subscription(self.alice, "Internet", Decimal("30.00"), date(2026, 2, 1),
+                                   owner_type="group", owner_id=self.flat.id)
+        bill_subscription(rent, date(2026, 2, 1))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add(self, group, payer, total, users, when):
+        return create_expense(group, payer, "Shared", Decimal(total),
+                              {"type": "equal", "users": [u.id for u in users]}, when)
+
+    def expected_spend(self, group_ids=None):
+        """The same aggregate computed row by row through the ORM"""
+        totals = defaultdict(lambda: Decimal("0.00"))
+        for split in db.session.query(ExpenseSplit).all():
+            if group_ids is None or split.expense.group_id in group_ids:
+                period = split.expense.date.year * 100 + split.expense.date.month
+                totals[(split.user_id, period)] += split.amount_owed
+        return [{"user_id": u, "period": p, "amount": a} for (u, p), a in sorted(totals.items())]
+
+    def test_spend_per_user_per_month_matches_orm(self):
+        """Test the vectorised group-by agrees with aggregating ORM rows"""
+        self.assertEqual(spend_per_user_per_month(), self.expected_spend())
+        self.assertEqual(spend_per_user_per_month(group_ids=[self.flat.id]), self.expected_spend({self.flat.id}))
+
+        january = spend_per_user_per_month(user_ids=[self.carol.id], date_from=date(2026, 1, 1), date_to=date(2026, 2, 1))
+        self.assertEqual(january, [{"user_id": self.carol.id, "period": 202601, "amount": Decimal("35.00")}])
+
+    def test_top_payers(self):
+        """Test payers are ranked by the total they paid"""
+        self.assertEqual(top_payers(limit=2), [
+            {"user_id": self.bob.id, "amount": Decimal("245.00")},
+            {"user_id": self.alice.id, "amount": Decimal("120.00")},
+        ])
+        self.assertEqual(top_payers(group_ids=[self.trip.id]), [{"user_id": self.bob.id, "amount": Decimal("200.00")}])
+
+    def test_subscription_share_of_spend(self):
+        """Test the subscription-generated share of a group's spend"""
+        share = subscription_share_of_spend(group_ids=[self.flat.id])
+        self.assertEqual(share["subscription"], Decimal("30.00"))
+        self.assertEqual(share["total"], Decimal("175.01"))
+        self.assertAlmostEqual(share["share"], 30 / 175.01)
+
+    def test_snapshot_refreshes_incrementally_and_after_deletes(self):
+        """Test new splits are appended and deleted ones disappear"""
+        snapshot = self.app.extensions["analytics_snapshot"]
+        snapshot.refresh()
+        loaded = len(snapshot)
+
+        expense = self.add(self.trip, self.alice, "20.00", [self.alice, self.bob], datetime(2026, 3, 2))
+        self.assertEqual(top_payers(group_ids=[self.trip.id])[1]["amount"], Decimal("20.00"))
+        self.assertEqual(len(snapshot), loaded + 2)
+
+        delete_expense(self.trip, expense, self.bob)
+        self.assertEqual(len(top_payers(group_ids=[self.trip.id])), 1)
+        self.assertEqual(spend_per_user_per_month(), self.expected_spend())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from decimal import Decimal
+from datetime import date, datetime
+
+from sqlalchemy import delete, select, text, update
+
+from app import create_app, integrity
+from app.config import Config
+from app.extensions import db
+from app.integrity import run_integrity_check, check_groups
+from app.models import User, Expense, ExpenseSplit, GeneratedExpense, Settlement
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group, remove_user_from_group, delete_group
+from app.services.subscription_service import create_subscription, bill_subscription
+
+
+class TestIntegrityCheck(unittest.TestCase):
+    """Test suite for the ledger integrity checker"""
+
+    def setUp(self):
+        """Alice, Bob and Carol share a flat with a billed subscription, Carol has left; Dan and Erin live alone"""
+        self.tmpdir = tempfile.mkdtemp()
+
+        class TestConfig(Config):
+            # A file, so forked workers see the same database
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(self.tmpdir, "test.db")
+            INTEGRITY_DIR = os.path.join(self.tmpdir, "integrity")
+            TESTING = True
+
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash")
+        self.dan = User(name="Dan", email="dan@test.com", password_hash="hash")
+        self.erin = User(name="Erin", email="erin@test.com", password_hash="hash")
+        db.session.add_all([self.alice, self.bob, self.carol, self.dan, self.erin])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        add_user_to_group(self.flat, self.carol)
+        self.studio = create_group("Studio", self.dan)
+        self.loft = create_group("Loft", self.erin)
+
+        everyone = {"type": "equal", "users": [self.alice.id, self.bob.id, self.carol.id]}
+        self.rent = create_expense(self.flat, self.alice, "Rent", Decimal("900.00"), everyone, datetime(2026, 9, 1))
+        self.internet = create_subscription(self.alice, "Internet", Decimal("30.00"), date(2026, 9, 1),
+                                            owner_type="group", owner_id=self.flat.id)
+        bill_subscription(self.internet, today=date(2026, 10, 15))
+        # Leaving squares Carol up with a confirmed settlement, which is no finding
+        remove_user_from_group(self.flat, self.carol, force=True)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def read_report(self, totals):
+        with open(totals["report"], encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def corrupt(self):
+        """A split changed behind the services' back, a generated expense's expense deleted and a stray settlement"""
+        db.session.execute(
+            update(ExpenseSplit).where(ExpenseSplit.expense_id == self.rent.id, ExpenseSplit.user_id == self.bob.id)
+            .values(amount_owed=Decimal("299.00"))
+        )
+        db.session.commit()
+
+        generated = db.session.scalars(select(GeneratedExpense).order_by(GeneratedExpense.id)).first()
+        self.generated = (generated.id, generated.expense_id)
+        db.session.execute(text("PRAGMA foreign_keys = OFF"))
+        db.session.execute(delete(ExpenseSplit).where(ExpenseSplit.expense_id == generated.expense_id))
+        db.session.execute(delete(Expense).where(Expense.id == generated.expense_id))
+        db.session.commit()
+        db.session.execute(text("PRAGMA foreign_keys = ON"))
+
+        self.stray = Settlement(group_id=self.studio.id, from_user_id=self.dan.id, to_user_id=self.erin.id,
+                                amount=Decimal("5.00"))
+        db.session.add(self.stray)
+        db.session.commit()
+
+    def test_finds_each_kind_of_damage(self):
+        """Test a clean ledger has no findings, and each corruption is reported once, across workers"""
+        totals = run_integrity_check(workers=2, chunk_size=1)
+        self.assertEqual((totals["groups"], totals["findings"]), (3, 0))
+
+        self.corrupt()
+        result = self.app.test_cli_runner().invoke(args=["integrity", "check", "--all", "--workers", "2", "--chunk-size", "1"])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Checked 3 groups", result.output)
+        self.assertIn("3 findings", result.output)
+
+        report = result.output.rsplit(" in ", 1)[1].strip()
+        findings = sorted(self.read_report({"report": report}), key=lambda finding: finding["check"])
+        self.assertEqual(findings, [
+            {"check": "orphaned_generated_expense", "group_id": None, "generated_expense_id": self.generated[0],
+             "expense_id": self.generated[1], "subscription_id": self.internet.id, "reason": "expense_missing",
+             "shard": "global"},
+            {"check": "settlement_non_member", "group_id": self.studio.id, "settlement_id": self.stray.id, "side": "to",
+             "user_id": self.erin.id, "status": "pending", "amount": "5.00", "shard": "global"},
+            {"check": "split_total_mismatch", "group_id": self.flat.id, "expense_id": self.rent.id, "archived": False,
+             "total_amount": "900.00", "splits_total": "899.00", "shard": "global"},
+        ])
+
+    def test_incremental_runs_check_changed_groups_only(self):
+        """Test a rerun checks no group until one changes, and then only that one"""
+        totals = run_integrity_check(workers=1)
+        self.assertEqual(totals["groups"], 3)
+
+        self.corrupt()  # not through the services, so nothing is logged
+        totals = run_integrity_check(workers=1)
+        self.assertEqual(totals["groups"], 0)
+        # Orphans without an expense have no group, so every run looks for them
+        self.assertEqual([finding["reason"] for finding in self.read_report(totals)], ["expense_missing"])
+
+        create_expense(self.studio, self.dan, "Lamp", Decimal("12.00"), {"type": "equal", "users": [self.dan.id]},
+                       datetime(2026, 10, 2))
+        totals = run_integrity_check(workers=1)
+        self.assertEqual(totals["groups"], 1)
+        self.assertEqual(
+            sorted(finding["check"] for finding in self.read_report(totals)),
+            ["orphaned_generated_expense", "settlement_non_member"]
+        )
+
+        totals = run_integrity_check(full=True, workers=1)
+        self.assertEqual((totals["groups"], totals["findings"]), (3, 3))
+
+    def test_findings_are_written_as_each_chunk_finishes(self):
+        """Test a chunk's findings are in the report before the next chunk is checked"""
+        self.corrupt()
+        report_path = os.path.join(self.tmpdir, "report.jsonl")
+        written = []
+
+        def check_groups_after_reading_the_report(chunk):
+            with open(report_path, encoding="utf-8") as file:
+                written.append(len(file.readlines()))
+            return check_groups(chunk)
+
+        with mock.patch.object(integrity, "check_groups", check_groups_after_reading_the_report):
+            totals = run_integrity_check(report_path, full=True, workers=1, chunk_size=1)
+        # The shard-wide orphan first, then the flat's mismatch, then the studio's settlement
+        self.assertEqual(written, [1, 2, 3])
+        self.assertEqual(totals["findings"], 3)
+
+    def test_changes_after_a_deleted_group_are_not_skipped(self):
+        """Test a deleted group's change log ids aren't handed out again below the last run's watermark"""
+        lamp = create_expense(self.studio, self.dan, "Lamp", Decimal("12.00"), {"type": "equal", "users": [self.dan.id]},
+                              datetime(2026, 10, 2))
+        attic = create_group("Attic", self.erin)
+        for user in (self.alice, self.bob, self.dan):
+            add_user_to_group(attic, user)
+        run_integrity_check(workers=1)
+
+        delete_group(attic, self.erin)
+        db.session.execute(update(ExpenseSplit).where(ExpenseSplit.expense_id == lamp.id).values(amount_owed=Decimal("2.00")))
+        db.session.commit()
+        create_expense(self.studio, self.dan, "Bulb", Decimal("3.00"), {"type": "equal", "users": [self.dan.id]},
+                       datetime(2026, 10, 3))
+
+        totals = run_integrity_check(workers=1)
+        self.assertEqual(totals["groups"], 1)
+        self.assertEqual([(f["check"], f["expense_id"]) for f in self.read_report(totals)], [("split_total_mismatch", lamp.id)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import glob
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User
+from app.profiling import PROFILE_HEADER
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+    PROFILING_TOKEN = "let-me-see"
+
+
+class TestProfiling(unittest.TestCase):
+    """Test suite for opt-in per-request profiling"""
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.profile_dir)
+
+    def start(self, **settings):
+        """An app with the given profiling settings, where Alice and Bob share a flat with one expense"""
+        config = type("ProfilingConfig", (TestConfig,), {"PROFILING_DIR": self.profile_dir, **settings})
+        self.app = create_app(config)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([alice, bob])
+        db.session.commit()
+        self.flat = create_group("Flat", alice)
+        add_user_to_group(self.flat, bob)
+        create_expense(self.flat, alice, "Groceries", Decimal("30.00"),
+                       {"type": "equal", "users": [alice.id, bob.id]}, datetime(2026, 3, 1))
+
+        with self.app.test_request_context():
+            self.token = create_access_token(identity=str(alice.id))
+
+    def get_changes(self, **headers):
+        return self.app.test_client().get(
+            f"/groups/{self.flat.id}/changes", headers={"Authorization": f"Bearer {self.token}", **headers}
+        )
+
+    def saved(self, pattern):
+        return glob.glob(os.path.join(self.profile_dir, "groups.group_changes", pattern))
+
+    def test_only_an_authorized_header_triggers_a_profile(self):
+        """Test requests without the right token run unprofiled, and the right one saves a profile"""
+        self.start()
+        self.assertEqual(self.get_changes().status_code, 200)
+        self.assertEqual(self.get_changes(**{PROFILE_HEADER: "guess"}).status_code, 200)
+        self.assertEqual(self.saved("*"), [])
+
+        response = self.get_changes(**{PROFILE_HEADER: "let-me-see"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("sql;dur=", response.headers["Server-Timing"])
+        self.assertEqual(len(self.saved("*.prof")), 1)
+
+        with open(self.saved("*.json")[0]) as handle:
+            summary = json.load(handle)
+        self.assertEqual((summary["endpoint"], summary["status"]), ("groups.group_changes", 200))
+        self.assertGreater(summary["sql_queries"], 0)
+        self.assertLessEqual(summary["sql_ms"], summary["wall_ms"])
+        self.assertTrue(summary["top_functions"])
+
+        result = self.app.test_cli_runner().invoke(args=["profiling", "summary"])
+        self.assertIn("groups.group_changes: 1 profiled", result.output)
+
+        # A request quicker than the clock's resolution takes no time at all
+        summary.update(wall_ms=0.0, sql_ms=0.0)
+        with open(self.saved("*.json")[0], "w") as handle:
+            json.dump(summary, handle)
+        result = self.app.test_cli_runner().invoke(args=["profiling", "summary"])
+        self.assertIsNone(result.exception)
+        self.assertIn("SQL n/a of the time", result.output)
+
+    def test_collapsed_stacks_for_every_request(self):
+        """Test PROFILING_ENABLED profiles every request as flame graph stacks"""
+        self.start(PROFILING_ENABLED=True, PROFILING_FORMAT="collapsed")
+        self.get_changes()
+        self.get_changes()
+
+        self.assertEqual(len(self.saved("*.collapsed")), 2)
+        for path in self.saved("*.collapsed"):
+            with open(path) as handle:
+                for line in handle:
+                    stack, count = line.rsplit(" ", 1)
+                    self.assertGreater(int(count), 0)
+                    self.assertIn(";", stack)
+
+    def test_nothing_is_hooked_in_when_off(self):
+        """Test an app with every trigger off runs no profiling code at all"""
+        self.start(PROFILING_TOKEN=None)
+        self.assertEqual(self.app.before_request_funcs, {})
+        self.assertEqual(self.get_changes(**{PROFILE_HEADER: "let-me-see"}).status_code, 200)
+        self.assertNotIn("Server-Timing", self.get_changes().headers)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User
+from app.read_models import ExpenseView, SplitView, SettlementView, GroupView, MembershipView
+from app.services.expense_service import create_expense, get_group_expenses, get_expense_details
+from app.services.group_service import create_group, add_user_to_group, get_user_groups, get_group_members
+from app.services.settlement_service import create_settlement_request, get_group_settlements
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestReadModels(unittest.TestCase):
+    """Test suite for services returning read-model views instead of ORM entities"""
+
+    def setUp(self):
+        """Alice and Bob share a flat with two expenses and a pending settlement"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        self.groceries = self.add("Groceries", "30.00", datetime(2026, 3, 1))
+        self.rent = self.add("Rent", "900.00", datetime(2026, 3, 2))
+        self.settlement = create_settlement_request(self.flat, self.bob, self.alice, Decimal("15.00"))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add(self, description, total, when):
+        return create_expense(self.flat, self.alice, description, Decimal(total),
+                              {"type": "equal", "users": [self.alice.id, self.bob.id]}, when)
+
+    def test_group_expenses(self):
+        """Test expenses are listed as views, with splits only when asked for"""
+        loaded = len(db.session.identity_map)
+        expenses = get_group_expenses(self.flat)
+        self.assertTrue(all(isinstance(e, ExpenseView) for e in expenses))
+        self.assertEqual([(e.description, e.total_amount, e.splits) for e in expenses],
+                         [("Groceries", Decimal("30.00"), ()), ("Rent", Decimal("900.00"), ())])
+        # Listing loads no entities
+        self.assertEqual(len(db.session.identity_map), loaded)
+
+        with_splits = get_group_expenses(self.flat, with_splits=True)
+        self.assertEqual([[(s.user_id, s.amount_owed) for s in e.splits] for e in with_splits], [
+            [(self.alice.id, Decimal("15.00")), (self.bob.id, Decimal("15.00"))],
+            [(self.alice.id, Decimal("450.00")), (self.bob.id, Decimal("450.00"))],
+        ])
+
+    def test_expense_details(self):
+        """Test an expense's details carry its splits"""
+        details = get_expense_details(get_group_expenses(self.flat)[1])
+        self.assertEqual((details.id, details.description), (self.rent.id, "Rent"))
+        self.assertTrue(all(isinstance(s, SplitView) for s in details.splits))
+        self.assertEqual(sum(s.amount_owed for s in details.splits), Decimal("900.00"))
+
+        with self.assertRaises(ValueError):
+            get_expense_details(None)
+
+    def test_group_settlements(self):
+        """Test settlements are listed as views"""
+        self.assertEqual(get_group_settlements(self.flat), [SettlementView(
+            self.settlement.id, self.flat.id, self.bob.id, self.alice.id,
+            Decimal("15.00"), "pending", self.settlement.created_at
+        )])
+
+    def test_user_groups_and_members(self):
+        """Test a user's groups and a group's members are listed as views"""
+        trip = create_group("Trip", self.bob)
+
+        groups = get_user_groups(self.bob)
+        self.assertTrue(all(isinstance(g, GroupView) for g in groups))
+        self.assertEqual([g.name for g in groups], ["Flat", "Trip"])
+        self.assertEqual([g.name for g in get_user_groups(self.alice)], ["Flat"])
+
+        members = get_group_members(trip)
+        self.assertEqual([(m.user_id, m.role) for m in members], [(self.bob.id, "admin")])
+        self.assertIsInstance(members[0], MembershipView)
+
+
+if __name__ == '__main__':
+    unittest.main()
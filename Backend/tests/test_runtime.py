@@ -0,0 +1,87 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from click.testing import CliRunner
+
+from app.config import Config
+from app.extensions import db
+from app.models import User
+from app.runtime import cli, create_job_app, job_context
+from app.services.balance_service import calculate_group_balances
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    BILLING_SCHEDULER_ENABLED = True
+    TESTING = True
+
+
+class TestJobRuntime(unittest.TestCase):
+    """Test suite for the lightweight app batch jobs run in"""
+
+    def test_services_run_without_the_web_stack(self):
+        """Test the job app has no routes or JWT, never starts the scheduler, and the services work in it"""
+        app = create_job_app(TestConfig)
+        self.assertEqual(list(app.blueprints), [])
+        self.assertNotIn("flask-jwt-extended", app.extensions)
+        self.assertNotIn("migrate", app.extensions)
+        self.assertIsNone(app.extensions["billing_scheduler"]._thread)
+
+        with job_context(TestConfig):
+            db.create_all()
+            alice = User(name="Alice", email="alice@test.com", password_hash="hash")
+            bob = User(name="Bob", email="bob@test.com", password_hash="hash")
+            db.session.add_all([alice, bob])
+            db.session.commit()
+            flat = create_group("Flat", alice)
+            add_user_to_group(flat, bob)
+            expense = create_expense(flat, alice, "Tesco", Decimal("20.00"),
+                                     {"type": "equal", "users": [alice.id, bob.id]}, datetime(2026, 3, 1))
+            self.assertEqual(expense.category, "groceries")
+            self.assertEqual(calculate_group_balances(flat), {alice.id: Decimal("10.00"), bob.id: Decimal("-10.00")})
+
+    def test_cli_imports_only_what_a_job_needs(self):
+        """Test the job CLI runs a command, and starting it loads neither Alembic, JWT nor the routes"""
+        result = CliRunner().invoke(cli, ["--help"])
+        self.assertIn("categories", result.output)
+        self.assertIn("statements", result.output)
+
+        loaded = subprocess.run(
+            [sys.executable, "-c", "import sys\nfrom app.runtime import job_context\n"
+             "with job_context(): pass\n"
+             "print(sorted(m for m in ('alembic', 'flask_migrate', 'flask_jwt_extended', 'app.routes') if m in sys.modules))"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(loaded.stdout.strip(), "[]")
+
+    def test_jobs_read_the_dotenv_file_like_flask(self):
+        """Test a job started outside the flask command takes DATABASE_URL from .env, unless the environment sets it"""
+        tmpdir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmpdir, ".env"), "w", encoding="utf-8") as file:
+                file.write("DATABASE_URL=sqlite:///from-dotenv.db\n")
+            script = ("from app.runtime import job_context\n"
+                      "with job_context() as app: print(app.config['SQLALCHEMY_DATABASE_URI'])")
+            env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+            env["PYTHONPATH"] = BACKEND_DIR
+
+            run = lambda env: subprocess.run([sys.executable, "-c", script], cwd=tmpdir, env=env,
+                                             capture_output=True, text=True, check=True).stdout.strip()
+            self.assertEqual(run(env), "sqlite:///from-dotenv.db")
+            self.assertEqual(run(dict(env, DATABASE_URL="sqlite:///from-environment.db")), "sqlite:///from-environment.db")
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    unittest.main()
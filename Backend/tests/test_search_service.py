@@ -0,0 +1,101 @@
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User, Expense
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group
+from app.services.search_service import search_expenses, build_match_query
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestSearchService(unittest.TestCase):
+    """Test suite for full-text expense search"""
+
+    def setUp(self):
+        """Alice is in a trip group; Bob has a group of his own"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+        self.trip = create_group("Malta Trip", self.alice)
+        self.other = create_group("Bob's Flat", self.bob)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def add(self, group, user, description, date=datetime(2025, 7, 1)):
+        return create_expense(group, user, description, Decimal("10.00"),
+                              {"type": "equal", "users": [user.id]}, date)
+
+    def ids(self, results):
+        return [item["expense_id"] for item in results["items"]]
+
+    def test_free_text_finds_best_match_first(self):
+        """Test extra words in the query don't stop the relevant expense matching"""
+        airbnb = self.add(self.trip, self.alice, "Airbnb in Valletta")
+        self.add(self.trip, self.alice, "Dinner from the market")
+
+        results = search_expenses(self.alice, "that Airbnb from last summer")
+
+        self.assertEqual(self.ids(results)[0], airbnb.id)
+        self.assertIn("[Airbnb]", results["items"][0]["highlight"])
+
+    def test_search_is_scoped_to_the_users_groups(self):
+        """Test expenses in groups the user isn't in are never returned"""
+        mine = self.add(self.trip, self.alice, "Airbnb Valletta")
+        self.add(self.other, self.bob, "Airbnb Paris")
+
+        self.assertEqual(self.ids(search_expenses(self.alice, "airbnb")), [mine.id])
+
+    def test_index_follows_deletes_and_group_renames(self):
+        """Test the triggers keep the index in sync"""
+        ferry = self.add(self.trip, self.alice, "Ferry tickets")
+        museum = self.add(self.trip, self.alice, "Museum")
+
+        db.session.delete(db.session.get(Expense, museum.id))
+        self.trip.name = "Gozo Weekend"
+        db.session.commit()
+
+        self.assertEqual(self.ids(search_expenses(self.alice, "museum")), [])
+        self.assertEqual(self.ids(search_expenses(self.alice, "gozo")), [ferry.id])
+
+    def test_pagination_and_date_filter(self):
+        """Test results page in rank order and respect the date range"""
+        for day in range(1, 6):
+            self.add(self.trip, self.alice, f"Taxi {day}", datetime(2025, 8, day))
+
+        first = search_expenses(self.alice, "taxi", page=1, per_page=2)
+        second = search_expenses(self.alice, "taxi", page=2, per_page=2)
+        last = search_expenses(self.alice, "taxi", page=3, per_page=2)
+
+        self.assertTrue(first["has_next"])
+        self.assertFalse(last["has_next"])
+        self.assertEqual(len(set(self.ids(first) + self.ids(second) + self.ids(last))), 5)
+
+        august = search_expenses(self.alice, "taxi", date_from=datetime(2025, 8, 4))
+        self.assertEqual(len(august["items"]), 2)
+
+    def test_query_syntax_is_escaped(self):
+        """Test FTS operators in user input are treated as plain words"""
+        self.assertEqual(build_match_query('rent" OR NEAR(x'), '"rent"* OR "OR"* OR "NEAR"* OR "x"*')
+        self.assertIsNone(build_match_query("  ?! "))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from flask import jsonify
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import User
+from app.serialization import columnar, serializer_for
+from app.services.balance_service import calculate_group_balances
+from app.services.expense_service import create_expense, get_group_expenses
+from app.services.group_service import create_group, add_user_to_group
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestSerialization(unittest.TestCase):
+    """Test suite for the API JSON provider and compiled serializers"""
+
+    def setUp(self):
+        """Alice and Bob split a dinner three ways with Carol"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash3")
+        db.session.add_all([self.alice, self.bob, self.carol])
+        db.session.commit()
+
+        self.group = create_group("Flat", self.alice)
+        add_user_to_group(self.group, self.bob)
+        add_user_to_group(self.group, self.carol)
+        self.dinner = create_expense(self.group, self.alice, "Dinner", Decimal("100.00"),
+                                     {"type": "equal", "users": [self.alice.id, self.bob.id, self.carol.id]},
+                                     datetime(2026, 3, 1, 19, 30))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_decimals_are_exact_strings(self):
+        """Test money keeps its exact digits and never becomes a float"""
+        payload = json.loads(self.app.json.dumps({
+            "amounts": [Decimal("0.10"), Decimal("1E+2"), Decimal("12345678.91")],
+            "balances": calculate_group_balances(self.group),
+        }))
+        self.assertEqual(payload["amounts"], ["0.10", "100", "12345678.91"])
+        self.assertEqual(payload["balances"], {
+            str(self.alice.id): "66.66", str(self.bob.id): "-33.33", str(self.carol.id): "-33.33"
+        })
+
+    def test_views_and_models_use_compiled_serializers(self):
+        """Test read-model views (with nested splits) and ORM models serialize by field"""
+        expense = get_group_expenses(self.group, with_splits=True)[0]
+        payload = json.loads(self.app.json.dumps(expense))
+        self.assertEqual(payload["total_amount"], "100.00")
+        self.assertEqual(payload["date"], "2026-03-01T19:30:00")
+        self.assertEqual(sorted(s["amount_owed"] for s in payload["splits"]), ["33.33", "33.33", "33.34"])
+
+        self.assertEqual(json.loads(self.app.json.dumps(self.dinner))["description"], "Dinner")
+        self.assertIs(serializer_for(type(expense)), serializer_for(type(expense)))
+
+        with self.assertRaises(TypeError):
+            self.app.json.dumps(object())
+
+    def test_columnar_shape(self):
+        """Test long lists can be sent with their field names once"""
+        expenses = get_group_expenses(self.group, with_splits=True)
+        shape = columnar(expenses)
+        self.assertEqual(shape["columns"][:6], ["id", "group_id", "created_by", "description", "total_amount", "currency"])
+        self.assertEqual(shape["nested"]["splits"], ["id", "expense_id", "user_id", "amount_owed"])
+        self.assertEqual(shape["rows"][0][4:6], ["100.00", "GBP"])
+        self.assertEqual(len(shape["rows"][0][9]), 3)
+
+        self.assertEqual(columnar([]), {"columns": [], "rows": []})
+
+    def test_jsonify_uses_the_provider(self):
+        """Test responses built with jsonify go through the same encoder"""
+        with self.app.test_request_context():
+            response = jsonify(total=Decimal("10.50"))
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.get_json(), {"total": "10.50"})
+
+
+if __name__ == '__main__':
+    unittest.main()
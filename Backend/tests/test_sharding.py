@@ -0,0 +1,226 @@
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+import sqlalchemy as sa
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.archive import archive_group_history
+from app.models import User, Group, Expense, Settlement, GroupShard
+from app.services.balance_service import calculate_group_balances, get_user_net_balance
+from app.services.change_service import get_group_changes
+from app.services.expense_service import create_expense, get_group_expenses
+from app.services.group_service import create_group, add_user_to_group, get_user_groups, delete_group
+from app.services.settlement_service import create_settlement_request
+from app.sharding import create_shard_schemas, move_group
+
+
+class TestSharding(unittest.TestCase):
+    """Test suite for routing group data across shard databases"""
+
+    def setUp(self):
+        """Set up a global database and two shards in a temp directory"""
+        self.tmpdir = tempfile.mkdtemp()
+
+        class ShardedConfig(Config):
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(self.tmpdir, "global.db")
+            SHARD_COUNT = 2
+            SHARD_DATABASE_URL = "sqlite:///" + os.path.join(self.tmpdir, "shard_{shard}.db")
+            TESTING = True
+
+        self.app = create_app(ShardedConfig)
+
+        with self.app.app_context():
+            db.create_all()
+            create_shard_schemas()
+
+            alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+            bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+            db.session.add_all([alice, bob])
+            db.session.commit()
+
+            self.alice_id = alice.id
+            self.bob_id = bob.id
+
+    def tearDown(self):
+        """Clean up after each test"""
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        shutil.rmtree(self.tmpdir)
+
+    def _group_rows(self, shard_id, group_id):
+        """Count the expenses stored for a group directly on one shard"""
+        with db.engines[shard_id].connect() as connection:
+            return connection.execute(
+                sa.select(sa.func.count()).select_from(Expense.__table__).where(Expense.group_id == group_id)
+            ).scalar()
+
+    def _add_dinner(self, group, payer, other):
+        """Payer covers a £30 dinner split evenly with other"""
+        return create_expense(
+            group, payer, "Dinner", Decimal("30.00"),
+            [{"user": payer.id, "amount": Decimal("15.00")}, {"user": other.id, "amount": Decimal("15.00")}],
+            datetime(2026, 2, 5)
+        )
+
+    def test_groups_are_spread_over_shards(self):
+        """Test that new groups get unique ids and land on different shards"""
+        with self.app.app_context():
+            alice = db.session.get(User, self.alice_id)
+            first = create_group("Flat", alice)
+            second = create_group("Trip", alice)
+
+            self.assertNotEqual(first.id, second.id)
+            shards = dict(db.session.execute(sa.select(GroupShard.group_id, GroupShard.shard_id)).all())
+            self.assertEqual({shards[first.id], shards[second.id]}, {"shard_0", "shard_1"})
+
+            # The group row only exists on its own shard
+            with db.engines[shards[first.id]].connect() as connection:
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM groups")).scalar(), 1)
+
+    def test_group_data_is_routed_to_its_shard(self):
+        """Test that expenses, splits and memberships follow their group"""
+        with self.app.app_context():
+            alice = db.session.get(User, self.alice_id)
+            bob = db.session.get(User, self.bob_id)
+            group = create_group("Flat", alice)
+            add_user_to_group(group, bob)
+            self._add_dinner(group, alice, bob)
+            group_id = group.id
+            shard_id = db.session.get(GroupShard, group_id).shard_id
+
+            self.assertEqual(self._group_rows(shard_id, group_id), 1)
+
+        with self.app.app_context():
+            group = db.session.get(Group, group_id)
+            balances = calculate_group_balances(group)
+            self.assertEqual(balances[self.alice_id], Decimal("15.00"))
+            self.assertEqual(balances[self.bob_id], Decimal("-15.00"))
+            self.assertEqual(get_user_net_balance(group, self.bob_id), Decimal("-15.00"))
+
+            # Cross-shard read: a user's groups are gathered from every shard
+            bob = db.session.get(User, self.bob_id)
+            self.assertEqual([g.id for g in get_user_groups(bob)], [group_id])
+
+    def test_child_ids_are_looked_up_on_the_group_shard(self):
+        """Test a settlement id both shards use is confirmed in the right group, and a bare get refuses to guess"""
+        with self.app.app_context():
+            alice = db.session.get(User, self.alice_id)
+            bob = db.session.get(User, self.bob_id)
+            flat, studio = create_group("Flat", alice), create_group("Studio", alice)
+            add_user_to_group(flat, bob)
+            add_user_to_group(studio, bob)
+            self.assertNotEqual(db.session.get(GroupShard, flat.id).shard_id, db.session.get(GroupShard, studio.id).shard_id)
+            in_flat = create_settlement_request(flat, bob, alice, Decimal("10.00"))
+            in_studio = create_settlement_request(studio, bob, alice, Decimal("20.00"))
+            self.assertEqual(in_flat.id, in_studio.id)
+            with self.assertRaises(ValueError):
+                db.session.get(Settlement, in_flat.id)
+            with self.app.test_request_context():
+                token = create_access_token(identity=str(alice.id))
+            flat_id, studio_id, settlement_id = flat.id, studio.id, in_studio.id
+            db.session.remove()
+
+        client = self.app.test_client()
+        response = client.post(f"/groups/{studio_id}/settlements/{settlement_id}/confirm",
+                               headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.get_json()["amount"], response.get_json()["status"]), ("20.00", "confirmed"))
+        response = client.post(f"/groups/{studio_id}/settlements/{settlement_id + 1}/confirm",
+                               headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 404)
+
+        with self.app.app_context():
+            statuses = {
+                group_id: db.session.scalar(sa.select(Settlement.status).where(Settlement.group_id == group_id))
+                for group_id in (flat_id, studio_id)
+            }
+            self.assertEqual(statuses, {flat_id: "pending", studio_id: "confirmed"})
+
+    def test_move_group_between_shards(self):
+        """Test that a moved group keeps its id, data and balances"""
+        with self.app.app_context():
+            alice = db.session.get(User, self.alice_id)
+            bob = db.session.get(User, self.bob_id)
+            group = create_group("Flat", alice)
+            add_user_to_group(group, bob)
+            self._add_dinner(group, alice, bob)
+            group_id = group.id
+            source = db.session.get(GroupShard, group_id).shard_id
+            target = "shard_1" if source == "shard_0" else "shard_0"
+            db.session.remove()
+
+            self.assertEqual(move_group(group_id, target), source)
+            self.assertEqual(self._group_rows(source, group_id), 0)
+            self.assertEqual(self._group_rows(target, group_id), 1)
+
+        with self.app.app_context():
+            group = db.session.get(Group, group_id)
+            self.assertEqual(len(group.memberships), 2)
+            self.assertEqual(calculate_group_balances(group)[self.bob_id], Decimal("-15.00"))
+            # Child ids were reassigned, so syncing clients are told to refetch
+            self.assertTrue(get_group_changes(group, since=3)["resync"])
+
+    def test_move_group_with_archived_history(self):
+        """Test that archived rows and opening balances move with their group"""
+        with self.app.app_context():
+            alice = db.session.get(User, self.alice_id)
+            bob = db.session.get(User, self.bob_id)
+            group = create_group("Flat", alice)
+            add_user_to_group(group, bob)
+            self._add_dinner(group, alice, bob)
+            self._add_dinner(group, bob, alice)
+            self._add_dinner(group, alice, bob)
+            archive_group_history(group, datetime(2026, 3, 1))
+            group_id = group.id
+            source = db.session.get(GroupShard, group_id).shard_id
+            target = "shard_1" if source == "shard_0" else "shard_0"
+            db.session.remove()
+
+            move_group(group_id, target)
+
+        with self.app.app_context():
+            group = db.session.get(Group, group_id)
+            self.assertEqual(get_user_net_balance(group, self.bob_id), Decimal("-15.00"))
+            self.assertEqual(get_group_expenses(group), [])
+            self.assertEqual(len(get_group_expenses(group, with_splits=True, include_archived=True)), 3)
+            with db.engines[source].connect() as connection:
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM archived_expense_splits")).scalar(), 0)
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM opening_balances")).scalar(), 0)
+
+    def test_delete_group_on_its_shard(self):
+        """Test that deleting a group clears its shard rows and directory entry"""
+        with self.app.app_context():
+            alice = db.session.get(User, self.alice_id)
+            bob = db.session.get(User, self.bob_id)
+            group = create_group("Flat", alice)
+            add_user_to_group(group, bob)
+            self._add_dinner(group, alice, bob)
+            group_id = group.id
+            self._add_dinner(group, bob, alice)
+            archive_group_history(group, datetime(2026, 3, 1), batch_size=1)
+            self._add_dinner(group, alice, bob)
+            shard_id = db.session.get(GroupShard, group_id).shard_id
+
+            delete_group(group, alice, chunk_size=1)
+
+            self.assertEqual(self._group_rows(shard_id, group_id), 0)
+            self.assertIsNone(db.session.get(GroupShard, group_id))
+            with db.engines[shard_id].connect() as connection:
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM expense_splits")).scalar(), 0)
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM memberships")).scalar(), 0)
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM group_changes")).scalar(), 0)
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM archived_expense_splits")).scalar(), 0)
+                self.assertEqual(connection.execute(sa.text("SELECT count(*) FROM balance_checkpoints")).scalar(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from decimal import Decimal
+
+import numpy as np
+
+from app.services.split_service import calculate_splits, allocate_cents, build_split_rows
+
+
+class TestSplitService(unittest.TestCase):
+    """Test suite for the split calculator"""
+
+    def amounts(self, splits):
+        return {split["user"]: split["amount"] for split in splits}
+
+    def test_equal_split_distributes_leftover_cents_by_user_id(self):
+        """Test £10 over three users gives the extra cent to the lowest id"""
+        splits = calculate_splits(Decimal("10.00"), {"type": "equal", "users": [3, 1, 2]})
+
+        self.assertEqual(self.amounts(splits), {1: Decimal("3.34"), 2: Decimal("3.33"), 3: Decimal("3.33")})
+        self.assertEqual([split["user"] for split in splits], [1, 2, 3])
+
+    def test_percentage_split_sums_to_total(self):
+        """Test fractional percentages still add up to the exact total"""
+        splits = calculate_splits(
+            Decimal("100.00"),
+            {"type": "percentage", "shares": {1: "33.33", 2: "33.33", 3: "33.34"}}
+        )
+
+        self.assertEqual(sum(split["amount"] for split in splits), Decimal("100.00"))
+        self.assertEqual(self.amounts(splits)[3], Decimal("33.34"))
+
+    def test_percentage_must_sum_to_100(self):
+        """Test percentages that don't add up to 100 are rejected"""
+        with self.assertRaises(ValueError):
+            calculate_splits(Decimal("10.00"), {"type": "percentage", "shares": {1: "50", 2: "40"}})
+
+    def test_shares_split_uses_largest_remainder(self):
+        """Test £1.00 split 2:1 gives the leftover cent to the larger remainder"""
+        splits = calculate_splits(Decimal("1.00"), {"type": "shares", "shares": {1: 2, 2: 1}})
+
+        self.assertEqual(self.amounts(splits), {1: Decimal("0.67"), 2: Decimal("0.33")})
+
+    def test_exact_plus_remainder(self):
+        """Test exact amounts are kept and the rest is shared equally"""
+        splits = calculate_splits(
+            Decimal("50.00"),
+            {"type": "exact", "amounts": {1: "20.00"}, "remainder": [1, 2, 3]}
+        )
+
+        self.assertEqual(self.amounts(splits), {1: Decimal("30.00"), 2: Decimal("10.00"), 3: Decimal("10.00")})
+
+    def test_exact_amounts_cannot_exceed_total(self):
+        """Test exact amounts over the total are rejected"""
+        with self.assertRaises(ValueError):
+            calculate_splits(Decimal("10.00"), {"type": "exact", "amounts": {1: "11.00"}, "remainder": [2]})
+
+    def test_batch_matches_single_expense_results(self):
+        """Test the array mode gives the same cents as one expense at a time"""
+        rng = np.random.default_rng(7)
+        totals = rng.integers(1, 100_000, size = 500)
+        weights = rng.integers(0, 4, size = (500, 6))
+        weights[:, 0] = 1
+
+        batch = allocate_cents(totals, weights)
+
+        np.testing.assert_array_equal(batch.sum(axis = 1), totals)
+        for i in range(0, 500, 50):
+            shares = {user: int(w) for user, w in enumerate(weights[i]) if w}
+            single = calculate_splits(Decimal(int(totals[i])) / 100, {"type": "shares", "shares": shares})
+            self.assertEqual(
+                [int(split["amount"] * 100) for split in single],
+                [int(c) for c, w in zip(batch[i], weights[i]) if w]
+            )
+
+    def test_build_split_rows_skips_users_not_in_the_split(self):
+        """Test bulk rows only include users with a weight"""
+        rows = build_split_rows([10, 11], [Decimal("9.00"), Decimal("5.00")], [1, 2], [[1, 2], [1, 0]])
+
+        self.assertEqual(rows, [
+            {"expense_id": 10, "user_id": 1, "amount_owed": Decimal("3.00")},
+            {"expense_id": 10, "user_id": 2, "amount_owed": Decimal("6.00")},
+            {"expense_id": 11, "user_id": 1, "amount_owed": Decimal("5.00")},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
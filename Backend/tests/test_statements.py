@@ -0,0 +1,141 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from datetime import datetime
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.archive import archive_group_history
+from app.models import User
+from app.services.balance_service import calculate_group_balances, get_group_obligations
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group
+from app.services.settlement_service import create_settlement_request, confirm_settlement
+from app.statements import build_statement, generate_statements, statement_paths
+
+SEPTEMBER = datetime(2026, 9, 1)
+
+
+class TestStatements(unittest.TestCase):
+    """Test suite for monthly group statements"""
+
+    def setUp(self):
+        """Alice, Bob and Carol share a flat with history before, during and after September; Dan lives alone"""
+        self.tmpdir = tempfile.mkdtemp()
+
+        class TestConfig(Config):
+            # A file, so forked workers see the same database
+            SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(self.tmpdir, "test.db")
+            STATEMENTS_DIR = os.path.join(self.tmpdir, "statements")
+            TESTING = True
+
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash")
+        self.carol = User(name="Carol", email="carol@test.com", password_hash="hash")
+        self.dan = User(name="Dan", email="dan@test.com", password_hash="hash")
+        db.session.add_all([self.alice, self.bob, self.carol, self.dan])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+        add_user_to_group(self.flat, self.carol)
+        self.studio = create_group("Studio", self.dan)
+        everyone = [self.alice.id, self.bob.id, self.carol.id]
+
+        self.spend(self.alice, "August rent", "900.00", everyone, datetime(2026, 8, 1))
+        self.settle(self.bob, self.alice, "300.00", datetime(2026, 8, 20))
+        self.spend(self.bob, "Tesco", "60.00", everyone, datetime(2026, 9, 3))
+        self.spend(self.carol, "Pizza, Bob & Carol", "30.00", [self.bob.id, self.carol.id], datetime(2026, 9, 30, 23))
+        self.settle(self.carol, self.alice, "100.00", datetime(2026, 9, 15))
+        self.spend(self.alice, "October rent", "900.00", everyone, datetime(2026, 10, 1))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+        shutil.rmtree(self.tmpdir)
+
+    def spend(self, payer, description, amount, users, date):
+        return create_expense(self.flat, payer, description, Decimal(amount), {"type": "equal", "users": users}, date)
+
+    def settle(self, payer, payee, amount, requested_at):
+        settlement = create_settlement_request(self.flat, payer, payee, Decimal(amount))
+        settlement.created_at = requested_at
+        db.session.commit()
+        confirm_settlement(settlement, payee)
+
+    def test_statement_adds_up(self):
+        """Test opening plus the month's change is the closing balance, as the balance services see it"""
+        statement = build_statement(self.flat, SEPTEMBER)
+
+        self.assertEqual([(name, opening, change, closing) for name, opening, change, closing in statement.balances], [
+            ("Alice", Decimal("300.00"), Decimal("-120.00"), Decimal("180.00")),
+            ("Bob", Decimal("0.00"), Decimal("25.00"), Decimal("25.00")),
+            ("Carol", Decimal("-300.00"), Decimal("95.00"), Decimal("-205.00")),
+        ])
+        self.assertEqual([e[1] for e in statement.expenses], ["Tesco", "Pizza, Bob & Carol"])
+        self.assertEqual(statement.settlements, [(datetime(2026, 9, 15), "Carol", "Alice", Decimal("100.00"))])
+        self.assertEqual(statement.owes, [
+            ("Alice", "Bob", Decimal("20.00")),
+            ("Bob", "Carol", Decimal("15.00")),
+            ("Carol", "Alice", Decimal("200.00")),
+            ("Carol", "Bob", Decimal("20.00")),
+        ])
+
+        # Nothing after September: the closing figures are today's
+        october = build_statement(self.flat, datetime(2026, 10, 1))
+        self.assertEqual(
+            {name: closing for name, _, _, closing in october.balances},
+            {name: closing for name, _, _, closing in statement.balances} | {
+                "Alice": Decimal("780.00"), "Bob": Decimal("-275.00"), "Carol": Decimal("-505.00")
+            }
+        )
+        by_id = {self.alice.id: "Alice", self.bob.id: "Bob", self.carol.id: "Carol"}
+        self.assertEqual(
+            {by_id[user_id]: balance for user_id, balance in calculate_group_balances(self.flat).items()},
+            {name: closing for name, _, _, closing in october.balances}
+        )
+        self.assertEqual(
+            sorted((by_id[d], by_id[c], amount) for d, owed in get_group_obligations(self.flat).items() for c, amount in owed.items()),
+            october.owes
+        )
+
+    def test_generate_resumes_and_skips_archived_months(self):
+        """Test every group gets HTML and CSV, a rerun only does what is missing, and archived months are skipped"""
+        totals = generate_statements(SEPTEMBER, workers=2, chunk_size=1)
+        self.assertEqual((totals["groups"], totals["written"], totals["already_done"]), (2, 2, 0))
+
+        html_path, csv_path = statement_paths(self.app.config["STATEMENTS_DIR"], SEPTEMBER, self.flat.id)
+        with open(html_path, encoding="utf-8") as file:
+            html = file.read()
+        self.assertIn("<h1>Flat: September 2026</h1>", html)
+        self.assertIn("Pizza, Bob &amp; Carol", html)
+        with open(csv_path, encoding="utf-8", newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertIn(["balance", "Carol", "-300.00", "95.00", "-205.00"], rows)
+        self.assertIn(["expense", "2026-09-30", "Pizza, Bob & Carol", "eating_out", "Carol", "30.00", "GBP"], rows)
+
+        # An interrupted run left one group without its CSV
+        os.remove(csv_path)
+        totals = generate_statements(SEPTEMBER, workers=1)
+        self.assertEqual((totals["written"], totals["already_done"]), (1, 1))
+        self.assertTrue(os.path.exists(csv_path))
+
+        archive_group_history(self.flat, datetime(2026, 10, 1))
+        result = self.app.test_cli_runner().invoke(args=["statements", "generate", "--month", "2026-09", "--force"])
+        self.assertIn("wrote 1 of 2 groups", result.output)
+        self.assertIn("1 archived", result.output)
+        self.assertIn("groups/s", result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+from decimal import Decimal
+from datetime import date
+
+from sqlalchemy import select
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.billing_scheduler import BillingScheduler, ManualClock
+from app.models import User, Expense, GeneratedExpense
+from app.services.group_service import create_group, add_user_to_group
+from app.services.subscription_service import (
+    create_subscription, update_subscription, deactivate_subscription, advance_billing_date,
+    get_generated_expenses, get_latest_period, get_latest_periods, to_period
+)
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestBillingScheduler(unittest.TestCase):
+    """Test suite for subscription billing driven by the in-process scheduler"""
+
+    def setUp(self):
+        """Alice and Bob share a flat; the clock starts on 27 February"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash1")
+        self.bob = User(name="Bob", email="bob@test.com", password_hash="hash2")
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+        self.flat = create_group("Flat", self.alice)
+        add_user_to_group(self.flat, self.bob)
+
+        self.clock = ManualClock(date(2026, 2, 27))
+        self.scheduler = self.use_new_scheduler()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def use_new_scheduler(self, horizon_days=35):
+        """Install a fresh scheduler, as after a restart"""
+        scheduler = BillingScheduler(clock=self.clock, horizon_days=horizon_days)
+        self.app.extensions["billing_scheduler"] = scheduler
+        scheduler.rebuild()
+        return scheduler
+
+    def netflix(self, next_billing_date=date(2026, 3, 1)):
+        return create_subscription(
+            self.alice, "Netflix", Decimal("15.99"), next_billing_date,
+            owner_type="group", owner_id=self.flat.id
+        )
+
+    def generated(self):
+        return db.session.execute(
+            select(GeneratedExpense.period, Expense.total_amount)
+            .join(Expense, GeneratedExpense.expense_id == Expense.id)
+            .order_by(Expense.date)
+        ).all()
+
+    def test_bills_only_when_due(self):
+        """Test a subscription is billed on its date, once, and then rescheduled"""
+        subscription = self.netflix()
+
+        self.assertEqual(self.scheduler.run_due(), [])
+        self.clock.advance(2)
+        self.assertEqual(self.scheduler.run_due(), [subscription.id])
+        self.assertEqual(self.scheduler.run_due(), [])
+
+        self.assertEqual(self.generated(), [(202603, Decimal("15.99"))])
+        self.assertEqual(subscription.next_billing_date, date(2026, 4, 1))
+        self.assertEqual(self.scheduler.next_due_date(), date(2026, 4, 1))
+
+        expense = db.session.scalars(select(Expense)).one()
+        self.assertEqual(sorted(s.amount_owed for s in expense.splits), [Decimal("7.99"), Decimal("8.00")])
+
+    def test_changes_and_deactivation_update_the_schedule(self):
+        """Test moving a billing date reschedules it and deactivating drops it"""
+        subscription = self.netflix()
+        update_subscription(subscription, next_billing_date=date(2026, 2, 27))
+        self.assertEqual(self.scheduler.run_due(), [subscription.id])
+
+        deactivate_subscription(subscription)
+        self.clock.advance(40)
+        self.assertEqual(self.scheduler.run_due(), [])
+        self.assertIsNone(self.scheduler.next_due_date())
+        self.assertEqual(len(self.generated()), 1)
+
+    def test_rebuild_after_restart_catches_up_missed_cycles(self):
+        """Test a new scheduler reloads due subscriptions and bills each missed month"""
+        subscription = self.netflix()
+        self.clock.advance(60)
+
+        scheduler = self.use_new_scheduler()
+        self.assertEqual(scheduler.run_due(), [subscription.id])
+        self.assertEqual([period for period, _ in self.generated()], [202603, 202604])
+        self.assertEqual(subscription.next_billing_date, date(2026, 5, 1))
+
+    def test_subscriptions_beyond_the_horizon_are_loaded_as_it_moves(self):
+        """Test a subscription outside the horizon is picked up by a later range load"""
+        scheduler = self.use_new_scheduler(horizon_days=7)
+        subscription = self.netflix(next_billing_date=date(2026, 3, 20))
+        self.assertIsNone(scheduler.next_due_date())
+
+        self.clock.advance(20)
+        self.assertEqual(scheduler.run_due(), [])
+        self.assertEqual(scheduler.next_due_date(), date(2026, 3, 20))
+
+        self.clock.advance(1)
+        self.assertEqual(scheduler.run_due(), [subscription.id])
+
+    def test_subscriptions_added_by_another_process_are_billed(self):
+        """Test a subscription created within the loaded horizon by another worker is still billed on its date"""
+        self.assertEqual(self.scheduler.run_due(), [])
+
+        # Another web worker's scheduler gets the notification; this one only sees the database
+        self.app.extensions["billing_scheduler"] = BillingScheduler(clock=self.clock)
+        subscription = self.netflix(next_billing_date=date(2026, 3, 10))
+        self.app.extensions["billing_scheduler"] = self.scheduler
+        self.assertEqual(self.scheduler.next_due_date(), None)
+
+        self.clock.advance(1)
+        self.assertEqual(self.scheduler.run_due(), [])
+        self.assertEqual(self.scheduler.next_due_date(), date(2026, 3, 10))
+        self.clock.advance(10)
+        self.assertEqual(self.scheduler.run_due(), [subscription.id])
+        self.assertEqual(self.generated(), [(202603, Decimal("15.99"))])
+
+    def test_period_range_and_latest_period(self):
+        """Test period range and latest-period lookups across a year boundary"""
+        netflix = self.netflix(next_billing_date=date(2025, 11, 1))
+        spotify = create_subscription(
+            self.alice, "Spotify", Decimal("9.99"), date(2026, 1, 15),
+            owner_type="group", owner_id=self.flat.id
+        )
+        unbilled = create_subscription(self.bob, "Gym", Decimal("30.00"), date(2026, 6, 1))
+        self.scheduler.run_due()
+
+        q1 = get_generated_expenses([netflix.id, spotify.id], to_period(date(2026, 1, 1)), 202603)
+        self.assertEqual([(g.subscription_id, g.period) for g in q1],
+                         [(netflix.id, 202601), (netflix.id, 202602), (spotify.id, 202601), (spotify.id, 202602)])
+        self.assertEqual(q1[0].billing_period, "01-2026")
+
+        self.assertEqual(get_latest_periods([netflix.id, spotify.id, unbilled.id]),
+                         {netflix.id: 202602, spotify.id: 202602})
+        self.assertEqual(get_latest_period(netflix), 202602)
+        self.assertIsNone(get_latest_period(unbilled))
+
+    def test_advance_billing_date_clamps_to_month_end(self):
+        """Test monthly and yearly cycles on short months and leap days"""
+        self.assertEqual(advance_billing_date(date(2026, 1, 31), "monthly"), date(2026, 2, 28))
+        self.assertEqual(advance_billing_date(date(2026, 12, 15), "monthly"), date(2027, 1, 15))
+        self.assertEqual(advance_billing_date(date(2028, 2, 29), "yearly"), date(2029, 2, 28))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from unittest import mock
+from decimal import Decimal
+from datetime import date, datetime
+
+from sqlalchemy import select, func
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.billing_scheduler import BillingScheduler, ManualClock
+from app.models import User, Group, Membership, Expense, Subscription
+from app.services.expense_service import create_expense
+from app.services.group_service import create_group, add_user_to_group
+from app.services.subscription_service import create_subscription
+from app.transactions import billnest_transaction, in_transaction
+
+
+class TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    TESTING = True
+
+
+class TestBillnestTransaction(unittest.TestCase):
+    """Test suite for running several service calls as one unit of work"""
+
+    def setUp(self):
+        """Alice and ten housemates, none of them in a group yet"""
+        self.app = create_app(TestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        self.alice = User(name="Alice", email="alice@test.com", password_hash="hash")
+        self.housemates = [User(name=f"H{i}", email=f"h{i}@test.com", password_hash="hash") for i in range(10)]
+        db.session.add_all([self.alice] + self.housemates)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def move_in(self):
+        group = create_group("Flat", self.alice)
+        for user in self.housemates:
+            add_user_to_group(group, user)
+        create_expense(group, self.alice, "Deposit", Decimal("1100.00"),
+                       {"type": "equal", "users": [u.id for u in [self.alice] + self.housemates]},
+                       datetime(2026, 3, 1))
+        return group
+
+    def count(self, model):
+        return db.session.scalar(select(func.count()).select_from(model))
+
+    def test_composite_operation_commits_once(self):
+        """Test a group, its members and an expense are committed together"""
+        session = db.session()
+        with mock.patch.object(session, "commit", wraps=session.commit) as commits:
+            with billnest_transaction():
+                self.assertTrue(in_transaction())
+                group = self.move_in()
+                # Ids are still assigned as each call runs
+                self.assertIsNotNone(group.id)
+            self.assertEqual(commits.call_count, 1)
+
+        self.assertFalse(in_transaction())
+        self.assertEqual(self.count(Membership), 11)
+        self.assertEqual(self.count(Expense), 1)
+
+    def test_failure_rolls_back_the_whole_unit(self):
+        """Test an error part way through leaves nothing behind"""
+        with self.assertRaises(ValueError):
+            with billnest_transaction():
+                group = self.move_in()
+                add_user_to_group(group, self.housemates[0])  # already a member
+
+        self.assertEqual((self.count(Group), self.count(Membership), self.count(Expense)), (0, 0, 0))
+
+    def test_nested_blocks_join_the_outermost(self):
+        """Test only the outermost block commits"""
+        with self.assertRaises(RuntimeError):
+            with billnest_transaction():
+                with billnest_transaction():
+                    create_group("Flat", self.alice)
+                self.assertTrue(in_transaction())
+                raise RuntimeError("abandon the outer block")
+
+        self.assertEqual(self.count(Group), 0)
+        self.assertFalse(in_transaction())
+
+    def test_schedule_changes_wait_for_the_commit(self):
+        """Test the billing scheduler only hears about committed subscriptions"""
+        scheduler = BillingScheduler(clock=ManualClock(date(2026, 3, 1)))
+        self.app.extensions["billing_scheduler"] = scheduler
+        scheduler.rebuild()
+
+        with self.assertRaises(RuntimeError):
+            with billnest_transaction():
+                create_subscription(self.alice, "Gym", Decimal("30.00"), date(2026, 3, 5))
+                raise RuntimeError("card declined")
+        self.assertIsNone(scheduler.next_due_date())
+        self.assertEqual(self.count(Subscription), 0)
+
+        with billnest_transaction():
+            create_subscription(self.alice, "Gym", Decimal("30.00"), date(2026, 3, 5))
+            self.assertIsNone(scheduler.next_due_date())
+        self.assertEqual(scheduler.next_due_date(), date(2026, 3, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()